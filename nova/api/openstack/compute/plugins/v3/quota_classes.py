@@ -88,6 +88,7 @@ class QuotaClassSetsController(wsgi.Controller):
             except exception.AdminRequired:
                 raise webob.exc.HTTPForbidden()
 
+        QUOTAS.invalidate_limits_cache()
         values = QUOTAS.get_class_quotas(context, quota_class)
         return self._format_quota_set(None, values)
 
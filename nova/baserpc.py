@@ -41,6 +41,7 @@ class BaseAPI(object):
 
         1.0 - Initial version.
         1.1 - Add get_backdoor_port
+        1.2 - Add get_rpc_stats
     """
 
     VERSION_ALIASES = {
@@ -65,11 +66,15 @@ class BaseAPI(object):
         cctxt = self.client.prepare(server=host, version='1.1')
         return cctxt.call(context, 'get_backdoor_port')
 
+    def get_rpc_stats(self, context, host, reset=False):
+        cctxt = self.client.prepare(server=host, version='1.2')
+        return cctxt.call(context, 'get_rpc_stats', reset=reset)
+
 
 class BaseRPCAPI(object):
     """Server side of the base RPC API."""
 
-    target = messaging.Target(namespace=_NAMESPACE, version='1.1')
+    target = messaging.Target(namespace=_NAMESPACE, version='1.2')
 
     def __init__(self, service_name, backdoor_port):
         self.service_name = service_name
@@ -81,3 +86,9 @@ class BaseRPCAPI(object):
 
     def get_backdoor_port(self, context):
         return self.backdoor_port
+
+    def get_rpc_stats(self, context, reset=False):
+        stats = rpc.get_stats()
+        if reset:
+            rpc.reset_stats()
+        return jsonutils.to_primitive(stats)
@@ -57,6 +57,12 @@ cells_opts = [
     cfg.IntOpt('bandwidth_update_interval',
                 default=600,
                 help='Seconds between bandwidth updates for cells.'),
+    cfg.FloatOpt('cast_coalesce_window',
+                 default=0.0,
+                 help='Seconds to hold instance updates sent to the top '
+                      'level cell for, so that repeated updates of the same '
+                      'instance are merged into one message. Set to 0 to '
+                      'send them right away.'),
 ]
 
 CONF = cfg.CONF
@@ -120,11 +120,8 @@ class InterCellRPCAPI(object):
         """Turn the DB information for a cell into a messaging.RPCClient."""
         transport = self._get_transport(next_hop)
         target = messaging.Target(topic=topic, version='1.0')
-        serializer = rpc.RequestContextSerializer(None)
-        return messaging.RPCClient(transport,
-                                   target,
-                                   version_cap=self.version_cap,
-                                   serializer=serializer)
+        return rpc.get_client(target, version_cap=self.version_cap,
+                              transport=transport)
 
     def _get_transport(self, next_hop):
         """NOTE(belliott) Each Transport object contains connection pool
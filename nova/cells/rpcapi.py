@@ -38,12 +38,31 @@ LOG = logging.getLogger(__name__)
 CONF = cfg.CONF
 CONF.import_opt('enable', 'nova.cells.opts', group='cells')
 CONF.import_opt('topic', 'nova.cells.opts', group='cells')
+CONF.import_opt('cast_coalesce_window', 'nova.cells.opts', group='cells')
 
 rpcapi_cap_opt = cfg.StrOpt('cells',
         help='Set a version cap for messages sent to local cells services')
 CONF.register_opt(rpcapi_cap_opt, 'upgrade_levels')
 
 
+def _merge_instance_updates(earlier, later):
+    """Fold an earlier instance_update_at_top into a later one.
+
+    The top level cell only saves the fields marked as changed, so the
+    fields changed by the earlier update have to stay changed. Values set
+    in the later update are newer and win.
+    """
+    earlier_instance = earlier['instance']
+    instance = later['instance']
+    for field in earlier_instance.obj_what_changed():
+        if not instance.obj_attr_is_set(field):
+            setattr(instance, field, getattr(earlier_instance, field))
+        instance._changed_fields.add(field)
+
+
+_COALESCER = rpc.CastCoalescer(lambda: CONF.cells.cast_coalesce_window)
+
+
 class CellsAPI(object):
     '''Cells client-side RPC API
 
@@ -195,17 +214,25 @@ class CellsAPI(object):
         """Update instance at API level."""
         if not CONF.cells.enable:
             return
-        version = '1.35'
+        self._instance_update_at_top(ctxt, instance)
+
+    def _instance_update_at_top(self, ctxt, instance):
         if not self.client.can_send_version('1.35'):
             instance = objects_base.obj_to_primitive(instance)
-            version = '1.34'
-        cctxt = self.client.prepare(version=version)
-        cctxt.cast(ctxt, 'instance_update_at_top', instance=instance)
+            cctxt = self.client.prepare(version='1.34')
+            cctxt.cast(ctxt, 'instance_update_at_top', instance=instance)
+            return
+        cctxt = self.client.prepare(version='1.35')
+        _COALESCER.cast(cctxt, ctxt, 'instance_update_at_top', instance.uuid,
+                        merge=_merge_instance_updates, instance=instance)
 
     def instance_destroy_at_top(self, ctxt, instance):
         """Destroy instance at API level."""
         if not CONF.cells.enable:
             return
+        # NOTE: A queued update must not reach the top after the destroy,
+        # it would recreate the instance there.
+        _COALESCER.flush()
         version = '1.35'
         if not self.client.can_send_version('1.35'):
             instance = objects_base.obj_to_primitive(instance)
@@ -257,14 +284,9 @@ class CellsAPI(object):
         """Broadcast up that an instance's info_cache has changed."""
         if not CONF.cells.enable:
             return
-        version = '1.35'
         instance = objects.Instance(uuid=instance_info_cache.instance_uuid,
                                     info_cache=instance_info_cache)
-        if not self.client.can_send_version('1.35'):
-            instance = objects_base.obj_to_primitive(instance)
-            version = '1.34'
-        cctxt = self.client.prepare(version=version)
-        cctxt.cast(ctxt, 'instance_update_at_top', instance=instance)
+        self._instance_update_at_top(ctxt, instance)
 
     def get_cell_info_for_neighbors(self, ctxt):
         """Get information about our neighbor cells from the manager."""
@@ -137,20 +137,22 @@ def get_instances_to_sync(context, updated_since=None, project_id=None,
         filters['changes-since'] = updated_since
     if project_id is not None:
         filters['project_id'] = project_id
-    if not deleted:
-        filters['deleted'] = False
-    # Active instances first.
-    instances = objects.InstanceList.get_by_filters(
-            context, filters, sort_key='deleted', sort_dir='asc')
+    # NOTE: Instances are read a page at a time, active instances first.
+    passes = [False, True] if deleted else [False]
+    expected_attrs = [] if uuids_only else None
+    instances = (instance
+                 for pass_deleted in passes
+                 for instance in objects.InstanceList.iter_by_filters(
+                     context, dict(filters, deleted=pass_deleted),
+                     expected_attrs=expected_attrs))
+    if uuids_only:
+        instances = (instance.uuid for instance in instances)
     if shuffle:
         # NOTE(melwitt): Need a list that supports assignment for shuffle.
         instances = [instance for instance in instances]
         random.shuffle(instances)
     for instance in instances:
-        if uuids_only:
-            yield instance.uuid
-        else:
-            yield instance
+        yield instance
 
 
 def cell_with_item(cell_name, item):
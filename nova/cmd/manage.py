@@ -69,6 +69,7 @@ import six
 
 from nova.api.ec2 import ec2utils
 from nova import availability_zones
+from nova import conductor
 from nova import config
 from nova import context
 from nova import db
@@ -674,7 +675,7 @@ class VmCommands(object):
                                              _('index'))))
 
         if host is None:
-            instances = objects.InstanceList.get_by_filters(
+            instances = objects.InstanceList.iter_by_filters(
                 context.get_admin_context(), {}, expected_attrs=['flavor'])
         else:
             instances = objects.InstanceList.get_by_host(
@@ -980,6 +981,45 @@ class DbCommands(object):
             print(_('There were no records found where '
                     'instance_uuid was NULL.'))
 
+    @args('--top', metavar='<number>',
+          help='Number of DB API functions to show, slowest first')
+    @args('--reset', action='store_true', dest='reset', default=False,
+          help='Reset the statistics after showing them')
+    def stats(self, top=20, reset=False):
+        """Show the DB API statistics collected by a nova-conductor.
+
+        Requires db_api_instrumentation to be enabled on the conductor.
+        """
+        top = int(top)
+        if top < 0:
+            print(_('Must supply a positive value for top'))
+            return(1)
+        admin_context = context.get_admin_context()
+        stats = conductor.API().get_db_api_stats(admin_context, reset=reset)
+        if not stats['enabled']:
+            print(_('DB API instrumentation is not enabled on the conductor. '
+                    'Set db_api_instrumentation to True to enable it.'))
+            return(1)
+
+        functions = sorted(stats['functions'].items(),
+                           key=lambda item: item[1]['total_time'],
+                           reverse=True)
+        print("%-45s %-8s %-8s %-10s %-10s %-10s %s" % (
+            _('Function'), _('Calls'), _('Errors'), _('Rows'),
+            _('Avg (ms)'), _('Max (ms)'), _('Total (s)')))
+        for name, func in functions[:top]:
+            print("%-45s %-8d %-8d %-10d %-10.1f %-10.1f %.3f" % (
+                name, func['calls'], func['errors'], func['rows'],
+                func['avg_time'] * 1000, func['max_time'] * 1000,
+                func['total_time']))
+
+        if stats['slow_queries']:
+            print()
+            print(_('Slow queries:'))
+        for query in stats['slow_queries']:
+            print(_('%(duration).3fs %(function)s (%(operation)s, request '
+                    '%(request_id)s): %(statement)s %(parameters)s') % query)
+
     @args('--max-number', metavar='<number>', dest='max_number',
           help='Maximum number of instances to consider')
     @args('--force', action='store_true', dest='force',
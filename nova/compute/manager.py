@@ -121,12 +121,56 @@ compute_opts = [
                 default=False,
                 help='Whether to start guests that were running before the '
                      'host rebooted'),
+    cfg.IntOpt('init_host_workers',
+               default=1,
+               help='Maximum number of instances to initialize concurrently '
+                    'when nova-compute starts. Only used if the virt driver '
+                    'supports it, otherwise instances are initialized one '
+                    'at a time.'),
     cfg.IntOpt('network_allocate_retries',
                default=0,
                help="Number of times to retry network allocation on failures"),
     cfg.IntOpt('max_concurrent_builds',
                default=10,
                help='Maximum number of instance builds to run concurrently'),
+    cfg.IntOpt('max_concurrent_live_migrations',
+               default=0,
+               help='Maximum number of live migrations to run concurrently '
+                    'from this host. Further live migrations are queued, '
+                    'evacuations of a disabled host before rebalancing '
+                    'migrations. 0 starts every live migration as soon as '
+                    'it is requested, without queueing.'),
+    cfg.IntOpt('max_concurrent_live_migrations_per_host',
+               default=0,
+               help='Maximum number of queued live migrations to run '
+                    'concurrently from this host towards a single '
+                    'destination host, which bounds the inbound migrations '
+                    'this host sends to a destination. 0 means no limit. '
+                    'Only used when max_concurrent_live_migrations is '
+                    'positive.'),
+    cfg.BoolOpt('prefetch_image_on_build',
+                default=False,
+                help='Start fetching the image of an instance into the image '
+                     'cache of the virt driver as soon as its build request '
+                     'is received, so that the download overlaps with the '
+                     'wait for a build slot, the resource claim, the network '
+                     'allocation and the block device preparation.'),
+    cfg.BoolOpt('record_build_stage_events',
+                default=False,
+                help='Record the image prefetch, network allocation, block '
+                     'device preparation and spawn stages of instance builds '
+                     'as instance action events, which include their start '
+                     'and finish times.'),
+    cfg.FloatOpt('action_event_buffer_interval',
+                 default=0,
+                 help='Buffer the instance action events of the compute '
+                      'methods and record them in batches, with one write '
+                      'per event instead of one when it starts and one when '
+                      'it finishes. The events of an instance are recorded '
+                      'when none of them is running anymore or one failed, '
+                      'and otherwise at the latest after this many seconds. '
+                      'Running events are not visible until they finish. '
+                      'Set to 0 to record every event right away.'),
     cfg.IntOpt('block_device_allocate_retries',
                default=60,
                help='Number of times to retry block device'
@@ -144,10 +188,32 @@ interval_opts = [
                help='Interval to sync power states between the database and '
                     'the hypervisor. Set to -1 to disable. '
                     'Setting this to 0 will run at the default rate.'),
+    cfg.BoolOpt('sync_power_state_event_driven',
+                default=False,
+                help='Rely on the lifecycle events of the compute driver to '
+                     'sync power states. The sync_power_state_interval task '
+                     'then only syncs the instances touched by an operation '
+                     'since its previous run, and all the instances of the '
+                     'host are only synced every '
+                     'sync_power_state_full_interval seconds. Ignored when '
+                     'lifecycle events are disabled.'),
+    cfg.IntOpt('sync_power_state_full_interval',
+               default=3600,
+               help='With sync_power_state_event_driven, interval in seconds '
+                    'between syncs of all the instances of the host. '
+                    'Instances synced more recently than this, either by a '
+                    'lifecycle event or by a previous sync, are skipped.'),
     cfg.IntOpt("heal_instance_info_cache_interval",
                default=60,
                help="Number of seconds between instance network information "
                     "cache updates"),
+    cfg.IntOpt('heal_instance_info_cache_batch_size',
+               default=1,
+               help='Number of instances whose network information cache '
+                    'is updated on each heal_instance_info_cache_interval. '
+                    'With more than one instance, the network API fetches '
+                    'the network resources of the whole batch at once and '
+                    'only the caches which changed are written.'),
     cfg.IntOpt('reclaim_instance_interval',
                default=0,
                help='Interval in seconds for reclaiming deleted instances'),
@@ -169,6 +235,16 @@ interval_opts = [
                help='Interval in seconds for retrying failed instance file '
                     'deletes. Set to -1 to disable. '
                     'Setting this to 0 will run at the default rate.'),
+    cfg.IntOpt('host_inventory_reconcile_interval',
+               default=0,
+               help='Interval in seconds for reconciling the instances on '
+                    'the hypervisor with the database. When positive, one '
+                    'task diffs the instance uuids listed by the driver '
+                    'against a single database query and takes the running '
+                    'deleted instance and pending instance file delete '
+                    'actions from that diff, instead of the separate '
+                    'running deleted instance cleanup and instance file '
+                    'delete tasks. Set to 0 to keep the separate tasks.'),
     cfg.IntOpt('block_device_allocate_retries_interval',
                default=3,
                help='Waiting time interval (seconds) between block'
@@ -381,8 +457,11 @@ def wrap_instance_event(function):
         instance_uuid = keyed_args['instance']['uuid']
 
         event_name = 'compute_{0}'.format(function.func_name)
-        with compute_utils.EventReporter(context, event_name, instance_uuid):
-            return function(self, context, *args, **kwargs)
+        with self._event_reporter(context, event_name, instance_uuid):
+            try:
+                return function(self, context, *args, **kwargs)
+            finally:
+                self._mark_power_state_dirty(instance_uuid)
 
     return decorated_function
 
@@ -579,6 +658,10 @@ class ComputeVirtAPI(virtapi.VirtAPI):
     def provider_fw_rule_get_all(self, context):
         return self._compute.conductor_api.provider_fw_rule_get_all(context)
 
+    def update_live_migration_progress(self, context, instance, progress):
+        self._compute._live_migrations.update_progress(instance.uuid,
+                                                       progress)
+
     def _default_error_callback(self, event_name, instance):
         raise exception.NovaException(_('Instance event failed'))
 
@@ -648,7 +731,7 @@ class ComputeVirtAPI(virtapi.VirtAPI):
 class ComputeManager(manager.Manager):
     """Manages the running instances from creation to destruction."""
 
-    target = messaging.Target(version='4.2')
+    target = messaging.Target(version='4.3')
 
     # How long to wait in seconds before re-issuing a shutdown
     # signal to a instance during power off.  The overall
@@ -678,6 +761,21 @@ class ComputeManager(manager.Manager):
         self.instance_events = InstanceEvents()
         self._sync_power_pool = eventlet.GreenPool()
         self._syncs_in_progress = {}
+        # NOTE: Used when sync_power_state_event_driven is set, uuids of
+        # the instances to sync at the next run of _sync_power_states and
+        # time of the last sync of each instance.
+        self._power_sync_dirty = set()
+        self._power_sync_times = {}
+        self._last_full_power_sync = None
+        # NOTE: Cleared when the driver can not list instance uuids, in
+        # which case the separate cleanup tasks replace the host inventory
+        # reconciliation.
+        self._host_inventory_supported = True
+        self._action_events = compute_utils.ActionEventBuffer(
+            lambda: CONF.action_event_buffer_interval)
+        self._live_migrations = compute_utils.LiveMigrationQueue(
+            lambda: (CONF.max_concurrent_live_migrations,
+                     CONF.max_concurrent_live_migrations_per_host))
         self.send_instance_updates = CONF.scheduler_tracks_instance_changes
         if CONF.max_concurrent_builds != 0:
             self._build_semaphore = eventlet.semaphore.Semaphore(
@@ -778,6 +876,14 @@ class ComputeManager(manager.Manager):
             local_instances.append(instance)
         return local_instances
 
+    @staticmethod
+    def _is_instance_migrating(instance):
+        return (instance.task_state in [task_states.MIGRATING,
+                                        task_states.RESIZE_MIGRATING,
+                                        task_states.RESIZE_MIGRATED,
+                                        task_states.RESIZE_FINISH]
+                or instance.vm_state in [vm_states.RESIZED])
+
     def _destroy_evacuated_instances(self, context):
         """Destroys evacuated instances.
 
@@ -793,11 +899,7 @@ class ComputeManager(manager.Manager):
         local_instances = self._get_instances_on_driver(context, filters)
         for instance in local_instances:
             if instance.host != our_host:
-                if (instance.task_state in [task_states.MIGRATING,
-                                            task_states.RESIZE_MIGRATING,
-                                            task_states.RESIZE_MIGRATED,
-                                            task_states.RESIZE_FINISH]
-                    or instance.vm_state in [vm_states.RESIZED]):
+                if self._is_instance_migrating(instance):
                     LOG.debug('Will not delete instance as its host ('
                               '%(instance_host)s) is not equal to our '
                               'host (%(our_host)s) but its task state is '
@@ -1239,6 +1341,7 @@ class ComputeManager(manager.Manager):
             self._sync_instance_power_state(context,
                                             instance,
                                             vm_power_state)
+            self._power_state_synced(instance.uuid)
 
     def handle_events(self, event):
         if isinstance(event, virtevent.LifecycleEvent):
@@ -1254,6 +1357,9 @@ class ComputeManager(manager.Manager):
         if CONF.workarounds.handle_virt_lifecycle_events:
             self.driver.register_event_listener(self.handle_events)
         else:
+            if CONF.sync_power_state_event_driven:
+                LOG.warn(_LW('sync_power_state_event_driven is ignored '
+                             'since lifecycle events are disabled.'))
             # NOTE(mriedem): If the _sync_power_states periodic task is
             # disabled we should emit a warning in the logs.
             if CONF.sync_power_state_interval < 0:
@@ -1285,17 +1391,94 @@ class ComputeManager(manager.Manager):
         try:
             # checking that instance was not already evacuated to other host
             self._destroy_evacuated_instances(context)
-            for instance in instances:
-                self._init_instance(context, instance)
+            self._fail_queued_live_migrations(context)
+            self._init_instances(context, instances)
         finally:
             if CONF.defer_iptables_apply:
                 self.driver.filter_defer_apply_off()
             self._update_scheduler_instance_info(context, instances)
 
+    def _fail_queued_live_migrations(self, context):
+        """Fail the live migrations left queued by a previous run.
+
+        The live migration queue is only kept in memory, so these would
+        never be started. The instances are reset by _init_instance().
+        """
+        migrations = objects.MigrationList.get_by_filters(
+            context, {'source_compute': self.host, 'status': 'queued'})
+        for migration in migrations:
+            LOG.warning(_LW('Live migration to %s was still queued when the '
+                            'service stopped, marking it as failed'),
+                        migration.dest_compute,
+                        instance_uuid=migration.instance_uuid)
+            migration.status = 'failed'
+            migration.save()
+
+    def _init_instances(self, context, instances):
+        """Initialize the instances of the host, logging how long it took.
+
+        Instances with an interrupted task are initialized first. If the
+        driver supports it, up to init_host_workers instances are initialized
+        concurrently.
+        """
+        # NOTE: sorted() is stable, so the order is otherwise unchanged
+        instances = sorted(instances,
+                           key=lambda instance: instance.task_state is None)
+        workers = CONF.init_host_workers
+        if workers > 1 and not self.driver.capabilities.get(
+                'supports_parallel_init_instance', False):
+            LOG.info(_LI('Virt driver does not support initializing '
+                         'instances concurrently, ignoring '
+                         'init_host_workers'))
+            workers = 1
+
+        timings = {}
+
+        def _init_instance_timed(instance):
+            start = time.time()
+            try:
+                self._init_instance(context, instance)
+            finally:
+                timings[instance.uuid] = time.time() - start
+
+        start = time.time()
+        if workers > 1:
+            # NOTE: Each instance is handled by a single greenthread, and the
+            # operations _init_instance() calls still take the instance lock
+            # themselves, so there is no need to lock the instance here.
+            pool = eventlet.GreenPool(workers)
+            threads = [pool.spawn(_init_instance_timed, instance)
+                       for instance in instances]
+            pool.waitall()
+            for thread in threads:
+                # re-raise the first failure, like the sequential loop does
+                thread.wait()
+        else:
+            for instance in instances:
+                _init_instance_timed(instance)
+
+        if timings:
+            slowest = max(timings, key=timings.get)
+            LOG.info(_LI('Initialized %(count)d instances in %(elapsed).2f '
+                         'seconds using %(workers)d workers, slowest '
+                         '%(slowest)s took %(slowest_time).2f seconds'),
+                     {'count': len(timings),
+                      'elapsed': time.time() - start,
+                      'workers': workers, 'slowest': slowest,
+                      'slowest_time': timings[slowest]})
+
     def cleanup_host(self):
         self.driver.register_event_listener(None)
         self.instance_events.cancel_all_events()
         self.driver.cleanup_host(host=self.host)
+        self._action_events.flush()
+
+    def _event_reporter(self, context, event_name, instance_uuid):
+        """Return the context manager reporting an instance action event."""
+        if self._action_events.enabled:
+            return compute_utils.BufferedEventReporter(
+                self._action_events, context, event_name, instance_uuid)
+        return compute_utils.EventReporter(context, event_name, instance_uuid)
 
     def pre_start_hook(self):
         """After the service is initialized, but before we fully bring
@@ -1505,11 +1688,35 @@ class ComputeManager(manager.Manager):
         building_insts = objects.InstanceList.get_by_filters(context,
                            filters, expected_attrs=[], use_slave=True)
 
-        for instance in building_insts:
-            if timeutils.is_older_than(instance.created_at, timeout):
-                self._set_instance_error_state(context, instance)
-                LOG.warning(_LW("Instance build timed out. Set to error "
-                                "state."), instance=instance)
+        timed_out = [instance for instance in building_insts
+                     if timeutils.is_older_than(instance.created_at, timeout)]
+        if not timed_out:
+            return
+
+        for instance in timed_out:
+            instance.vm_state = vm_states.ERROR
+        timed_out = objects.InstanceList(context, objects=timed_out)
+        # NOTE: Set all of them to error with one bulk update, skipping
+        # the instances which finished building or were deleted meanwhile.
+        try:
+            skipped = timed_out.save_many(
+                expected_vm_state=[vm_states.BUILDING])
+        except exception.IncompatibleObjectVersion:
+            # NOTE: The conductor predates InstanceList.save_many() (for
+            # example during a rolling upgrade), so save one at a time.
+            skipped = []
+            for instance in timed_out:
+                try:
+                    instance.save(expected_vm_state=[vm_states.BUILDING])
+                except (exception.InstanceNotFound,
+                        exception.UnexpectedVMStateError):
+                    skipped.append(instance.uuid)
+        for instance in timed_out:
+            if instance.uuid in skipped:
+                continue
+            self._update_resource_tracker(context, instance)
+            LOG.warning(_LW("Instance build timed out. Set to error "
+                            "state."), instance=instance)
 
     def _check_instance_exists(self, context, instance):
         """Ensure an instance with the same name is not already present."""
@@ -1624,8 +1831,13 @@ class ComputeManager(manager.Manager):
         self._update_resource_tracker(context, instance)
 
         is_vpn = pipelib.is_vpn_image(instance.image_ref)
+
+        def _allocate_network_stage(*args):
+            with self._build_stage(context, instance, 'allocate_network'):
+                return self._allocate_network_async(*args)
+
         return network_model.NetworkInfoAsyncWrapper(
-                self._allocate_network_async, context, instance,
+                _allocate_network_stage, context, instance,
                 requested_networks, macs, security_groups, is_vpn,
                 dhcp_options)
 
@@ -1840,6 +2052,12 @@ class ComputeManager(manager.Manager):
             with self._build_semaphore:
                 self._do_build_and_run_instance(*args, **kwargs)
 
+        if CONF.prefetch_image_on_build:
+            # NOTE: Start fetching the image before waiting for the instance
+            # lock and a build slot, spawn() then finds it in the cache.
+            utils.spawn_n(self._prefetch_image, context, instance, image,
+                          block_device_mapping)
+
         # NOTE(danms): We spawn here to return the RPC worker thread back to
         # the pool. Since what follows could take a really long time, we don't
         # want to tie up RPC workers.
@@ -1849,6 +2067,33 @@ class ComputeManager(manager.Manager):
                       requested_networks, security_groups,
                       block_device_mapping, node, limits)
 
+    def _prefetch_image(self, context, instance, image, block_device_mapping):
+        """Fetch the image of an instance being built into the image cache.
+
+        Failures are only logged, spawn() fetches the image again and fails
+        the build if it really cannot be fetched.
+        """
+        bdms = block_device_mapping or objects.BlockDeviceMappingList()
+        try:
+            if self.compute_api.is_volume_backed_instance(context, instance,
+                                                          bdms):
+                return
+            with self._build_stage(context, instance, 'image_prefetch'):
+                self.driver.prefetch_image(context, instance, image)
+        except Exception:
+            LOG.warning(_LW('Failed to prefetch the image of the instance'),
+                        instance=instance, exc_info=True)
+
+    @contextlib.contextmanager
+    def _build_stage(self, context, instance, stage):
+        """Record a stage of a build as an instance action event."""
+        if not CONF.record_build_stage_events:
+            yield
+            return
+        with self._event_reporter(context, 'compute_%s' % stage,
+                                  instance.uuid):
+            yield
+
     @hooks.add_hook('build_instance')
     @wrap_exception()
     @reverts_task_state
@@ -1983,10 +2228,11 @@ class ComputeManager(manager.Manager):
                             task_states.BLOCK_DEVICE_MAPPING)
                     block_device_info = resources['block_device_info']
                     network_info = resources['network_info']
-                    self.driver.spawn(context, instance, image,
-                                      injected_files, admin_password,
-                                      network_info=network_info,
-                                      block_device_info=block_device_info)
+                    with self._build_stage(context, instance, 'spawn'):
+                        self.driver.spawn(context, instance, image,
+                                          injected_files, admin_password,
+                                          network_info=network_info,
+                                          block_device_info=block_device_info)
         except (exception.InstanceNotFound,
                 exception.UnexpectedDeletingTaskStateError) as e:
             with excutils.save_and_reraise_exception():
@@ -2088,8 +2334,9 @@ class ComputeManager(manager.Manager):
             instance.task_state = task_states.BLOCK_DEVICE_MAPPING
             instance.save()
 
-            block_device_info = self._prep_block_device(context, instance,
-                    block_device_mapping)
+            with self._build_stage(context, instance, 'prep_block_device'):
+                block_device_info = self._prep_block_device(context, instance,
+                        block_device_mapping)
             resources['block_device_info'] = block_device_info
         except (exception.InstanceNotFound,
                 exception.UnexpectedDeletingTaskStateError):
@@ -4845,7 +5092,50 @@ class ComputeManager(manager.Manager):
         :param migrate_data: implementation specific params
 
         """
+        if not self._live_migrations.enabled:
+            self._do_live_migration(context, dest, instance, block_migration,
+                                    migration, migrate_data)
+            return
+
+        priority = self._get_live_migration_priority(context, migrate_data)
+        if migration:
+            migration.status = 'queued'
+            migration.save()
+        LOG.info(_LI('Queueing live migration to %(dest)s with %(priority)s '
+                     'priority'), {'dest': dest, 'priority': priority},
+                 instance=instance)
+        self._live_migrations.submit(instance.uuid, dest, priority,
+                                     self._do_queued_live_migration,
+                                     context, dest, instance,
+                                     block_migration, migration,
+                                     migrate_data)
+
+    def _get_live_migration_priority(self, context, migrate_data):
+        """Return the priority of a live migration in the queue.
 
+        The priority can be given in migrate_data, otherwise migrations
+        from a disabled host are evacuations, which go first.
+        """
+        queue = compute_utils.LiveMigrationQueue
+        priority = (migrate_data or {}).get('live_migration_priority')
+        if priority in queue.PRIORITIES:
+            return priority
+        try:
+            service = objects.Service.get_by_compute_host(context, self.host)
+        except exception.NotFound:
+            return queue.PRIORITY_REBALANCE
+        if service.disabled:
+            return queue.PRIORITY_EVACUATION
+        return queue.PRIORITY_REBALANCE
+
+    @wrap_instance_fault
+    def _do_queued_live_migration(self, context, dest, instance,
+                                  block_migration, migration, migrate_data):
+        self._do_live_migration(context, dest, instance, block_migration,
+                                migration, migrate_data, queued=True)
+
+    def _do_live_migration(self, context, dest, instance, block_migration,
+                           migration, migrate_data, queued=False):
         # NOTE(danms): Remove these guards in v5.0 of the RPC API
         if migration:
             # NOTE(danms): We should enhance the RT to account for migrations
@@ -4886,10 +5176,18 @@ class ComputeManager(manager.Manager):
             migration.save()
 
         migrate_data['migration'] = migration
+        post_method = self._post_live_migration
+        recover_method = self._rollback_live_migration
+        if queued:
+            # NOTE: The driver may still be migrating when it returns, so
+            # the queue slot is only freed once the migration is over.
+            post_method = self._live_migrations.finish_after(
+                instance.uuid, post_method)
+            recover_method = self._live_migrations.finish_after(
+                instance.uuid, recover_method)
         try:
             self.driver.live_migration(context, instance, dest,
-                                       self._post_live_migration,
-                                       self._rollback_live_migration,
+                                       post_method, recover_method,
                                        block_migration, migrate_data)
         except Exception:
             # Executing live migration
@@ -5215,21 +5513,29 @@ class ComputeManager(manager.Manager):
         list, pull the DB record, and try the call to the network API.
         If anything errors don't fail, as it's possible the instance
         has been deleted, etc.
+
+        With heal_instance_info_cache_batch_size greater than one, that
+        many instances are popped off the list and refreshed together.
         """
         heal_interval = CONF.heal_instance_info_cache_interval
         if not heal_interval:
             return
 
+        batch_size = max(CONF.heal_instance_info_cache_batch_size, 1)
         instance_uuids = getattr(self, '_instance_uuids_to_heal', [])
-        instance = None
+        instances = []
 
         LOG.debug('Starting heal instance info cache')
 
         if not instance_uuids:
             # The list of instances to heal is empty so rebuild it
             LOG.debug('Rebuilding the list of instances to heal')
+            # NOTE: The instances refreshed in batch are compared with
+            # their cached network info, so load it with them.
+            expected_attrs = ['info_cache'] if batch_size > 1 else []
             db_instances = objects.InstanceList.get_by_host(
-                context, self.host, expected_attrs=[], use_slave=True)
+                context, self.host, expected_attrs=expected_attrs,
+                use_slave=True)
             for inst in db_instances:
                 # We don't want to refresh the cache for instances
                 # which are building or deleting so don't put them
@@ -5244,17 +5550,17 @@ class ComputeManager(manager.Manager):
                               'because it is being deleted.', instance=inst)
                     continue
 
-                if not instance:
-                    # Save the first one we find so we don't
-                    # have to get it again
-                    instance = inst
+                if len(instances) < batch_size:
+                    # Save the first ones we find so we don't
+                    # have to get them again
+                    instances.append(inst)
                 else:
                     instance_uuids.append(inst['uuid'])
 
             self._instance_uuids_to_heal = instance_uuids
         else:
-            # Find the next valid instance on the list
-            while instance_uuids:
+            # Find the next valid instances on the list
+            while instance_uuids and len(instances) < batch_size:
                 try:
                     inst = objects.Instance.get_by_uuid(
                             context, instance_uuids.pop(0),
@@ -5274,10 +5580,21 @@ class ComputeManager(manager.Manager):
                     LOG.debug('Skipping network cache update for instance '
                               'because it is being deleted.', instance=inst)
                 else:
-                    instance = inst
-                    break
+                    instances.append(inst)
 
-        if instance:
+        if batch_size > 1 and instances:
+            try:
+                updated = self.network_api.heal_instance_info_caches(
+                    context, instances)
+                LOG.debug('Refreshed the network info_cache for %(count)d '
+                          'instances, %(updated)d of them changed',
+                          {'count': len(instances), 'updated': len(updated)})
+            except Exception:
+                LOG.error(_LE('An error occurred while refreshing the network '
+                              'cache of %d instances.'), len(instances),
+                          exc_info=True)
+        elif instances:
+            instance = instances[0]
             # We have an instance now to refresh
             try:
                 # Call to network API to get instance info.. this will
@@ -5457,11 +5774,12 @@ class ComputeManager(manager.Manager):
             return
 
         begin, end = utils.last_completed_audit_period()
-        instances = objects.InstanceList.get_active_by_window_joined(
+        num_instances = objects.InstanceList.get_count_active_by_window(
+            context, begin, end, host=self.host, use_slave=True)
+        instances = objects.InstanceList.iter_active_by_window_joined(
             context, begin, end, host=self.host,
             expected_attrs=['system_metadata', 'info_cache', 'metadata'],
             use_slave=True)
-        num_instances = len(instances)
         errors = 0
         successes = 0
         LOG.info(_LI("Running instance usage audit for"
@@ -5540,45 +5858,30 @@ class ComputeManager(manager.Manager):
                 return
 
             refreshed = timeutils.utcnow()
-            for bw_ctr in bw_counters:
-                # Allow switching of greenthreads between queries.
-                greenthread.sleep(0)
-                bw_in = 0
-                bw_out = 0
-                last_ctr_in = None
-                last_ctr_out = None
-                usage = objects.BandwidthUsage.get_by_instance_uuid_and_mac(
-                    context, bw_ctr['uuid'], bw_ctr['mac_address'],
-                    start_period=start_time, use_slave=True)
-                if usage:
-                    bw_in = usage.bw_in
-                    bw_out = usage.bw_out
-                    last_ctr_in = usage.last_ctr_in
-                    last_ctr_out = usage.last_ctr_out
-                else:
+            try:
+                self._update_bw_usage_cache(context, bw_counters, prev_time,
+                                            start_time, refreshed,
+                                            update_cells)
+            except exception.IncompatibleObjectVersion:
+                # NOTE: The conductor predates BandwidthUsageList 1.3 (for
+                # example during a rolling upgrade), so look up and update
+                # the usage one network at a time.
+                for bw_ctr in bw_counters:
+                    # Allow switching of greenthreads between queries.
+                    greenthread.sleep(0)
                     usage = (objects.BandwidthUsage.
                              get_by_instance_uuid_and_mac(
                         context, bw_ctr['uuid'], bw_ctr['mac_address'],
-                        start_period=prev_time, use_slave=True))
-                    if usage:
-                        last_ctr_in = usage.last_ctr_in
-                        last_ctr_out = usage.last_ctr_out
-
-                if last_ctr_in is not None:
-                    if bw_ctr['bw_in'] < last_ctr_in:
-                        # counter rollover
-                        bw_in += bw_ctr['bw_in']
-                    else:
-                        bw_in += (bw_ctr['bw_in'] - last_ctr_in)
-
-                if last_ctr_out is not None:
-                    if bw_ctr['bw_out'] < last_ctr_out:
-                        # counter rollover
-                        bw_out += bw_ctr['bw_out']
-                    else:
-                        bw_out += (bw_ctr['bw_out'] - last_ctr_out)
-
-                objects.BandwidthUsage(context=context).create(
+                        start_period=start_time, use_slave=True))
+                    prev_usage = None
+                    if not usage:
+                        prev_usage = (objects.BandwidthUsage.
+                                      get_by_instance_uuid_and_mac(
+                            context, bw_ctr['uuid'], bw_ctr['mac_address'],
+                            start_period=prev_time, use_slave=True))
+                    bw_in, bw_out = self._get_bw_usage_delta(bw_ctr, usage,
+                                                             prev_usage)
+                    objects.BandwidthUsage(context=context).create(
                                               bw_ctr['uuid'],
                                               bw_ctr['mac_address'],
                                               bw_in,
@@ -5589,6 +5892,84 @@ class ComputeManager(manager.Manager):
                                               last_refreshed=refreshed,
                                               update_cells=update_cells)
 
+    @staticmethod
+    def _get_bw_usage_delta(bw_ctr, usage, prev_usage):
+        """Return the bw_in and bw_out totals for a counter sample.
+
+        usage is the record for the current audit period, if any, and
+        prev_usage the one for the previous period, which is only used to
+        get the last counter values when there is no current record.
+        """
+        bw_in = 0
+        bw_out = 0
+        last_ctr_in = None
+        last_ctr_out = None
+        if usage:
+            bw_in = usage.bw_in
+            bw_out = usage.bw_out
+            last_ctr_in = usage.last_ctr_in
+            last_ctr_out = usage.last_ctr_out
+        elif prev_usage:
+            last_ctr_in = prev_usage.last_ctr_in
+            last_ctr_out = prev_usage.last_ctr_out
+
+        if last_ctr_in is not None:
+            if bw_ctr['bw_in'] < last_ctr_in:
+                # counter rollover
+                bw_in += bw_ctr['bw_in']
+            else:
+                bw_in += (bw_ctr['bw_in'] - last_ctr_in)
+
+        if last_ctr_out is not None:
+            if bw_ctr['bw_out'] < last_ctr_out:
+                # counter rollover
+                bw_out += bw_ctr['bw_out']
+            else:
+                bw_out += (bw_ctr['bw_out'] - last_ctr_out)
+
+        return bw_in, bw_out
+
+    def _update_bw_usage_cache(self, context, bw_counters, prev_time,
+                               start_time, refreshed, update_cells):
+        """Updates the bandwidth usage cache table with a list of counters.
+
+        The existing usage records for both audit periods are fetched with
+        one query each and all of the counters are written in one call.
+        """
+        if not bw_counters:
+            return
+
+        uuids = list(set(bw_ctr['uuid'] for bw_ctr in bw_counters))
+
+        def _get_usages(start_period):
+            usages = objects.BandwidthUsageList.get_by_uuids(
+                context, uuids, start_period=start_period, use_slave=True)
+            return {(usage.instance_uuid, usage.mac): usage
+                    for usage in usages}
+
+        usages = _get_usages(start_time)
+        prev_usages = {}
+        if any((bw_ctr['uuid'], bw_ctr['mac_address']) not in usages
+               for bw_ctr in bw_counters):
+            prev_usages = _get_usages(prev_time)
+
+        bw_usages = []
+        for bw_ctr in bw_counters:
+            key = (bw_ctr['uuid'], bw_ctr['mac_address'])
+            bw_in, bw_out = self._get_bw_usage_delta(bw_ctr, usages.get(key),
+                                                     prev_usages.get(key))
+            bw_usages.append({'uuid': bw_ctr['uuid'],
+                              'mac': bw_ctr['mac_address'],
+                              'bw_in': bw_in,
+                              'bw_out': bw_out,
+                              'last_ctr_in': bw_ctr['bw_in'],
+                              'last_ctr_out': bw_ctr['bw_out']})
+
+        objects.BandwidthUsageList.update_bulk(context, bw_usages,
+                                               start_period=start_time,
+                                               last_refreshed=refreshed,
+                                               update_cells=update_cells)
+
     def _get_host_volume_bdms(self, context, use_slave=False):
         """Return all block device mappings on a compute host."""
         compute_host_bdms = []
@@ -5605,15 +5986,23 @@ class ComputeManager(manager.Manager):
 
     def _update_volume_usage_cache(self, context, vol_usages):
         """Updates the volume usage cache table with a list of stats."""
+        if not vol_usages:
+            return
+
+        usages = []
         for usage in vol_usages:
-            # Allow switching of greenthreads between queries.
-            greenthread.sleep(0)
-            self.conductor_api.vol_usage_update(context, usage['volume'],
-                                                usage['rd_req'],
-                                                usage['rd_bytes'],
-                                                usage['wr_req'],
-                                                usage['wr_bytes'],
-                                                usage['instance'])
+            instance = usage['instance']
+            usages.append({'volume_id': usage['volume'],
+                           'rd_req': usage['rd_req'],
+                           'rd_bytes': usage['rd_bytes'],
+                           'wr_req': usage['wr_req'],
+                           'wr_bytes': usage['wr_bytes'],
+                           'instance_uuid': instance['uuid'],
+                           'project_id': instance['project_id'],
+                           'user_id': instance['user_id'],
+                           'availability_zone':
+                               instance['availability_zone']})
+        self.conductor_api.vol_usage_update_bulk(context, usages)
 
     @periodic_task.periodic_task(spacing=CONF.volume_usage_poll_interval)
     def _poll_volume_usage(self, context, start_time=None):
@@ -5647,7 +6036,23 @@ class ComputeManager(manager.Manager):
         number of virtual machines known by the database, we proceed in a lazy
         loop, one database record at a time, checking if the hypervisor has the
         same power state as is in the database.
+
+        With sync_power_state_event_driven, lifecycle events keep the power
+        states in sync. Only the instances touched by an operation since the
+        previous run are synced, except every sync_power_state_full_interval
+        seconds when all the instances which were not synced during that
+        interval are.
         """
+        event_driven = self._power_sync_event_driven()
+        now = time.time()
+        dirty, self._power_sync_dirty = self._power_sync_dirty, set()
+        if (event_driven and self._last_full_power_sync is not None and
+                now - self._last_full_power_sync <
+                CONF.sync_power_state_full_interval):
+            self._sync_dirty_power_states(context, dirty)
+            return
+        self._last_full_power_sync = now
+
         db_instances = objects.InstanceList.get_by_host(context, self.host,
                                                         expected_attrs=[],
                                                         use_slave=True)
@@ -5663,16 +6068,50 @@ class ComputeManager(manager.Manager):
                         {'num_db_instances': num_db_instances,
                          'num_vm_instances': num_vm_instances})
 
+        if event_driven:
+            # NOTE: Forget the instances which left the host, and skip the
+            # ones synced recently by a lifecycle event or a dirty sync.
+            self._power_sync_times = {
+                inst.uuid: self._power_sync_times[inst.uuid]
+                for inst in db_instances
+                if inst.uuid in self._power_sync_times}
+            synced_since = now - CONF.sync_power_state_full_interval
+            db_instances = [
+                inst for inst in db_instances
+                if (inst.uuid in dirty or
+                    self._power_sync_times.get(inst.uuid, 0) < synced_since)]
+
+        try:
+            vm_power_states = self.driver.get_power_states()
+        except NotImplementedError:
+            vm_power_states = None
+        self._spawn_power_state_syncs(context, db_instances, vm_power_states)
+
+    def _sync_dirty_power_states(self, context, uuids):
+        """Sync the power states of the given instances of this host."""
+        if not uuids:
+            return
+        filters = {'uuid': list(uuids), 'host': self.host,
+                   'deleted': False, 'soft_deleted': True}
+        db_instances = objects.InstanceList.get_by_filters(
+            context, filters, expected_attrs=[], use_slave=True)
+        self._spawn_power_state_syncs(context, db_instances, None)
+
+    def _spawn_power_state_syncs(self, context, db_instances,
+                                 vm_power_states):
+
         def _sync(db_instance):
             # NOTE(melwitt): This must be synchronized as we query state from
             #                two separate sources, the driver and the database.
             #                They are set (in stop_instance) and read, in sync.
             @utils.synchronized(db_instance.uuid)
             def query_driver_power_state_and_sync():
-                self._query_driver_power_state_and_sync(context, db_instance)
+                self._query_driver_power_state_and_sync(
+                    context, db_instance, vm_power_states=vm_power_states)
 
             try:
                 query_driver_power_state_and_sync()
+                self._power_state_synced(db_instance.uuid)
             except Exception:
                 LOG.exception(_LE("Periodic sync_power_state task had an "
                                   "error while processing an instance."),
@@ -5691,36 +6130,59 @@ class ComputeManager(manager.Manager):
                 self._syncs_in_progress[uuid] = True
                 self._sync_power_pool.spawn_n(_sync, db_instance)
 
-    def _query_driver_power_state_and_sync(self, context, db_instance):
+    def _power_sync_event_driven(self):
+        return (CONF.sync_power_state_event_driven and
+                CONF.workarounds.handle_virt_lifecycle_events)
+
+    def _mark_power_state_dirty(self, instance_uuid):
+        """Sync the power state of an instance at the next sync run."""
+        if self._power_sync_event_driven():
+            self._power_sync_dirty.add(instance_uuid)
+
+    def _power_state_synced(self, instance_uuid):
+        if self._power_sync_event_driven():
+            self._power_sync_times[instance_uuid] = time.time()
+
+    def _get_vm_power_state(self, instance):
+        try:
+            return self.driver.get_info(instance).state
+        except exception.InstanceNotFound:
+            return power_state.NOSTATE
+
+    def _query_driver_power_state_and_sync(self, context, db_instance,
+                                           vm_power_states=None):
         if db_instance.task_state is not None:
             LOG.info(_LI("During sync_power_state the instance has a "
                          "pending task (%(task)s). Skip."),
                      {'task': db_instance.task_state}, instance=db_instance)
             return
         # No pending tasks. Now try to figure out the real vm_power_state.
-        try:
-            vm_instance = self.driver.get_info(db_instance)
-            vm_power_state = vm_instance.state
-        except exception.InstanceNotFound:
-            vm_power_state = power_state.NOSTATE
+        if vm_power_states is not None:
+            vm_power_state = vm_power_states.get(db_instance.uuid,
+                                                 power_state.NOSTATE)
+        else:
+            vm_power_state = self._get_vm_power_state(db_instance)
         # Note(maoy): the above get_info call might take a long time,
         # for example, because of a broken libvirt driver.
         try:
-            self._sync_instance_power_state(context,
-                                            db_instance,
-                                            vm_power_state,
-                                            use_slave=True)
+            self._sync_instance_power_state(
+                context, db_instance, vm_power_state, use_slave=True,
+                confirm_power_state=vm_power_states is not None)
         except exception.InstanceNotFound:
             # NOTE(hanlind): If the instance gets deleted during sync,
             # silently ignore.
             pass
 
     def _sync_instance_power_state(self, context, db_instance, vm_power_state,
-                                   use_slave=False):
+                                   use_slave=False, confirm_power_state=False):
         """Align instance power state between the database and hypervisor.
 
         If the instance is not found on the hypervisor, but is in the database,
         then a stop() API will be called on the instance.
+
+        If confirm_power_state is True, vm_power_state was read before the
+        instance lock was taken and is queried again from the driver when it
+        does not match the database.
         """
 
         # We re-query the DB to get the latest instance info to minimize
@@ -5756,6 +6218,11 @@ class ComputeManager(manager.Manager):
                      instance=db_instance)
             return
 
+        if confirm_power_state and vm_power_state != db_power_state:
+            # NOTE: The instance may have been started or stopped since
+            # the power states of all instances were read.
+            vm_power_state = self._get_vm_power_state(db_instance)
+
         orig_db_power_state = db_power_state
         if vm_power_state != db_power_state:
             LOG.info(_LI('During _sync_instance_power_state the DB '
@@ -5992,6 +6459,9 @@ class ComputeManager(manager.Manager):
         should do in production), or automatically reaping the instances (more
         appropriate for dev environments).
         """
+        if self._host_inventory_enabled():
+            return
+
         action = CONF.running_deleted_instance_action
 
         if action == "noop":
@@ -5999,51 +6469,56 @@ class ComputeManager(manager.Manager):
 
         # NOTE(sirp): admin contexts don't ordinarily return deleted records
         with utils.temporary_mutation(context, read_deleted="yes"):
-            for instance in self._running_deleted_instances(context):
-                if action == "log":
-                    LOG.warning(_LW("Detected instance with name label "
-                                    "'%s' which is marked as "
-                                    "DELETED but still present on host."),
-                                instance.name, instance=instance)
-
-                elif action == 'shutdown':
-                    LOG.info(_LI("Powering off instance with name label "
-                                 "'%s' which is marked as "
-                                 "DELETED but still present on host."),
-                             instance.name, instance=instance)
-                    try:
-                        try:
-                            # disable starting the instance
-                            self.driver.set_bootable(instance, False)
-                        except NotImplementedError:
-                            LOG.warning(_LW("set_bootable is not implemented "
-                                            "for the current driver"))
-                        # and power it off
-                        self.driver.power_off(instance)
-                    except Exception:
-                        msg = _LW("Failed to power off instance")
-                        LOG.warn(msg, instance=instance, exc_info=True)
-
-                elif action == 'reap':
-                    LOG.info(_LI("Destroying instance with name label "
-                                 "'%s' which is marked as "
-                                 "DELETED but still present on host."),
-                             instance.name, instance=instance)
-                    bdms = objects.BlockDeviceMappingList.get_by_instance_uuid(
-                        context, instance.uuid, use_slave=True)
-                    self.instance_events.clear_events_for_instance(instance)
+            self._handle_running_deleted_instances(
+                context, self._running_deleted_instances(context), action)
+
+    def _handle_running_deleted_instances(self, context, instances, action):
+        """Take the running_deleted_instance_action on instances."""
+        for instance in instances:
+            if action == "log":
+                LOG.warning(_LW("Detected instance with name label "
+                                "'%s' which is marked as "
+                                "DELETED but still present on host."),
+                            instance.name, instance=instance)
+
+            elif action == 'shutdown':
+                LOG.info(_LI("Powering off instance with name label "
+                             "'%s' which is marked as "
+                             "DELETED but still present on host."),
+                         instance.name, instance=instance)
+                try:
                     try:
-                        self._shutdown_instance(context, instance, bdms,
-                                                notify=False)
-                        self._cleanup_volumes(context, instance.uuid, bdms)
-                    except Exception as e:
-                        LOG.warning(_LW("Periodic cleanup failed to delete "
-                                        "instance: %s"),
-                                    e, instance=instance)
-                else:
-                    raise Exception(_("Unrecognized value '%s'"
-                                      " for CONF.running_deleted_"
-                                      "instance_action") % action)
+                        # disable starting the instance
+                        self.driver.set_bootable(instance, False)
+                    except NotImplementedError:
+                        LOG.warning(_LW("set_bootable is not implemented "
+                                        "for the current driver"))
+                    # and power it off
+                    self.driver.power_off(instance)
+                except Exception:
+                    msg = _LW("Failed to power off instance")
+                    LOG.warn(msg, instance=instance, exc_info=True)
+
+            elif action == 'reap':
+                LOG.info(_LI("Destroying instance with name label "
+                             "'%s' which is marked as "
+                             "DELETED but still present on host."),
+                         instance.name, instance=instance)
+                bdms = objects.BlockDeviceMappingList.get_by_instance_uuid(
+                    context, instance.uuid, use_slave=True)
+                self.instance_events.clear_events_for_instance(instance)
+                try:
+                    self._shutdown_instance(context, instance, bdms,
+                                            notify=False)
+                    self._cleanup_volumes(context, instance.uuid, bdms)
+                except Exception as e:
+                    LOG.warning(_LW("Periodic cleanup failed to delete "
+                                    "instance: %s"),
+                                e, instance=instance)
+            else:
+                raise Exception(_("Unrecognized value '%s'"
+                                  " for CONF.running_deleted_"
+                                  "instance_action") % action)
 
     def _running_deleted_instances(self, context):
         """Returns a list of instances nova thinks is deleted,
@@ -6183,6 +6658,9 @@ class ComputeManager(manager.Manager):
     @periodic_task.periodic_task(spacing=CONF.instance_delete_interval)
     def _run_pending_deletes(self, context):
         """Retry any pending instance file deletes."""
+        if self._host_inventory_enabled():
+            return
+
         LOG.debug('Cleaning up deleted instances')
         filters = {'deleted': True,
                    'soft_deleted': False,
@@ -6192,23 +6670,156 @@ class ComputeManager(manager.Manager):
         with utils.temporary_mutation(context, read_deleted='yes'):
             instances = objects.InstanceList.get_by_filters(
                 context, filters, expected_attrs=attrs, use_slave=True)
+        self._retry_pending_deletes(context, instances)
+
+    def _retry_pending_deletes(self, context, instances):
         LOG.debug('There are %d instances to clean', len(instances))
 
-        for instance in instances:
-            attempts = int(instance.system_metadata.get('clean_attempts', '0'))
-            LOG.debug('Instance has had %(attempts)s of %(max)s '
-                      'cleanup attempts',
-                      {'attempts': attempts,
-                       'max': CONF.maximum_instance_delete_attempts},
-                      instance=instance)
-            if attempts < CONF.maximum_instance_delete_attempts:
-                success = self.driver.delete_instance_files(instance)
+        # NOTE: The saves are sent to the conductor together when the batch
+        # exits, so it has to be within the read_deleted mutation.
+        with utils.temporary_mutation(context, read_deleted='yes'):
+            with obj_base.RemotableBatch(context):
+                for instance in instances:
+                    self._retry_pending_delete(instance)
+
+    def _retry_pending_delete(self, instance):
+        attempts = int(instance.system_metadata.get('clean_attempts', '0'))
+        LOG.debug('Instance has had %(attempts)s of %(max)s '
+                  'cleanup attempts',
+                  {'attempts': attempts,
+                   'max': CONF.maximum_instance_delete_attempts},
+                  instance=instance)
+        if attempts < CONF.maximum_instance_delete_attempts:
+            success = self.driver.delete_instance_files(instance)
 
-                instance.system_metadata['clean_attempts'] = str(attempts + 1)
-                if success:
-                    instance.cleaned = True
-                with utils.temporary_mutation(context, read_deleted='yes'):
-                    instance.save()
+            instance.system_metadata['clean_attempts'] = str(attempts + 1)
+            if success:
+                instance.cleaned = True
+            instance.save()
+
+    @periodic_task.periodic_task
+    def _report_live_migration_queue(self, context):
+        """Log the progress of the running and queued live migrations.
+
+        The slots of running migrations which ended without freeing them
+        are reclaimed first.
+        """
+        self._reclaim_live_migration_slots(context)
+        migrations = self._live_migrations.get_status()
+        if not migrations:
+            return
+        running = [migration for migration in migrations
+                   if migration['status'] == 'running']
+        LOG.info(_LI('%(running)d live migrations running and %(queued)d '
+                     'queued'),
+                 {'running': len(running),
+                  'queued': len(migrations) - len(running)})
+        for migration in migrations:
+            LOG.debug('Live migration to %(dest)s with %(priority)s '
+                      'priority is %(status)s, %(progress)d%% done',
+                      migration, instance_uuid=migration['instance_uuid'])
+
+    def _reclaim_live_migration_slots(self, context):
+        """Free the slots of the running migrations which have ended.
+
+        A slot is normally freed once the driver calls the post or recover
+        method of the migration, which it may never do if the thread
+        monitoring the migration died. A migration has ended once its
+        instance is gone, no longer on this host or no longer migrating.
+        """
+        uuids = [migration['instance_uuid']
+                 for migration in self._live_migrations.get_status()
+                 if migration['status'] == 'running']
+        if not uuids:
+            return
+        instances = objects.InstanceList.get_by_filters(
+            context, {'uuid': uuids}, expected_attrs=[])
+        migrating = set(instance.uuid for instance in instances
+                        if instance.host == self.host and
+                        instance.task_state == task_states.MIGRATING)
+        for instance_uuid in uuids:
+            if instance_uuid not in migrating:
+                LOG.warning(_LW('Live migration is no longer in progress, '
+                                'freeing its slot'),
+                            instance_uuid=instance_uuid)
+                self._live_migrations.finish(instance_uuid)
+
+    def _host_inventory_enabled(self):
+        return (CONF.host_inventory_reconcile_interval > 0 and
+                self._host_inventory_supported)
+
+    @periodic_task.periodic_task(
+        spacing=CONF.host_inventory_reconcile_interval)
+    def _reconcile_host_inventory(self, context):
+        """Reconcile the instances on the hypervisor with the database.
+
+        The uuids of the instances listed by the driver are diffed against
+        a single light database query, instead of the separate scans of
+        _cleanup_running_deleted_instances() and _run_pending_deletes().
+        Full instance records are only loaded for the instances needing
+        an action. Instances which look evacuated are logged; destroying
+        them is still left to init_host(). Each check is skipped when the
+        interval option of the task it replaces disables that task.
+        """
+        if not self._host_inventory_enabled():
+            return
+
+        try:
+            driver_uuids = set(self.driver.list_instance_uuids())
+        except NotImplementedError:
+            LOG.info(_LI('The driver can not list instance uuids, using '
+                         'the separate running deleted instance and '
+                         'instance file delete tasks instead of host '
+                         'inventory reconciliation.'))
+            self._host_inventory_supported = False
+            return
+
+        timeout = CONF.running_deleted_instance_timeout
+        action = CONF.running_deleted_instance_action
+        check_running_deleted = (
+            CONF.running_deleted_instance_poll_interval > 0 and
+            action != 'noop')
+        check_pending_deletes = CONF.instance_delete_interval >= 0
+        running_deleted = []
+        pending_deletes = []
+        # NOTE: admin contexts don't ordinarily return deleted records
+        with utils.temporary_mutation(context, read_deleted='yes'):
+            inventory = objects.InstanceList.get_host_inventory(
+                context, self.host, list(driver_uuids), use_slave=True)
+            for instance in inventory:
+                on_driver = instance.uuid in driver_uuids
+                if not instance.deleted:
+                    if (on_driver and instance.host != self.host and
+                            not self._is_instance_migrating(instance)):
+                        LOG.warning(_LW('Instance appears to have been '
+                                        'evacuated from this host to '
+                                        '%(host)s but is still present on '
+                                        'the hypervisor.'),
+                                    {'host': instance.host},
+                                    instance=instance)
+                    continue
+                if (instance.host != self.host or
+                        instance.vm_state == vm_states.SOFT_DELETED):
+                    continue
+                if (check_running_deleted and on_driver and
+                        self._deleted_old_enough(instance, timeout)):
+                    running_deleted.append(instance.uuid)
+                if check_pending_deletes and not instance.cleaned:
+                    pending_deletes.append(instance.uuid)
+
+            if running_deleted:
+                instances = objects.InstanceList.get_by_filters(
+                    context, {'uuid': running_deleted, 'deleted': True},
+                    use_slave=True)
+                self._handle_running_deleted_instances(context, instances,
+                                                       action)
+
+            if pending_deletes:
+                attrs = ['info_cache', 'security_groups', 'system_metadata']
+                instances = objects.InstanceList.get_by_filters(
+                    context, {'uuid': pending_deletes, 'deleted': True},
+                    expected_attrs=attrs, use_slave=True)
+                self._retry_pending_deletes(context, instances)
 
     @messaging.expected_exceptions(exception.InstanceQuiesceNotSupported,
                                    exception.NovaException,
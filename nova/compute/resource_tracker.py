@@ -19,6 +19,7 @@ scheduler with useful information about availability through the ComputeNode
 model.
 """
 import copy
+import time
 
 from oslo_config import cfg
 from oslo_log import log as logging
@@ -53,6 +54,16 @@ resource_tracker_opts = [
     cfg.ListOpt('compute_resources',
                 default=['vcpu'],
                 help='The names of the extra resources to track.'),
+    cfg.IntOpt('resource_full_audit_interval',
+               default=0,
+               help='Interval in seconds between full audits of the usage of '
+                    'the compute node, which recount the instances and '
+                    'migrations of the node from the database. In between, '
+                    'the periodic audit only refreshes the values reported '
+                    'by the hypervisor and relies on claims and instance '
+                    'updates to keep the usage current. A change of the '
+                    'capacity reported by the hypervisor always triggers a '
+                    'full audit. Set to 0 to do a full audit every time.'),
 ]
 
 CONF = cfg.CONF
@@ -86,6 +97,8 @@ class ResourceTracker(object):
             ext_resources.ResourceHandler(CONF.compute_resources)
         self.old_resources = objects.ComputeNode()
         self.scheduler_client = scheduler_client.SchedulerClient()
+        self._last_full_audit = None
+        self._capacity_signature = None
 
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def instance_claim(self, context, instance_ref, limits=None):
@@ -406,6 +419,18 @@ class ResourceTracker(object):
     @utils.synchronized(COMPUTE_RESOURCE_SEMAPHORE)
     def _update_available_resource(self, context, resources):
 
+        capacity_signature = self._get_capacity_signature(resources)
+        if self._incremental_audit(context, resources, capacity_signature):
+            return
+
+        # NOTE: remember the usage maintained since the last full audit, so
+        # that the recount below can tell whether it drifted. A new capacity
+        # changes the free resources, so there is nothing to compare then.
+        usage_before = None
+        if (self._last_full_audit is not None and not self.disabled and
+                capacity_signature == self._capacity_signature):
+            usage_before = self._get_usage_snapshot()
+
         # initialise the compute node object, creating it
         # if it does not already exist.
         self._init_compute_node(context, resources)
@@ -481,6 +506,86 @@ class ResourceTracker(object):
         LOG.info(_LI('Compute_service record updated for %(host)s:%(node)s'),
                      {'host': self.host, 'node': self.nodename})
 
+        if usage_before is not None:
+            self._check_usage_drift(usage_before)
+        self._last_full_audit = time.time()
+        self._capacity_signature = capacity_signature
+
+    def _get_capacity_signature(self, resources):
+        """Returns the capacity reported by the hypervisor, as a string."""
+        keys = ('vcpus', 'memory_mb', 'local_gb', 'numa_topology',
+                'pci_passthrough_devices')
+        return jsonutils.dumps(dict((key, resources.get(key)) for key in keys),
+                               sort_keys=True)
+
+    def _incremental_audit(self, context, resources, capacity_signature):
+        """Refresh the compute node without recounting its usage.
+
+        Between full audits, the usage of the node is kept current by the
+        claims and by update_usage(), so only the values which come straight
+        from the hypervisor need to be refreshed.
+
+        :returns: False if a full audit is needed instead, True otherwise
+        """
+        interval = CONF.resource_full_audit_interval
+        if (interval <= 0 or self.disabled or self._last_full_audit is None
+                or time.time() - self._last_full_audit >= interval):
+            return False
+        if capacity_signature != self._capacity_signature:
+            LOG.info(_LI("Capacity of node %(node)s changed, recounting "
+                         "its usage"), {'node': self.nodename})
+            return False
+
+        keys = ('cpu_info', 'hypervisor_type', 'hypervisor_version',
+                'hypervisor_hostname', 'disk_available_least', 'host_ip',
+                'supported_instances')
+        self.compute_node.update_from_virt_driver(
+            dict((key, resources[key]) for key in keys if key in resources))
+
+        metrics = self._get_host_metrics(context, self.nodename)
+        self.compute_node.metrics = jsonutils.dumps(metrics)
+
+        # NOTE: _update() only reports the compute node if anything changed
+        self._update(context)
+        LOG.debug('Compute node %(host)s:%(node)s refreshed without a full '
+                  'audit', {'host': self.host, 'node': self.nodename})
+        return True
+
+    def _get_usage_snapshot(self):
+        """Returns the usage values of the compute node as primitives."""
+        snapshot = {}
+        for key in ('vcpus_used', 'memory_mb_used', 'local_gb_used',
+                    'free_ram_mb', 'free_disk_gb', 'running_vms',
+                    'current_workload', 'numa_topology', 'stats',
+                    'pci_device_pools'):
+            if not self.compute_node.obj_attr_is_set(key):
+                continue
+            value = self.compute_node[key]
+            if isinstance(value, obj_base.NovaObject):
+                value = obj_base.obj_to_primitive(value)
+            elif isinstance(value, dict):
+                value = dict(value)
+            snapshot[key] = value
+        return snapshot
+
+    def _check_usage_drift(self, usage_before):
+        """Log the usage values a full audit had to correct."""
+        usage_after = self._get_usage_snapshot()
+        drifted = sorted(key for key in set(usage_before) | set(usage_after)
+                         if usage_before.get(key) != usage_after.get(key))
+        if not drifted:
+            return
+        changes = []
+        for key in drifted:
+            if isinstance(usage_after.get(key), int):
+                changes.append('%s: %s -> %s' % (key, usage_before.get(key),
+                                                 usage_after[key]))
+            else:
+                changes.append(key)
+        LOG.warning(_LW("Usage of node %(node)s drifted since the last full "
+                        "audit: %(changes)s"),
+                    {'node': self.nodename, 'changes': ', '.join(changes)})
+
     def _get_compute_node(self, context):
         """Returns compute node for the host and nodename."""
         try:
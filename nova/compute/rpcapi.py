@@ -31,6 +31,12 @@ rpcapi_opts = [
     cfg.StrOpt('compute_topic',
                default='compute',
                help='The topic compute nodes listen on'),
+    cfg.FloatOpt('compute_cast_coalesce_window',
+                 default=0.0,
+                 help='Seconds to hold security group refresh casts to '
+                      'compute nodes for, so that repeated refreshes of the '
+                      'same security group or instance are only sent once. '
+                      'Set to 0 to send them right away.'),
 ]
 
 CONF = cfg.CONF
@@ -47,6 +53,8 @@ CONF.register_opt(rpcapi_cap_opt, 'upgrade_levels')
 
 LOG = logging.getLogger(__name__)
 
+_COALESCER = rpc.CastCoalescer(lambda: CONF.compute_cast_coalesce_window)
+
 
 def _compute_host(host, instance):
     '''Get the destination host for a message.
@@ -299,6 +307,7 @@ class ComputeAPI(object):
         * 4.0  - Remove 3.x compatibility
         * 4.1  - Make prep_resize() and resize_instance() send Flavor object
         * 4.2  - Add migration argument to live_migration()
+        * 4.3  - Accept objects in the compact envelope
     '''
 
     VERSION_ALIASES = {
@@ -314,6 +323,8 @@ class ComputeAPI(object):
                                                CONF.upgrade_levels.compute)
         serializer = objects_base.NovaObjectSerializer()
         self.client = self.get_client(target, version_cap, serializer)
+        serializer.compact = (CONF.rpc_compact_objects and
+                              self.client.can_send_version('4.3'))
 
     def _compat_ver(self, current, legacy):
         if self.client.can_send_version(current):
@@ -906,15 +917,17 @@ class ComputeAPI(object):
     def refresh_security_group_rules(self, ctxt, security_group_id, host):
         version = '4.0'
         cctxt = self.client.prepare(server=host, version=version)
-        cctxt.cast(ctxt, 'refresh_security_group_rules',
-                   security_group_id=security_group_id)
+        _COALESCER.cast(cctxt, ctxt, 'refresh_security_group_rules',
+                        security_group_id,
+                        security_group_id=security_group_id)
 
     def refresh_security_group_members(self, ctxt, security_group_id,
             host):
         version = '4.0'
         cctxt = self.client.prepare(server=host, version=version)
-        cctxt.cast(ctxt, 'refresh_security_group_members',
-                   security_group_id=security_group_id)
+        _COALESCER.cast(cctxt, ctxt, 'refresh_security_group_members',
+                        security_group_id,
+                        security_group_id=security_group_id)
 
     def refresh_instance_security_rules(self, ctxt, host, instance):
         version = '4.0'
@@ -922,5 +935,5 @@ class ComputeAPI(object):
         instance_p = jsonutils.to_primitive(instance)
         cctxt = self.client.prepare(server=_compute_host(None, instance),
                 version=version)
-        cctxt.cast(ctxt, 'refresh_instance_security_rules',
-                   instance=instance_p)
+        _COALESCER.cast(cctxt, ctxt, 'refresh_instance_security_rules',
+                        instance_p['uuid'], instance=instance_p)
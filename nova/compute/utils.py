@@ -14,20 +14,26 @@
 
 """Compute-related Utilities and helpers."""
 
+import collections
+import functools
+import heapq
 import itertools
 import string
+import threading
 import traceback
 
+from eventlet import greenthread
 import netifaces
 from oslo_config import cfg
 from oslo_log import log
+from oslo_utils import timeutils
 import six
 
 from nova import block_device
 from nova.compute import power_state
 from nova.compute import task_states
 from nova import exception
-from nova.i18n import _LW
+from nova.i18n import _LE, _LW
 from nova.network import model as network_model
 from nova import notifications
 from nova import objects
@@ -466,6 +472,110 @@ class EventReporter(object):
         return False
 
 
+class ActionEventBuffer(object):
+    """Buffer instance action events and record them in batches.
+
+    An event is only recorded once it finished, with a single write for
+    its start and its finish. The buffered events of an instance are
+    recorded as soon as none of its events is running anymore or one of
+    them failed, and the events of all the instances at the latest after
+    the interval.
+
+    :param get_interval: Callable returning the interval in seconds; events
+                         are not buffered while it returns 0
+    """
+
+    def __init__(self, get_interval):
+        self._get_interval = get_interval
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()
+        self._running = collections.defaultdict(int)
+        self._timer = None
+
+    @property
+    def enabled(self):
+        return bool(self._get_interval())
+
+    def start(self, instance_uuid):
+        """Note that an event of the instance started and return the time."""
+        with self._lock:
+            self._running[instance_uuid] += 1
+        return timeutils.utcnow()
+
+    def finish(self, context, instance_uuid, event_name, start_time,
+               exc_val=None, exc_tb=None):
+        """Buffer an event of the instance which finished."""
+        values = objects.InstanceActionEvent.pack_action_event_record(
+            context, instance_uuid, event_name, start_time, exc_val=exc_val,
+            exc_tb=exc_tb)
+        with self._lock:
+            self._running[instance_uuid] -= 1
+            flush_now = exc_val is not None
+            if self._running[instance_uuid] <= 0:
+                del self._running[instance_uuid]
+                flush_now = True
+            self._pending.setdefault(instance_uuid, []).append(
+                (context, values))
+            if not flush_now and self._timer is None:
+                self._timer = greenthread.spawn_after(self._get_interval(),
+                                                      self.flush)
+        if flush_now:
+            self.flush(instance_uuid)
+
+    def flush(self, instance_uuid=None):
+        """Record the buffered events of an instance, or of all of them."""
+        with self._lock:
+            if instance_uuid is None:
+                pending = list(self._pending.values())
+                self._pending.clear()
+            else:
+                pending = [self._pending.pop(instance_uuid, [])]
+            if not self._pending and self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+
+        # NOTE: Events are recorded with the context of their request, so
+        # send one batch per context.
+        batches = collections.OrderedDict()
+        for context, values in itertools.chain(*pending):
+            batches.setdefault(id(context), (context, []))[1].append(values)
+        for context, events in batches.values():
+            try:
+                not_found = objects.InstanceActionEvent.record_events(
+                    context, events)
+            except Exception:
+                LOG.exception(_LE('Failed to record %d instance action '
+                                  'events'), len(events))
+                continue
+            for values in not_found or []:
+                LOG.warning(_LW('Failed to record the %(event)s event, its '
+                                'instance action was not found'),
+                            {'event': values['event']},
+                            instance_uuid=values['instance_uuid'])
+
+
+class BufferedEventReporter(EventReporter):
+    """Context manager to report instance action events to a buffer."""
+
+    def __init__(self, event_buffer, context, event_name, *instance_uuids):
+        super(BufferedEventReporter, self).__init__(context, event_name,
+                                                    *instance_uuids)
+        self.event_buffer = event_buffer
+        self.start_times = {}
+
+    def __enter__(self):
+        for uuid in self.instance_uuids:
+            self.start_times[uuid] = self.event_buffer.start(uuid)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        for uuid in self.instance_uuids:
+            self.event_buffer.finish(self.context, uuid, self.event_name,
+                                     self.start_times[uuid], exc_val=exc_val,
+                                     exc_tb=exc_tb)
+        return False
+
+
 class UnlimitedSemaphore(object):
     def __enter__(self):
         pass
@@ -476,3 +586,120 @@ class UnlimitedSemaphore(object):
     @property
     def balance(self):
         return 0
+
+
+class LiveMigrationQueue(object):
+    """Admission control for the outbound live migrations of a host.
+
+    Live migrations are started in priority order, evacuations before
+    rebalancing migrations and in submission order otherwise, as soon as
+    fewer than the maximum number of migrations run from this host and
+    towards their destination host. A running migration keeps its slot
+    until finish() is called for its instance, which can be after the
+    function starting it returned as drivers may migrate asynchronously.
+
+    :param get_limits: Callable returning the maximum numbers of
+                       migrations running from this host and towards a
+                       single destination host, 0 meaning no limit;
+                       migrations are not queued while the former is 0
+    """
+
+    PRIORITY_EVACUATION = 'evacuation'
+    PRIORITY_REBALANCE = 'rebalance'
+    PRIORITIES = (PRIORITY_EVACUATION, PRIORITY_REBALANCE)
+
+    def __init__(self, get_limits):
+        self._get_limits = get_limits
+        self._lock = threading.Lock()
+        self._queue = []
+        self._running = collections.OrderedDict()
+        self._counter = itertools.count()
+
+    @property
+    def enabled(self):
+        return self._get_limits()[0] > 0
+
+    def submit(self, instance_uuid, dest, priority, func, *args, **kwargs):
+        """Queue the migration of an instance, started by calling func."""
+        migration = {'instance_uuid': instance_uuid,
+                     'dest': dest,
+                     'priority': priority,
+                     'status': 'queued',
+                     'progress': 0,
+                     'queued_at': timeutils.utcnow(),
+                     'started_at': None}
+        with self._lock:
+            heapq.heappush(self._queue,
+                           (self.PRIORITIES.index(priority),
+                            next(self._counter), migration,
+                            functools.partial(func, *args, **kwargs)))
+        self._dispatch()
+
+    def _dispatch(self):
+        max_running, max_per_dest = self._get_limits()
+        started = []
+        with self._lock:
+            per_dest = collections.Counter(
+                migration['dest'] for migration in self._running.values())
+            waiting = []
+            while self._queue and (max_running <= 0 or
+                                   len(self._running) < max_running):
+                item = heapq.heappop(self._queue)
+                migration = item[2]
+                if 0 < max_per_dest <= per_dest[migration['dest']]:
+                    waiting.append(item)
+                    continue
+                migration['status'] = 'running'
+                migration['started_at'] = timeutils.utcnow()
+                self._running[migration['instance_uuid']] = migration
+                per_dest[migration['dest']] += 1
+                started.append(item)
+            for item in waiting:
+                heapq.heappush(self._queue, item)
+
+        for _priority, _count, migration, func in started:
+            utils.spawn_n(self._run, migration, func)
+
+    def _run(self, migration, func):
+        try:
+            func()
+        except Exception:
+            LOG.exception(_LE('Live migration to %s failed'),
+                          migration['dest'],
+                          instance_uuid=migration['instance_uuid'])
+            self.finish(migration['instance_uuid'])
+
+    def finish(self, instance_uuid):
+        """Free the slot of the migration of an instance."""
+        with self._lock:
+            migration = self._running.pop(instance_uuid, None)
+        if migration is not None:
+            self._dispatch()
+
+    def finish_after(self, instance_uuid, func):
+        """Wrap func to finish the migration of an instance once it ran."""
+        def wrapper(*args, **kwargs):
+            try:
+                return func(*args, **kwargs)
+            finally:
+                self.finish(instance_uuid)
+        return wrapper
+
+    def update_progress(self, instance_uuid, progress):
+        """Record the progress percentage of a running migration."""
+        with self._lock:
+            migration = self._running.get(instance_uuid)
+            if migration is not None:
+                migration['progress'] = progress
+
+    def get_status(self):
+        """Return the running migrations and then the queued ones in order.
+
+        :returns: A list of dicts with the instance_uuid, dest, priority,
+                  status, progress, queued_at and started_at of each
+                  migration
+        """
+        with self._lock:
+            migrations = list(self._running.values())
+            migrations.extend(item[2] for item in sorted(self._queue))
+            return [dict(migration) for migration in migrations]
@@ -78,6 +78,11 @@ class LocalAPI(object):
                                               instance, last_refreshed,
                                               update_totals)
 
+    def vol_usage_update_bulk(self, context, vol_usages,
+                              update_totals=False):
+        return self._manager.vol_usage_update_bulk(context, vol_usages,
+                                                   update_totals)
+
     def compute_node_create(self, context, values):
         return self._manager.compute_node_create(context, values)
 
@@ -104,6 +109,10 @@ class LocalAPI(object):
     def object_backport(self, context, objinst, target_version):
         return self._manager.object_backport(context, objinst, target_version)
 
+    def get_db_api_stats(self, context, reset=False):
+        """Return the DB API statistics collected by a conductor."""
+        return self._manager.get_db_api_stats(context, reset)
+
 
 class LocalComputeTaskAPI(object):
     def __init__(self):
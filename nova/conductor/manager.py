@@ -34,6 +34,7 @@ from nova.compute import utils as compute_utils
 from nova.compute import vm_states
 from nova.conductor.tasks import live_migrate
 from nova.db import base
+from nova.db import instrumentation
 from nova import exception
 from nova.i18n import _, _LE, _LW
 from nova import image
@@ -78,7 +79,7 @@ class ConductorManager(manager.Manager):
     namespace.  See the ComputeTaskManager class for details.
     """
 
-    target = messaging.Target(version='2.1')
+    target = messaging.Target(version='2.5')
 
     def __init__(self, *args, **kwargs):
         super(ConductorManager, self).__init__(service_name='conductor',
@@ -267,6 +268,15 @@ class ConductorManager(manager.Manager):
         self.notifier.info(context, 'volume.usage',
                            compute_utils.usage_volume_info(vol_usage))
 
+    def vol_usage_update_bulk(self, context, vol_usages, update_totals):
+        vol_usages = self.db.vol_usage_update_bulk(context, vol_usages,
+                                                   update_totals)
+
+        # We have just updated the database, so send the notifications now
+        for vol_usage in vol_usages:
+            self.notifier.info(context, 'volume.usage',
+                               compute_utils.usage_volume_info(vol_usage))
+
     # NOTE(hanlind): This method can be removed in version 3.0 of the RPC API
     @messaging.expected_exceptions(exception.ComputeHostNotFound,
                                    exception.HostBinaryNotFound)
@@ -431,7 +441,9 @@ class ConductorManager(manager.Manager):
         try:
             # NOTE(danms): Keep the getattr inside the try block since
             # a missing method is really a client problem
-            return getattr(target, method)(*args, **kwargs)
+            with instrumentation.operation('%s.%s' % (target.obj_name(),
+                                                      method)):
+                return getattr(target, method)(*args, **kwargs)
         except Exception:
             raise messaging.ExpectedException()
 
@@ -468,9 +480,40 @@ class ConductorManager(manager.Manager):
         updates['obj_what_changed'] = objinst.obj_what_changed()
         return updates, result
 
+    def object_actions(self, context, requests):
+        """Perform a batch of object and classmethod actions in order.
+
+        Each request is a dict with the arguments of object_action() or
+        object_class_action(). An exception raised by one action is
+        returned with its result rather than failing the whole batch.
+        """
+        results = []
+        for request in requests:
+            try:
+                if 'objinst' in request:
+                    result = self.object_action(
+                        context, request['objinst'], request['objmethod'],
+                        request['args'], request['kwargs'])
+                else:
+                    result = self.object_class_action(
+                        context, request['objname'], request['objmethod'],
+                        request['objver'], request['args'],
+                        request['kwargs'])
+                results.append({'result': result})
+            except messaging.ExpectedException as e:
+                exc = nova_object.obj_exception_to_primitive(e.exc_info[1])
+                results.append({'exception': exc})
+        return results
+
     def object_backport(self, context, objinst, target_version):
         return objinst.obj_to_primitive(target_version=target_version)
 
+    def get_db_api_stats(self, context, reset=False):
+        stats = instrumentation.get_stats()
+        if reset:
+            instrumentation.reset_stats()
+        return jsonutils.to_primitive(stats)
+
 
 class ComputeTaskManager(base.Base):
     """Namespace for compute methods.
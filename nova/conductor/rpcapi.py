@@ -178,6 +178,11 @@ class ConductorAPI(object):
     * Remove compute_node_delete()
     * Remove security_groups_trigger_handler()
 
+    * 2.2  - Added vol_usage_update_bulk()
+    * 2.3  - Added get_db_api_stats()
+    * 2.4  - Accept objects in the compact envelope
+    * 2.5  - Added object_actions()
+
     """
 
     VERSION_ALIASES = {
@@ -197,6 +202,8 @@ class ConductorAPI(object):
         self.client = rpc.get_client(target,
                                      version_cap=version_cap,
                                      serializer=serializer)
+        serializer.compact = (CONF.rpc_compact_objects and
+                              self.client.can_send_version('2.4'))
 
     def instance_update(self, context, instance_uuid, updates,
                         service=None):
@@ -223,6 +230,26 @@ class ConductorAPI(object):
                           instance=instance_p, last_refreshed=last_refreshed,
                           update_totals=update_totals)
 
+    def vol_usage_update_bulk(self, context, vol_usages,
+                              update_totals=False):
+        if not self.client.can_send_version('2.2'):
+            # NOTE: The conductor does not support bulk updates yet, so
+            # send the usages one at a time.
+            for usage in vol_usages:
+                instance = {'uuid': usage['instance_uuid'],
+                            'project_id': usage['project_id'],
+                            'user_id': usage['user_id'],
+                            'availability_zone': usage['availability_zone']}
+                self.vol_usage_update(context, usage['volume_id'],
+                                      usage['rd_req'], usage['rd_bytes'],
+                                      usage['wr_req'], usage['wr_bytes'],
+                                      instance, update_totals=update_totals)
+            return
+        cctxt = self.client.prepare(version='2.2')
+        return cctxt.call(context, 'vol_usage_update_bulk',
+                          vol_usages=vol_usages,
+                          update_totals=update_totals)
+
     def compute_node_create(self, context, values):
         cctxt = self.client.prepare()
         return cctxt.call(context, 'compute_node_create', values=values)
@@ -265,11 +292,22 @@ class ConductorAPI(object):
         return cctxt.call(context, 'object_action', objinst=objinst,
                           objmethod=objmethod, args=args, kwargs=kwargs)
 
+    def object_actions(self, context, requests):
+        if not self.client.can_send_version('2.5'):
+            return objects_base.object_actions_serially(self, context,
+                                                        requests)
+        cctxt = self.client.prepare(version='2.5')
+        return cctxt.call(context, 'object_actions', requests=requests)
+
     def object_backport(self, context, objinst, target_version):
         cctxt = self.client.prepare()
         return cctxt.call(context, 'object_backport', objinst=objinst,
                           target_version=target_version)
 
+    def get_db_api_stats(self, context, reset=False):
+        cctxt = self.client.prepare(version='2.3')
+        return cctxt.call(context, 'get_db_api_stats', reset=reset)
+
 
 class ComputeTaskAPI(object):
     """Client side of the conductor 'compute' namespaced RPC API
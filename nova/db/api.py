@@ -687,16 +687,29 @@ def instance_get_all_by_filters_sort(context, filters, limit=None,
 def instance_get_active_by_window_joined(context, begin, end=None,
                                          project_id=None, host=None,
                                          use_slave=False,
-                                         columns_to_join=None):
+                                         columns_to_join=None,
+                                         limit=None, marker=None):
     """Get instances and joins active during a certain time window.
 
     Specifying a project_id will filter for a certain project.
     Specifying a host will filter for instances on a given compute host.
+    Specifying a limit or a marker (an instance uuid) returns a page of
+    the instances ordered by id.
     """
     return IMPL.instance_get_active_by_window_joined(context, begin, end,
                                               project_id, host,
                                               use_slave=use_slave,
-                                              columns_to_join=columns_to_join)
+                                              columns_to_join=columns_to_join,
+                                              limit=limit, marker=marker)
+
+
+def instance_count_active_by_window(context, begin, end=None,
+                                    project_id=None, host=None,
+                                    use_slave=False):
+    """Count the instances active during a certain time window."""
+    return IMPL.instance_count_active_by_window(context, begin, end,
+                                                project_id, host,
+                                                use_slave=use_slave)
 
 
 def instance_get_all_by_host(context, host,
@@ -707,6 +720,17 @@ def instance_get_all_by_host(context, host,
                                          use_slave=use_slave)
 
 
+def instance_get_host_inventory(context, host, uuids, use_slave=False):
+    """Get a light projection of the instances a compute host knows about.
+
+    Returns dicts with the uuid, host and the deletion and state columns
+    of the instances in uuids, deleted or not, and of the deleted
+    instances on host whose files have not been cleaned yet.
+    """
+    return IMPL.instance_get_host_inventory(context, host, uuids,
+                                            use_slave=use_slave)
+
+
 def instance_get_all_by_host_and_node(context, host, node,
                                       columns_to_join=None):
     """Get all instances belonging to a node."""
@@ -758,6 +782,22 @@ def instance_update_and_get_original(context, instance_uuid, values,
     return rv
 
 
+def instance_update_bulk(context, updates):
+    """Set the given properties on many instances at once.
+
+    :param context: = request context object
+    :param updates: = dict of instance uuid to a dict of column values,
+                      optionally with expected_task_state and
+                      expected_vm_state guards
+
+    :returns: a tuple of the form (originals, failed) where originals maps
+              the uuid of each updated instance to its vm_state, task_state
+              and display_name before the update, and failed lists the
+              uuids which were missing or not in an expected state.
+    """
+    return IMPL.instance_update_bulk(context, updates)
+
+
 def instance_add_security_group(context, instance_id, security_group_id):
     """Associate the given security group with the given instance."""
     return IMPL.instance_add_security_group(context, instance_id,
@@ -1645,6 +1685,29 @@ def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
     return rv
 
 
+def bw_usage_update_bulk(context, bw_usages, start_period,
+                         last_refreshed=None, update_cells=True):
+    """Update cached bandwidth usage for many instance networks at once.
+
+    bw_usages is a list of dicts with the uuid, mac, bw_in, bw_out,
+    last_ctr_in and last_ctr_out keys.  Creates new records if needed.
+    """
+    rv = IMPL.bw_usage_update_bulk(context, bw_usages, start_period,
+                                   last_refreshed=last_refreshed)
+    if update_cells:
+        for usage in bw_usages:
+            try:
+                cells_rpcapi.CellsAPI().bw_usage_update_at_top(context,
+                        usage['uuid'], usage['mac'], start_period,
+                        usage['bw_in'], usage['bw_out'],
+                        usage['last_ctr_in'], usage['last_ctr_out'],
+                        last_refreshed)
+            except Exception:
+                LOG.exception(_LE("Failed to notify cells of bw_usage "
+                                  "update"))
+    return rv
+
+
 ###################
 
 
@@ -1666,6 +1729,18 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
                                  update_totals=update_totals)
 
 
+def vol_usage_update_bulk(context, vol_usages, update_totals=False):
+    """Update cached volume usage for many volumes at once.
+
+    vol_usages is a list of dicts with the volume_id, rd_req, rd_bytes,
+    wr_req, wr_bytes, instance_uuid, project_id, user_id and
+    availability_zone keys.  Creates new records if needed and returns the
+    updated records.
+    """
+    return IMPL.vol_usage_update_bulk(context, vol_usages,
+                                      update_totals=update_totals)
+
+
 ###################
 
 
@@ -1810,6 +1885,14 @@ def action_event_finish(context, values):
     return IMPL.action_event_finish(context, values)
 
 
+def action_events_record(context, values_list):
+    """Record several finished events on instance actions at once.
+
+    Returns the values of the events whose action could not be found.
+    """
+    return IMPL.action_events_record(context, values_list)
+
+
 def action_events_get(context, action_id):
     """Get the events by action id."""
     return IMPL.action_events_get(context, action_id)
@@ -0,0 +1,256 @@
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+"""Opt-in latency instrumentation for the DB API.
+
+When enabled, every call made through the DB API backend is timed and
+counted per function, and every SQL statement is timed through the engine
+events. Statements slower than a threshold are logged along with the DB
+API function, the object method being dispatched and the request id which
+caused them. The statistics are kept per process and can be fetched from
+the conductor with nova-manage db stats.
+"""
+
+import collections
+import contextlib
+import functools
+import inspect
+import threading
+import time
+
+from oslo_config import cfg
+from oslo_context import context as common_context
+from oslo_log import log as logging
+from sqlalchemy import event
+
+from nova.i18n import _LW
+
+
+instrumentation_opts = [
+    cfg.BoolOpt('db_api_instrumentation',
+                default=False,
+                help='Record call counts, row counts and latencies of the DB '
+                     'API functions and SQL statements run by this service. '
+                     'The statistics of nova-conductor can be shown with '
+                     '"nova-manage db stats".'),
+    cfg.FloatOpt('db_slow_query_threshold',
+                 default=1.0,
+                 help='Log SQL statements which take longer than this many '
+                      'seconds when db_api_instrumentation is enabled. Set '
+                      'to 0 to disable the slow query log.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(instrumentation_opts)
+
+LOG = logging.getLogger(__name__)
+
+# Upper bounds, in seconds, of the latency histogram buckets
+HISTOGRAM_BUCKETS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0)
+# Number of slow statements kept for the summary
+MAX_SLOW_QUERIES = 50
+# Statements longer than this are truncated in the slow query log
+MAX_STATEMENT_LENGTH = 2048
+
+_STATS = {}
+_SLOW_QUERIES = collections.deque(maxlen=MAX_SLOW_QUERIES)
+_LOCAL = threading.local()
+
+
+class CallStats(object):
+    """Call count, row count and latency histogram of one DB API function."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.statements = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+
+    def add(self, elapsed, rows=0, error=False):
+        self.calls += 1
+        self.rows += rows
+        if error:
+            self.errors += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if elapsed <= bound:
+                break
+        else:
+            i = len(HISTOGRAM_BUCKETS)
+        self.histogram[i] += 1
+
+    def to_dict(self):
+        buckets = ['<=%s' % bound for bound in HISTOGRAM_BUCKETS]
+        buckets.append('>%s' % HISTOGRAM_BUCKETS[-1])
+        return {'calls': self.calls,
+                'errors': self.errors,
+                'rows': self.rows,
+                'statements': self.statements,
+                'total_time': self.total_time,
+                'avg_time': self.total_time / self.calls if self.calls else 0,
+                'max_time': self.max_time,
+                'histogram': dict(zip(buckets, self.histogram))}
+
+
+def _get_stats(name):
+    stats = _STATS.get(name)
+    if stats is None:
+        stats = _STATS.setdefault(name, CallStats())
+    return stats
+
+
+def _count_rows(result):
+    if result is None:
+        return 0
+    if isinstance(result, (list, tuple)):
+        return len(result)
+    if isinstance(result, dict) or hasattr(result, '__table__'):
+        return 1
+    return 0
+
+
+@contextlib.contextmanager
+def operation(name):
+    """Tag the DB API calls made within the block with an operation name.
+
+    The conductor uses this to record which object method caused a query.
+    """
+    previous = getattr(_LOCAL, 'operation', None)
+    _LOCAL.operation = name
+    try:
+        yield
+    finally:
+        _LOCAL.operation = previous
+
+
+def _instrument(name, fn):
+    @functools.wraps(fn)
+    def wrapper(*args, **kwargs):
+        previous = (getattr(_LOCAL, 'function', None),
+                    getattr(_LOCAL, 'request_id', None))
+        _LOCAL.function = name
+        _LOCAL.request_id = getattr(args[0] if args else None, 'request_id',
+                                    previous[1])
+        start = time.time()
+        error = True
+        result = None
+        try:
+            result = fn(*args, **kwargs)
+            error = False
+            return result
+        finally:
+            _get_stats(name).add(time.time() - start,
+                                 rows=_count_rows(result), error=error)
+            _LOCAL.function, _LOCAL.request_id = previous
+    return wrapper
+
+
+class InstrumentedBackend(object):
+    """Proxy for a DB API backend module which times each function call."""
+
+    def __init__(self, backend):
+        self._backend = backend
+
+    def __getattr__(self, name):
+        attr = getattr(self._backend, name)
+        # NOTE: Only wrap the public functions; helpers such as the
+        # constraint classes are passed through untouched.
+        if inspect.isfunction(attr) and not name.startswith('_'):
+            return _instrument(name, attr)
+        return attr
+
+
+def instrument_backend(backend):
+    """Return the backend, wrapped if db_api_instrumentation is enabled."""
+    if CONF.db_api_instrumentation:
+        return InstrumentedBackend(backend)
+    return backend
+
+
+def _param_shape(parameters):
+    """Describe bind parameters by type only, never by value."""
+    if isinstance(parameters, dict):
+        return dict((key, type(value).__name__)
+                    for key, value in parameters.items())
+    if isinstance(parameters, (list, tuple)):
+        if parameters and isinstance(parameters[0], (dict, list, tuple)):
+            # executemany()
+            return '%d x %s' % (len(parameters), _param_shape(parameters[0]))
+        return [type(value).__name__ for value in parameters]
+    return type(parameters).__name__
+
+
+def _before_cursor_execute(conn, cursor, statement, parameters, context,
+                           executemany):
+    conn.info.setdefault('nova_query_start', []).append(time.time())
+
+
+def _after_cursor_execute(conn, cursor, statement, parameters, context,
+                          executemany):
+    elapsed = time.time() - conn.info['nova_query_start'].pop()
+    function = getattr(_LOCAL, 'function', None)
+    if function:
+        _get_stats(function).statements += 1
+
+    threshold = CONF.db_slow_query_threshold
+    if not threshold or elapsed < threshold:
+        return
+
+    request_id = getattr(_LOCAL, 'request_id', None)
+    if request_id is None:
+        ctxt = common_context.get_current()
+        request_id = getattr(ctxt, 'request_id', None)
+    if len(statement) > MAX_STATEMENT_LENGTH:
+        statement = statement[:MAX_STATEMENT_LENGTH] + '...'
+    query = {'duration': elapsed,
+             'function': function,
+             'operation': getattr(_LOCAL, 'operation', None),
+             'request_id': request_id,
+             'statement': statement,
+             'parameters': _param_shape(parameters)}
+    _SLOW_QUERIES.append(query)
+    LOG.warning(_LW("Slow query took %(duration).3f seconds in DB API "
+                    "%(function)s for %(operation)s (request "
+                    "%(request_id)s): %(statement)s with parameters "
+                    "%(parameters)s"), query)
+
+
+def instrument_engine(engine):
+    """Time every SQL statement run on the engine."""
+    if not CONF.db_api_instrumentation:
+        return
+    if event.contains(engine, 'before_cursor_execute',
+                      _before_cursor_execute):
+        return
+    event.listen(engine, 'before_cursor_execute', _before_cursor_execute)
+    event.listen(engine, 'after_cursor_execute', _after_cursor_execute)
+
+
+def get_stats():
+    """Return the statistics collected in this process."""
+    return {'enabled': CONF.db_api_instrumentation,
+            'functions': dict((name, stats.to_dict())
+                              for name, stats in _STATS.items()),
+            'slow_queries': list(_SLOW_QUERIES)}
+
+
+def reset_stats():
+    """Drop the statistics collected in this process."""
+    _STATS.clear()
+    _SLOW_QUERIES.clear()
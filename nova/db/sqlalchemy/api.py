@@ -63,6 +63,7 @@ from nova import block_device
 from nova.compute import task_states
 from nova.compute import vm_states
 import nova.context
+from nova.db import instrumentation
 from nova.db.sqlalchemy import models
 from nova import exception
 from nova.i18n import _, _LI, _LE, _LW
@@ -141,7 +142,7 @@ _LOCK = threading.Lock()
 def _create_facade(conf_group):
 
     # NOTE(dheeraj): This fragment is copied from oslo.db
-    return db_session.EngineFacade(
+    facade = db_session.EngineFacade(
         sql_connection=conf_group.connection,
         slave_connection=conf_group.slave_connection,
         sqlite_fk=False,
@@ -157,6 +158,10 @@ def _create_facade(conf_group):
         connection_trace=conf_group.connection_trace,
         max_retries=conf_group.max_retries,
         retry_interval=conf_group.retry_interval)
+    for engine in set([facade.get_engine(),
+                       facade.get_engine(use_slave=True)]):
+        instrumentation.instrument_engine(engine)
+    return facade
 
 
 def _create_facade_lazily(facade, conf_group):
@@ -199,7 +204,7 @@ PER_PROJECT_QUOTAS = ['fixed_ips', 'floating_ips', 'networks']
 
 def get_backend():
     """The backend is this module itself."""
-    return sys.modules[__name__]
+    return instrumentation.instrument_backend(sys.modules[__name__])
 
 
 def require_admin_context(f):
@@ -2066,13 +2071,12 @@ def instance_get_all_by_filters_sort(context, filters, limit=None, marker=None,
     # paginate query
     if marker is not None:
         try:
-            if deleted:
-                marker = _instance_get_by_uuid(
-                    context.elevated(read_deleted='yes'), marker,
-                    session=session)
-            else:
-                marker = _instance_get_by_uuid(context,
-                                               marker, session=session)
+            # NOTE: The marker may be a deleted instance, either because
+            # the query returns deleted instances or because it was deleted
+            # since the previous page was returned.
+            marker = _instance_get_by_uuid(
+                context.elevated(read_deleted='yes'), marker,
+                session=session)
         except exception.InstanceNotFound:
             raise exception.MarkerNotFound(marker)
     try:
@@ -2307,14 +2311,30 @@ def process_sort_params(sort_keys, sort_dirs,
     return result_keys, result_dirs
 
 
+def _instance_get_active_by_window_query(session, begin, end=None,
+                                         project_id=None, host=None):
+    query = session.query(models.Instance)
+    query = query.filter(or_(models.Instance.terminated_at == null(),
+                             models.Instance.terminated_at > begin))
+    if end:
+        query = query.filter(models.Instance.launched_at < end)
+    if project_id:
+        query = query.filter_by(project_id=project_id)
+    if host:
+        query = query.filter_by(host=host)
+    return query
+
+
 @require_context
 def instance_get_active_by_window_joined(context, begin, end=None,
                                          project_id=None, host=None,
                                          use_slave=False,
-                                         columns_to_join=None):
+                                         columns_to_join=None,
+                                         limit=None, marker=None):
     """Return instances and joins that were active during window."""
     session = get_session(use_slave=use_slave)
-    query = session.query(models.Instance)
+    query = _instance_get_active_by_window_query(session, begin, end,
+                                                 project_id, host)
 
     if columns_to_join is None:
         columns_to_join_new = ['info_cache', 'security_groups']
@@ -2329,18 +2349,32 @@ def instance_get_active_by_window_joined(context, begin, end=None,
         else:
             query = query.options(joinedload(column))
 
-    query = query.filter(or_(models.Instance.terminated_at == null(),
-                             models.Instance.terminated_at > begin))
-    if end:
-        query = query.filter(models.Instance.launched_at < end)
-    if project_id:
-        query = query.filter_by(project_id=project_id)
-    if host:
-        query = query.filter_by(host=host)
+    if limit is not None or marker is not None:
+        if marker is not None:
+            try:
+                marker = _instance_get_by_uuid(
+                    context.elevated(read_deleted='yes'), marker,
+                    session=session)
+            except exception.InstanceNotFound:
+                raise exception.MarkerNotFound(marker)
+        query = sqlalchemyutils.paginate_query(query, models.Instance, limit,
+                                               ['id'], marker=marker,
+                                               sort_dir='asc')
 
     return _instances_fill_metadata(context, query.all(), manual_joins)
 
 
+@require_context
+def instance_count_active_by_window(context, begin, end=None,
+                                    project_id=None, host=None,
+                                    use_slave=False):
+    """Return the number of instances that were active during window."""
+    session = get_session(use_slave=use_slave)
+    query = _instance_get_active_by_window_query(session, begin, end,
+                                                 project_id, host)
+    return query.count()
+
+
 def _instance_get_all_query(context, project_only=False,
                             joins=None, use_slave=False):
     if joins is None:
@@ -2383,6 +2417,27 @@ def _instance_get_all_uuids_by_host(context, host, session=None):
     return uuids
 
 
+_HOST_INVENTORY_COLUMNS = ('id', 'uuid', 'host', 'deleted', 'deleted_at',
+                           'vm_state', 'task_state', 'cleaned')
+
+
+@require_context
+def instance_get_host_inventory(context, host, uuids, use_slave=False):
+    columns = [getattr(models.Instance, column)
+               for column in _HOST_INVENTORY_COLUMNS]
+    not_cleaned = and_(models.Instance.host == host,
+                       models.Instance.deleted != 0,
+                       models.Instance.cleaned == 0)
+    if uuids:
+        criteria = or_(models.Instance.uuid.in_(uuids), not_cleaned)
+    else:
+        criteria = not_cleaned
+    query = model_query(context, models.Instance, columns,
+                        read_deleted='yes', use_slave=use_slave).\
+                filter(criteria)
+    return [dict(zip(_HOST_INVENTORY_COLUMNS, row)) for row in query.all()]
+
+
 def instance_get_all_by_host_and_node(context, host, node,
                                       columns_to_join=None):
     if columns_to_join is None:
@@ -2499,6 +2554,36 @@ def _instance_metadata_update_in_place(context, instance, metadata_type, model,
         instance[metadata_type].append(newitem)
 
 
+def _check_instance_expected_states(instance_ref, values):
+    """Pop the expected_task_state and expected_vm_state guards out of
+    values and check them against instance_ref.
+
+    Raises UnexpectedTaskStateError or UnexpectedVMStateError if the
+    instance is not in one of the expected states.
+    """
+    if "expected_task_state" in values:
+        # it is not a db column so always pop out
+        expected = values.pop("expected_task_state")
+        if not isinstance(expected, (tuple, list, set)):
+            expected = (expected,)
+        actual_state = instance_ref["task_state"]
+        if actual_state not in expected:
+            if actual_state == task_states.DELETING:
+                raise exception.UnexpectedDeletingTaskStateError(
+                        actual=actual_state, expected=expected)
+            else:
+                raise exception.UnexpectedTaskStateError(
+                        actual=actual_state, expected=expected)
+    if "expected_vm_state" in values:
+        expected = values.pop("expected_vm_state")
+        if not isinstance(expected, (tuple, list, set)):
+            expected = (expected,)
+        actual_state = instance_ref["vm_state"]
+        if actual_state not in expected:
+            raise exception.UnexpectedVMStateError(actual=actual_state,
+                                                   expected=expected)
+
+
 @oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
 def _instance_update(context, instance_uuid, values, copy_old_instance=False,
                      columns_to_join=None):
@@ -2511,27 +2596,7 @@ def _instance_update(context, instance_uuid, values, copy_old_instance=False,
         instance_ref = _instance_get_by_uuid(context, instance_uuid,
                                              session=session,
                                              columns_to_join=columns_to_join)
-        if "expected_task_state" in values:
-            # it is not a db column so always pop out
-            expected = values.pop("expected_task_state")
-            if not isinstance(expected, (tuple, list, set)):
-                expected = (expected,)
-            actual_state = instance_ref["task_state"]
-            if actual_state not in expected:
-                if actual_state == task_states.DELETING:
-                    raise exception.UnexpectedDeletingTaskStateError(
-                            actual=actual_state, expected=expected)
-                else:
-                    raise exception.UnexpectedTaskStateError(
-                            actual=actual_state, expected=expected)
-        if "expected_vm_state" in values:
-            expected = values.pop("expected_vm_state")
-            if not isinstance(expected, (tuple, list, set)):
-                expected = (expected,)
-            actual_state = instance_ref["vm_state"]
-            if actual_state not in expected:
-                raise exception.UnexpectedVMStateError(actual=actual_state,
-                                                       expected=expected)
+        _check_instance_expected_states(instance_ref, values)
 
         instance_hostname = instance_ref['hostname'] or ''
         if ("hostname" in values and
@@ -2568,6 +2633,87 @@ def _instance_update(context, instance_uuid, values, copy_old_instance=False,
     return (old_instance_ref, instance_ref)
 
 
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def instance_update_bulk(context, updates):
+    """Set the given properties on many instances at once.
+
+    The instances are locked and checked with a single query, and
+    instances receiving identical values are updated together with one
+    UPDATE statement.
+
+    :param context: = request context object
+    :param updates: = dict of instance uuid to a dict of column values.
+                      The values may contain "expected_task_state" and
+                      "expected_vm_state" guards as for instance_update(),
+                      but not metadata, system_metadata or hostname
+                      changes.
+
+    :returns: a tuple of the form (originals, failed) where originals maps
+              the uuid of each updated instance to a dict of its
+              vm_state, task_state and display_name before the update,
+              and failed is a list of uuids of instances which were not
+              updated because they do not exist or were not in an
+              expected state.
+    """
+    for instance_uuid, values in six.iteritems(updates):
+        if not uuidutils.is_uuid_like(instance_uuid):
+            raise exception.InvalidUUID(instance_uuid)
+        for key in ('metadata', 'system_metadata', 'hostname'):
+            if key in values:
+                raise ValueError(_("Bulk instance updates can not change "
+                                   "'%s'") % key)
+
+    originals = {}
+    failed = []
+    if not updates:
+        return originals, failed
+
+    session = get_session()
+    with session.begin():
+        rows = model_query(context, models.Instance,
+                           (models.Instance.uuid,
+                            models.Instance.vm_state,
+                            models.Instance.task_state,
+                            models.Instance.display_name),
+                           session=session).\
+                filter(models.Instance.uuid.in_(list(updates))).\
+                with_lockmode('update').\
+                all()
+        current = {row.uuid: {'vm_state': row.vm_state,
+                              'task_state': row.task_state,
+                              'display_name': row.display_name}
+                   for row in rows}
+
+        uuids_by_values = collections.defaultdict(list)
+        for instance_uuid, values in six.iteritems(updates):
+            if instance_uuid not in current:
+                failed.append(instance_uuid)
+                continue
+            # NOTE: Copy the values, the guards are popped out of them and
+            # this function may be retried on deadlock.
+            values = dict(values)
+            try:
+                _check_instance_expected_states(current[instance_uuid],
+                                                values)
+            except (exception.UnexpectedTaskStateError,
+                    exception.UnexpectedVMStateError):
+                failed.append(instance_uuid)
+                continue
+            _handle_objects_related_type_conversions(values)
+            originals[instance_uuid] = current[instance_uuid]
+            if values:
+                uuids_by_values[tuple(sorted(values.items()))].append(
+                    instance_uuid)
+
+        for values, instance_uuids in six.iteritems(uuids_by_values):
+            model_query(context, models.Instance, session=session).\
+                filter(models.Instance.uuid.in_(instance_uuids)).\
+                update(dict(values), synchronize_session=False)
+
+    return originals, sorted(failed)
+
+
 def instance_add_security_group(context, instance_uuid, security_group_id):
     """Associate the given security group with the given instance."""
     sec_group_ref = models.SecurityGroupInstanceAssociation()
@@ -5170,6 +5316,58 @@ def bw_usage_update(context, uuid, mac, start_period, bw_in, bw_out,
             pass
 
 
+@require_context
+@oslo_db_api.wrap_db_retry(max_retries=5, retry_on_deadlock=True)
+def bw_usage_update_bulk(context, bw_usages, start_period,
+                         last_refreshed=None):
+    if not bw_usages:
+        return
+
+    if last_refreshed is None:
+        last_refreshed = timeutils.utcnow()
+
+    ts_values = {'last_refreshed': last_refreshed,
+                 'start_period': start_period}
+    ts_values = convert_objects_related_datetimes(ts_values, 'start_period',
+                                                  'last_refreshed')
+    uuids = set(usage['uuid'] for usage in bw_usages)
+
+    session = get_session()
+    try:
+        with session.begin():
+            rows = model_query(context, models.BandwidthUsage,
+                               session=session, read_deleted="yes").\
+                           filter_by(start_period=ts_values['start_period']).\
+                           filter(models.BandwidthUsage.uuid.in_(uuids)).\
+                           all()
+            bw_usage_refs = {(row.uuid, row.mac): row for row in rows}
+
+            for usage in bw_usages:
+                key = (usage['uuid'], usage['mac'])
+                bwusage = bw_usage_refs.get(key)
+                if bwusage is None:
+                    bwusage = models.BandwidthUsage()
+                    bwusage.start_period = ts_values['start_period']
+                    bwusage.uuid = usage['uuid']
+                    bwusage.mac = usage['mac']
+                    session.add(bwusage)
+                    bw_usage_refs[key] = bwusage
+                bwusage.update({'last_refreshed': ts_values['last_refreshed'],
+                                'last_ctr_in': usage['last_ctr_in'],
+                                'last_ctr_out': usage['last_ctr_out'],
+                                'bw_in': usage['bw_in'],
+                                'bw_out': usage['bw_out']})
+    except db_exc.DBDuplicateEntry:
+        # NOTE: Another greenthread created one of the missing entries
+        # meanwhile, so fall back to the per entry upsert which copes with
+        # that race.
+        for usage in bw_usages:
+            bw_usage_update(context, usage['uuid'], usage['mac'],
+                            start_period, usage['bw_in'], usage['bw_out'],
+                            usage['last_ctr_in'], usage['last_ctr_out'],
+                            last_refreshed=last_refreshed)
+
+
 ####################
 
 
@@ -5185,6 +5383,102 @@ def vol_get_usage_by_time(context, begin):
                               all()
 
 
+def _vol_usage_update(session, current_usage, id, rd_req, rd_bytes, wr_req,
+                      wr_bytes, instance_id, project_id, user_id,
+                      availability_zone, update_totals, refreshed):
+    values = {}
+    # NOTE(dricco): We will be mostly updating current usage records vs
+    # updating total or creating records. Optimize accordingly.
+    if not update_totals:
+        values = {'curr_last_refreshed': refreshed,
+                  'curr_reads': rd_req,
+                  'curr_read_bytes': rd_bytes,
+                  'curr_writes': wr_req,
+                  'curr_write_bytes': wr_bytes,
+                  'instance_uuid': instance_id,
+                  'project_id': project_id,
+                  'user_id': user_id,
+                  'availability_zone': availability_zone}
+    else:
+        values = {'tot_last_refreshed': refreshed,
+                  'tot_reads': models.VolumeUsage.tot_reads + rd_req,
+                  'tot_read_bytes': models.VolumeUsage.tot_read_bytes +
+                                    rd_bytes,
+                  'tot_writes': models.VolumeUsage.tot_writes + wr_req,
+                  'tot_write_bytes': models.VolumeUsage.tot_write_bytes +
+                                     wr_bytes,
+                  'curr_reads': 0,
+                  'curr_read_bytes': 0,
+                  'curr_writes': 0,
+                  'curr_write_bytes': 0,
+                  'instance_uuid': instance_id,
+                  'project_id': project_id,
+                  'user_id': user_id,
+                  'availability_zone': availability_zone}
+
+    if current_usage:
+        if (rd_req < current_usage['curr_reads'] or
+            rd_bytes < current_usage['curr_read_bytes'] or
+            wr_req < current_usage['curr_writes'] or
+                wr_bytes < current_usage['curr_write_bytes']):
+            LOG.info(_LI("Volume(%s) has lower stats then what is in "
+                         "the database. Instance must have been rebooted "
+                         "or crashed. Updating totals."), id)
+            if not update_totals:
+                values['tot_reads'] = (models.VolumeUsage.tot_reads +
+                                       current_usage['curr_reads'])
+                values['tot_read_bytes'] = (
+                    models.VolumeUsage.tot_read_bytes +
+                    current_usage['curr_read_bytes'])
+                values['tot_writes'] = (models.VolumeUsage.tot_writes +
+                                        current_usage['curr_writes'])
+                values['tot_write_bytes'] = (
+                    models.VolumeUsage.tot_write_bytes +
+                    current_usage['curr_write_bytes'])
+            else:
+                values['tot_reads'] = (models.VolumeUsage.tot_reads +
+                                       current_usage['curr_reads'] +
+                                       rd_req)
+                values['tot_read_bytes'] = (
+                    models.VolumeUsage.tot_read_bytes +
+                    current_usage['curr_read_bytes'] + rd_bytes)
+                values['tot_writes'] = (models.VolumeUsage.tot_writes +
+                                        current_usage['curr_writes'] +
+                                        wr_req)
+                values['tot_write_bytes'] = (
+                    models.VolumeUsage.tot_write_bytes +
+                    current_usage['curr_write_bytes'] + wr_bytes)
+
+        current_usage.update(values)
+        current_usage.save(session=session)
+        session.refresh(current_usage)
+        return current_usage
+
+    vol_usage = models.VolumeUsage()
+    vol_usage.volume_id = id
+    vol_usage.instance_uuid = instance_id
+    vol_usage.project_id = project_id
+    vol_usage.user_id = user_id
+    vol_usage.availability_zone = availability_zone
+
+    if not update_totals:
+        vol_usage.curr_last_refreshed = refreshed
+        vol_usage.curr_reads = rd_req
+        vol_usage.curr_read_bytes = rd_bytes
+        vol_usage.curr_writes = wr_req
+        vol_usage.curr_write_bytes = wr_bytes
+    else:
+        vol_usage.tot_last_refreshed = refreshed
+        vol_usage.tot_reads = rd_req
+        vol_usage.tot_read_bytes = rd_bytes
+        vol_usage.tot_writes = wr_req
+        vol_usage.tot_write_bytes = wr_bytes
+
+    vol_usage.save(session=session)
+
+    return vol_usage
+
+
 @require_context
 def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
                      instance_id, project_id, user_id, availability_zone,
@@ -5194,101 +5488,44 @@ def vol_usage_update(context, id, rd_req, rd_bytes, wr_req, wr_bytes,
     refreshed = timeutils.utcnow()
 
     with session.begin():
-        values = {}
-        # NOTE(dricco): We will be mostly updating current usage records vs
-        # updating total or creating records. Optimize accordingly.
-        if not update_totals:
-            values = {'curr_last_refreshed': refreshed,
-                      'curr_reads': rd_req,
-                      'curr_read_bytes': rd_bytes,
-                      'curr_writes': wr_req,
-                      'curr_write_bytes': wr_bytes,
-                      'instance_uuid': instance_id,
-                      'project_id': project_id,
-                      'user_id': user_id,
-                      'availability_zone': availability_zone}
-        else:
-            values = {'tot_last_refreshed': refreshed,
-                      'tot_reads': models.VolumeUsage.tot_reads + rd_req,
-                      'tot_read_bytes': models.VolumeUsage.tot_read_bytes +
-                                        rd_bytes,
-                      'tot_writes': models.VolumeUsage.tot_writes + wr_req,
-                      'tot_write_bytes': models.VolumeUsage.tot_write_bytes +
-                                         wr_bytes,
-                      'curr_reads': 0,
-                      'curr_read_bytes': 0,
-                      'curr_writes': 0,
-                      'curr_write_bytes': 0,
-                      'instance_uuid': instance_id,
-                      'project_id': project_id,
-                      'user_id': user_id,
-                      'availability_zone': availability_zone}
-
         current_usage = model_query(context, models.VolumeUsage,
                             session=session, read_deleted="yes").\
                             filter_by(volume_id=id).\
                             first()
-        if current_usage:
-            if (rd_req < current_usage['curr_reads'] or
-                rd_bytes < current_usage['curr_read_bytes'] or
-                wr_req < current_usage['curr_writes'] or
-                    wr_bytes < current_usage['curr_write_bytes']):
-                LOG.info(_LI("Volume(%s) has lower stats then what is in "
-                             "the database. Instance must have been rebooted "
-                             "or crashed. Updating totals."), id)
-                if not update_totals:
-                    values['tot_reads'] = (models.VolumeUsage.tot_reads +
-                                           current_usage['curr_reads'])
-                    values['tot_read_bytes'] = (
-                        models.VolumeUsage.tot_read_bytes +
-                        current_usage['curr_read_bytes'])
-                    values['tot_writes'] = (models.VolumeUsage.tot_writes +
-                                            current_usage['curr_writes'])
-                    values['tot_write_bytes'] = (
-                        models.VolumeUsage.tot_write_bytes +
-                        current_usage['curr_write_bytes'])
-                else:
-                    values['tot_reads'] = (models.VolumeUsage.tot_reads +
-                                           current_usage['curr_reads'] +
-                                           rd_req)
-                    values['tot_read_bytes'] = (
-                        models.VolumeUsage.tot_read_bytes +
-                        current_usage['curr_read_bytes'] + rd_bytes)
-                    values['tot_writes'] = (models.VolumeUsage.tot_writes +
-                                            current_usage['curr_writes'] +
-                                            wr_req)
-                    values['tot_write_bytes'] = (
-                        models.VolumeUsage.tot_write_bytes +
-                        current_usage['curr_write_bytes'] + wr_bytes)
-
-            current_usage.update(values)
-            current_usage.save(session=session)
-            session.refresh(current_usage)
-            return current_usage
-
-        vol_usage = models.VolumeUsage()
-        vol_usage.volume_id = id
-        vol_usage.instance_uuid = instance_id
-        vol_usage.project_id = project_id
-        vol_usage.user_id = user_id
-        vol_usage.availability_zone = availability_zone
-
-        if not update_totals:
-            vol_usage.curr_last_refreshed = refreshed
-            vol_usage.curr_reads = rd_req
-            vol_usage.curr_read_bytes = rd_bytes
-            vol_usage.curr_writes = wr_req
-            vol_usage.curr_write_bytes = wr_bytes
-        else:
-            vol_usage.tot_last_refreshed = refreshed
-            vol_usage.tot_reads = rd_req
-            vol_usage.tot_read_bytes = rd_bytes
-            vol_usage.tot_writes = wr_req
-            vol_usage.tot_write_bytes = wr_bytes
+        return _vol_usage_update(session, current_usage, id, rd_req,
+                                 rd_bytes, wr_req, wr_bytes, instance_id,
+                                 project_id, user_id, availability_zone,
+                                 update_totals, refreshed)
+
+
+@require_context
+def vol_usage_update_bulk(context, vol_usages, update_totals=False):
+    if not vol_usages:
+        return []
+
+    session = get_session()
 
-        vol_usage.save(session=session)
+    refreshed = timeutils.utcnow()
+    volume_ids = set(usage['volume_id'] for usage in vol_usages)
 
-        return vol_usage
+    with session.begin():
+        rows = model_query(context, models.VolumeUsage,
+                           session=session, read_deleted="yes").\
+                       filter(models.VolumeUsage.volume_id.in_(volume_ids)).\
+                       all()
+        vol_usage_refs = {row.volume_id: row for row in rows}
+
+        result = []
+        for usage in vol_usages:
+            vol_usage = _vol_usage_update(
+                session, vol_usage_refs.get(usage['volume_id']),
+                usage['volume_id'], usage['rd_req'], usage['rd_bytes'],
+                usage['wr_req'], usage['wr_bytes'], usage['instance_uuid'],
+                usage['project_id'], usage['user_id'],
+                usage['availability_zone'], update_totals, refreshed)
+            vol_usage_refs[usage['volume_id']] = vol_usage
+            result.append(vol_usage)
+        return result
 
 
 ####################
@@ -5775,6 +6012,41 @@ def action_event_finish(context, values):
     return event_ref
 
 
+def action_events_record(context, values_list):
+    """Record several finished events on instance actions at once."""
+    not_found = []
+    actions = {}
+    session = get_session()
+    with session.begin():
+        for packed_values in values_list:
+            values = convert_objects_related_datetimes(
+                dict(packed_values), 'start_time', 'finish_time')
+            key = (values['instance_uuid'], values['request_id'])
+            if key not in actions:
+                action = _action_get_by_request_id(context, key[0], key[1],
+                                                   session)
+                # NOTE: Same fallback as action_event_start() for the events
+                # recorded by init_host.
+                if not action and not context.project_id:
+                    action = _action_get_last_created_by_instance_uuid(
+                        context, key[0], session)
+                actions[key] = action
+            action = actions[key]
+            if not action:
+                not_found.append(packed_values)
+                continue
+
+            values['action_id'] = action['id']
+            event_ref = models.InstanceActionEvent()
+            event_ref.update(values)
+            session.add(event_ref)
+
+            if values['result'].lower() == 'error':
+                action.update({'message': 'Error'})
+
+    return not_found
+
+
 def action_events_get(context, action_id):
     events = model_query(context, models.InstanceActionEvent).\
                          filter_by(action_id=action_id).\
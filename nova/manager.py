@@ -51,19 +51,78 @@ This module provides Manager, a base class for managers.
 
 """
 
+import random
+import time
+
 from oslo_config import cfg
 from oslo_log import log as logging
 
 from nova.db import base
+from nova.i18n import _LE, _LI, _LW
 from nova.openstack.common import periodic_task
 from nova import rpc
 
 
+periodic_task_opts = [
+    cfg.BoolOpt('periodic_task_jitter',
+                default=False,
+                help='Start each periodic task at a random point of its '
+                     'interval instead of one interval after the service '
+                     'started, so that the same task does not run at the '
+                     'same time on every host.'),
+    cfg.FloatOpt('periodic_task_budget',
+                 default=0,
+                 help='Seconds the periodic tasks of a service may run back '
+                      'to back. Once they are exceeded, the remaining due '
+                      'tasks are deferred so the service can handle other '
+                      'work, and run first on the next pass. Set to 0 to '
+                      'run all the due tasks on every pass.'),
+    cfg.IntOpt('periodic_task_stats_interval',
+               default=0,
+               help='Interval in seconds between logging the run count, '
+                    'run times, overruns and deferrals of the periodic '
+                    'tasks of a service. Set to 0 to disable.'),
+]
+
 CONF = cfg.CONF
+CONF.register_opts(periodic_task_opts)
 CONF.import_opt('host', 'nova.netconf')
 LOG = logging.getLogger(__name__)
 
 
+class PeriodicTaskStats(object):
+    """Run statistics of a periodic task."""
+
+    def __init__(self):
+        self.runs = 0
+        self.errors = 0
+        self.overruns = 0
+        self.deferrals = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.last_time = 0.0
+
+    def add(self, elapsed, error=False, overrun=False):
+        self.runs += 1
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        self.last_time = elapsed
+        if error:
+            self.errors += 1
+        if overrun:
+            self.overruns += 1
+
+    def to_dict(self):
+        return {'runs': self.runs,
+                'errors': self.errors,
+                'overruns': self.overruns,
+                'deferrals': self.deferrals,
+                'total_time': self.total_time,
+                'avg_time': self.total_time / self.runs if self.runs else 0,
+                'max_time': self.max_time,
+                'last_time': self.last_time}
+
+
 class Manager(base.Base, periodic_task.PeriodicTasks):
 
     def __init__(self, host=None, db_driver=None, service_name='undefined'):
@@ -75,11 +134,128 @@ class Manager(base.Base, periodic_task.PeriodicTasks):
         self.notifier = rpc.get_notifier(self.service_name, self.host)
         self.additional_endpoints = []
         super(Manager, self).__init__(db_driver)
+        self._periodic_task_stats = {}
+        if CONF.periodic_task_jitter:
+            self._spread_periodic_tasks()
+
+    def _spread_periodic_tasks(self):
+        """Give each periodic task a random phase within its interval."""
+        now = time.time()
+        for name, last_run in self._periodic_last_run.items():
+            # NOTE: Tasks which asked to run immediately keep doing so
+            if last_run is not None:
+                self._periodic_last_run[name] = (
+                    now - random.random() * self._periodic_spacing[name])
 
     def periodic_tasks(self, context, raise_on_error=False):
         """Tasks to be run at a periodic interval."""
         return self.run_periodic_tasks(context, raise_on_error=raise_on_error)
 
+    def run_periodic_tasks(self, context, raise_on_error=False):
+        """Run the due periodic tasks and return the seconds until the next
+        one is due.
+
+        This is the runner of PeriodicTasks, which also records the run time
+        of every task, warns about tasks running longer than their interval,
+        and honours periodic_task_budget.
+        """
+        idle_for = periodic_task.DEFAULT_INTERVAL
+        now = time.time()
+        due = []
+        for task_name, task in self._periodic_tasks:
+            spacing = self._periodic_spacing[task_name]
+            last_run = self._periodic_last_run[task_name]
+
+            # Check if due, if not skip
+            idle_for = min(idle_for, spacing)
+            if last_run is not None:
+                delta = last_run + spacing - now
+                if delta > 0:
+                    idle_for = min(idle_for, delta)
+                    continue
+            due.append((task_name, task))
+
+        budget = CONF.periodic_task_budget
+        if budget > 0:
+            # NOTE: The most overdue tasks go first so that tasks deferred
+            # by the budget are not deferred again on the next pass.
+            due.sort(key=lambda item: (
+                self._periodic_last_run[item[0]] is not None,
+                (self._periodic_last_run[item[0]] or 0) +
+                self._periodic_spacing[item[0]]))
+
+        started = time.time()
+        for index, (task_name, task) in enumerate(due):
+            if budget > 0 and time.time() - started >= budget:
+                deferred = [name for name, _task in due[index:]]
+                for name in deferred:
+                    self._get_periodic_task_stats(name).deferrals += 1
+                LOG.debug('Periodic task budget of %(budget).1f seconds '
+                          'exceeded, deferring %(tasks)s',
+                          {'budget': budget, 'tasks': ', '.join(deferred)})
+                return 0
+            self._run_periodic_task(context, task_name, task,
+                                    raise_on_error)
+            time.sleep(0)
+
+        return idle_for
+
+    def _run_periodic_task(self, context, task_name, task, raise_on_error):
+        full_task_name = '.'.join([self.__class__.__name__, task_name])
+        spacing = self._periodic_spacing[task_name]
+        last_run = self._periodic_last_run[task_name]
+
+        LOG.debug("Running periodic task %(full_task_name)s",
+                  {"full_task_name": full_task_name})
+        self._periodic_last_run[task_name] = periodic_task._nearest_boundary(
+            last_run, spacing)
+
+        start = time.time()
+        error = False
+        try:
+            task(self, context)
+        except Exception:
+            error = True
+            if raise_on_error:
+                raise
+            LOG.exception(_LE("Error during %(full_task_name)s"),
+                          {"full_task_name": full_task_name})
+        finally:
+            elapsed = time.time() - start
+            overrun = elapsed > spacing
+            self._get_periodic_task_stats(task_name).add(
+                elapsed, error=error, overrun=overrun)
+            if overrun:
+                LOG.warning(_LW("Periodic task %(full_task_name)s took "
+                                "%(elapsed).1f seconds, longer than its "
+                                "interval of %(spacing).1f seconds"),
+                            {"full_task_name": full_task_name,
+                             "elapsed": elapsed, "spacing": spacing})
+
+    def _get_periodic_task_stats(self, task_name):
+        stats = self._periodic_task_stats.get(task_name)
+        if stats is None:
+            stats = self._periodic_task_stats[task_name] = (
+                PeriodicTaskStats())
+        return stats
+
+    def get_periodic_task_stats(self):
+        """Return the run statistics of the periodic tasks, by task name."""
+        return dict((name, stats.to_dict())
+                    for name, stats in self._periodic_task_stats.items())
+
+    def log_periodic_task_stats(self):
+        """Log the run statistics of the periodic tasks, slowest first."""
+        slowest = sorted(self._periodic_task_stats.items(),
+                         key=lambda item: item[1].total_time, reverse=True)
+        for name, stats in slowest:
+            LOG.info(_LI("Periodic task %(name)s: %(runs)d runs, %(errors)d "
+                         "errors, %(overruns)d overruns, %(deferrals)d "
+                         "deferrals, %(avg_time).3f/%(max_time).3f seconds "
+                         "avg/max"),
+                     dict(stats.to_dict(),
+                          name='.'.join([self.__class__.__name__, name])))
+
     def init_host(self):
         """Hook to do additional manager initialization when one requests
         the service be started.  This is called before any service record
@@ -18,9 +18,11 @@ import inspect
 
 from oslo_concurrency import lockutils
 from oslo_log import log as logging
+from oslo_serialization import jsonutils
 from oslo_utils import excutils
 
 from nova.db import base
+from nova import exception
 from nova import hooks
 from nova.i18n import _, _LE
 from nova.network import model as network_model
@@ -53,6 +55,12 @@ def update_instance_cache_with_nw_info(impl, context, instance,
             LOG.exception(_LE('Failed storing info cache'), instance=instance)
 
 
+def nw_info_changed(old_nw_info, new_nw_info):
+    """Returns whether two network infos differ in any field."""
+    return (jsonutils.loads(old_nw_info.json()) !=
+            jsonutils.loads(new_nw_info.json()))
+
+
 def refresh_cache(f):
     """Decorator to update the instance_info_cache
 
@@ -240,6 +248,46 @@ class NetworkAPI(base.Base):
         """Returns all network info related to an instance."""
         raise NotImplementedError()
 
+    def heal_instance_info_caches(self, context, instances):
+        """Refresh the network info cache of several instances.
+
+        Only the caches whose network info changed are written. Errors are
+        logged and do not stop the other instances from being refreshed.
+
+        :returns: the uuids of the instances whose cache was updated
+        """
+        updated = []
+        for instance in instances:
+            try:
+                with lockutils.lock('refresh_cache-%s' % instance.uuid):
+                    nw_info = self._get_instance_nw_info(context, instance)
+                    if self._heal_instance_info_cache(context, instance,
+                                                      nw_info):
+                        updated.append(instance.uuid)
+            except exception.InstanceNotFound:
+                LOG.debug('Instance no longer exists. Unable to refresh',
+                          instance=instance)
+            except Exception:
+                LOG.error(_LE('An error occurred while refreshing the '
+                              'network cache.'), instance=instance,
+                          exc_info=True)
+        return updated
+
+    def _heal_instance_info_cache(self, context, instance, nw_info):
+        """Write nw_info to the cache of instance if it changed.
+
+        Must be called with the refresh_cache-%(instance_uuid) lock held.
+        """
+        if instance.info_cache is not None:
+            old_nw_info = instance.info_cache.network_info
+            if (old_nw_info is not None and
+                    not nw_info_changed(old_nw_info, nw_info)):
+                return False
+        update_instance_cache_with_nw_info(self, context, instance,
+                                           nw_info=nw_info,
+                                           update_cells=False)
+        return True
+
     def create_pci_requests_for_sriov_ports(self, context,
                                             pci_requests,
                                             requested_networks):
@@ -886,8 +886,105 @@ class API(base_api.NetworkAPI):
                                                  preexisting_port_ids)
         return network_model.NetworkInfo.hydrate(nw_info)
 
+    def heal_instance_info_caches(self, context, instances):
+        """Refresh the network info cache of several instances.
+
+        The ports, networks, subnets, DHCP ports and floating IPs of all the
+        instances are fetched with one listing each, instead of several
+        requests per instance.
+        """
+        if not instances:
+            return []
+        client = get_client(context, admin=True)
+        # NOTE: Remember the caches before fetching the neutron resources. An
+        # instance whose cache changes in the meantime was just refreshed by
+        # someone else, and the fetched resources may predate that refresh.
+        old_nw_infos = dict(
+            (instance.uuid, compute_utils.get_nw_info_for_instance(instance))
+            for instance in instances)
+        neutron_data = self._get_neutron_data_for_instances(client, instances)
+
+        updated = []
+        for instance in instances:
+            try:
+                with lockutils.lock('refresh_cache-%s' % instance.uuid):
+                    current = objects.InstanceInfoCache.get_by_instance_uuid(
+                        context, instance.uuid)
+                    if (current.network_info is not None and
+                            base_api.nw_info_changed(
+                                old_nw_infos[instance.uuid],
+                                current.network_info)):
+                        LOG.debug('Skipping network cache update for '
+                                  'instance because it was updated '
+                                  'concurrently.', instance=instance)
+                        continue
+                    nw_info = network_model.NetworkInfo.hydrate(
+                        self._build_network_info_model(
+                            context, instance, admin_client=client,
+                            neutron_data=neutron_data))
+                    if self._heal_instance_info_cache(context, instance,
+                                                      nw_info):
+                        updated.append(instance.uuid)
+            except (exception.InstanceNotFound,
+                    exception.InstanceInfoCacheNotFound):
+                LOG.debug('Instance no longer exists. Unable to refresh',
+                          instance=instance)
+            except Exception:
+                LOG.error(_LE('An error occurred while refreshing the '
+                              'network cache.'), instance=instance,
+                          exc_info=True)
+        return updated
+
+    def _get_neutron_data_for_instances(self, client, instances):
+        """Return the neutron resources needed to build the network info of
+        the given instances, fetching each kind of resource only once.
+        """
+        ports = client.list_ports(
+            device_id=[instance.uuid for instance in instances]).get(
+                'ports', [])
+
+        net_ids = set()
+        for instance in instances:
+            net_ids.update(vif['network']['id'] for vif in
+                           compute_utils.get_nw_info_for_instance(instance))
+        networks = []
+        if net_ids:
+            networks = client.list_networks(id=list(net_ids)).get(
+                'networks', [])
+
+        subnet_ids = set(fixed_ip['subnet_id'] for port in ports
+                         for fixed_ip in port['fixed_ips'])
+        subnets = []
+        dhcp_ports = []
+        if subnet_ids:
+            subnets = client.list_subnets(id=list(subnet_ids)).get(
+                'subnets', [])
+            subnet_net_ids = set(subnet['network_id'] for subnet in subnets)
+            if subnet_net_ids:
+                dhcp_ports = client.list_ports(
+                    network_id=list(subnet_net_ids),
+                    device_owner='network:dhcp').get('ports', [])
+
+        floatingips = []
+        port_ids = [port['id'] for port in ports if port['fixed_ips']]
+        if port_ids:
+            try:
+                floatingips = client.list_floatingips(port_id=port_ids).get(
+                    'floatingips', [])
+            # If a neutron plugin does not implement the L3 API a 404 from
+            # list_floatingips will be raised.
+            except neutron_client_exc.NeutronClientException as e:
+                if e.status_code != 404:
+                    raise
+
+        return {'ports': ports,
+                'networks': networks,
+                'subnets': subnets,
+                'dhcp_ports': dhcp_ports,
+                'floatingips': floatingips}
+
     def _gather_port_ids_and_networks(self, context, instance, networks=None,
-                                      port_ids=None):
+                                      port_ids=None, neutron_data=None):
         """Return an instance's complete list of port_ids and networks."""
 
         if ((networks is None and port_ids is not None) or
@@ -903,7 +1000,14 @@ class API(base_api.NetworkAPI):
             port_ids = [iface['id'] for iface in ifaces]
             net_ids = [iface['network']['id'] for iface in ifaces]
 
-        if networks is None:
+        if networks is None and neutron_data is not None and net_ids:
+            networks = [net for net in neutron_data['networks']
+                        if net['id'] in net_ids]
+            _ensure_requested_network_ordering(
+                lambda x: x['id'],
+                networks,
+                net_ids)
+        elif networks is None:
             networks = self._get_available_networks(context,
                                                     instance.project_id,
                                                     net_ids)
@@ -1502,12 +1606,17 @@ class API(base_api.NetworkAPI):
         """Force add a network to the project."""
         raise NotImplementedError()
 
-    def _nw_info_get_ips(self, client, port):
+    def _nw_info_get_ips(self, client, port, neutron_data=None):
         network_IPs = []
         for fixed_ip in port['fixed_ips']:
             fixed = network_model.FixedIP(address=fixed_ip['ip_address'])
-            floats = self._get_floating_ips_by_fixed_and_port(
-                client, fixed_ip['ip_address'], port['id'])
+            if neutron_data is None:
+                floats = self._get_floating_ips_by_fixed_and_port(
+                    client, fixed_ip['ip_address'], port['id'])
+            else:
+                floats = [fip for fip in neutron_data['floatingips']
+                          if fip['port_id'] == port['id'] and
+                          fip['fixed_ip_address'] == fixed_ip['ip_address']]
             for ip in floats:
                 fip = network_model.IP(address=ip['floating_ip_address'],
                                        type='floating')
@@ -1515,8 +1624,12 @@ class API(base_api.NetworkAPI):
             network_IPs.append(fixed)
         return network_IPs
 
-    def _nw_info_get_subnets(self, context, port, network_IPs):
-        subnets = self._get_subnets_from_port(context, port)
+    def _nw_info_get_subnets(self, context, port, network_IPs,
+                             neutron_data=None):
+        if neutron_data is None:
+            subnets = self._get_subnets_from_port(context, port)
+        else:
+            subnets = self._get_subnets_from_neutron_data(port, neutron_data)
         for subnet in subnets:
             subnet['ips'] = [fixed_ip for fixed_ip in network_IPs
                              if fixed_ip.is_in_subnet(subnet)]
@@ -1597,7 +1710,8 @@ class API(base_api.NetworkAPI):
 
     def _build_network_info_model(self, context, instance, networks=None,
                                   port_ids=None, admin_client=None,
-                                  preexisting_port_ids=None):
+                                  preexisting_port_ids=None,
+                                  neutron_data=None):
         """Return list of ordered VIFs attached to instance.
 
         :param context - request context.
@@ -1614,6 +1728,9 @@ class API(base_api.NetworkAPI):
         allocate and there shouldn't be deleted when an instance is
         de-allocated. Supplied list will be added to the cached list of
         preexisting port IDs for this instance.
+        :param neutron_data - the neutron resources of the instance, as
+        returned by _get_neutron_data_for_instances(). If None they are
+        fetched from neutron.
         """
 
         search_opts = {'tenant_id': instance.project_id,
@@ -1623,12 +1740,18 @@ class API(base_api.NetworkAPI):
         else:
             client = admin_client
 
-        data = client.list_ports(**search_opts)
+        if neutron_data is None:
+            data = client.list_ports(**search_opts)
+            current_neutron_ports = data.get('ports', [])
+        else:
+            current_neutron_ports = [
+                port for port in neutron_data['ports']
+                if (port['device_id'] == instance.uuid and
+                    port['tenant_id'] == instance.project_id)]
 
-        current_neutron_ports = data.get('ports', [])
         nw_info_refresh = networks is None and port_ids is None
         networks, port_ids = self._gather_port_ids_and_networks(
-                context, instance, networks, port_ids)
+                context, instance, networks, port_ids, neutron_data)
         nw_info = network_model.NetworkInfo()
 
         if preexisting_port_ids is None:
@@ -1655,10 +1778,12 @@ class API(base_api.NetworkAPI):
                     vif_active = True
 
                 network_IPs = self._nw_info_get_ips(client,
-                                                    current_neutron_port)
+                                                    current_neutron_port,
+                                                    neutron_data)
                 subnets = self._nw_info_get_subnets(context,
                                                     current_neutron_port,
-                                                    network_IPs)
+                                                    network_IPs,
+                                                    neutron_data)
 
                 devname = "tap" + current_neutron_port['id']
                 devname = devname[:network_model.NIC_NAME_LEN]
@@ -1708,38 +1833,49 @@ class API(base_api.NetworkAPI):
         subnets = []
 
         for subnet in ipam_subnets:
-            subnet_dict = {'cidr': subnet['cidr'],
-                           'gateway': network_model.IP(
-                                address=subnet['gateway_ip'],
-                                type='gateway'),
-            }
-
             # attempt to populate DHCP server field
             search_opts = {'network_id': subnet['network_id'],
                            'device_owner': 'network:dhcp'}
             data = get_client(context).list_ports(**search_opts)
             dhcp_ports = data.get('ports', [])
-            for p in dhcp_ports:
-                for ip_pair in p['fixed_ips']:
-                    if ip_pair['subnet_id'] == subnet['id']:
-                        subnet_dict['dhcp_server'] = ip_pair['ip_address']
-                        break
-
-            subnet_object = network_model.Subnet(**subnet_dict)
-            for dns in subnet.get('dns_nameservers', []):
-                subnet_object.add_dns(
-                    network_model.IP(address=dns, type='dns'))
-
-            for route in subnet.get('host_routes', []):
-                subnet_object.add_route(
-                    network_model.Route(cidr=route['destination'],
-                                        gateway=network_model.IP(
-                                            address=route['nexthop'],
-                                            type='gateway')))
-
-            subnets.append(subnet_object)
+            subnets.append(self._build_subnet(subnet, dhcp_ports))
         return subnets
 
+    def _get_subnets_from_neutron_data(self, port, neutron_data):
+        """Return the subnets for a given port from prefetched resources."""
+        subnet_ids = [ip['subnet_id'] for ip in port['fixed_ips']]
+        return [self._build_subnet(subnet, neutron_data['dhcp_ports'])
+                for subnet in neutron_data['subnets']
+                if subnet['id'] in subnet_ids]
+
+    def _build_subnet(self, subnet, dhcp_ports):
+        """Return the network model of a neutron subnet."""
+        subnet_dict = {'cidr': subnet['cidr'],
+                       'gateway': network_model.IP(
+                            address=subnet['gateway_ip'],
+                            type='gateway'),
+        }
+
+        for p in dhcp_ports:
+            for ip_pair in p['fixed_ips']:
+                if ip_pair['subnet_id'] == subnet['id']:
+                    subnet_dict['dhcp_server'] = ip_pair['ip_address']
+                    break
+
+        subnet_object = network_model.Subnet(**subnet_dict)
+        for dns in subnet.get('dns_nameservers', []):
+            subnet_object.add_dns(
+                network_model.IP(address=dns, type='dns'))
+
+        for route in subnet.get('host_routes', []):
+            subnet_object.add_route(
+                network_model.Route(cidr=route['destination'],
+                                    gateway=network_model.IP(
+                                        address=route['nexthop'],
+                                        type='gateway')))
+
+        return subnet_object
+
     def get_dns_domains(self, context):
         """Return a list of available dns domains.
 
@@ -18,11 +18,15 @@ import contextlib
 import copy
 import datetime
 import functools
+import threading
 import traceback
 
 import netaddr
+from oslo_config import cfg
 from oslo_log import log as logging
 import oslo_messaging as messaging
+from oslo_serialization import jsonutils
+from oslo_utils import excutils
 from oslo_utils import timeutils
 from oslo_utils import versionutils
 from oslo_versionedobjects import base as ovoo_base
@@ -36,8 +40,24 @@ from nova.objects import fields as obj_fields
 from nova import utils
 
 
+serializer_opts = [
+    cfg.BoolOpt('rpc_compact_objects',
+                default=False,
+                help='Send objects in RPC requests with a compact envelope '
+                     'instead of the long nova_object.* keys, to services '
+                     'whose RPC version cap allows it. Only enable this '
+                     'once every service has been upgraded to a release '
+                     'which can decode it.'),
+]
+
+CONF = cfg.CONF
+CONF.register_opts(serializer_opts)
+
 LOG = logging.getLogger('object')
 
+# Key of the compact object envelope, see NovaObjectSerializer
+COMPACT_OBJECT_KEY = 'nova_obj'
+
 
 def get_attrname(name):
     """Return the mangled name of the attribute's underlying storage."""
@@ -46,11 +66,62 @@ def get_attrname(name):
     return '_obj_' + name
 
 
+# Per-class obj_to_primitive() handler tables, see
+# NovaObject._obj_primitive_handlers()
+_PRIMITIVE_HANDLERS = {}
+# Results of obj_calculate_child_version() keyed by the target version and
+# the relationship table of the child
+_CHILD_VERSION_CACHE = {}
+# Per-class obj_make_compatible() sub-object tables, see
+# NovaObject._obj_compatibility_plan()
+_COMPATIBILITY_PLANS = {}
+# Versions which the serializer had to backport or truncate received
+# objects to, keyed by object name and received version
+_NEGOTIATED_VERSIONS = {}
+
+
+def _field_is_simple(field):
+    """Return True if the field serializes values to themselves."""
+    field_to_primitive = six.get_unbound_function(type(field).to_primitive)
+    type_to_primitive = six.get_unbound_function(
+        type(field._type).to_primitive)
+    return (field_to_primitive is
+            six.get_unbound_function(obj_fields.Field.to_primitive) and
+            type_to_primitive is
+            six.get_unbound_function(obj_fields.FieldType.to_primitive))
+
+
+def _calculate_child_version(target_version, relationships):
+    target_version = utils.convert_version_to_tuple(target_version)
+    for index, versions in enumerate(relationships):
+        my_version, child_version = versions
+        my_version = utils.convert_version_to_tuple(my_version)
+        if target_version < my_version:
+            if index == 0:
+                # We're backporting to a version from before this
+                # subobject was added: delete it from the primitive.
+                return None
+            else:
+                # We're in the gap between index-1 and index, so
+                # backport to the older version
+                return relationships[index - 1][1]
+        elif target_version == my_version:
+            # This is the first mapping that satisfies the
+            # target_version request: backport the object.
+            return child_version
+    # No need to backport, as far as we know, so return the latest
+    # version of the sub-object we know about
+    return relationships[-1][1]
+
+
 class NovaObjectRegistry(ovoo_base.VersionedObjectRegistry):
     def registration_hook(self, cls, index):
         # NOTE(danms): Set the *latest* version of this class
         newest = self._registry._obj_classes[cls.obj_name()][0]
         setattr(objects, cls.obj_name(), newest)
+        # NOTE: A newly registered version may be able to load objects
+        # which had to be backported so far
+        _NEGOTIATED_VERSIONS.clear()
 
 
 # These are decorators that mark an object's method as remotable.
@@ -64,6 +135,10 @@ def remotable_classmethod(fn):
     @functools.wraps(fn)
     def wrapper(cls, context, *args, **kwargs):
         if NovaObject.indirection_api:
+            batch = RemotableBatch.current()
+            if batch is not None:
+                return batch.queue_class_action(cls, fn.__name__, args,
+                                                kwargs)
             result = NovaObject.indirection_api.object_class_action(
                 context, cls.obj_name(), fn.__name__, cls.VERSION,
                 args, kwargs)
@@ -96,21 +171,12 @@ def remotable(fn):
             raise exception.OrphanedObjectError(method=fn.__name__,
                                                 objtype=self.obj_name())
         if NovaObject.indirection_api:
+            batch = RemotableBatch.current()
+            if batch is not None:
+                return batch.queue_action(self, fn.__name__, args, kwargs)
             updates, result = NovaObject.indirection_api.object_action(
                 self._context, self, fn.__name__, args, kwargs)
-            for key, value in six.iteritems(updates):
-                if key in self.fields:
-                    field = self.fields[key]
-                    # NOTE(ndipanov): Since NovaObjectSerializer will have
-                    # deserialized any object fields into objects already,
-                    # we do not try to deserialize them again here.
-                    if isinstance(value, NovaObject):
-                        setattr(self, key, value)
-                    else:
-                        setattr(self, key,
-                                field.from_primitive(self, key, value))
-            self.obj_reset_changes()
-            self._changed_fields = set(updates.get('obj_what_changed', []))
+            _apply_remote_updates(self, updates)
             return result
         else:
             return fn(self, *args, **kwargs)
@@ -120,6 +186,204 @@ def remotable(fn):
     return wrapper
 
 
+def _apply_remote_updates(obj, updates):
+    """Apply the changes returned by a remote object_action() to obj."""
+    for key, value in six.iteritems(updates):
+        if key in obj.fields:
+            field = obj.fields[key]
+            # NOTE(ndipanov): Since NovaObjectSerializer will have
+            # deserialized any object fields into objects already,
+            # we do not try to deserialize them again here.
+            if isinstance(value, NovaObject):
+                setattr(obj, key, value)
+            else:
+                setattr(obj, key, field.from_primitive(obj, key, value))
+    obj.obj_reset_changes()
+    obj._changed_fields = set(updates.get('obj_what_changed', []))
+
+
+def obj_exception_to_primitive(exc):
+    """Turn an exception raised by a batched remotable call into a dict.
+
+    Exceptions from nova.exception are rebuilt by the caller with
+    obj_exception_from_primitive(), others only keep their message.
+    """
+    exc_class = None
+    for cls in type(exc).__mro__:
+        if cls.__module__ == exception.__name__:
+            exc_class = cls.__name__
+            break
+    return {'class': exc_class,
+            'message': six.text_type(exc),
+            'kwargs': jsonutils.to_primitive(getattr(exc, 'kwargs', {}))}
+
+
+def obj_exception_from_primitive(primitive, method):
+    """Rebuild an exception turned into a dict by obj_exception_to_primitive.
+    """
+    cls = getattr(exception, primitive.get('class') or '', None)
+    if isinstance(cls, type) and issubclass(cls, exception.NovaException):
+        try:
+            return cls(message=primitive['message'], **primitive['kwargs'])
+        except Exception:
+            pass
+    return exception.ObjectActionError(action=method,
+                                       reason=primitive['message'])
+
+
+def object_actions_serially(api, context, requests):
+    """Make batched remotable calls one by one through api.
+
+    This is for indirection APIs, or conductors, which can't take the
+    whole batch at once. The results have the format returned by
+    ConductorManager.object_actions().
+    """
+    results = []
+    for request in requests:
+        try:
+            if 'objinst' in request:
+                result = api.object_action(
+                    context, request['objinst'], request['objmethod'],
+                    request['args'], request['kwargs'])
+            else:
+                result = api.object_class_action(
+                    context, request['objname'], request['objmethod'],
+                    request['objver'], request['args'], request['kwargs'])
+            results.append({'result': result})
+        except Exception as e:
+            results.append({'exception': obj_exception_to_primitive(e)})
+    return results
+
+
+class BatchedCall(object):
+    """The pending result of a remotable call queued in a RemotableBatch."""
+
+    def __init__(self, objinst, method):
+        self.objinst = objinst
+        self.method = method
+        self.done = False
+        self.exception = None
+        self._result = None
+
+    def result(self):
+        """Return the result of the call, or raise its exception."""
+        if not self.done:
+            raise exception.ObjectActionError(
+                action=self.method,
+                reason='the batch has not been sent yet')
+        if self.exception is not None:
+            raise self.exception
+        return self._result
+
+
+class RemotableBatch(object):
+    """Send the remotable calls made within a block as a single RPC.
+
+    When objects are remoted through the conductor, each remotable call
+    is one RPC round trip. Within this context manager, remotable calls
+    are queued instead and sent together when the block exits:
+
+        with base.RemotableBatch(context) as batch:
+            for instance in instances:
+                instance.save()
+        for call in batch.calls:
+            ...
+
+    The calls are made in order by the conductor. The changes made to
+    each object are applied to it once the batch returns, the same way
+    as for a single call, so an object shouldn't be changed again within
+    the block after one of its methods is called. Queued calls return a
+    BatchedCall rather than their result, so the block shouldn't depend
+    on them. When objects are not remoted, calls are made immediately as
+    usual.
+
+    If raise_on_error is True, the first exception raised by a call is
+    raised when the block exits. All the calls are made regardless.
+    """
+
+    _local = threading.local()
+
+    def __init__(self, context, raise_on_error=True):
+        self.context = context
+        self.raise_on_error = raise_on_error
+        self.calls = []
+        self._requests = []
+        self._previous = None
+
+    @classmethod
+    def current(cls):
+        return getattr(cls._local, 'batch', None)
+
+    def __enter__(self):
+        self._previous = self.current()
+        self._local.batch = self
+        return self
+
+    def __exit__(self, exc_type, exc_value, exc_tb):
+        self._local.batch = self._previous
+        if exc_type is not None:
+            # NOTE: Still send what was queued before the failure, since
+            # those calls would have been made without a batch, but don't
+            # hide the original exception.
+            with excutils.save_and_reraise_exception():
+                self.flush(raise_on_error=False)
+        else:
+            self.flush()
+
+    def queue_action(self, objinst, method, args, kwargs):
+        call = BatchedCall(objinst, method)
+        # NOTE: Snapshot the object now, since the caller may go on
+        # changing it before the batch is sent.
+        self._requests.append({'objinst': objinst.obj_clone(),
+                               'objmethod': method,
+                               'args': args,
+                               'kwargs': kwargs})
+        self.calls.append(call)
+        return call
+
+    def queue_class_action(self, cls, method, args, kwargs):
+        call = BatchedCall(None, method)
+        self._requests.append({'objname': cls.obj_name(),
+                               'objver': cls.VERSION,
+                               'objmethod': method,
+                               'args': args,
+                               'kwargs': kwargs})
+        self.calls.append(call)
+        return call
+
+    def _send(self, requests):
+        api = NovaObject.indirection_api
+        if hasattr(api, 'object_actions'):
+            return api.object_actions(self.context, requests)
+        return object_actions_serially(api, self.context, requests)
+
+    def flush(self, raise_on_error=None):
+        """Send the queued calls and fill in their results."""
+        if raise_on_error is None:
+            raise_on_error = self.raise_on_error
+        requests, self._requests = self._requests, []
+        pending = [call for call in self.calls if not call.done]
+        if not requests:
+            return
+        results = self._send(requests)
+        first_error = None
+        for call, result in zip(pending, results):
+            call.done = True
+            if 'exception' in result:
+                call.exception = obj_exception_from_primitive(
+                    result['exception'], call.method)
+                first_error = first_error or call.exception
+            elif call.objinst is not None:
+                updates, call._result = result['result']
+                _apply_remote_updates(call.objinst, updates)
+            else:
+                call._result = result['result']
+                if isinstance(call._result, NovaObject):
+                    call._result._context = self.context
+        if first_error is not None and raise_on_error:
+            raise first_error
+
+
 class NovaObject(object):
     """Base class and object factory.
 
@@ -299,26 +563,16 @@ class NovaObject(object):
                   otherwise, the version to which the child should be
                   backported
         """
-        target_version = utils.convert_version_to_tuple(target_version)
-        for index, versions in enumerate(self.obj_relationships[child]):
-            my_version, child_version = versions
-            my_version = utils.convert_version_to_tuple(my_version)
-            if target_version < my_version:
-                if index == 0:
-                    # We're backporting to a version from before this
-                    # subobject was added: delete it from the primitive.
-                    return None
-                else:
-                    # We're in the gap between index-1 and index, so
-                    # backport to the older version
-                    return self.obj_relationships[child][index - 1][1]
-            elif target_version == my_version:
-                # This is the first mapping that satisfies the
-                # target_version request: backport the object.
-                return child_version
-        # No need to backport, as far as we know, so return the latest
-        # version of the sub-object we know about
-        return self.obj_relationships[child][-1][1]
+        relationships = tuple(self.obj_relationships[child])
+        key = (target_version, relationships)
+        try:
+            return _CHILD_VERSION_CACHE[key]
+        except KeyError:
+            pass
+        child_version = _calculate_child_version(target_version,
+                                                 relationships)
+        _CHILD_VERSION_CACHE[key] = child_version
+        return child_version
 
     def _obj_make_obj_compatible(self, primitive, target_version, field):
         """Backlevel a sub-object based on our versioning rules.
@@ -384,13 +638,10 @@ class NovaObject(object):
         :raises: nova.exception.UnsupportedObjectError if conversion
         is not possible for some reason
         """
-        for key, field in self.fields.items():
-            if not isinstance(field, (obj_fields.ObjectField,
-                                      obj_fields.ListOfObjectsField)):
-                continue
+        for key, has_rule in self._obj_compatibility_plan():
             if not self.obj_attr_is_set(key):
                 continue
-            if key not in self.obj_relationships:
+            if not has_rule:
                 # NOTE(danms): This is really a coding error and shouldn't
                 # happen unless we miss something
                 raise exception.ObjectActionError(
@@ -398,26 +649,75 @@ class NovaObject(object):
                     reason='No rule for %s' % key)
             self._obj_make_obj_compatible(primitive, target_version, key)
 
+    def _obj_compatibility_plan(self):
+        """Return the sub-object fields visited by obj_make_compatible().
+
+        Each entry is (name, has_rule), where has_rule is False if the
+        field has no obj_relationships entry. The versions each sub-object
+        is backported to are cached by obj_calculate_child_version(), so
+        backporting many objects of a class to the same version only looks
+        at its fields and relationships once.
+        """
+        cls = self.__class__
+        cached = _COMPATIBILITY_PLANS.get(cls)
+        if (cached is not None and cached[0] is self.fields and
+                cached[1] is self.obj_relationships):
+            return cached[2]
+        plan = tuple((name, name in self.obj_relationships)
+                     for name, field in sorted(self.fields.items())
+                     if isinstance(field, (obj_fields.ObjectField,
+                                           obj_fields.ListOfObjectsField)))
+        _COMPATIBILITY_PLANS[cls] = (self.fields, self.obj_relationships,
+                                     plan)
+        return plan
+
     def obj_to_primitive(self, target_version=None):
         """Simple base-case dehydration.
 
         This calls to_primitive() for each item in fields.
         """
         primitive = dict()
-        for name, field in self.fields.items():
-            if self.obj_attr_is_set(name):
-                primitive[name] = field.to_primitive(self, name,
-                                                     getattr(self, name))
+        for name, attrname, field, simple in self._obj_primitive_handlers():
+            # NOTE: This is equivalent to checking obj_attr_is_set() and
+            # calling field.to_primitive() for every field, but skips the
+            # field machinery for unset, None and plain scalar values,
+            # which is the bulk of the work for large object lists.
+            try:
+                value = getattr(self, attrname)
+            except AttributeError:
+                continue
+            if value is None or simple:
+                primitive[name] = value
+            else:
+                primitive[name] = field.to_primitive(self, name, value)
         if target_version:
             self.obj_make_compatible(primitive, target_version)
         obj = {'nova_object.name': self.obj_name(),
                'nova_object.namespace': 'nova',
                'nova_object.version': target_version or self.VERSION,
                'nova_object.data': primitive}
-        if self.obj_what_changed():
-            obj['nova_object.changes'] = list(self.obj_what_changed())
+        changes = self.obj_what_changed()
+        if changes:
+            obj['nova_object.changes'] = list(changes)
         return obj
 
+    @classmethod
+    def _obj_primitive_handlers(cls):
+        """Return the per-class table used by obj_to_primitive().
+
+        Each entry is (name, attrname, field, simple), where simple is True
+        if the field serializes its values unchanged. The table is built
+        once per class and rebuilt if the class' fields are replaced.
+        """
+        cached = _PRIMITIVE_HANDLERS.get(cls)
+        if cached is not None and cached[0] is cls.fields:
+            return cached[1]
+        handlers = tuple((name, get_attrname(name), field,
+                          _field_is_simple(field))
+                         for name, field in cls.fields.items())
+        _PRIMITIVE_HANDLERS[cls] = (cls.fields, handlers)
+        return handlers
+
     def obj_set_defaults(self, *attrs):
         if not attrs:
             attrs = [name for name, field in self.fields.items()
@@ -452,11 +752,12 @@ class NovaObject(object):
     def obj_what_changed(self):
         """Returns a set of fields that have been modified."""
         changes = set(self._changed_fields)
-        for field in self.fields:
-            if (self.obj_attr_is_set(field) and
-                    isinstance(getattr(self, field), NovaObject) and
-                    getattr(self, field).obj_what_changed()):
-                changes.add(field)
+        for name, attrname, field, simple in self._obj_primitive_handlers():
+            if simple:
+                continue
+            value = getattr(self, attrname, None)
+            if isinstance(value, NovaObject) and value.obj_what_changed():
+                changes.add(name)
         return changes
 
     def obj_get_changes(self):
@@ -516,7 +817,8 @@ class NovaObject(object):
         False if not. Raises AttributeError if attrname is not
         a valid attribute for this object.
         """
-        if attrname not in self.obj_fields:
+        if (attrname not in self.fields and
+                attrname not in self.obj_extra_fields):
             raise AttributeError(
                 _("%(objname)s object has no attribute '%(attrname)s'") %
                 {'objname': self.obj_name(), 'attrname': attrname})
@@ -612,6 +914,13 @@ class ObjectListBase(ovoo_base.ObjectListBase):
         else:
             return primitive.get(key, default)
 
+    def obj_compact(self, fields):
+        """Return read-only compact copies of the objects in this list.
+
+        See obj_compact() for details.
+        """
+        return [obj_compact(obj, fields) for obj in self.objects]
+
 
 class NovaObjectSerializer(messaging.NoOpSerializer):
     """A NovaObject-aware Serializer.
@@ -622,6 +931,13 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
     should pass this to its RPCClient and RPCServer objects.
     """
 
+    def __init__(self, compact=False):
+        super(NovaObjectSerializer, self).__init__()
+        # NOTE: Clients set this once they know the other end can decode
+        # the compact envelope. Replies are always sent in the full format
+        # since a server can't tell which format its caller understands.
+        self.compact = compact
+
     @property
     def conductor(self):
         if not hasattr(self, '_conductor'):
@@ -630,6 +946,16 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         return self._conductor
 
     def _process_object(self, context, objprim):
+        key = (objprim['nova_object.name'], objprim['nova_object.version'])
+        negotiated = _NEGOTIATED_VERSIONS.get(key)
+        if negotiated is not None:
+            # NOTE: We already know that we can't load this version, skip
+            # straight to what worked the last time.
+            truncate, version = negotiated
+            if truncate:
+                objprim['nova_object.version'] = version
+                return self._process_object(context, objprim)
+            return self.conductor.object_backport(context, objprim, version)
         try:
             objinst = NovaObject.obj_from_primitive(objprim, context=context)
         except exception.IncompatibleObjectVersion as e:
@@ -639,9 +965,13 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
                 # should be safe to accept without requiring a backport
                 objprim['nova_object.version'] = \
                     '.'.join(objver.split('.')[:2])
-                return self._process_object(context, objprim)
+                objinst = self._process_object(context, objprim)
+                _NEGOTIATED_VERSIONS[key] = (
+                    True, objprim['nova_object.version'])
+                return objinst
             objinst = self.conductor.object_backport(context, objprim,
                                                      e.kwargs['supported'])
+            _NEGOTIATED_VERSIONS[key] = (False, e.kwargs['supported'])
         return objinst
 
     def _process_iterable(self, context, action_fn, values):
@@ -673,10 +1003,14 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         elif (hasattr(entity, 'obj_to_primitive') and
               callable(entity.obj_to_primitive)):
             entity = entity.obj_to_primitive()
+            if self.compact:
+                entity = compact_primitive(entity)
         return entity
 
     def deserialize_entity(self, context, entity):
-        if isinstance(entity, dict) and 'nova_object.name' in entity:
+        if isinstance(entity, dict) and COMPACT_OBJECT_KEY in entity:
+            entity = self._process_object(context, expand_primitive(entity))
+        elif isinstance(entity, dict) and 'nova_object.name' in entity:
             entity = self._process_object(context, entity)
         elif isinstance(entity, (tuple, list, set, dict)):
             entity = self._process_iterable(context, self.deserialize_entity,
@@ -684,6 +1018,59 @@ class NovaObjectSerializer(messaging.NoOpSerializer):
         return entity
 
 
+def _convert_object_data(objname, data, convert):
+    """Apply convert to the objects held by the fields of an object.
+
+    Only the values of object and list of objects fields are converted,
+    other fields like metadata can hold any key and are left alone.
+    """
+    obj_classes = NovaObjectRegistry.obj_classes().get(objname)
+    if not obj_classes:
+        return data
+    fields = obj_classes[0].fields
+    converted = dict(data)
+    for key, value in data.items():
+        if value is None:
+            continue
+        field = fields.get(key)
+        if isinstance(field, obj_fields.ObjectField):
+            converted[key] = convert(value)
+        elif isinstance(field, obj_fields.ListOfObjectsField):
+            converted[key] = [convert(element) for element in value]
+    return converted
+
+
+def compact_primitive(primitive):
+    """Convert an object primitive to the compact envelope.
+
+    {'nova_object.name': name, 'nova_object.version': version,
+     'nova_object.data': data, 'nova_object.changes': changes} becomes
+    {'nova_obj': [name, version, data, changes]}, recursively for the
+    objects within data. The namespace is always nova and is dropped.
+    """
+    name = primitive['nova_object.name']
+    compact = [name, primitive['nova_object.version'],
+               _convert_object_data(name, primitive['nova_object.data'],
+                                    compact_primitive)]
+    if 'nova_object.changes' in primitive:
+        compact.append(primitive['nova_object.changes'])
+    return {COMPACT_OBJECT_KEY: compact}
+
+
+def expand_primitive(primitive):
+    """Convert a compact envelope back to an object primitive."""
+    compact = primitive[COMPACT_OBJECT_KEY]
+    expanded = {'nova_object.name': compact[0],
+                'nova_object.namespace': 'nova',
+                'nova_object.version': compact[1],
+                'nova_object.data': _convert_object_data(compact[0],
+                                                         compact[2],
+                                                         expand_primitive)}
+    if len(compact) > 3:
+        expanded['nova_object.changes'] = compact[3]
+    return expanded
+
+
 def obj_to_primitive(obj):
     """Recursively turn an object into a python primitive.
 
@@ -706,6 +1093,117 @@ def obj_to_primitive(obj):
         return obj
 
 
+class CompactObject(object):
+    """Read-only, slot based copy of a few fields of a NovaObject.
+
+    A full object keeps every field in a per-instance __dict__ along with
+    change tracking state, which adds up for long-lived collections of
+    hundreds of thousands of objects. A compact object only stores the
+    requested fields, in slots. Reading any other attribute materializes
+    the full object, fetching it again when it has a uuid.
+    """
+    __slots__ = ('_context', '_materialized')
+
+    def __init__(self, obj):
+        self._context = obj._context
+        self._materialized = None
+        for name in self._obj_compact_fields:
+            attrname = get_attrname(name)
+            if hasattr(obj, attrname):
+                setattr(self, name, getattr(obj, attrname))
+
+    def __getattr__(self, name):
+        if name.startswith('__'):
+            raise AttributeError(name)
+        return getattr(self.obj_materialize(), name)
+
+    def __setattr__(self, name, value):
+        if name in self._obj_compact_fields and self._obj_slot_is_set(name):
+            raise exception.ObjectActionError(
+                action='setattr',
+                reason='%s is read-only in a compact object' % name)
+        super(CompactObject, self).__setattr__(name, value)
+
+    def _obj_slot_is_set(self, name):
+        # NOTE: hasattr() would fall back to __getattr__ and materialize
+        # the full object for unset fields.
+        try:
+            object.__getattribute__(self, name)
+        except AttributeError:
+            return False
+        return True
+
+    def __repr__(self):
+        return 'Compact%s(%s)' % (
+            self._obj_compact_cls.obj_name(),
+            ','.join('%s=%r' % (name, getattr(self, name))
+                     for name in self._obj_compact_fields
+                     if self.obj_attr_is_set(name)))
+
+    def obj_attr_is_set(self, attrname):
+        if attrname in self._obj_compact_fields:
+            return self._obj_slot_is_set(attrname)
+        return self.obj_materialize().obj_attr_is_set(attrname)
+
+    def obj_materialize(self):
+        """Return the full object for this compact copy.
+
+        Objects with a uuid and a get_by_uuid() method are fetched again,
+        so that fields which can not be lazy-loaded are available. Other
+        objects, and objects which no longer exist, are rebuilt from the
+        compact fields. The full object is built once and kept, so callers
+        which need it repeatedly should keep the compact copy rather than
+        the list.
+        """
+        if self._materialized is None:
+            self._materialized = self._obj_fetch()
+        if self._materialized is None:
+            obj = self._obj_compact_cls()
+            obj._context = self._context
+            for name in self._obj_compact_fields:
+                if self._obj_slot_is_set(name):
+                    setattr(obj, get_attrname(name), getattr(self, name))
+            obj.obj_reset_changes()
+            self._materialized = obj
+        return self._materialized
+
+    def _obj_fetch(self):
+        get_by_uuid = getattr(self._obj_compact_cls, 'get_by_uuid', None)
+        if (get_by_uuid is None or self._context is None or
+                not self._obj_slot_is_set('uuid')):
+            return None
+        try:
+            return get_by_uuid(self._context, self.uuid)
+        except exception.NotFound:
+            LOG.debug('%(name)s %(uuid)s no longer exists, rebuilding it '
+                      'from its compact copy',
+                      {'name': self._obj_compact_cls.obj_name(),
+                       'uuid': self.uuid})
+            return None
+
+
+_COMPACT_CLASSES = {}
+
+
+def obj_compact(obj, fields):
+    """Return a read-only compact copy of obj holding only the given fields.
+
+    :param:obj: The NovaObject to copy
+    :param:fields: The names of the fields to keep
+    :returns: A CompactObject
+    """
+    fields = tuple(fields)
+    key = (obj.__class__, fields)
+    compact_cls = _COMPACT_CLASSES.get(key)
+    if compact_cls is None:
+        compact_cls = type('Compact%s' % obj.obj_name(), (CompactObject,),
+                           {'__slots__': fields,
+                            '_obj_compact_cls': obj.__class__,
+                            '_obj_compact_fields': fields})
+        compact_cls = _COMPACT_CLASSES.setdefault(key, compact_cls)
+    return compact_cls(obj)
+
+
 def obj_make_list(context, list_obj, item_cls, db_list, **extra_args):
     """Construct an object list from a list of primitives.
 
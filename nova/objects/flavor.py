@@ -12,15 +12,86 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+from oslo_config import cfg
+
 from nova import db
 from nova import exception
 from nova import objects
 from nova.objects import base
 from nova.objects import fields
+from nova.openstack.common import memorycache
+
+
+flavor_opts = [
+    cfg.IntOpt('flavor_cache_ttl',
+               default=0,
+               help='Number of seconds flavors and their extra specs looked '
+                    'up by id or flavorid are cached in each process. '
+                    'Flavor changes made through the same process '
+                    'invalidate the cache immediately, changes made by '
+                    'other processes are noticed once the cached entry '
+                    'expires. This defaults to 0(off)'),
+]
 
+CONF = cfg.CONF
+CONF.register_opts(flavor_opts)
 
 OPTIONAL_FIELDS = ['extra_specs', 'projects']
 
+_CACHE = None
+
+
+def _get_cache():
+    global _CACHE
+
+    if _CACHE is None:
+        # NOTE: Always use the in process cache, reset_cache() can only
+        #       invalidate the entries this process owns.
+        _CACHE = memorycache.Client()
+
+    return _CACHE
+
+
+def reset_cache():
+    """Drop all cached flavors.
+
+    Called whenever a flavor or its extra specs are changed.
+    """
+
+    global _CACHE
+
+    _CACHE = None
+
+
+def _make_cache_key(context, attr, value, read_deleted=None):
+    return 'flavor-%s-%s-%s' % (attr, value,
+                                read_deleted or context.read_deleted)
+
+
+def _copy_db_flavor(db_flavor):
+    db_flavor = dict(db_flavor)
+    db_flavor['extra_specs'] = dict(db_flavor['extra_specs'])
+    return db_flavor
+
+
+def _get_db_flavor(context, cache_key, get_fn, *args):
+    """Read-through lookup of a db flavor in the process flavor cache."""
+    ttl = CONF.flavor_cache_ttl
+    if ttl <= 0:
+        return get_fn(context, *args)
+
+    cache = _get_cache()
+    db_flavor = cache.get(cache_key)
+    # NOTE: Private flavors are only visible to admins and to projects
+    #       which have been granted access, leave that check to the DB API.
+    if db_flavor is not None and (context.is_admin or
+                                  db_flavor['is_public']):
+        return _copy_db_flavor(db_flavor)
+
+    db_flavor = get_fn(context, *args)
+    cache.set(cache_key, _copy_db_flavor(db_flavor), time=ttl)
+    return db_flavor
+
 
 # TODO(berrange): Remove NovaObjectDictCompat
 @base.NovaObjectRegistry.register
@@ -103,10 +174,11 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
     def obj_what_changed(self):
         changes = super(Flavor, self).obj_what_changed()
-        if ('extra_specs' in self and
-            self.extra_specs != self._orig_extra_specs):
+        if (self.obj_attr_is_set('extra_specs') and
+                self.extra_specs != self._orig_extra_specs):
             changes.add('extra_specs')
-        if 'projects' in self and self.projects != self._orig_projects:
+        if (self.obj_attr_is_set('projects') and
+                self.projects != self._orig_projects):
             changes.add('projects')
         return changes
 
@@ -129,7 +201,9 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
     @base.remotable_classmethod
     def get_by_id(cls, context, id):
-        db_flavor = db.flavor_get(context, id)
+        db_flavor = _get_db_flavor(context,
+                                   _make_cache_key(context, 'id', id),
+                                   db.flavor_get, id)
         return cls._from_db_object(context, cls(context), db_flavor,
                                    expected_attrs=['extra_specs'])
 
@@ -141,8 +215,11 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
     @base.remotable_classmethod
     def get_by_flavor_id(cls, context, flavor_id, read_deleted=None):
-        db_flavor = db.flavor_get_by_flavor_id(context, flavor_id,
-                                               read_deleted)
+        cache_key = _make_cache_key(context, 'flavorid', flavor_id,
+                                    read_deleted)
+        db_flavor = _get_db_flavor(context, cache_key,
+                                   db.flavor_get_by_flavor_id, flavor_id,
+                                   read_deleted)
         return cls._from_db_object(context, cls(context), db_flavor,
                                    expected_attrs=['extra_specs'])
 
@@ -174,6 +251,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
                 expected_attrs.append(attr)
         projects = updates.pop('projects', [])
         db_flavor = db.flavor_create(self._context, updates, projects=projects)
+        reset_cache()
         self._from_db_object(self._context, self, db_flavor,
                              expected_attrs=expected_attrs)
 
@@ -212,6 +290,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
 
         for key in to_delete:
             db.flavor_extra_specs_delete(self._context, self.flavorid, key)
+        reset_cache()
         self.obj_reset_changes(['extra_specs'])
 
     def save(self):
@@ -249,6 +328,7 @@ class Flavor(base.NovaPersistentObject, base.NovaObject,
     @base.remotable
     def destroy(self):
         db.flavor_destroy(self._context, self.name)
+        reset_cache()
 
 
 @base.NovaObjectRegistry.register
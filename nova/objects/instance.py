@@ -12,13 +12,16 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import collections
 import contextlib
+import weakref
 
 from oslo_config import cfg
 from oslo_db import exception as db_exc
 from oslo_log import log as logging
 from oslo_serialization import jsonutils
 from oslo_utils import timeutils
+import six
 
 from nova.cells import opts as cells_opts
 from nova.cells import rpcapi as cells_rpcapi
@@ -39,6 +42,11 @@ CONF = cfg.CONF
 LOG = logging.getLogger(__name__)
 
 
+# Number of lazy-loads per attribute in this process, for the debug log
+_LAZY_LOAD_COUNTS = collections.Counter()
+# Number of saves, and of columns and bytes written by them, in this process
+_SAVE_COUNTS = collections.Counter()
+
 # List of fields that can be joined in DB layer.
 _INSTANCE_OPTIONAL_JOINED_FIELDS = ['metadata', 'system_metadata',
                                     'info_cache', 'security_groups',
@@ -57,6 +65,23 @@ INSTANCE_OPTIONAL_ATTRS = (_INSTANCE_OPTIONAL_JOINED_FIELDS +
 # These are fields that most query calls load by default
 INSTANCE_DEFAULT_FIELDS = ['metadata', 'system_metadata',
                            'info_cache', 'security_groups']
+# These are fields which InstanceList can lazy-load for all of its members
+# with one query
+_INSTANCE_BATCH_LOAD_FIELDS = set(INSTANCE_OPTIONAL_ATTRS) - set(['ec2_ids'])
+# These are fields whose changes need more than a column update and can
+# not be saved by InstanceList.save_many()
+_INSTANCE_NO_BULK_SAVE_FIELDS = (set(INSTANCE_OPTIONAL_ATTRS) |
+                                 set(['hostname', 'cell_name', 'deleted']))
+
+
+def _estimate_size(value):
+    """Roughly estimate the number of bytes a column value takes."""
+    if value is None:
+        return 0
+    if isinstance(value, dict):
+        return sum(len(six.text_type(k)) + len(six.text_type(v))
+                   for k, v in value.items())
+    return len(six.text_type(value))
 
 
 def _expected_cols(expected_attrs):
@@ -238,6 +263,10 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
     def __init__(self, *args, **kwargs):
         super(Instance, self).__init__(*args, **kwargs)
         self._reset_metadata_tracking()
+        # NOTE: A weak reference to the InstanceList we were loaded in, so
+        # that lazy-loads can be done for the whole list at once
+        self._instance_list = None
+        self._pending_extra = None
 
     def _reset_metadata_tracking(self, fields=None):
         if fields is None or 'system_metadata' in fields:
@@ -253,10 +282,11 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
 
     def obj_what_changed(self):
         changes = super(Instance, self).obj_what_changed()
-        if 'metadata' in self and self.metadata != self._orig_metadata:
+        if (self.obj_attr_is_set('metadata') and
+                self.metadata != self._orig_metadata):
             changes.add('metadata')
-        if 'system_metadata' in self and (self.system_metadata !=
-                                          self._orig_system_metadata):
+        if (self.obj_attr_is_set('system_metadata') and
+                self.system_metadata != self._orig_system_metadata):
             changes.add('system_metadata')
         return changes
 
@@ -656,11 +686,13 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
     def _save_numa_topology(self, context):
         if self.numa_topology:
             self.numa_topology.instance_uuid = self.uuid
-            with self.numa_topology.obj_alternate_context(context):
-                self.numa_topology._save()
+            self._update_extra(
+                context, {'numa_topology': self.numa_topology._to_json()})
+            for cell in self.numa_topology.cells:
+                cell.obj_reset_changes()
+            self.numa_topology.obj_reset_changes()
         else:
-            objects.InstanceNUMATopology.delete_by_instance_uuid(
-                    context, self.uuid)
+            self._update_extra(context, {'numa_topology': None})
 
     def _save_pci_requests(self, context):
         # NOTE(danms): No need for this yet.
@@ -676,8 +708,6 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         if not any([x in self.obj_what_changed() for x in
                     ('flavor', 'old_flavor', 'new_flavor')]):
             return
-        # FIXME(danms): We can do this smarterly by updating this
-        # with all the other extra things at the same time
         flavor_info = {
             'cur': self.flavor.obj_to_primitive(),
             'old': (self.old_flavor and
@@ -685,9 +715,7 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             'new': (self.new_flavor and
                     self.new_flavor.obj_to_primitive() or None),
         }
-        db.instance_extra_update_by_uuid(
-            context, self.uuid,
-            {'flavor': jsonutils.dumps(flavor_info)})
+        self._update_extra(context, {'flavor': jsonutils.dumps(flavor_info)})
         self.obj_reset_changes(['flavor', 'old_flavor', 'new_flavor'])
 
     def _save_old_flavor(self, context):
@@ -699,21 +727,71 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self._save_flavor(context)
 
     def _save_vcpu_model(self, context):
-        # TODO(yjiang5): should merge the db accesses for all the extra
-        # fields
         if 'vcpu_model' in self.obj_what_changed():
             if self.vcpu_model:
                 update = jsonutils.dumps(self.vcpu_model.obj_to_primitive())
             else:
                 update = None
-            db.instance_extra_update_by_uuid(
-                context, self.uuid,
-                {'vcpu_model': update})
+            self._update_extra(context, {'vcpu_model': update})
 
     def _save_ec2_ids(self, context):
         # NOTE(hanlind): Read-only so no need to save this.
         pass
 
+    def _update_extra(self, context, values):
+        """Write instance_extra columns for the _save_*() handlers.
+
+        Within save() the columns are collected and written with a single
+        update once all the handlers have run.
+        """
+        if self._pending_extra is not None:
+            self._pending_extra.update(values)
+        else:
+            db.instance_extra_update_by_uuid(context, self.uuid, values)
+
+    @staticmethod
+    def _has_nested_changes(value):
+        """Check a sub-object, and the objects in its lists, for changes.
+
+        obj_what_changed() doesn't look into lists of objects, such as
+        the members of a SecurityGroupList or the cells of a NUMA topology.
+        """
+        if not isinstance(value, base.NovaObject):
+            return False
+        if value.obj_what_changed():
+            return True
+        for name, field in value.fields.items():
+            if (isinstance(field, fields.ListOfObjectsField) and
+                    value.obj_attr_is_set(name)):
+                if any(item.obj_what_changed()
+                       for item in getattr(value, name) or []):
+                    return True
+        return False
+
+    def _count_save(self, updates, extra_updates):
+        _SAVE_COUNTS['saves'] += 1
+        if not updates and not extra_updates:
+            _SAVE_COUNTS['noop_saves'] += 1
+            return
+        size = sum(_estimate_size(value) for value in updates.values())
+        extra_size = sum(_estimate_size(value)
+                         for value in extra_updates.values())
+        _SAVE_COUNTS['columns'] += len(updates)
+        _SAVE_COUNTS['bytes'] += size
+        _SAVE_COUNTS['extra_columns'] += len(extra_updates)
+        _SAVE_COUNTS['extra_bytes'] += extra_size
+        LOG.debug("Saving %(columns)s (%(bytes)d bytes) and instance_extra "
+                  "%(extra)s (%(extra_bytes)d bytes); %(saves)d saves, "
+                  "%(noop)d without changes, %(total)d bytes written in this "
+                  "process",
+                  {'columns': sorted(updates), 'bytes': size,
+                   'extra': sorted(extra_updates), 'extra_bytes': extra_size,
+                   'saves': _SAVE_COUNTS['saves'],
+                   'noop': _SAVE_COUNTS['noop_saves'],
+                   'total': (_SAVE_COUNTS['bytes'] +
+                             _SAVE_COUNTS['extra_bytes'])},
+                  instance=self)
+
     def _maybe_upgrade_flavor(self):
         # NOTE(danms): We may have regressed to flavors stored in sysmeta,
         # so we have to merge back in here. That could happen if we pass
@@ -792,31 +870,52 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
         self._maybe_upgrade_flavor()
         updates = {}
         changes = self.obj_what_changed()
+        self._pending_extra = {}
 
-        for field in self.fields:
-            # NOTE(danms): For object fields, we construct and call a
-            # helper method like self._save_$attrname()
-            if (self.obj_attr_is_set(field) and
-                    isinstance(self.fields[field], fields.ObjectField)):
-                try:
-                    getattr(self, '_save_%s' % field)(context)
-                except AttributeError:
-                    LOG.exception(_LE('No save handler for %s'), field,
-                                  instance=self)
-                except db_exc.DBReferenceError:
-                    # NOTE(melwitt): This will happen if we instance.save()
-                    # before an instance.create() and FK constraint fails.
-                    # In practice, this occurs in cells during a delete of
-                    # an unscheduled instance. Otherwise, it could happen
-                    # as a result of bug.
-                    raise exception.InstanceNotFound(instance_id=self.uuid)
-            elif field in changes:
-                if (field == 'cell_name' and self[field] is not None and
-                        self[field].startswith(cells_utils.BLOCK_SYNC_FLAG)):
-                    updates[field] = self[field].replace(
-                            cells_utils.BLOCK_SYNC_FLAG, '', 1)
-                else:
-                    updates[field] = self[field]
+        try:
+            for field in self.fields:
+                # NOTE(danms): For object fields, we construct and call a
+                # helper method like self._save_$attrname()
+                if (self.obj_attr_is_set(field) and
+                        isinstance(self.fields[field], fields.ObjectField)):
+                    # NOTE: Skip the handlers of unchanged sub-objects,
+                    # they would have nothing to write.
+                    if (field not in changes and
+                            not self._has_nested_changes(self[field])):
+                        continue
+                    try:
+                        getattr(self, '_save_%s' % field)(context)
+                    except AttributeError:
+                        LOG.exception(_LE('No save handler for %s'), field,
+                                      instance=self)
+                    except db_exc.DBReferenceError:
+                        # NOTE(melwitt): This will happen if we
+                        # instance.save() before an instance.create() and
+                        # FK constraint fails. In practice, this occurs in
+                        # cells during a delete of an unscheduled instance.
+                        # Otherwise, it could happen as a result of bug.
+                        raise exception.InstanceNotFound(
+                            instance_id=self.uuid)
+                elif field in changes:
+                    if (field == 'cell_name' and self[field] is not None and
+                            self[field].startswith(
+                                cells_utils.BLOCK_SYNC_FLAG)):
+                        updates[field] = self[field].replace(
+                                cells_utils.BLOCK_SYNC_FLAG, '', 1)
+                    else:
+                        updates[field] = self[field]
+            extra_updates = self._pending_extra
+        finally:
+            self._pending_extra = None
+        if extra_updates:
+            try:
+                db.instance_extra_update_by_uuid(context, self.uuid,
+                                                 extra_updates)
+            except db_exc.DBReferenceError:
+                # NOTE: The writes of the _save_* handlers are deferred
+                # to here, so the FK failure described above shows up here.
+                raise exception.InstanceNotFound(instance_id=self.uuid)
+        self._count_save(updates, extra_updates)
 
         if not updates:
             if cells_update_from_api:
@@ -957,6 +1056,9 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             self.new_flavor = None
             return
 
+        self._copy_flavor_from(instance)
+
+    def _copy_flavor_from(self, instance):
         # NOTE(danms): Orphan the instance to make sure we don't lazy-load
         # anything below
         instance._context = None
@@ -1002,12 +1104,22 @@ class Instance(base.NovaPersistentObject, base.NovaObject,
             raise exception.OrphanedObjectError(method='obj_load_attr',
                                                 objtype=self.obj_name())
 
-        LOG.debug("Lazy-loading `%(attr)s' on %(name)s uuid %(uuid)s",
+        _LAZY_LOAD_COUNTS[attrname] += 1
+        LOG.debug("Lazy-loading `%(attr)s' on %(name)s uuid %(uuid)s "
+                  "(%(count)d lazy-loads of `%(attr)s' in this process)",
                   {'attr': attrname,
                    'name': self.obj_name(),
                    'uuid': self.uuid,
+                   'count': _LAZY_LOAD_COUNTS[attrname],
                    })
 
+        instance_list = self._instance_list and self._instance_list()
+        if (instance_list is not None and
+                attrname in _INSTANCE_BATCH_LOAD_FIELDS):
+            instance_list._load_attr_batched(attrname, self)
+            if self.obj_attr_is_set(attrname):
+                return
+
         # NOTE(danms): We handle some fields differently here so that we
         # can be more efficient
         if attrname == 'fault':
@@ -1139,10 +1251,31 @@ def _make_instance_list(context, inst_list, db_inst_list, expected_attrs):
         if get_fault:
             inst_obj.fault = inst_faults.get(inst_obj.uuid, None)
         inst_list.objects.append(inst_obj)
+    inst_list._track_instances()
     inst_list.obj_reset_changes()
     return inst_list
 
 
+def _iter_instance_pages(get_page, page_size, expected_attrs):
+    """Yield the instances of consecutive pages returned by get_page.
+
+    get_page is called with the limit, marker and expected_attrs of each
+    page, the marker being the uuid of the last instance of the previous
+    page.
+    """
+    marker = None
+    while True:
+        # NOTE: _make_instance_list() consumes 'fault' from expected_attrs
+        page = get_page(limit=page_size, marker=marker,
+                        expected_attrs=(list(expected_attrs)
+                                        if expected_attrs else None))
+        for instance in page:
+            yield instance
+        if len(page) < page_size:
+            return
+        marker = page[-1].uuid
+
+
 @base.NovaObjectRegistry.register
 class InstanceList(base.ObjectListBase, base.NovaObject):
     # Version 1.0: Initial version
@@ -1164,7 +1297,14 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
     # Version 1.15: Instance <= version 1.19
     # Version 1.16: Added get_all() method
     # Version 1.17: Instance <= version 1.20
-    VERSION = '1.17'
+    # Version 1.18: Added save_many() method
+    # Version 1.19: Added limit and marker to get_active_by_window_joined,
+    #               added get_count_active_by_window()
+    # Version 1.20: Added get_host_inventory()
+    VERSION = '1.20'
+
+    # Number of instances fetched per page by the iter_*() methods
+    ITER_PAGE_SIZE = 1000
 
     fields = {
         'objects': fields.ListOfObjectsField('Instance'),
@@ -1188,6 +1328,9 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
         '1.15': '1.19',
         '1.16': '1.19',
         '1.17': '1.20',
+        '1.18': '1.20',
+        '1.19': '1.20',
+        '1.20': '1.20',
         }
 
     @base.remotable_classmethod
@@ -1208,6 +1351,26 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
         return _make_instance_list(context, cls(), db_inst_list,
                                    expected_attrs)
 
+    @classmethod
+    def iter_by_filters(cls, context, filters, expected_attrs=None,
+                        use_slave=False, page_size=None):
+        """Iterate over the instances matching filters.
+
+        Unlike get_by_filters(), instances are fetched page_size at a time
+        in id order, so that scanning all the instances of a deployment
+        only holds one page of them in memory.
+
+        :returns: A generator of Instance objects
+        """
+        def get_page(**kwargs):
+            return cls.get_by_filters(context, filters, use_slave=use_slave,
+                                      sort_keys=['id'], sort_dirs=['asc'],
+                                      **kwargs)
+
+        return _iter_instance_pages(get_page,
+                                    page_size or cls.ITER_PAGE_SIZE,
+                                    expected_attrs)
+
     @base.remotable_classmethod
     def get_by_host(cls, context, host, expected_attrs=None, use_slave=False):
         db_inst_list = db.instance_get_all_by_host(
@@ -1252,14 +1415,16 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
     def _get_active_by_window_joined(cls, context, begin, end=None,
                                     project_id=None, host=None,
                                     expected_attrs=None,
-                                    use_slave=False):
+                                    use_slave=False, limit=None,
+                                    marker=None):
         # NOTE(mriedem): We need to convert the begin/end timestamp strings
         # to timezone-aware datetime objects for the DB API call.
         begin = timeutils.parse_isotime(begin)
         end = timeutils.parse_isotime(end) if end else None
         db_inst_list = db.instance_get_active_by_window_joined(
             context, begin, end, project_id, host,
-            columns_to_join=_expected_cols(expected_attrs))
+            columns_to_join=_expected_cols(expected_attrs),
+            limit=limit, marker=marker)
         return _make_instance_list(context, cls(), db_inst_list,
                                    expected_attrs)
 
@@ -1267,7 +1432,8 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
     def get_active_by_window_joined(cls, context, begin, end=None,
                                     project_id=None, host=None,
                                     expected_attrs=None,
-                                    use_slave=False):
+                                    use_slave=False, limit=None,
+                                    marker=None):
         """Get instances and joins active during a certain time window.
 
         :param:context: nova request context
@@ -1278,6 +1444,8 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
         :param:expected_attrs: list of related fields that can be joined
         in the database layer when querying for instances
         :param use_slave if True, ship this query off to a DB slave
+        :param limit: maximum number of instances to return, in id order
+        :param marker: uuid of the instance after which to start
         :returns: InstanceList
 
         """
@@ -1288,7 +1456,81 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
         return cls._get_active_by_window_joined(context, begin, end,
                                                 project_id, host,
                                                 expected_attrs,
-                                                use_slave=use_slave)
+                                                use_slave=use_slave,
+                                                limit=limit, marker=marker)
+
+    @classmethod
+    def iter_active_by_window_joined(cls, context, begin, end=None,
+                                     project_id=None, host=None,
+                                     expected_attrs=None, use_slave=False,
+                                     page_size=None):
+        """Iterate over the instances active during a time window.
+
+        Takes the same arguments as get_active_by_window_joined(), but
+        fetches the instances page_size at a time.
+
+        :returns: A generator of Instance objects
+        """
+        def get_page(**kwargs):
+            return cls.get_active_by_window_joined(
+                context, begin, end, project_id, host, use_slave=use_slave,
+                **kwargs)
+
+        return _iter_instance_pages(get_page,
+                                    page_size or cls.ITER_PAGE_SIZE,
+                                    expected_attrs)
+
+    @base.remotable_classmethod
+    def _get_count_active_by_window(cls, context, begin, end=None,
+                                    project_id=None, host=None,
+                                    use_slave=False):
+        begin = timeutils.parse_isotime(begin)
+        end = timeutils.parse_isotime(end) if end else None
+        return db.instance_count_active_by_window(context, begin, end,
+                                                  project_id, host,
+                                                  use_slave=use_slave)
+
+    @classmethod
+    def get_count_active_by_window(cls, context, begin, end=None,
+                                   project_id=None, host=None,
+                                   use_slave=False):
+        """Count the instances active during a certain time window.
+
+        Takes the same arguments as get_active_by_window_joined().
+
+        :returns: The number of instances
+        """
+        begin = timeutils.isotime(begin)
+        end = timeutils.isotime(end) if end else None
+        return cls._get_count_active_by_window(context, begin, end,
+                                               project_id, host,
+                                               use_slave=use_slave)
+
+    @base.remotable_classmethod
+    def get_host_inventory(cls, context, host, uuids, use_slave=False):
+        """Get the instances a compute host should reconcile.
+
+        These are the instances in uuids, deleted or not, and the deleted
+        instances on host whose files have not been cleaned yet. Only the
+        uuid, host, deleted, deleted_at, vm_state, task_state and cleaned
+        fields of the instances are set.
+        """
+        db_inventory = db.instance_get_host_inventory(context, host, uuids,
+                                                      use_slave=use_slave)
+        inst_list = cls(context, objects=[])
+        for db_inst in db_inventory:
+            inst_obj = objects.Instance(context)
+            inst_obj.uuid = db_inst['uuid']
+            inst_obj.host = db_inst['host']
+            inst_obj.deleted = db_inst['deleted'] == db_inst['id']
+            inst_obj.deleted_at = db_inst['deleted_at']
+            inst_obj.vm_state = db_inst['vm_state']
+            inst_obj.task_state = db_inst['task_state']
+            inst_obj.cleaned = db_inst['cleaned'] == 1
+            inst_obj.obj_reset_changes()
+            inst_list.objects.append(inst_obj)
+        inst_list.obj_reset_changes()
+        return inst_list
 
     @base.remotable_classmethod
     def get_by_security_group_id(cls, context, security_group_id):
@@ -1303,6 +1545,137 @@ class InstanceList(base.ObjectListBase, base.NovaObject):
     def get_by_security_group(cls, context, security_group):
         return cls.get_by_security_group_id(context, security_group.id)
 
+    @base.remotable
+    def save_many(self, expected_vm_state=None, expected_task_state=None):
+        """Save the changes made to the instances in this list.
+
+        Column changes of all the instances are written by a single
+        db.instance_update_bulk() call instead of one Instance.save()
+        each. Instances with other pending changes, and all instances
+        when cells are enabled, are saved individually.
+
+        :param expected_vm_state: Optional tuple of valid vm states for
+                                  the instances to be in
+        :param expected_task_state: Optional tuple of valid task states
+                                    for the instances to be in
+        :returns: A list of uuids of the instances which were not saved
+                  because they were deleted or not in an expected state.
+                  The pending changes of these instances are kept.
+        """
+        guards = {}
+        if expected_vm_state is not None:
+            guards['expected_vm_state'] = expected_vm_state
+        if expected_task_state is not None:
+            guards['expected_task_state'] = expected_task_state
+
+        bulk_allowed = cells_opts.get_cell_type() is None
+        now = timeutils.utcnow()
+        updates = {}
+        single_saves = []
+        for instance in self:
+            changes = instance.obj_what_changed()
+            if not changes:
+                continue
+            legacy_flavor = (instance.obj_attr_is_set('system_metadata') and
+                             'instance_type_id' in instance.system_metadata)
+            if (not bulk_allowed or legacy_flavor or
+                    changes & _INSTANCE_NO_BULK_SAVE_FIELDS):
+                single_saves.append(instance)
+                continue
+            values = {field: instance[field] for field in changes}
+            # Cleaned needs to be turned back into an int here
+            if 'cleaned' in values:
+                values['cleaned'] = 1 if values['cleaned'] else 0
+            values.setdefault('updated_at', now)
+            values.update(guards)
+            updates[instance.uuid] = values
+
+        originals, failed = db.instance_update_bulk(self._context, updates)
+        for instance in self:
+            if instance.uuid not in originals:
+                continue
+            if 'updated_at' not in instance.obj_what_changed():
+                instance.updated_at = now
+            instance.obj_reset_changes()
+            notifications.send_update(self._context,
+                                      originals[instance.uuid],
+                                      instance.obj_clone())
+
+        for instance in single_saves:
+            try:
+                instance.save(expected_vm_state=expected_vm_state,
+                              expected_task_state=expected_task_state)
+            except (exception.InstanceNotFound,
+                    exception.UnexpectedTaskStateError,
+                    exception.UnexpectedVMStateError):
+                failed.append(instance.uuid)
+
+        if failed:
+            LOG.debug('Bulk save skipped %d instance(s) which were deleted '
+                      'or changed state: %s', len(failed), ', '.join(failed))
+        return failed
+
+    @classmethod
+    def _obj_from_primitive(cls, context, objver, primitive):
+        self = super(InstanceList, cls)._obj_from_primitive(context, objver,
+                                                            primitive)
+        self._track_instances()
+        return self
+
+    def _track_instances(self):
+        ref = weakref.ref(self)
+        for instance in self.objects:
+            instance._instance_list = ref
+
+    def _load_attr_batched(self, attrname, instance):
+        """Lazy-load an attribute for all of our instances at once.
+
+        Called from Instance.obj_load_attr() when one of our instances
+        lazy-loads attrname. Members which can not be loaded this way (for
+        example deleted instances) are left alone and load it on their own.
+        """
+        if not any(inst is instance for inst in self):
+            # NOTE: A copy of one of our instances, leave it alone
+            return
+        if 'flavor' in attrname:
+            attrname = 'flavor'
+        missing = [inst for inst in self
+                   if not inst.obj_attr_is_set(attrname)]
+        if len(missing) < 2:
+            return
+
+        LOG.debug("Batch lazy-loading `%(attr)s' on %(count)d instances",
+                  {'attr': attrname, 'count': len(missing)})
+
+        if attrname == 'fault':
+            faults = objects.InstanceFaultList.get_by_instance_uuids(
+                self._context, [inst.uuid for inst in missing])
+            faults_by_uuid = {}
+            for fault in faults:
+                if fault.instance_uuid not in faults_by_uuid:
+                    faults_by_uuid[fault.instance_uuid] = fault
+            for inst in missing:
+                inst.fault = faults_by_uuid.get(inst.uuid)
+                inst.obj_reset_changes(['fault'])
+            return
+
+        expected_attrs = [attrname]
+        if attrname == 'flavor':
+            expected_attrs.append('system_metadata')
+        loaded = InstanceList.get_by_filters(
+            self._context, {'uuid': [inst.uuid for inst in missing]},
+            expected_attrs=expected_attrs)
+        loaded_by_uuid = dict((inst.uuid, inst) for inst in loaded)
+        for inst in missing:
+            loaded_inst = loaded_by_uuid.get(inst.uuid)
+            if loaded_inst is None:
+                continue
+            if attrname == 'flavor':
+                inst._copy_flavor_from(loaded_inst)
+            else:
+                inst[attrname] = loaded_inst[attrname]
+            inst.obj_reset_changes([attrname])
+
     def fill_faults(self):
         """Batch query the database for our instances' faults.
 
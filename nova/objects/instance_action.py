@@ -12,7 +12,10 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import traceback
+
 from oslo_utils import timeutils
+import six
 
 from nova import db
 from nova import objects
@@ -119,7 +122,8 @@ class InstanceActionEvent(base.NovaPersistentObject, base.NovaObject,
                           base.NovaObjectDictCompat):
     # Version 1.0: Initial version
     # Version 1.1: event_finish_with_failure decorated with serialize_args
-    VERSION = '1.1'
+    # Version 1.2: Added record_events()
+    VERSION = '1.2'
     fields = {
         'id': fields.IntegerField(),
         'event': fields.StringField(nullable=True),
@@ -161,6 +165,22 @@ class InstanceActionEvent(base.NovaPersistentObject, base.NovaObject,
             values['traceback'] = exc_tb
         return values
 
+    @classmethod
+    def pack_action_event_record(cls, context, instance_uuid, event_name,
+                                 start_time, exc_val=None, exc_tb=None):
+        """Pack an event which already finished for record_events()."""
+        values = cls.pack_action_event_finish(context, instance_uuid,
+                                              event_name, exc_val=exc_val,
+                                              exc_tb=exc_tb)
+        values['start_time'] = start_time
+        for key in ('start_time', 'finish_time'):
+            values[key] = timeutils.strtime(at=values[key])
+        if exc_val is not None:
+            values['message'] = six.text_type(exc_val)
+        if exc_tb is not None and not isinstance(exc_tb, six.string_types):
+            values['traceback'] = ''.join(traceback.format_tb(exc_tb))
+        return values
+
     @base.remotable_classmethod
     def get_by_id(cls, context, action_id, event_id):
         db_event = db.action_event_get_by_id(context, action_id, event_id)
@@ -193,6 +213,15 @@ class InstanceActionEvent(base.NovaPersistentObject, base.NovaObject,
                                              exc_tb=None,
                                              want_result=want_result)
 
+    @base.remotable_classmethod
+    def record_events(cls, context, events):
+        """Record several events which already finished at once.
+
+        :param events: a list of values from pack_action_event_record()
+        :returns: the values of the events whose action was not found
+        """
+        return db.action_events_record(context, events)
+
     @base.remotable
     def finish_with_failure(self, exc_val, exc_tb):
         values = self.pack_action_event_finish(self._context,
@@ -209,12 +238,17 @@ class InstanceActionEvent(base.NovaPersistentObject, base.NovaObject,
 
 @base.NovaObjectRegistry.register
 class InstanceActionEventList(base.ObjectListBase, base.NovaObject):
+    # Version 1.0: Initial version
+    # Version 1.1: InstanceActionEvent <= version 1.1
+    # Version 1.2: InstanceActionEvent <= version 1.2
+    VERSION = '1.2'
     fields = {
         'objects': fields.ListOfObjectsField('InstanceActionEvent'),
         }
     child_versions = {
         '1.0': '1.0',
         '1.1': '1.1',
+        '1.2': '1.2',
         }
 
     @base.remotable_classmethod
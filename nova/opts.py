@@ -33,6 +33,7 @@ import nova.consoleauth.rpcapi
 import nova.crypto
 import nova.db.api
 import nova.db.base
+import nova.db.instrumentation
 import nova.db.sqlalchemy.api
 import nova.exception
 import nova.image.download.file
@@ -42,8 +43,11 @@ import nova.ipv6.api
 import nova.keymgr
 import nova.keymgr.barbican
 import nova.keymgr.conf_key_mgr
+import nova.manager
 import nova.netconf
 import nova.notifications
+import nova.objects.base
+import nova.objects.flavor
 import nova.objects.network
 import nova.objectstore.s3server
 import nova.paths
@@ -51,6 +55,7 @@ import nova.pci.request
 import nova.pci.whitelist
 import nova.quota
 import nova.rdp
+import nova.rpc
 import nova.service
 import nova.servicegroup.api
 import nova.servicegroup.drivers.zk
@@ -85,17 +90,22 @@ def list_opts():
              nova.consoleauth.manager.consoleauth_opts,
              nova.crypto.crypto_opts,
              nova.db.api.db_opts,
+             nova.db.instrumentation.instrumentation_opts,
              nova.db.sqlalchemy.api.db_opts,
              nova.exception.exc_log_opts,
              nova.image.s3.s3_opts,
+             nova.manager.periodic_task_opts,
              nova.netconf.netconf_opts,
              nova.notifications.notify_opts,
+             nova.objects.base.serializer_opts,
+             nova.objects.flavor.flavor_opts,
              nova.objects.network.network_opts,
              nova.objectstore.s3server.s3_opts,
              nova.paths.path_opts,
              nova.pci.request.pci_alias_opts,
              nova.pci.whitelist.pci_opts,
              nova.quota.quota_opts,
+             nova.rpc.rpc_instrumentation_opts,
              nova.service.service_opts,
              nova.utils.monkey_patch_opts,
              nova.utils.utils_opts,
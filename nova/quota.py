@@ -96,12 +96,75 @@ quota_opts = [
     cfg.StrOpt('quota_driver',
                default='nova.quota.DbQuotaDriver',
                help='Default driver to use for quota checks'),
+    cfg.IntOpt('quota_limits_cache_ttl',
+               default=0,
+               help='Number of seconds the quota limits (defaults, quota '
+                    'class, project and user limits) used by reserve and '
+                    'limit checks are cached in each process. Limit updates '
+                    'made through the same process invalidate the cache '
+                    'immediately, updates made by other processes are '
+                    'noticed once the cached entry expires. This defaults '
+                    'to 0(off), which reads the limits from the database on '
+                    'every check'),
     ]
 
 CONF = cfg.CONF
 CONF.register_opts(quota_opts)
 
 
+class QuotaLimitsCache(object):
+    """Per-process cache of quota limits.
+
+    Every entry is tagged with the generation of the cache at the time
+    the limits were read from the database.  invalidate() bumps the
+    generation, so entries computed from data read before an update are
+    never returned, and are not stored either if the update raced with
+    the read.
+    """
+    # NOTE: Entries only ever expire on lookup, so cap the number of
+    #       cached keys to keep the memory footprint bounded.
+    MAX_ENTRIES = 10000
+
+    def __init__(self):
+        self._generation = 0
+        self._entries = {}
+
+    @property
+    def generation(self):
+        return self._generation
+
+    def get(self, key):
+        ttl = CONF.quota_limits_cache_ttl
+        if ttl <= 0:
+            return None
+        entry = self._entries.get(key)
+        if entry is None:
+            return None
+        generation, cached_at, value = entry
+        if (generation != self._generation or
+                timeutils.is_older_than(cached_at, ttl)):
+            self._entries.pop(key, None)
+            return None
+        return value
+
+    def set(self, key, value, generation):
+        if CONF.quota_limits_cache_ttl <= 0:
+            return
+        if generation != self._generation:
+            # The limits were updated while value was being computed.
+            return
+        if len(self._entries) >= self.MAX_ENTRIES:
+            self._entries.clear()
+        self._entries[key] = (generation, timeutils.utcnow(), value)
+
+    def invalidate(self):
+        self._generation += 1
+        self._entries.clear()
+
+
+_LIMITS_CACHE = QuotaLimitsCache()
+
+
 class DbQuotaDriver(object):
     """Driver to perform necessary checks to enforce quotas and obtain
     quota information.  The default driver utilizes the local
@@ -416,6 +479,50 @@ class DbQuotaDriver(object):
 
         return {k: v['limit'] for k, v in quotas.items()}
 
+    def _get_limits(self, context, resources, keys, has_sync, project_id,
+                    user_id):
+        """A helper method which retrieves the project quotas along with
+        the project and user limits for the resources identified by keys.
+
+        Results are served from the per-process limits cache when it is
+        enabled, so that the only database work left for a check is the
+        usage update.
+
+        :returns: a tuple of (project_quotas, quotas, user_quotas) where
+                  project_quotas are the raw per-project quota records.
+        """
+        cache_key = (project_id, user_id, context.quota_class, has_sync,
+                     frozenset(keys))
+        limits = _LIMITS_CACHE.get(cache_key)
+        if limits is None:
+            generation = _LIMITS_CACHE.generation
+            project_quotas = db.quota_get_all_by_project(context, project_id)
+            quotas = self._get_quotas(context, resources, keys,
+                                      has_sync=has_sync,
+                                      project_id=project_id,
+                                      project_quotas=project_quotas)
+            user_quotas = self._get_quotas(context, resources, keys,
+                                           has_sync=has_sync,
+                                           project_id=project_id,
+                                           user_id=user_id,
+                                           project_quotas=project_quotas)
+            limits = (project_quotas, quotas, user_quotas)
+            _LIMITS_CACHE.set(cache_key, limits, generation)
+        else:
+            LOG.debug('Using cached quota limits for project %(project_id)s '
+                      'and user %(user_id)s',
+                      {'project_id': project_id, 'user_id': user_id})
+        # NOTE: Hand out copies so callers can't corrupt the cache.
+        return tuple(dict(d) for d in limits)
+
+    def invalidate_limits_cache(self):
+        """Drop all cached quota limits in this process.
+
+        Must be called whenever quota limits, quota classes or defaults
+        are changed.
+        """
+        _LIMITS_CACHE.invalidate()
+
     def limit_check(self, context, resources, values, project_id=None,
                     user_id=None):
         """Check simple quota limits.
@@ -459,14 +566,9 @@ class DbQuotaDriver(object):
             user_id = context.user_id
 
         # Get the applicable quotas
-        project_quotas = db.quota_get_all_by_project(context, project_id)
-        quotas = self._get_quotas(context, resources, values.keys(),
-                                  has_sync=False, project_id=project_id,
-                                  project_quotas=project_quotas)
-        user_quotas = self._get_quotas(context, resources, values.keys(),
-                                       has_sync=False, project_id=project_id,
-                                       user_id=user_id,
-                                       project_quotas=project_quotas)
+        project_quotas, quotas, user_quotas = self._get_limits(
+            context, resources, values.keys(), has_sync=False,
+            project_id=project_id, user_id=user_id)
 
         # Check the quotas and construct a list of the resources that
         # would be put over limit by the desired values
@@ -553,24 +655,18 @@ class DbQuotaDriver(object):
         # NOTE(Vek): We're not worried about races at this point.
         #            Yes, the admin may be in the process of reducing
         #            quotas, but that's a pretty rare thing.
-        project_quotas = db.quota_get_all_by_project(context, project_id)
+        project_quotas, quotas, user_quotas = self._get_limits(
+            context, resources, deltas.keys(), has_sync=True,
+            project_id=project_id, user_id=user_id)
         LOG.debug('Quota limits for project %(project_id)s: '
                   '%(project_quotas)s', {'project_id': project_id,
                                          'project_quotas': project_quotas})
-
-        quotas = self._get_quotas(context, resources, deltas.keys(),
-                                  has_sync=True, project_id=project_id,
-                                  project_quotas=project_quotas)
         LOG.debug('Quotas for project %(project_id)s after resource sync: '
                   '%(quotas)s', {'project_id': project_id, 'quotas': quotas})
-        user_quotas = self._get_quotas(context, resources, deltas.keys(),
-                                       has_sync=True, project_id=project_id,
-                                       user_id=user_id,
-                                       project_quotas=project_quotas)
         LOG.debug('Quotas for project %(project_id)s and user %(user_id)s '
                   'after resource sync: %(quotas)s',
                   {'project_id': project_id, 'user_id': user_id,
-                   'quotas': quotas})
+                   'quotas': user_quotas})
 
         # NOTE(Vek): Most of the work here has to be done in the DB
         #            API, because we have to do it in a transaction,
@@ -667,6 +763,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project_and_user(context, project_id, user_id)
+        self.invalidate_limits_cache()
 
     def destroy_all_by_project(self, context, project_id):
         """Destroy all quotas, usages, and reservations associated with a
@@ -677,6 +774,7 @@ class DbQuotaDriver(object):
         """
 
         db.quota_destroy_all_by_project(context, project_id)
+        self.invalidate_limits_cache()
 
     def expire(self, context):
         """Expire reservations.
@@ -962,6 +1060,10 @@ class NoopQuotaDriver(object):
         """
         pass
 
+    def invalidate_limits_cache(self):
+        """Drop all cached quota limits in this process."""
+        pass
+
 
 class BaseResource(object):
     """Describe a single resource for quota checking."""
@@ -1443,6 +1545,18 @@ class QuotaEngine(object):
 
         self._driver.expire(context)
 
+    def invalidate_limits_cache(self):
+        """Drop all quota limits cached by the driver in this process.
+
+        Must be called after quota limits, quota classes or defaults
+        have been changed.
+        """
+
+        # NOTE: Out-of-tree drivers may not implement a limits cache.
+        invalidate = getattr(self._driver, 'invalidate_limits_cache', None)
+        if invalidate:
+            invalidate()
+
     @property
     def resources(self):
         return sorted(self._resources.keys())
@@ -23,17 +23,47 @@ __all__ = [
     'get_client',
     'get_server',
     'get_notifier',
+    'get_stats',
+    'reset_stats',
+    'log_stats',
+    'CastCoalescer',
     'TRANSPORT_ALIASES',
 ]
 
+import collections
+import functools
+import threading
+import time
+
+from eventlet import greenthread
 from oslo_config import cfg
+from oslo_log import log as logging
 import oslo_messaging as messaging
 from oslo_serialization import jsonutils
 
 import nova.context
 import nova.exception
+from nova.i18n import _LE, _LI
+
+rpc_instrumentation_opts = [
+    cfg.BoolOpt('rpc_instrumentation',
+                default=False,
+                help='Record call counts, latencies, timeouts and payload '
+                     'sizes of the RPC methods called and served by this '
+                     'service, per topic and method.'),
+    cfg.IntOpt('rpc_stats_interval',
+               default=0,
+               help='Interval in seconds between logging the busiest RPC '
+                    'methods when rpc_instrumentation is enabled. Set to 0 '
+                    'to only return the statistics from the get_rpc_stats '
+                    'base API call.'),
+]
 
 CONF = cfg.CONF
+CONF.register_opts(rpc_instrumentation_opts)
+
+LOG = logging.getLogger(__name__)
+
 TRANSPORT = None
 NOTIFIER = None
 
@@ -117,22 +147,300 @@ class RequestContextSerializer(messaging.Serializer):
         return nova.context.RequestContext.from_dict(context)
 
 
+# Upper bounds, in seconds, of the latency histogram buckets
+HISTOGRAM_BUCKETS = (0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 30.0)
+# Number of methods shown by log_stats()
+LOG_STATS_METHODS = 10
+
+_STATS = {}
+_LOCAL = threading.local()
+
+
+class MethodStats(object):
+    """Call count, latency histogram and payload sizes of an RPC method."""
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.timeouts = 0
+        self.request_bytes = 0
+        self.reply_bytes = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.histogram = [0] * (len(HISTOGRAM_BUCKETS) + 1)
+
+    def add(self, elapsed, error=False, timeout=False, request_bytes=0,
+            reply_bytes=0):
+        self.calls += 1
+        if error:
+            self.errors += 1
+        if timeout:
+            self.timeouts += 1
+        self.request_bytes += request_bytes
+        self.reply_bytes += reply_bytes
+        self.total_time += elapsed
+        self.max_time = max(self.max_time, elapsed)
+        for i, bound in enumerate(HISTOGRAM_BUCKETS):
+            if elapsed <= bound:
+                break
+        else:
+            i = len(HISTOGRAM_BUCKETS)
+        self.histogram[i] += 1
+
+    def to_dict(self):
+        buckets = ['<=%s' % bound for bound in HISTOGRAM_BUCKETS]
+        buckets.append('>%s' % HISTOGRAM_BUCKETS[-1])
+        return {'calls': self.calls,
+                'errors': self.errors,
+                'timeouts': self.timeouts,
+                'request_bytes': self.request_bytes,
+                'reply_bytes': self.reply_bytes,
+                'total_time': self.total_time,
+                'avg_time': self.total_time / self.calls if self.calls else 0,
+                'max_time': self.max_time,
+                'histogram': dict(zip(buckets, self.histogram))}
+
+
+def _get_stats(side, topic, method):
+    key = (side, '%s.%s' % (topic, method))
+    stats = _STATS.get(key)
+    if stats is None:
+        stats = _STATS.setdefault(key, MethodStats())
+    return stats
+
+
+def _payload_size(entity):
+    try:
+        return len(jsonutils.dumps(entity))
+    except (TypeError, ValueError):
+        return 0
+
+
+class _InstrumentedSerializer(messaging.Serializer):
+    """Count the serialized size of the arguments and replies of a call."""
+
+    def __init__(self, base):
+        self._base = base
+
+    def _count(self, key, entity):
+        sizes = getattr(_LOCAL, 'sizes', None)
+        if sizes is not None:
+            sizes[key] += _payload_size(entity)
+
+    def serialize_entity(self, context, entity):
+        entity = self._base.serialize_entity(context, entity)
+        self._count('request_bytes', entity)
+        return entity
+
+    def deserialize_entity(self, context, entity):
+        self._count('reply_bytes', entity)
+        return self._base.deserialize_entity(context, entity)
+
+    def serialize_context(self, context):
+        context = self._base.serialize_context(context)
+        self._count('request_bytes', context)
+        return context
+
+    def deserialize_context(self, context):
+        return self._base.deserialize_context(context)
+
+
+def _send(topic, method, send, ctxt, kwargs):
+    previous = getattr(_LOCAL, 'sizes', None)
+    sizes = _LOCAL.sizes = {'request_bytes': 0, 'reply_bytes': 0}
+    start = time.time()
+    error = True
+    timeout = False
+    try:
+        result = send(ctxt, method, **kwargs)
+        error = False
+        return result
+    except messaging.MessagingTimeout:
+        timeout = True
+        raise
+    finally:
+        _LOCAL.sizes = previous
+        _get_stats('client', topic, method).add(time.time() - start,
+                                                error=error, timeout=timeout,
+                                                **sizes)
+
+
+class _InstrumentedCallContext(object):
+    def __init__(self, cctxt, topic):
+        self._cctxt = cctxt
+        self._topic = topic
+
+    def __getattr__(self, name):
+        return getattr(self._cctxt, name)
+
+    def call(self, ctxt, method, **kwargs):
+        return _send(self._topic, method, self._cctxt.call, ctxt, kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        return _send(self._topic, method, self._cctxt.cast, ctxt, kwargs)
+
+
+class InstrumentedRPCClient(object):
+    """Proxy for an RPCClient which records the calls and casts it sends."""
+
+    def __init__(self, client):
+        self._client = client
+
+    def __getattr__(self, name):
+        return getattr(self._client, name)
+
+    def prepare(self, **kwargs):
+        topic = kwargs.get('topic') or self._client.target.topic
+        return _InstrumentedCallContext(self._client.prepare(**kwargs), topic)
+
+    def call(self, ctxt, method, **kwargs):
+        return self.prepare().call(ctxt, method, **kwargs)
+
+    def cast(self, ctxt, method, **kwargs):
+        return self.prepare().cast(ctxt, method, **kwargs)
+
+
+class InstrumentedEndpoint(object):
+    """Proxy for an RPC endpoint which times the methods it serves."""
+
+    def __init__(self, endpoint, topic):
+        self._endpoint = endpoint
+        self._topic = topic
+
+    def __getattr__(self, name):
+        attr = getattr(self._endpoint, name)
+        if name.startswith('_') or not callable(attr):
+            return attr
+
+        @functools.wraps(attr)
+        def wrapper(ctxt, **kwargs):
+            start = time.time()
+            error = True
+            try:
+                result = attr(ctxt, **kwargs)
+                error = False
+                return result
+            finally:
+                _get_stats('server', self._topic, name).add(
+                    time.time() - start, error=error)
+        return wrapper
+
+
+def get_stats():
+    """Return the RPC statistics collected in this process."""
+    stats = {'enabled': CONF.rpc_instrumentation, 'client': {}, 'server': {}}
+    for (side, name), method_stats in _STATS.items():
+        stats[side][name] = method_stats.to_dict()
+    return stats
+
+
+def reset_stats():
+    """Drop the RPC statistics collected in this process."""
+    _STATS.clear()
+
+
+def log_stats():
+    """Log the RPC methods which sent and received the most data."""
+    busiest = sorted(_STATS.items(),
+                     key=lambda item: (item[1].request_bytes +
+                                       item[1].reply_bytes,
+                                       item[1].total_time),
+                     reverse=True)
+    for (side, name), stats in busiest[:LOG_STATS_METHODS]:
+        LOG.info(_LI("RPC %(side)s %(name)s: %(calls)d calls, %(errors)d "
+                     "errors, %(timeouts)d timeouts, %(avg_time).3f/"
+                     "%(max_time).3f seconds avg/max, %(request_bytes)d "
+                     "bytes sent, %(reply_bytes)d bytes received"),
+                 dict(stats.to_dict(), side=side, name=name))
+
+
+class CastCoalescer(object):
+    """Buffer casts for a short window and drop the redundant ones.
+
+    Casts queued for the same topic, server, method and key within the
+    window are merged and only the last one is sent. If a merge function
+    is given, it is called as merge(earlier_kwargs, later_kwargs) first so
+    that it can fold whatever the later cast doesn't supersede into it.
+    The remaining casts are sent in the order they were first queued.
+
+    :param get_window: Callable returning the window in seconds; casts are
+                       sent right away while it returns 0
+    """
+
+    def __init__(self, get_window):
+        self._get_window = get_window
+        self._lock = threading.Lock()
+        self._pending = collections.OrderedDict()
+        self._queued = 0
+        self._timer = None
+
+    def cast(self, cctxt, ctxt, method, key, merge=None, **kwargs):
+        window = self._get_window()
+        if not window:
+            cctxt.cast(ctxt, method, **kwargs)
+            return
+        # NOTE: The caller may go on changing the objects it passed in
+        # before the cast is sent, so queue copies of them.
+        kwargs = dict((name, value.obj_clone()
+                       if hasattr(value, 'obj_clone') else value)
+                      for name, value in kwargs.items())
+        bucket = (cctxt.target.topic, cctxt.target.server, method, key)
+        with self._lock:
+            self._queued += 1
+            pending = self._pending.get(bucket)
+            if pending is not None and merge is not None:
+                merge(pending[2], kwargs)
+            self._pending[bucket] = (cctxt, ctxt, kwargs)
+            if self._timer is None:
+                self._timer = greenthread.spawn_after(window, self.flush)
+
+    def flush(self):
+        """Send the queued casts now."""
+        with self._lock:
+            pending = self._pending
+            queued = self._queued
+            self._pending = collections.OrderedDict()
+            self._queued = 0
+            if self._timer is not None:
+                self._timer.cancel()
+                self._timer = None
+        if not pending:
+            return
+        LOG.debug("Sending %(sent)d casts for %(queued)d queued",
+                  {'sent': len(pending), 'queued': queued})
+        for bucket, (cctxt, ctxt, kwargs) in pending.items():
+            try:
+                cctxt.cast(ctxt, bucket[2], **kwargs)
+            except Exception:
+                LOG.exception(_LE('Failed to send the %s cast'), bucket[2])
+
+
 def get_transport_url(url_str=None):
     return messaging.TransportURL.parse(CONF, url_str, TRANSPORT_ALIASES)
 
 
-def get_client(target, version_cap=None, serializer=None):
-    assert TRANSPORT is not None
+def get_client(target, version_cap=None, serializer=None, transport=None):
+    if transport is None:
+        assert TRANSPORT is not None
+        transport = TRANSPORT
     serializer = RequestContextSerializer(serializer)
-    return messaging.RPCClient(TRANSPORT,
-                               target,
-                               version_cap=version_cap,
-                               serializer=serializer)
+    if CONF.rpc_instrumentation:
+        serializer = _InstrumentedSerializer(serializer)
+    client = messaging.RPCClient(transport,
+                                 target,
+                                 version_cap=version_cap,
+                                 serializer=serializer)
+    if CONF.rpc_instrumentation:
+        client = InstrumentedRPCClient(client)
+    return client
 
 
 def get_server(target, endpoints, serializer=None):
     assert TRANSPORT is not None
     serializer = RequestContextSerializer(serializer)
+    if CONF.rpc_instrumentation:
+        endpoints = [InstrumentedEndpoint(endpoint, target.topic)
+                     for endpoint in endpoints]
     return messaging.get_rpc_server(TRANSPORT,
                                     target,
                                     endpoints,
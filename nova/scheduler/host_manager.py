@@ -38,6 +38,7 @@ from nova import context as context_module
 from nova import exception
 from nova.i18n import _, _LI, _LW
 from nova import objects
+from nova.objects import base as objects_base
 from nova.pci import stats as pci_stats
 from nova.scheduler import filters
 from nova.scheduler import weights
@@ -71,6 +72,15 @@ host_manager_opts = [
                default=True,
                help='Determines if the Scheduler tracks changes to instances '
                     'to help with its filtering decisions.'),
+    cfg.BoolOpt('scheduler_compact_instance_info',
+                default=False,
+                help='Keep only the uuid, flavor, host, node, project and '
+                     'state of the tracked instances, in a compact form, '
+                     'rather than full Instance objects. This reduces the '
+                     'memory used by the scheduler in large clouds. Filters '
+                     'which read other instance attributes fetch the full '
+                     'instance from the database the first time they do '
+                     'so.'),
 ]
 
 CONF = cfg.CONF
@@ -78,6 +88,9 @@ CONF.register_opts(host_manager_opts)
 
 LOG = logging.getLogger(__name__)
 HOST_INSTANCE_SEMAPHORE = "host_instance"
+# Instance fields kept with scheduler_compact_instance_info
+COMPACT_INSTANCE_FIELDS = ('uuid', 'instance_type_id', 'host', 'node',
+                           'project_id', 'vm_state', 'task_state')
 
 
 class ReadOnlyDict(IterableUserDict):
@@ -413,7 +426,8 @@ class HostManager(object):
                         self._instance_info[host] = {"instances": {},
                                                      "updated": False}
                     inst_dict = self._instance_info[host]
-                    inst_dict["instances"][instance.uuid] = instance
+                    inst_dict["instances"][instance.uuid] = (
+                        self._track_instance(instance))
                 # Call sleep() to cooperatively yield
                 time.sleep(0)
             LOG.debug("END:_async_init_instance_info")
@@ -421,6 +435,14 @@ class HostManager(object):
         # Run this async so that we don't block the scheduler start-up
         utils.spawn_n(_async_init_instance_info)
 
+    @staticmethod
+    def _track_instance(instance):
+        """Return what is kept in _instance_info for an instance."""
+        if CONF.scheduler_compact_instance_info:
+            return objects_base.obj_compact(instance,
+                                            COMPACT_INSTANCE_FIELDS)
+        return instance
+
     def _choose_host_filters(self, filter_cls_names):
         """Since the caller may specify which filters to use we need
         to have an authoritative list of what is permissible. This
@@ -602,7 +624,8 @@ class HostManager(object):
         _instance_info dict.
         """
         instances = objects.InstanceList.get_by_host(context, host_name)
-        inst_dict = {instance.uuid: instance for instance in instances}
+        inst_dict = {instance.uuid: self._track_instance(instance)
+                     for instance in instances}
         host_info = self._instance_info[host_name] = {}
         host_info["instances"] = inst_dict
         host_info["updated"] = False
@@ -620,15 +643,16 @@ class HostManager(object):
             inst_dict = host_info.get("instances")
             for instance in instance_info.objects:
                 # Overwrite the entry (if any) with the new info.
-                inst_dict[instance.uuid] = instance
+                inst_dict[instance.uuid] = self._track_instance(instance)
             host_info["updated"] = True
         else:
             instances = instance_info.objects
             if len(instances) > 1:
                 # This is a host sending its full instance list, so use it.
                 host_info = self._instance_info[host_name] = {}
-                host_info["instances"] = {instance.uuid: instance
-                                          for instance in instances}
+                host_info["instances"] = {
+                    instance.uuid: self._track_instance(instance)
+                    for instance in instances}
                 host_info["updated"] = True
             else:
                 self._recreate_instance_info(context, host_name)
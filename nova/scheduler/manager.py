@@ -55,7 +55,7 @@ QUOTAS = quota.QUOTAS
 class SchedulerManager(manager.Manager):
     """Chooses a host to run instances on."""
 
-    target = messaging.Target(version='4.2')
+    target = messaging.Target(version='4.3')
 
     def __init__(self, scheduler_driver=None, *args, **kwargs):
         if not scheduler_driver:
@@ -95,6 +95,8 @@ class SchedulerAPI(object):
         methods in 4.x after that point should be done such that they can
         handle the version_cap being set to 4.2.
 
+        * 4.3 - Accept objects in the compact envelope
+
     '''
 
     VERSION_ALIASES = {
@@ -113,6 +115,8 @@ class SchedulerAPI(object):
         serializer = objects_base.NovaObjectSerializer()
         self.client = rpc.get_client(target, version_cap=version_cap,
                                      serializer=serializer)
+        serializer.compact = (CONF.rpc_compact_objects and
+                              self.client.can_send_version('4.3'))
 
     def select_destinations(self, ctxt, request_spec, filter_properties):
         cctxt = self.client.prepare(version='4.0')
@@ -118,6 +118,7 @@ service_opts = [
 CONF = cfg.CONF
 CONF.register_opts(service_opts)
 CONF.import_opt('host', 'nova.netconf')
+CONF.import_opt('periodic_task_stats_interval', 'nova.manager')
 
 
 class Service(service.Service):
@@ -197,7 +198,17 @@ class Service(service.Service):
         # Add service to the ServiceGroup membership group.
         self.servicegroup_api.join(self.host, self.topic, self)
 
+        if CONF.rpc_instrumentation and CONF.rpc_stats_interval:
+            self.tg.add_timer(CONF.rpc_stats_interval, rpc.log_stats,
+                              initial_delay=CONF.rpc_stats_interval)
+
         if self.periodic_enable:
+            stats_interval = CONF.periodic_task_stats_interval
+            if stats_interval:
+                self.tg.add_timer(stats_interval,
+                                  self.manager.log_periodic_task_stats,
+                                  initial_delay=stats_interval)
+
             if self.periodic_fuzzy_delay:
                 initial_delay = random.randint(0, self.periodic_fuzzy_delay)
             else:
@@ -16,6 +16,7 @@
 Tests For Cells RPCAPI
 """
 
+import mock
 from oslo_config import cfg
 import six
 
@@ -156,6 +157,7 @@ class CellsAPITestCase(test.NoDBTestCase):
         fake_sys_metadata = {'key1': 'value1',
                              'key2': 'value2'}
         fake_attrs = {'id': 2,
+                      'uuid': 'fake-uuid',
                       'cell_name': 'fake',
                       'metadata': {'fake': 'fake'},
                       'info_cache': fake_info_cache,
@@ -171,6 +173,29 @@ class CellsAPITestCase(test.NoDBTestCase):
         self._check_result(call_info, 'instance_update_at_top',
                 expected_args, version='1.35')
 
+    @mock.patch('eventlet.greenthread.spawn_after')
+    def test_instance_update_at_top_coalesced(self, mock_spawn):
+        self.flags(cast_coalesce_window=0.5, group='cells')
+        call_info = self._stub_rpc_method('cast', None)
+        instance = objects.Instance(uuid='fake-uuid', vm_state='active',
+                                    task_state='spawning')
+        instance.obj_reset_changes()
+        instance.task_state = None
+        self.cells_rpcapi.instance_update_at_top(self.fake_context, instance)
+        # NOTE: The queued update must not change with the caller's object
+        instance.obj_reset_changes()
+        info_cache = objects.InstanceInfoCache(instance_uuid='fake-uuid')
+        self.cells_rpcapi.instance_info_cache_update_at_top(
+            self.fake_context, info_cache)
+        self.assertEqual({}, call_info)
+        mock_spawn.assert_called_once_with(0.5, mock.ANY)
+
+        cells_rpcapi._COALESCER.flush()
+        sent = call_info['args']['instance']
+        self.assertEqual(set(['uuid', 'info_cache', 'task_state']),
+                         sent.obj_what_changed())
+        self.assertIsNone(sent.task_state)
+
     def test_instance_destroy_at_top(self):
         fake_instance = objects.Instance(uuid='fake-uuid')
 
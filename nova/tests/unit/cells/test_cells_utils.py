@@ -36,54 +36,63 @@ class CellsUtilsTestCase(test.NoDBTestCase):
             call_info['shuffle'] += 1
 
         @staticmethod
-        def instance_get_all_by_filters(context, filters,
-                sort_key, sort_dir):
+        def instance_iter_by_filters(context, filters, expected_attrs):
             self.assertEqual(context, fake_context)
-            self.assertEqual(sort_key, 'deleted')
-            self.assertEqual(sort_dir, 'asc')
+            self.assertIsNone(expected_attrs)
             call_info['got_filters'] = filters
             call_info['get_all'] += 1
-            return ['fake_instance1', 'fake_instance2', 'fake_instance3']
+            return iter(['fake_instance1', 'fake_instance2'])
 
-        self.stubs.Set(objects.InstanceList, 'get_by_filters',
-                instance_get_all_by_filters)
+        self.stubs.Set(objects.InstanceList, 'iter_by_filters',
+                instance_iter_by_filters)
         self.stubs.Set(random, 'shuffle', random_shuffle)
 
         instances = cells_utils.get_instances_to_sync(fake_context)
         self.assertTrue(inspect.isgenerator(instances))
-        self.assertEqual(len([x for x in instances]), 3)
-        self.assertEqual(call_info['get_all'], 1)
-        self.assertEqual(call_info['got_filters'], {})
+        self.assertEqual(len([x for x in instances]), 4)
+        self.assertEqual(call_info['get_all'], 2)
+        self.assertEqual(call_info['got_filters'], {'deleted': True})
         self.assertEqual(call_info['shuffle'], 0)
 
         instances = cells_utils.get_instances_to_sync(fake_context,
                                                       shuffle=True)
         self.assertTrue(inspect.isgenerator(instances))
-        self.assertEqual(len([x for x in instances]), 3)
-        self.assertEqual(call_info['get_all'], 2)
-        self.assertEqual(call_info['got_filters'], {})
+        self.assertEqual(len([x for x in instances]), 4)
+        self.assertEqual(call_info['get_all'], 4)
+        self.assertEqual(call_info['got_filters'], {'deleted': True})
         self.assertEqual(call_info['shuffle'], 1)
 
         instances = cells_utils.get_instances_to_sync(fake_context,
-                updated_since='fake-updated-since')
+                updated_since='fake-updated-since', deleted=False)
         self.assertTrue(inspect.isgenerator(instances))
-        self.assertEqual(len([x for x in instances]), 3)
-        self.assertEqual(call_info['get_all'], 3)
+        self.assertEqual(len([x for x in instances]), 2)
+        self.assertEqual(call_info['get_all'], 5)
         self.assertEqual(call_info['got_filters'],
-                {'changes-since': 'fake-updated-since'})
+                {'changes-since': 'fake-updated-since', 'deleted': False})
         self.assertEqual(call_info['shuffle'], 1)
 
         instances = cells_utils.get_instances_to_sync(fake_context,
                 project_id='fake-project',
                 updated_since='fake-updated-since', shuffle=True)
         self.assertTrue(inspect.isgenerator(instances))
-        self.assertEqual(len([x for x in instances]), 3)
-        self.assertEqual(call_info['get_all'], 4)
+        self.assertEqual(len([x for x in instances]), 4)
+        self.assertEqual(call_info['get_all'], 7)
         self.assertEqual(call_info['got_filters'],
                 {'changes-since': 'fake-updated-since',
-                 'project_id': 'fake-project'})
+                 'project_id': 'fake-project', 'deleted': True})
         self.assertEqual(call_info['shuffle'], 2)
 
+    @mock.patch.object(objects.InstanceList, 'iter_by_filters')
+    def test_get_instances_to_sync_uuids_only(self, mock_iter):
+        mock_iter.side_effect = [iter([objects.Instance(uuid='active')]),
+                                 iter([objects.Instance(uuid='deleted')])]
+        instances = cells_utils.get_instances_to_sync('fake_context',
+                                                      uuids_only=True)
+        self.assertEqual(['active', 'deleted'], list(instances))
+        mock_iter.assert_has_calls([
+            mock.call('fake_context', {'deleted': False}, expected_attrs=[]),
+            mock.call('fake_context', {'deleted': True}, expected_attrs=[])])
+
     def test_split_cell_and_item(self):
         path = 'australia', 'queensland', 'gold_coast'
         cell = cells_utils.PATH_CELL_SEP.join(path)
@@ -1306,6 +1306,22 @@ class ComputeTestCase(BaseTestCase):
         self.assertTrue(mock_start.called)
         self.assertTrue(mock_finish.called)
 
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    def test_wrap_instance_event_marks_power_state_dirty(self, mock_finish,
+                                                         mock_start):
+        self.flags(sync_power_state_event_driven=True)
+        inst = {"uuid": "fake_uuid"}
+
+        @compute_manager.wrap_instance_event
+        def fake_event(self, context, instance):
+            raise exception.NovaException()
+
+        self.assertRaises(exception.NovaException, fake_event,
+                          self.compute, self.context, instance=inst)
+        self.assertEqual(set(['fake_uuid']), self.compute._power_sync_dirty)
+
     @mock.patch.object(objects.InstanceActionEvent, 'event_start')
     @mock.patch.object(objects.InstanceActionEvent,
                        'event_finish_with_failure')
@@ -1324,6 +1340,29 @@ class ComputeTestCase(BaseTestCase):
         args, kwargs = mock_finish.call_args
         self.assertIsInstance(kwargs['exc_val'], exception.NovaException)
 
+    @mock.patch.object(objects.InstanceActionEvent, 'record_events',
+                       return_value=[])
+    @mock.patch.object(objects.InstanceActionEvent, 'event_start')
+    @mock.patch.object(objects.InstanceActionEvent,
+                       'event_finish_with_failure')
+    def test_wrap_instance_event_buffered(self, mock_finish, mock_start,
+                                          mock_record):
+        self.flags(action_event_buffer_interval=5)
+        inst = {"uuid": "fake_uuid"}
+
+        @compute_manager.wrap_instance_event
+        def fake_event(self, context, instance):
+            pass
+
+        fake_event(self.compute, self.context, instance=inst)
+
+        self.assertFalse(mock_start.called)
+        self.assertFalse(mock_finish.called)
+        context, events = mock_record.call_args[0]
+        self.assertEqual(1, len(events))
+        self.assertEqual('compute_fake_event', events[0]['event'])
+        self.assertEqual('Success', events[0]['result'])
+
     def test_object_compat(self):
         db_inst = fake_instance.fake_db_instance()
 
@@ -6241,6 +6280,40 @@ class ComputeTestCase(BaseTestCase):
     def test_heal_instance_info_cache_with_exception(self):
         self._heal_instance_info_cache(_get_instance_nw_info_raise=True)
 
+    @mock.patch.object(objects.Instance, 'get_by_uuid')
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_heal_instance_info_cache_batch(self, mock_get_by_host,
+                                            mock_get_by_uuid):
+        self.flags(heal_instance_info_cache_interval=-1,
+                   heal_instance_info_cache_batch_size=2)
+        ctxt = context.get_admin_context()
+        instances = [objects.Instance(uuid='fake-uuid-%s' % x, host=CONF.host,
+                                      vm_state=vm_states.ACTIVE,
+                                      task_state=None)
+                     for x in range(5)]
+        instances[0].vm_state = vm_states.BUILDING
+        mock_get_by_host.return_value = instances
+        mock_get_by_uuid.side_effect = lambda context, inst_uuid, **kw: (
+            instances[int(inst_uuid[-1])])
+
+        with mock.patch.object(self.compute.network_api,
+                               'heal_instance_info_caches') as mock_heal:
+            mock_heal.return_value = []
+            self.compute._heal_instance_info_cache(ctxt)
+            mock_get_by_host.assert_called_once_with(
+                ctxt, self.compute.host, expected_attrs=['info_cache'],
+                use_slave=True)
+            mock_heal.assert_called_once_with(ctxt, instances[1:3])
+            self.assertEqual(['fake-uuid-3', 'fake-uuid-4'],
+                             self.compute._instance_uuids_to_heal)
+
+            mock_heal.reset_mock()
+            mock_heal.side_effect = test.TestingException
+            # Errors are logged, the next batch is refreshed on the next run
+            self.compute._heal_instance_info_cache(ctxt)
+            mock_heal.assert_called_once_with(ctxt, instances[3:5])
+            self.assertEqual([], self.compute._instance_uuids_to_heal)
+
     @mock.patch('nova.objects.InstanceList.get_by_filters')
     @mock.patch('nova.compute.api.API.unrescue')
     def test_poll_rescued_instances(self, unrescue, get):
@@ -6439,23 +6512,25 @@ class ComputeTestCase(BaseTestCase):
         new_instance.update(filters)
         instances.append(fake_instance.fake_db_instance(**new_instance))
 
-        # need something to return from conductor_api.instance_update
-        # that is defined outside the for loop and can be used in the mock
-        # context
-        fake_instance_ref = {'host': CONF.host, 'node': 'fake'}
+        # the instance which finished building in the meantime is skipped
+        skipped_uuid = old_instances[-1]['uuid']
+        originals = {inst['uuid']: {'vm_state': vm_states.BUILDING,
+                                    'task_state': None,
+                                    'display_name': None}
+                     for inst in old_instances[:-1]}
 
         # creating mocks
         with contextlib.nested(
             mock.patch.object(self.compute.db.sqlalchemy.api,
                               'instance_get_all_by_filters',
                               return_value=instances),
-            mock.patch.object(self.compute.conductor_api, 'instance_update',
-                              return_value=fake_instance_ref),
+            mock.patch.object(db, 'instance_update_bulk',
+                              return_value=(originals, [skipped_uuid])),
             mock.patch.object(self.compute.driver, 'node_is_available',
                               return_value=False)
         ) as (
             instance_get_all_by_filters,
-            conductor_instance_update,
+            instance_update_bulk,
             node_is_available
         ):
             # run the code
@@ -6469,16 +6544,49 @@ class ComputeTestCase(BaseTestCase):
                                             columns_to_join=[],
                                             use_slave=True,
                                             limit=None)
-            self.assertThat(conductor_instance_update.mock_calls,
-                            testtools_matchers.HasLength(len(old_instances)))
+            self.assertEqual(1, instance_update_bulk.call_count)
+            updates = instance_update_bulk.call_args[0][1]
+            self.assertEqual(set(inst['uuid'] for inst in old_instances),
+                             set(updates))
+            for values in updates.values():
+                self.assertEqual(vm_states.ERROR, values['vm_state'])
+                self.assertEqual([vm_states.BUILDING],
+                                 values['expected_vm_state'])
             self.assertThat(node_is_available.mock_calls,
-                            testtools_matchers.HasLength(len(old_instances)))
-            for inst in old_instances:
-                conductor_instance_update.assert_has_calls([
-                    mock.call(ctxt, inst['uuid'],
-                              vm_state=vm_states.ERROR)])
-                node_is_available.assert_has_calls([
-                    mock.call(fake_instance_ref['node'])])
+                            testtools_matchers.HasLength(
+                                len(old_instances) - 1))
+
+    def test_instance_build_timeout_old_conductor(self):
+        # Tests that the instances are saved one at a time when the
+        # conductor does not know about InstanceList.save_many() yet.
+        self.flags(instance_build_timeout=30)
+        ctxt = context.get_admin_context()
+        created_at = timeutils.utcnow() + datetime.timedelta(seconds=-60)
+        instances = [fake_instance.fake_instance_obj(
+                         ctxt, uuid=str(uuid.uuid4()), created_at=created_at,
+                         vm_state=vm_states.BUILDING, host=CONF.host)
+                     for x in range(2)]
+        inst_list = objects.InstanceList(ctxt, objects=instances)
+
+        with contextlib.nested(
+            mock.patch.object(objects.InstanceList, 'get_by_filters',
+                              return_value=inst_list),
+            mock.patch.object(objects.InstanceList, 'save_many',
+                              side_effect=exception.IncompatibleObjectVersion(
+                                  objname='InstanceList', objver='1.18',
+                                  supported='1.17')),
+            mock.patch.object(objects.Instance, 'save',
+                              side_effect=[None,
+                                           exception.UnexpectedVMStateError(
+                                               expected=[vm_states.BUILDING],
+                                               actual=vm_states.ACTIVE)]),
+            mock.patch.object(self.compute, '_update_resource_tracker')
+        ) as (get_by_filters, save_many, save, update_rt):
+            self.compute._check_instance_build_time(ctxt)
+
+            save.assert_has_calls(
+                [mock.call(expected_vm_state=[vm_states.BUILDING])] * 2)
+            update_rt.assert_called_once_with(ctxt, instances[0])
 
     def test_get_resource_tracker_fail(self):
         self.assertRaises(exception.NovaException,
@@ -359,6 +359,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             if defer_iptables_apply:
                 self.compute.driver.filter_defer_apply_on()
             self.compute._destroy_evacuated_instances(self.context)
+            self.compute._fail_queued_live_migrations(self.context)
             self.compute._init_instance(self.context,
                                         mox.IsA(objects.Instance))
             self.compute._init_instance(self.context,
@@ -377,6 +378,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         self.mox.StubOutWithMock(context, 'get_admin_context')
         self.mox.StubOutWithMock(self.compute,
                 '_destroy_evacuated_instances')
+        self.mox.StubOutWithMock(self.compute,
+                '_fail_queued_live_migrations')
         self.mox.StubOutWithMock(self.compute,
                 '_init_instance')
 
@@ -400,13 +403,78 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         self.mox.VerifyAll()
         self.mox.UnsetStubs()
 
+    @mock.patch.object(objects.Migration, 'save')
+    @mock.patch.object(objects.MigrationList, 'get_by_filters')
+    def test_fail_queued_live_migrations(self, mock_get, mock_save):
+        migration = objects.Migration(status='queued', dest_compute='dest',
+                                      instance_uuid='fake-uuid')
+        mock_get.return_value = [migration]
+        self.compute._fail_queued_live_migrations(self.context)
+        mock_get.assert_called_once_with(
+            self.context, {'source_compute': 'fake-mini',
+                           'status': 'queued'})
+        self.assertEqual('failed', migration.status)
+        mock_save.assert_called_once_with()
+
+    def _make_startup_instances(self):
+        return [fake_instance.fake_instance_obj(
+                    self.context, uuid='fake-uuid-%d' % i,
+                    task_state=task_state)
+                for i, task_state in enumerate(
+                    [None, task_states.REBOOTING, None,
+                     task_states.DELETING])]
+
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_interrupted_first(self, mock_init):
+        instances = self._make_startup_instances()
+        self.compute._init_instances(self.context, instances)
+        self.assertEqual(['fake-uuid-1', 'fake-uuid-3', 'fake-uuid-0',
+                          'fake-uuid-2'],
+                         [call[0][1].uuid
+                          for call in mock_init.call_args_list])
+
+    @mock.patch('eventlet.GreenPool')
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_parallel(self, mock_init, mock_pool):
+        self.flags(init_host_workers=4)
+        instances = self._make_startup_instances()
+        self.compute._init_instances(self.context, instances)
+        mock_pool.assert_called_once_with(4)
+        self.assertEqual(4, mock_pool.return_value.spawn.call_count)
+        mock_pool.return_value.waitall.assert_called_once_with()
+        self.assertEqual(
+            4, mock_pool.return_value.spawn.return_value.wait.call_count)
+
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_parallel_error(self, mock_init):
+        self.flags(init_host_workers=4)
+        mock_init.side_effect = [None, test.TestingException, None, None]
+        instances = self._make_startup_instances()
+        self.assertRaises(test.TestingException,
+                          self.compute._init_instances, self.context,
+                          instances)
+        self.assertEqual(4, mock_init.call_count)
+
+    @mock.patch('eventlet.GreenPool')
+    @mock.patch.object(manager.ComputeManager, '_init_instance')
+    def test_init_instances_parallel_unsupported(self, mock_init, mock_pool):
+        self.flags(init_host_workers=4)
+        instances = self._make_startup_instances()
+        with mock.patch.dict(self.compute.driver.capabilities,
+                             supports_parallel_init_instance=False):
+            self.compute._init_instances(self.context, instances)
+        self.assertFalse(mock_pool.called)
+        self.assertEqual(4, mock_init.call_count)
+
+    @mock.patch('nova.objects.MigrationList')
     @mock.patch('nova.objects.InstanceList')
-    def test_cleanup_host(self, mock_instance_list):
+    def test_cleanup_host(self, mock_instance_list, mock_migration_list):
         # just testing whether the cleanup_host method
         # when fired will invoke the underlying driver's
         # equivalent method.
 
         mock_instance_list.get_by_host.return_value = []
+        mock_migration_list.get_by_filters.return_value = []
 
         with mock.patch.object(self.compute, 'driver') as mock_driver:
             self.compute.init_host()
@@ -439,6 +507,8 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         self.mox.StubOutWithMock(context, 'get_admin_context')
         self.mox.StubOutWithMock(self.compute, 'init_virt_events')
         self.mox.StubOutWithMock(self.compute, '_get_instances_on_driver')
+        self.mox.StubOutWithMock(self.compute,
+                                 '_fail_queued_live_migrations')
         self.mox.StubOutWithMock(self.compute, '_init_instance')
         self.mox.StubOutWithMock(self.compute.network_api,
                                  'get_instance_nw_info')
@@ -461,6 +531,7 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         # clean up any dangling files
         self.compute.driver.destroy(self.context, deleted_instance,
             mox.IgnoreArg(), mox.IgnoreArg(), mox.IgnoreArg())
+        self.compute._fail_queued_live_migrations(self.context)
 
         self.mox.ReplayAll()
         self.compute.init_host()
@@ -1162,16 +1233,24 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         instances = [objects.Instance(uuid='foo')]
 
         @classmethod
-        def fake_get(*a, **k):
-            return instances
+        def fake_iter(*a, **k):
+            return iter(instances)
+
+        @classmethod
+        def fake_count(*a, **k):
+            return len(instances)
 
         self.flags(instance_usage_audit=True)
         self.stubs.Set(compute_utils, 'has_audit_been_run',
                        lambda *a, **k: False)
         self.stubs.Set(objects.InstanceList,
-                       'get_active_by_window_joined', fake_get)
-        self.stubs.Set(compute_utils, 'start_instance_usage_audit',
-                       lambda *a, **k: None)
+                       'iter_active_by_window_joined', fake_iter)
+        self.stubs.Set(objects.InstanceList,
+                       'get_count_active_by_window', fake_count)
+        self.mox.StubOutWithMock(compute_utils, 'start_instance_usage_audit')
+        compute_utils.start_instance_usage_audit(
+            self.context, self.compute.conductor_api, mox.IgnoreArg(),
+            mox.IgnoreArg(), self.compute.host, 1)
         self.stubs.Set(compute_utils, 'finish_instance_usage_audit',
                        lambda *a, **k: None)
 
@@ -1193,6 +1272,81 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                                         use_slave=True)
             mock_spawn.assert_called_once_with(mock.ANY, instance)
 
+    @mock.patch.object(manager.ComputeManager,
+                       '_query_driver_power_state_and_sync')
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def _test_sync_power_states_bulk(self, vm_power_states, mock_get,
+                                     mock_query):
+        instance = objects.Instance(uuid='fake-uuid')
+        mock_get.return_value = [instance]
+        with contextlib.nested(
+            mock.patch.object(self.compute.driver, 'get_power_states',
+                              side_effect=vm_power_states),
+            mock.patch.object(self.compute._sync_power_pool, 'spawn_n',
+                              side_effect=lambda f, *a: f(*a)),
+        ) as (mock_get_power_states, mock_spawn):
+            self.compute._sync_power_states(self.context)
+            mock_get_power_states.assert_called_once_with()
+        return mock_query
+
+    def test_sync_power_states_bulk(self):
+        vm_power_states = {'fake-uuid': power_state.RUNNING}
+        mock_query = self._test_sync_power_states_bulk([vm_power_states])
+        mock_query.assert_called_once_with(self.context, mock.ANY,
+                                           vm_power_states=vm_power_states)
+
+    def test_sync_power_states_bulk_not_implemented(self):
+        mock_query = self._test_sync_power_states_bulk(NotImplementedError)
+        mock_query.assert_called_once_with(self.context, mock.ANY,
+                                           vm_power_states=None)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    def test_sync_power_states_event_driven_dirty(self, mock_get_filters,
+                                                  mock_get_host):
+        self.flags(sync_power_state_event_driven=True)
+        instance = objects.Instance(uuid='fake-uuid')
+        mock_get_filters.return_value = [instance]
+        self.compute._last_full_power_sync = time.time()
+        self.compute._mark_power_state_dirty('fake-uuid')
+        with mock.patch.object(self.compute._sync_power_pool,
+                               'spawn_n') as mock_spawn:
+            self.compute._sync_power_states(self.context)
+            # NOTE: Nothing left to sync at the next run
+            self.compute._sync_power_states(self.context)
+        self.assertFalse(mock_get_host.called)
+        mock_get_filters.assert_called_once_with(
+            self.context, {'uuid': ['fake-uuid'], 'host': self.compute.host,
+                           'deleted': False, 'soft_deleted': True},
+            expected_attrs=[], use_slave=True)
+        mock_spawn.assert_called_once_with(mock.ANY, instance)
+
+    @mock.patch.object(objects.InstanceList, 'get_by_host')
+    def test_sync_power_states_event_driven_full(self, mock_get_host):
+        self.flags(sync_power_state_event_driven=True)
+        synced = objects.Instance(uuid='synced')
+        stale = objects.Instance(uuid='stale')
+        dirty = objects.Instance(uuid='dirty')
+        mock_get_host.return_value = [synced, stale, dirty]
+        now = time.time()
+        self.compute._power_sync_times = {
+            'synced': now, 'dirty': now, 'gone': now,
+            'stale': now - CONF.sync_power_state_full_interval - 1}
+        self.compute._mark_power_state_dirty('dirty')
+        with mock.patch.object(self.compute._sync_power_pool,
+                               'spawn_n') as mock_spawn:
+            self.compute._sync_power_states(self.context)
+        self.assertEqual([mock.call(mock.ANY, stale),
+                          mock.call(mock.ANY, dirty)],
+                         mock_spawn.call_args_list)
+        self.assertNotIn('gone', self.compute._power_sync_times)
+
+    def test_mark_power_state_dirty_polling(self):
+        self.compute._mark_power_state_dirty('fake-uuid')
+        self.compute._power_state_synced('fake-uuid')
+        self.assertEqual(set(), self.compute._power_sync_dirty)
+        self.assertEqual({}, self.compute._power_sync_times)
+
     def _get_sync_instance(self, power_state, vm_state, task_state=None,
                            shutdown_terminate=False):
         instance = objects.Instance()
@@ -1214,6 +1368,19 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         self.compute._sync_instance_power_state(self.context, instance,
                                                 power_state.RUNNING)
 
+    def test_sync_instance_power_state_confirm(self):
+        instance = self._get_sync_instance(power_state.RUNNING,
+                                           vm_states.ACTIVE)
+        instance.refresh(use_slave=False)
+        self.mox.StubOutWithMock(self.compute.driver, 'get_info')
+        self.compute.driver.get_info(instance).AndReturn(
+            hardware.InstanceInfo(state=power_state.RUNNING))
+        self.mox.ReplayAll()
+        self.compute._sync_instance_power_state(self.context, instance,
+                                                power_state.SHUTDOWN,
+                                                confirm_power_state=True)
+        self.assertEqual(power_state.RUNNING, instance.power_state)
+
     def test_sync_instance_power_state_running_stopped(self):
         instance = self._get_sync_instance(power_state.RUNNING,
                                            vm_states.ACTIVE)
@@ -1296,10 +1463,24 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             self.compute._query_driver_power_state_and_sync(self.context,
                                                             db_instance)
             mock_get_info.assert_called_once_with(db_instance)
-            mock_sync_power_state.assert_called_once_with(self.context,
-                                                          db_instance,
-                                                          power_state.NOSTATE,
-                                                          use_slave=True)
+            mock_sync_power_state.assert_called_once_with(
+                self.context, db_instance, power_state.NOSTATE,
+                use_slave=True, confirm_power_state=False)
+
+    @mock.patch('nova.compute.manager.ComputeManager.'
+                '_sync_instance_power_state')
+    def test_query_driver_power_state_and_sync_bulk(self,
+                                                    mock_sync_power_state):
+        with mock.patch.object(self.compute.driver,
+                               'get_info') as mock_get_info:
+            db_instance = objects.Instance(uuid='fake-uuid', task_state=None)
+            self.compute._query_driver_power_state_and_sync(
+                self.context, db_instance,
+                vm_power_states={'fake-uuid': power_state.SHUTDOWN})
+            self.assertFalse(mock_get_info.called)
+            mock_sync_power_state.assert_called_once_with(
+                self.context, db_instance, power_state.SHUTDOWN,
+                use_slave=True, confirm_power_state=True)
 
     def test_run_pending_deletes(self):
         self.flags(instance_delete_interval=10)
@@ -1347,6 +1528,146 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
         self.assertFalse(c.cleaned)
         self.assertEqual('1', c.system_metadata['clean_attempts'])
 
+    @mock.patch('nova.objects.base.RemotableBatch')
+    def test_retry_pending_deletes_batches_saves(self, mock_batch):
+        instances = [fake_instance.fake_instance_obj(
+            self.context, uuid=uuid, expected_attrs=['system_metadata'])
+            for uuid in ('fake-uuid1', 'fake-uuid2')]
+
+        def fake_batch(context):
+            self.assertEqual('yes', context.read_deleted)
+            return mock.MagicMock()
+
+        mock_batch.side_effect = fake_batch
+        with contextlib.nested(
+            mock.patch.object(self.compute.driver, 'delete_instance_files',
+                              return_value=True),
+            mock.patch.object(objects.Instance, 'save')
+        ) as (mock_delete, mock_save):
+            self.compute._retry_pending_deletes(self.context, instances)
+        mock_batch.assert_called_once_with(self.context)
+        self.assertEqual(2, mock_save.call_count)
+        self.assertTrue(all(instance.cleaned for instance in instances))
+
+    @mock.patch.object(manager.ComputeManager, '_retry_pending_deletes')
+    @mock.patch.object(manager.ComputeManager,
+                       '_handle_running_deleted_instances')
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    @mock.patch.object(objects.InstanceList, 'get_host_inventory')
+    @mock.patch.object(manager.LOG, 'warning')
+    def test_reconcile_host_inventory(self, mock_warning, mock_inventory,
+                                      mock_get, mock_handle, mock_retry):
+        self.flags(host_inventory_reconcile_interval=60,
+                   running_deleted_instance_action='reap')
+
+        def make_instance(uuid, host='fake-mini', deleted=False,
+                          vm_state=vm_states.ACTIVE, task_state=None):
+            return objects.Instance(
+                uuid=uuid, host=host, deleted=deleted, deleted_at=None,
+                vm_state=vm_state, task_state=task_state, cleaned=False)
+
+        mock_inventory.return_value = objects.InstanceList(objects=[
+            make_instance('running'),
+            make_instance('zombie', deleted=True),
+            make_instance('gone', deleted=True),
+            make_instance('soft', deleted=True,
+                          vm_state=vm_states.SOFT_DELETED),
+            make_instance('evacuated', host='other'),
+            make_instance('resizing', host='other',
+                          task_state=task_states.RESIZE_MIGRATED),
+        ])
+        zombies = [mock.sentinel.zombie]
+        pending = [mock.sentinel.zombie, mock.sentinel.gone]
+        mock_get.side_effect = [zombies, pending]
+        driver_uuids = ['running', 'zombie', 'soft', 'evacuated', 'resizing']
+
+        with mock.patch.object(self.compute.driver, 'list_instance_uuids',
+                               return_value=driver_uuids):
+            self.compute._reconcile_host_inventory(self.context)
+
+        mock_inventory.assert_called_once_with(
+            self.context, 'fake-mini', mock.ANY, use_slave=True)
+        self.assertEqual(sorted(driver_uuids),
+                         sorted(mock_inventory.call_args[0][2]))
+        mock_get.assert_has_calls([
+            mock.call(self.context, {'uuid': ['zombie'], 'deleted': True},
+                      use_slave=True),
+            mock.call(self.context,
+                      {'uuid': ['zombie', 'gone'], 'deleted': True},
+                      expected_attrs=['info_cache', 'security_groups',
+                                      'system_metadata'],
+                      use_slave=True)])
+        mock_handle.assert_called_once_with(self.context, zombies, 'reap')
+        mock_retry.assert_called_once_with(self.context, pending)
+        self.assertEqual(1, mock_warning.call_count)
+        self.assertEqual('evacuated',
+                         mock_warning.call_args[1]['instance'].uuid)
+
+    @mock.patch.object(objects.InstanceList, 'get_host_inventory')
+    def test_reconcile_host_inventory_not_implemented(self, mock_inventory):
+        self.flags(host_inventory_reconcile_interval=60)
+        self.assertTrue(self.compute._host_inventory_enabled())
+
+        with mock.patch.object(self.compute.driver, 'list_instance_uuids',
+                               side_effect=NotImplementedError):
+            self.compute._reconcile_host_inventory(self.context)
+
+        self.assertFalse(mock_inventory.called)
+        self.assertFalse(self.compute._host_inventory_enabled())
+
+    @mock.patch.object(manager.ComputeManager, '_retry_pending_deletes')
+    @mock.patch.object(manager.ComputeManager,
+                       '_handle_running_deleted_instances')
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    @mock.patch.object(objects.InstanceList, 'get_host_inventory')
+    def _test_reconcile_host_inventory_disabled(self, mock_inventory,
+                                                mock_get, mock_handle,
+                                                mock_retry, **flags):
+        self.flags(host_inventory_reconcile_interval=60,
+                   running_deleted_instance_action='reap', **flags)
+        mock_inventory.return_value = objects.InstanceList(objects=[
+            objects.Instance(uuid='zombie', host='fake-mini', deleted=True,
+                             deleted_at=None, vm_state=vm_states.ACTIVE,
+                             task_state=None, cleaned=False)])
+        mock_get.return_value = [mock.sentinel.zombie]
+
+        with mock.patch.object(self.compute.driver, 'list_instance_uuids',
+                               return_value=['zombie']):
+            self.compute._reconcile_host_inventory(self.context)
+
+        self.assertEqual(1, mock_get.call_count)
+        return mock_handle, mock_retry
+
+    def test_reconcile_host_inventory_running_deleted_disabled(self):
+        for interval in (0, -1):
+            mock_handle, mock_retry = (
+                self._test_reconcile_host_inventory_disabled(
+                    running_deleted_instance_poll_interval=interval))
+            self.assertFalse(mock_handle.called)
+            mock_retry.assert_called_once_with(self.context,
+                                               [mock.sentinel.zombie])
+
+    def test_reconcile_host_inventory_pending_deletes_disabled(self):
+        mock_handle, mock_retry = (
+            self._test_reconcile_host_inventory_disabled(
+                instance_delete_interval=-1))
+        mock_handle.assert_called_once_with(
+            self.context, [mock.sentinel.zombie], 'reap')
+        self.assertFalse(mock_retry.called)
+
+    @mock.patch.object(manager.ComputeManager, '_running_deleted_instances')
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    def test_separate_cleanup_tasks_skipped_by_reconcile(self, mock_get,
+                                                         mock_running):
+        self.flags(host_inventory_reconcile_interval=60,
+                   running_deleted_instance_action='reap')
+
+        self.compute._cleanup_running_deleted_instances(self.context)
+        self.compute._run_pending_deletes(self.context)
+
+        self.assertFalse(mock_running.called)
+        self.assertFalse(mock_get.called)
+
     def test_attach_interface_failure(self):
         # Test that the fault methods are invoked when an attach fails
         db_instance = fake_instance.fake_db_instance()
@@ -1594,6 +1915,96 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                 self._test_check_can_live_migrate_destination,
                 do_raise=True)
 
+    @mock.patch('nova.utils.spawn_n')
+    @mock.patch.object(objects.Migration, 'save')
+    @mock.patch.object(objects.Service, 'get_by_compute_host')
+    @mock.patch.object(manager.ComputeManager, '_post_live_migration')
+    def test_live_migration_queued(self, mock_post, mock_service, mock_save,
+                                   mock_spawn):
+        self.flags(max_concurrent_live_migrations=1)
+        mock_service.return_value = objects.Service(disabled=False)
+        instances = [fake_instance.fake_instance_obj(
+                         self.context, uuid='fake-uuid-%d' % i)
+                     for i in range(2)]
+        migrations = [objects.Migration(), objects.Migration()]
+
+        with mock.patch.object(self.compute.compute_rpcapi,
+                               'pre_live_migration') as mock_pre:
+            for instance, migration in zip(instances, migrations):
+                self.compute.live_migration(self.context, 'dest', instance,
+                                            False, migration, {})
+            self.assertEqual(['queued', 'queued'],
+                             [migration.status for migration in migrations])
+            self.assertEqual(['running', 'queued'],
+                             [migration['status'] for migration
+                              in self.compute._live_migrations.get_status()])
+
+            # The fake driver reports its progress and finishes right away,
+            # which starts the next migration
+            self.assertEqual(1, mock_spawn.call_count)
+            mock_spawn.call_args[0][0](*mock_spawn.call_args[0][1:])
+            mock_pre.assert_called_once_with(
+                self.context, instances[0], False, None, 'dest', mock.ANY)
+
+        mock_post.assert_called_once_with(
+            self.context, instances[0], 'dest', False,
+            {'pre_live_migration_result': mock_pre.return_value,
+             'migration': migrations[0]})
+        self.assertEqual(['running', 'queued'],
+                         [migration.status for migration in migrations])
+        self.assertEqual(2, mock_spawn.call_count)
+        status = self.compute._live_migrations.get_status()
+        self.assertEqual([('fake-uuid-1', 'running', 0)],
+                         [(migration['instance_uuid'], migration['status'],
+                           migration['progress']) for migration in status])
+
+    @mock.patch('nova.utils.spawn_n')
+    @mock.patch.object(objects.InstanceList, 'get_by_filters')
+    def test_report_live_migration_queue_reclaims_slots(self, mock_get,
+                                                        mock_spawn):
+        self.flags(max_concurrent_live_migrations=4)
+        for instance_uuid in ('migrating', 'moved', 'reset', 'deleted',
+                              'queued'):
+            self.compute._live_migrations.submit(
+                instance_uuid, 'dest', 'rebalance', mock.Mock())
+        mock_get.return_value = [
+            objects.Instance(uuid='migrating', host='fake-mini',
+                             task_state=task_states.MIGRATING),
+            objects.Instance(uuid='moved', host='dest', task_state=None),
+            objects.Instance(uuid='reset', host='fake-mini',
+                             task_state=None)]
+
+        self.compute._report_live_migration_queue(self.context)
+
+        mock_get.assert_called_once_with(
+            self.context,
+            {'uuid': ['migrating', 'moved', 'reset', 'deleted']},
+            expected_attrs=[])
+        status = self.compute._live_migrations.get_status()
+        self.assertEqual([('migrating', 'running'), ('queued', 'running')],
+                         [(migration['instance_uuid'], migration['status'])
+                          for migration in status])
+
+    @mock.patch.object(objects.Service, 'get_by_compute_host')
+    def test_get_live_migration_priority(self, mock_service):
+        queue = compute_utils.LiveMigrationQueue
+        mock_service.return_value = objects.Service(disabled=False)
+        self.assertEqual(queue.PRIORITY_REBALANCE,
+                         self.compute._get_live_migration_priority(
+                             self.context, None))
+        mock_service.return_value.disabled = True
+        self.assertEqual(queue.PRIORITY_EVACUATION,
+                         self.compute._get_live_migration_priority(
+                             self.context, {}))
+        self.assertEqual(queue.PRIORITY_REBALANCE,
+                         self.compute._get_live_migration_priority(
+                             self.context,
+                             {'live_migration_priority': 'rebalance'}))
+        mock_service.side_effect = exception.ComputeHostNotFound(host='h')
+        self.assertEqual(queue.PRIORITY_REBALANCE,
+                         self.compute._get_live_migration_priority(
+                             self.context, {}))
+
     @mock.patch('nova.compute.manager.InstanceEvents._lock_name')
     def test_prepare_for_instance_event(self, lock_name_mock):
         inst_obj = objects.Instance(uuid='foo')
@@ -2333,10 +2744,58 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
             return_value=(0, 0))
     @mock.patch.object(time, 'time', side_effect=[10, 20, 21])
     @mock.patch.object(objects.InstanceList, 'get_by_host', return_value=[])
+    @mock.patch.object(objects.BandwidthUsageList, 'get_by_uuids')
+    @mock.patch.object(db, 'bw_usage_update_bulk')
+    def test_poll_bandwidth_usage(self, bw_usage_update_bulk, get_by_uuids,
+            get_by_host, time, last_completed_audit):
+        bw_counters = [{'uuid': 'fake-uuid', 'mac_address': 'fake-mac',
+                        'bw_in': 1, 'bw_out': 2},
+                       {'uuid': 'fake-uuid', 'mac_address': 'fake-mac2',
+                        'bw_in': 5, 'bw_out': 6}]
+        usage = objects.BandwidthUsage()
+        usage.instance_uuid = 'fake-uuid'
+        usage.mac = 'fake-mac'
+        usage.bw_in = 3
+        usage.bw_out = 4
+        usage.last_ctr_in = 0
+        usage.last_ctr_out = 0
+        prev_usage = objects.BandwidthUsage()
+        prev_usage.instance_uuid = 'fake-uuid'
+        prev_usage.mac = 'fake-mac2'
+        prev_usage.last_ctr_in = 2
+        prev_usage.last_ctr_out = 2
+        self.flags(bandwidth_poll_interval=1)
+        get_by_uuids.side_effect = [[usage], [prev_usage]]
+        with mock.patch.object(self.compute.driver,
+                'get_all_bw_counters', return_value=bw_counters):
+            self.compute._poll_bandwidth_usage(self.context)
+            self.assertEqual(
+                [mock.call(self.context, ['fake-uuid'], start_period=0,
+                           use_slave=True)] * 2,
+                get_by_uuids.call_args_list)
+            # NOTE(sdague): bw_usage_update happens at some time in
+            # the future, so what last_refreshed is is irrelevant.
+            bw_usage_update_bulk.assert_called_once_with(self.context,
+                    [{'uuid': 'fake-uuid', 'mac': 'fake-mac',
+                      'bw_in': 4, 'bw_out': 6,
+                      'last_ctr_in': 1, 'last_ctr_out': 2},
+                     {'uuid': 'fake-uuid', 'mac': 'fake-mac2',
+                      'bw_in': 3, 'bw_out': 4,
+                      'last_ctr_in': 5, 'last_ctr_out': 6}],
+                    0, last_refreshed=mock.ANY, update_cells=False)
+
+    @mock.patch.object(utils, 'last_completed_audit_period',
+            return_value=(0, 0))
+    @mock.patch.object(time, 'time', side_effect=[10, 20, 21])
+    @mock.patch.object(objects.InstanceList, 'get_by_host', return_value=[])
+    @mock.patch.object(objects.BandwidthUsageList, 'get_by_uuids',
+            side_effect=exception.IncompatibleObjectVersion(
+                objname='BandwidthUsageList', objver='1.3', supported='1.2'))
     @mock.patch.object(objects.BandwidthUsage, 'get_by_instance_uuid_and_mac')
     @mock.patch.object(db, 'bw_usage_update')
-    def test_poll_bandwidth_usage(self, bw_usage_update, get_by_uuid_mac,
-            get_by_host, time, last_completed_audit):
+    def test_poll_bandwidth_usage_old_conductor(self, bw_usage_update,
+            get_by_uuid_mac, get_by_uuids, get_by_host, time,
+            last_completed_audit):
         bw_counters = [{'uuid': 'fake-uuid', 'mac_address': 'fake-mac',
                         'bw_in': 1, 'bw_out': 2}]
         usage = objects.BandwidthUsage()
@@ -2363,6 +2822,24 @@ class ComputeManagerUnitTestCase(test.NoDBTestCase):
                     last_refreshed=mock.ANY,
                     update_cells=False)
 
+    def test_update_volume_usage_cache(self):
+        instance = fake_instance.fake_instance_obj(self.context,
+                                                   availability_zone='az')
+        vol_usages = [{'volume': 'fake-vol', 'instance': instance,
+                       'rd_req': 1, 'rd_bytes': 2, 'wr_req': 3,
+                       'wr_bytes': 4}]
+        with mock.patch.object(self.compute.conductor_api,
+                               'vol_usage_update_bulk') as update_bulk:
+            self.compute._update_volume_usage_cache(self.context,
+                                                    vol_usages)
+            update_bulk.assert_called_once_with(self.context,
+                [{'volume_id': 'fake-vol', 'rd_req': 1, 'rd_bytes': 2,
+                  'wr_req': 3, 'wr_bytes': 4,
+                  'instance_uuid': instance.uuid,
+                  'project_id': instance.project_id,
+                  'user_id': instance.user_id,
+                  'availability_zone': 'az'}])
+
     def test_reverts_task_state_instance_not_found(self):
         # Tests that the reverts_task_state decorator in the compute manager
         # will not trace when an InstanceNotFound is raised.
@@ -2594,6 +3071,69 @@ class ComputeManagerBuildInstanceTestCase(test.NoDBTestCase):
         self.assertEqual('10.0.0.1', str(requested_network.address))
         self.assertEqual('fake_port_id', requested_network.port_id)
 
+    @mock.patch('nova.utils.spawn_n')
+    def test_build_and_run_instance_prefetch_image(self, mock_spawn):
+        self.flags(prefetch_image_on_build=True)
+        self.compute.build_and_run_instance(self.context, self.instance,
+                self.image, request_spec={},
+                filter_properties=self.filter_properties,
+                block_device_mapping=self.block_device_mapping, node=self.node,
+                limits=self.limits)
+        self.assertEqual(2, mock_spawn.call_count)
+        mock_spawn.assert_any_call(self.compute._prefetch_image,
+                                   self.context, self.instance, self.image,
+                                   self.block_device_mapping)
+
+    @mock.patch('nova.utils.spawn_n')
+    def test_build_and_run_instance_no_prefetch_image(self, mock_spawn):
+        self.compute.build_and_run_instance(self.context, self.instance,
+                self.image, request_spec={},
+                filter_properties=self.filter_properties,
+                block_device_mapping=self.block_device_mapping, node=self.node,
+                limits=self.limits)
+        self.assertEqual(1, mock_spawn.call_count)
+
+    def test_prefetch_image(self):
+        self.instance.image_ref = 'fake-image-ref'
+        with mock.patch.object(self.compute.driver,
+                               'prefetch_image') as mock_prefetch:
+            self.compute._prefetch_image(self.context, self.instance,
+                                         self.image, self.block_device_mapping)
+        mock_prefetch.assert_called_once_with(self.context, self.instance,
+                                              self.image)
+
+    def test_prefetch_image_volume_backed(self):
+        self.instance.image_ref = ''
+        with mock.patch.object(self.compute.driver,
+                               'prefetch_image') as mock_prefetch:
+            self.compute._prefetch_image(self.context, self.instance,
+                                         self.image, self.block_device_mapping)
+        self.assertFalse(mock_prefetch.called)
+
+    @mock.patch.object(manager.LOG, 'warning')
+    def test_prefetch_image_failure(self, mock_warning):
+        self.instance.image_ref = 'fake-image-ref'
+        with mock.patch.object(self.compute.driver, 'prefetch_image',
+                               side_effect=test.TestingException):
+            self.compute._prefetch_image(self.context, self.instance,
+                                         self.image, self.block_device_mapping)
+        self.assertTrue(mock_warning.called)
+
+    @mock.patch.object(compute_utils, 'EventReporter')
+    def test_build_stage(self, mock_reporter):
+        self.flags(record_build_stage_events=True)
+        with self.compute._build_stage(self.context, self.instance, 'spawn'):
+            pass
+        mock_reporter.assert_called_once_with(self.context, 'compute_spawn',
+                                              self.instance.uuid)
+        self.assertTrue(mock_reporter.return_value.__exit__.called)
+
+    @mock.patch.object(compute_utils, 'EventReporter')
+    def test_build_stage_disabled(self, mock_reporter):
+        with self.compute._build_stage(self.context, self.instance, 'spawn'):
+            pass
+        self.assertFalse(mock_reporter.called)
+
     @mock.patch('nova.hooks._HOOKS')
     @mock.patch('nova.utils.spawn_n')
     def test_build_abort_exception(self, mock_spawn, mock_hooks):
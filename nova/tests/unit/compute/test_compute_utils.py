@@ -700,3 +700,172 @@ class ComputeUtilsTestCase(test.NoDBTestCase):
             addresses = compute_utils.get_machine_ips()
             self.assertEqual([], addresses)
         mock_ifaddresses.assert_called_once_with(iface)
+
+
+@mock.patch('eventlet.greenthread.spawn_after')
+@mock.patch.object(objects.InstanceActionEvent, 'record_events',
+                   return_value=[])
+class ActionEventBufferTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ActionEventBufferTestCase, self).setUp()
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.event_buffer = compute_utils.ActionEventBuffer(lambda: 5)
+
+    def _report(self, event_name, instance_uuid='fake-uuid'):
+        return compute_utils.BufferedEventReporter(
+            self.event_buffer, self.context, event_name, instance_uuid)
+
+    def test_nested_events_recorded_together(self, mock_record, mock_spawn):
+        with self._report('compute_build'):
+            with self._report('compute_spawn'):
+                pass
+            self.assertFalse(mock_record.called)
+            mock_spawn.assert_called_once_with(5, self.event_buffer.flush)
+
+        self.assertEqual(1, mock_record.call_count)
+        context, events = mock_record.call_args[0]
+        self.assertEqual(self.context, context)
+        self.assertEqual(['compute_spawn', 'compute_build'],
+                         [values['event'] for values in events])
+        for values in events:
+            self.assertEqual('Success', values['result'])
+            self.assertIn('start_time', values)
+            self.assertIn('finish_time', values)
+        self.assertTrue(mock_spawn.return_value.cancel.called)
+
+    def test_failed_event_recorded_immediately(self, mock_record,
+                                               mock_spawn):
+        def fail():
+            with self._report('compute_spawn'):
+                raise test.TestingException('failed')
+
+        with self._report('compute_build'):
+            self.assertRaises(test.TestingException, fail)
+            events = mock_record.call_args[0][1]
+            self.assertEqual(['compute_spawn'],
+                             [values['event'] for values in events])
+            self.assertEqual('Error', events[0]['result'])
+            self.assertEqual('failed', events[0]['message'])
+        self.assertEqual(2, mock_record.call_count)
+
+    def test_flush_interval(self, mock_record, mock_spawn):
+        with self._report('compute_build', 'uuid1'):
+            with self._report('compute_spawn', 'uuid1'):
+                pass
+            with self._report('compute_build', 'uuid2'):
+                with self._report('compute_spawn', 'uuid2'):
+                    pass
+                # The timer records the events of every instance
+                self.event_buffer.flush()
+                events = mock_record.call_args[0][1]
+                self.assertEqual([('uuid1', 'compute_spawn'),
+                                  ('uuid2', 'compute_spawn')],
+                                 [(values['instance_uuid'], values['event'])
+                                  for values in events])
+        self.assertEqual(3, mock_record.call_count)
+
+    @mock.patch.object(compute_utils.LOG, 'exception')
+    def test_flush_error(self, mock_exception, mock_record, mock_spawn):
+        mock_record.side_effect = test.TestingException
+        with self._report('compute_build'):
+            pass
+        self.assertTrue(mock_exception.called)
+        # The failed events are not kept around
+        self.event_buffer.flush()
+        self.assertEqual(1, mock_record.call_count)
+
+    def test_enabled(self, mock_record, mock_spawn):
+        self.assertTrue(self.event_buffer.enabled)
+        self.assertFalse(compute_utils.ActionEventBuffer(lambda: 0).enabled)
+
+
+@mock.patch('nova.utils.spawn_n')
+class LiveMigrationQueueTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(LiveMigrationQueueTestCase, self).setUp()
+        self.limits = [2, 1]
+        self.queue = compute_utils.LiveMigrationQueue(
+            lambda: tuple(self.limits))
+        self.migrated = []
+
+    def _migrate(self, instance_uuid):
+        self.migrated.append(instance_uuid)
+
+    def _submit(self, instance_uuid, dest, priority=None):
+        self.queue.submit(instance_uuid, dest,
+                          priority or self.queue.PRIORITY_REBALANCE,
+                          self._migrate, instance_uuid)
+
+    def _run_started(self, mock_spawn):
+        for call in mock_spawn.call_args_list:
+            call[0][0](*call[0][1:])
+        mock_spawn.reset_mock()
+
+    def _statuses(self):
+        return [(migration['instance_uuid'], migration['status'])
+                for migration in self.queue.get_status()]
+
+    def test_limits(self, mock_spawn):
+        self._submit('uuid1', 'host1')
+        self._submit('uuid2', 'host1')
+        self._submit('uuid3', 'host2')
+        self._submit('uuid4', 'host3')
+        self._run_started(mock_spawn)
+
+        # uuid2 waits for host1 without holding up uuid3
+        self.assertEqual(['uuid1', 'uuid3'], self.migrated)
+        self.assertEqual([('uuid1', 'running'), ('uuid3', 'running'),
+                          ('uuid2', 'queued'), ('uuid4', 'queued')],
+                         self._statuses())
+
+        self.queue.finish('uuid1')
+        self._run_started(mock_spawn)
+        self.assertEqual(['uuid1', 'uuid3', 'uuid2'], self.migrated)
+
+        self.queue.finish('uuid3')
+        self.queue.finish('uuid3')
+        self._run_started(mock_spawn)
+        self.assertEqual(['uuid1', 'uuid3', 'uuid2', 'uuid4'], self.migrated)
+
+    def test_priority(self, mock_spawn):
+        self.limits = [1, 0]
+        self._submit('uuid1', 'host1')
+        self._submit('uuid2', 'host1')
+        self._submit('uuid3', 'host2', self.queue.PRIORITY_EVACUATION)
+        self._submit('uuid4', 'host2', self.queue.PRIORITY_EVACUATION)
+
+        self.assertEqual([('uuid1', 'running'), ('uuid3', 'queued'),
+                          ('uuid4', 'queued'), ('uuid2', 'queued')],
+                         self._statuses())
+
+    def test_failed_migration_finished(self, mock_spawn):
+        self.limits = [1, 0]
+        self.queue.submit('uuid1', 'host1', self.queue.PRIORITY_REBALANCE,
+                          mock.Mock(side_effect=test.TestingException))
+        self._submit('uuid2', 'host1')
+
+        with mock.patch.object(compute_utils.LOG, 'exception') as mock_log:
+            self._run_started(mock_spawn)
+        self.assertTrue(mock_log.called)
+        self._run_started(mock_spawn)
+        self.assertEqual(['uuid2'], self.migrated)
+
+    def test_finish_after(self, mock_spawn):
+        self.limits = [1, 0]
+        self._submit('uuid1', 'host1')
+        self._submit('uuid2', 'host1')
+        post_method = self.queue.finish_after('uuid1', self._migrate)
+
+        self.queue.update_progress('uuid1', 40)
+        self.queue.update_progress('uuid2', 40)
+        self.assertEqual([40, 0], [migration['progress'] for migration
+                                   in self.queue.get_status()])
+
+        post_method('post-uuid1')
+        self.assertEqual(['post-uuid1'], self.migrated)
+        self.assertEqual([('uuid2', 'running')], self._statuses())
+
+    def test_enabled(self, mock_spawn):
+        self.assertTrue(self.queue.enabled)
+        self.limits = [0, 1]
+        self.assertFalse(self.queue.enabled)
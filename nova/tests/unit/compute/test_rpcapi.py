@@ -20,6 +20,7 @@ import contextlib
 
 import mock
 from oslo_config import cfg
+import oslo_messaging as messaging
 from oslo_serialization import jsonutils
 
 from nova.compute import rpcapi as compute_rpcapi
@@ -288,6 +289,19 @@ class ComputeRpcAPITestCase(test.NoDBTestCase):
                 filter_properties={'fakeprop': 'fakeval'},
                 node='node', clean_shutdown=True, version='4.0')
 
+    def test_compact_objects(self):
+        self.flags(rpc_compact_objects=True)
+        rpcapi = compute_rpcapi.ComputeAPI()
+        self.assertTrue(rpcapi.client.serializer._base.compact)
+
+        self.flags(compute='4.2', group='upgrade_levels')
+        rpcapi = compute_rpcapi.ComputeAPI()
+        self.assertFalse(rpcapi.client.serializer._base.compact)
+
+    def test_compact_objects_disabled(self):
+        rpcapi = compute_rpcapi.ComputeAPI()
+        self.assertFalse(rpcapi.client.serializer._base.compact)
+
     def test_reboot_instance(self):
         self.maxDiff = None
         self._test_compute_api('reboot_instance', 'cast',
@@ -327,6 +341,23 @@ class ComputeRpcAPITestCase(test.NoDBTestCase):
                 expected_args, host='fake_host',
                 instance=self.fake_instance_obj, version='4.0')
 
+    @mock.patch('eventlet.greenthread.spawn_after')
+    def test_refresh_instance_security_rules_coalesced(self, mock_spawn):
+        self.flags(compute_cast_coalesce_window=0.5)
+        rpcapi = compute_rpcapi.ComputeAPI()
+        with mock.patch.object(rpcapi.client, 'prepare') as mock_prepare:
+            cctxt = mock_prepare.return_value
+            cctxt.target = messaging.Target(topic='compute',
+                                            server='fake_host')
+            for i in range(3):
+                rpcapi.refresh_instance_security_rules(
+                    self.context, 'fake_host', self.fake_instance_obj)
+            self.assertFalse(cctxt.cast.called)
+            compute_rpcapi._COALESCER.flush()
+        cctxt.cast.assert_called_once_with(
+            self.context, 'refresh_instance_security_rules',
+            instance=self.fake_instance)
+
     def test_remove_aggregate_host(self):
         self._test_compute_api('remove_aggregate_host', 'cast',
                 aggregate={'id': 'fake_id'}, host_param='host', host='host',
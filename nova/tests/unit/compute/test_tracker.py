@@ -803,6 +803,90 @@ class TestUpdateAvailableResources(BaseTestCase):
         self.assertTrue(obj_base.obj_equal_prims(expected_resources,
                                                  self.rt.compute_node))
 
+    @mock.patch('nova.objects.Service.get_by_compute_host')
+    @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_incremental_audit(self, get_mock, migr_mock, get_cn_mock,
+                               service_mock):
+        self.flags(resource_full_audit_interval=3600,
+                   reserved_host_disk_mb=0,
+                   reserved_host_memory_mb=0)
+        self._setup_rt()
+
+        get_mock.return_value = _INSTANCE_FIXTURES
+        migr_mock.return_value = []
+        get_cn_mock.return_value = copy.deepcopy(_COMPUTE_NODE_FIXTURES[0])
+        service_mock.return_value = _SERVICE_FIXTURE
+
+        self._update_available_resources()
+        self.assertEqual(128, self.rt.compute_node.memory_mb_used)
+        self.driver_mock.get_available_resource.return_value[
+            'hypervisor_version'] = 1
+
+        update_mock = self._update_available_resources()
+
+        # The usage is not recounted, only the hypervisor values refreshed
+        self.assertEqual(1, get_mock.call_count)
+        self.assertEqual(1, migr_mock.call_count)
+        self.assertEqual(1, self.driver_mock.get_per_instance_usage.call_count)
+        update_mock.assert_called_once_with(mock.sentinel.ctx)
+        self.assertEqual(128, self.rt.compute_node.memory_mb_used)
+        self.assertEqual(1, self.rt.compute_node.hypervisor_version)
+
+    @mock.patch('nova.objects.Service.get_by_compute_host')
+    @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_incremental_audit_capacity_changed(self, get_mock, migr_mock,
+                                                get_cn_mock, service_mock):
+        self.flags(resource_full_audit_interval=3600)
+        self._setup_rt()
+
+        get_mock.return_value = []
+        migr_mock.return_value = []
+        get_cn_mock.return_value = copy.deepcopy(_COMPUTE_NODE_FIXTURES[0])
+        service_mock.return_value = _SERVICE_FIXTURE
+
+        self._update_available_resources()
+        self.driver_mock.get_available_resource.return_value[
+            'memory_mb'] = 1024
+        self._update_available_resources()
+
+        self.assertEqual(2, get_mock.call_count)
+        self.assertEqual(1024, self.rt.compute_node.memory_mb)
+
+    @mock.patch.object(resource_tracker.LOG, 'warning')
+    @mock.patch('nova.objects.Service.get_by_compute_host')
+    @mock.patch('nova.objects.ComputeNode.get_by_host_and_nodename')
+    @mock.patch('nova.objects.MigrationList.get_in_progress_by_host_and_node')
+    @mock.patch('nova.objects.InstanceList.get_by_host_and_node')
+    def test_full_audit_logs_drift(self, get_mock, migr_mock, get_cn_mock,
+                                   service_mock, warning_mock):
+        self.flags(resource_full_audit_interval=3600,
+                   reserved_host_disk_mb=0,
+                   reserved_host_memory_mb=0)
+        self._setup_rt()
+
+        get_mock.return_value = _INSTANCE_FIXTURES
+        migr_mock.return_value = []
+        get_cn_mock.return_value = copy.deepcopy(_COMPUTE_NODE_FIXTURES[0])
+        service_mock.return_value = _SERVICE_FIXTURE
+
+        self._update_available_resources()
+        self.assertFalse(warning_mock.called)
+
+        # An update the tracker missed, found by the next full audit
+        self.rt.compute_node.memory_mb_used += 256
+        self.rt._last_full_audit -= 3600
+        self._update_available_resources()
+
+        self.assertEqual(2, get_mock.call_count)
+        self.assertEqual(128, self.rt.compute_node.memory_mb_used)
+        self.assertEqual(1, warning_mock.call_count)
+        self.assertIn('memory_mb_used: 384 -> 128',
+                      warning_mock.call_args[0][1]['changes'])
+
 
 class TestInitComputeNode(BaseTestCase):
 
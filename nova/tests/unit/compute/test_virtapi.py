@@ -45,6 +45,10 @@ class VirtAPIBaseTest(test.NoDBTestCase, test.APICoverage):
     def test_provider_fw_rule_get_all(self):
         self.assertExpected('provider_fw_rule_get_all')
 
+    def test_update_live_migration_progress(self):
+        self.assertExpected('update_live_migration_progress',
+                            'instance', 50)
+
     def test_wait_for_instance_event(self):
         self.assertExpected('wait_for_instance_event',
                             'instance', ['event'])
@@ -64,6 +68,10 @@ class FakeVirtAPITest(VirtAPIBaseTest):
                 run = True
             self.assertTrue(run)
             return
+        if method == 'update_live_migration_progress':
+            self.assertIsNone(getattr(self.virtapi, method)(self.context,
+                                                            *args, **kwargs))
+            return
 
         self.mox.StubOutWithMock(db, method)
 
@@ -123,6 +131,14 @@ class ComputeVirtAPITest(VirtAPIBaseTest):
         result = getattr(self.virtapi, method)(self.context, *args, **kwargs)
         self.assertEqual(result, 'it worked')
 
+    def test_update_live_migration_progress(self):
+        self.compute._live_migrations = mock.MagicMock()
+        instance = objects.Instance(uuid='fake-uuid')
+        self.virtapi.update_live_migration_progress(self.context, instance,
+                                                    50)
+        self.compute._live_migrations.update_progress.assert_called_once_with(
+            'fake-uuid', 50)
+
     def test_wait_for_instance_event(self):
         and_i_ran = ''
         event_1_tag = objects.InstanceExternalEvent.make_key(
@@ -37,6 +37,7 @@ from nova.conductor import rpcapi as conductor_rpcapi
 from nova.conductor.tasks import live_migrate
 from nova import context
 from nova import db
+from nova.db import instrumentation
 from nova.db.sqlalchemy import models
 from nova import exception as exc
 from nova.image import api as image_api
@@ -174,6 +175,46 @@ class _BaseTestCase(object):
         self.assertEqual('INFO', msg.priority)
         self.assertEqual('fake-info', msg.payload)
 
+    def test_vol_usage_update_bulk(self):
+        self.mox.StubOutWithMock(db, 'vol_usage_update_bulk')
+        self.mox.StubOutWithMock(compute_utils, 'usage_volume_info')
+
+        vol_usages = [{'volume_id': 'fake-vol%d' % i,
+                       'rd_req': 22, 'rd_bytes': 33,
+                       'wr_req': 44, 'wr_bytes': 55,
+                       'instance_uuid': 'fake-uuid',
+                       'project_id': 'fake-project',
+                       'user_id': 'fake-user',
+                       'availability_zone': 'fake-az'} for i in range(2)]
+
+        db.vol_usage_update_bulk(self.context, vol_usages, False).AndReturn(
+            ['fake-usage1', 'fake-usage2'])
+        compute_utils.usage_volume_info('fake-usage1').AndReturn('fake-info1')
+        compute_utils.usage_volume_info('fake-usage2').AndReturn('fake-info2')
+
+        self.mox.ReplayAll()
+
+        self.conductor.vol_usage_update_bulk(self.context, vol_usages, False)
+
+        self.assertEqual(2, len(fake_notifier.NOTIFICATIONS))
+        for i, msg in enumerate(fake_notifier.NOTIFICATIONS):
+            self.assertEqual('volume.usage', msg.event_type)
+            self.assertEqual('fake-info%d' % (i + 1), msg.payload)
+
+    def test_get_db_api_stats(self):
+        self.flags(db_api_instrumentation=True)
+        with contextlib.nested(
+            mock.patch.object(instrumentation, 'get_stats',
+                              return_value={'enabled': True,
+                                            'functions': {},
+                                            'slow_queries': []}),
+            mock.patch.object(instrumentation, 'reset_stats')
+        ) as (get_stats, reset_stats):
+            result = self.conductor.get_db_api_stats(self.context, True)
+            self.assertEqual({'enabled': True, 'functions': {},
+                              'slow_queries': []}, result)
+            reset_stats.assert_called_once_with()
+
     def test_compute_node_create(self):
         self.mox.StubOutWithMock(db, 'compute_node_create')
         db.compute_node_create(self.context, 'fake-values').AndReturn(
@@ -470,6 +511,66 @@ class ConductorTestCase(_BaseTestCase, test.TestCase):
         self.assertIn('dict', updates)
         self.assertEqual({'foo': 'bar'}, updates['dict'])
 
+    def test_object_actions(self):
+        class TestObject(obj_base.NovaObject):
+            fields = {'foo': fields.IntegerField()}
+
+            def bump(self):
+                self.foo += 1
+
+            def fail(self):
+                raise exc.InstanceNotFound(instance_id='fake-uuid')
+
+            @classmethod
+            def bar(cls, context):
+                return 'bar'
+
+        obj_base.NovaObjectRegistry.register(TestObject)
+
+        obj = TestObject(foo=1)
+        obj.obj_reset_changes()
+        results = self.conductor.object_actions(self.context, [
+            {'objinst': obj, 'objmethod': 'bump', 'args': [], 'kwargs': {}},
+            {'objinst': obj, 'objmethod': 'fail', 'args': [], 'kwargs': {}},
+            {'objname': TestObject.obj_name(), 'objver': '1.0',
+             'objmethod': 'bar', 'args': [], 'kwargs': {}}])
+        self.assertEqual(3, len(results))
+        updates, result = results[0]['result']
+        self.assertEqual(2, updates['foo'])
+        self.assertEqual('InstanceNotFound', results[1]['exception']['class'])
+        self.assertEqual({'instance_id': 'fake-uuid', 'code': 404},
+                         results[1]['exception']['kwargs'])
+        self.assertEqual('bar', results[2]['result'])
+
+    def test_object_actions_serially(self):
+        class TestObject(obj_base.NovaObject):
+            fields = {'foo': fields.IntegerField()}
+
+            @obj_base.remotable
+            def bump(self):
+                self.foo += 1
+
+        obj_base.NovaObjectRegistry.register(TestObject)
+
+        def object_action(*args):
+            with mock.patch.object(obj_base.NovaObject, 'indirection_api',
+                                   None):
+                return self.conductor.object_action(*args)
+
+        api = mock.Mock(spec=['object_action'])
+        api.object_action.side_effect = object_action
+        obj = TestObject(context=self.context, foo=1)
+        obj.obj_reset_changes()
+        with mock.patch.object(obj_base.NovaObject, 'indirection_api', api):
+            with obj_base.RemotableBatch(self.context) as batch:
+                obj.bump()
+                self.assertEqual(1, obj.foo)
+        self.assertEqual(2, obj.foo)
+        self.assertIsNone(batch.calls[0].result())
+        sent = api.object_action.call_args[0][1]
+        self.assertIsInstance(sent, TestObject)
+        self.assertIsNot(obj, sent)
+
     def _test_expected_exceptions(self, db_method, conductor_method, errors,
                                   *args, **kwargs):
         # Tests that expected exceptions are handled properly.
@@ -785,6 +886,56 @@ class ConductorRPCAPITestCase(_BaseTestCase, test.TestCase):
         self.conductor_manager = self.conductor_service.manager
         self.conductor = conductor_rpcapi.ConductorAPI()
 
+    def test_vol_usage_update_bulk_old_conductor(self):
+        vol_usage = {'volume_id': 'fake-vol',
+                     'rd_req': 22, 'rd_bytes': 33,
+                     'wr_req': 44, 'wr_bytes': 55,
+                     'instance_uuid': 'fake-uuid',
+                     'project_id': 'fake-project',
+                     'user_id': 'fake-user',
+                     'availability_zone': 'fake-az'}
+        fake_inst = {'uuid': 'fake-uuid',
+                     'project_id': 'fake-project',
+                     'user_id': 'fake-user',
+                     'availability_zone': 'fake-az'}
+        with contextlib.nested(
+            mock.patch.object(self.conductor.client, 'can_send_version',
+                              return_value=False),
+            mock.patch.object(self.conductor, 'vol_usage_update')
+        ) as (can_send_version, vol_usage_update):
+            self.conductor.vol_usage_update_bulk(self.context, [vol_usage],
+                                                 True)
+            can_send_version.assert_called_once_with('2.2')
+            vol_usage_update.assert_called_once_with(
+                self.context, 'fake-vol', 22, 33, 44, 55, fake_inst,
+                update_totals=True)
+
+    def test_object_actions_old_conductor(self):
+        requests = [{'objinst': 'fake-inst', 'objmethod': 'save',
+                     'args': [], 'kwargs': {}},
+                    {'objname': 'Instance', 'objver': '1.0',
+                     'objmethod': 'get_by_uuid', 'args': ['fake-uuid'],
+                     'kwargs': {}}]
+        with contextlib.nested(
+            mock.patch.object(self.conductor.client, 'can_send_version',
+                              return_value=False),
+            mock.patch.object(self.conductor, 'object_action',
+                              return_value=({}, None)),
+            mock.patch.object(self.conductor, 'object_class_action',
+                              side_effect=exc.InstanceNotFound(
+                                  instance_id='fake-uuid'))
+        ) as (can_send_version, object_action, object_class_action):
+            results = self.conductor.object_actions(self.context, requests)
+            can_send_version.assert_called_once_with('2.5')
+            object_action.assert_called_once_with(
+                self.context, 'fake-inst', 'save', [], {})
+            object_class_action.assert_called_once_with(
+                self.context, 'Instance', 'get_by_uuid', '1.0',
+                ['fake-uuid'], {})
+            self.assertEqual({'result': ({}, None)}, results[0])
+            self.assertEqual('InstanceNotFound',
+                             results[1]['exception']['class'])
+
 
 class ConductorAPITestCase(_BaseTestCase, test.TestCase):
     """Conductor API Tests."""
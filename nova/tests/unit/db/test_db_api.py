@@ -1098,6 +1098,66 @@ class SqlAlchemyDbApiTestCase(DbTestCase):
         self.assertIn('info_cache', result[0])
         self.assertEqual(network_info, result[0]['info_cache']['network_info'])
 
+    def test_instance_get_active_by_window_joined_paged(self):
+        now = datetime.datetime(2013, 10, 10, 17, 16, 37, 156701)
+        ctxt = context.get_admin_context()
+        instances = [self.create_instance_with_args(launched_at=now)
+                     for i in range(3)]
+        db.instance_destroy(ctxt, instances[1]['uuid'])
+
+        result = sqlalchemy_api.instance_get_active_by_window_joined(
+            ctxt, begin=now, limit=2)
+        self.assertEqual([instances[0]['uuid'], instances[1]['uuid']],
+                         [inst['uuid'] for inst in result])
+        # NOTE: The deleted instance is a valid marker
+        result = sqlalchemy_api.instance_get_active_by_window_joined(
+            ctxt, begin=now, limit=2, marker=instances[1]['uuid'])
+        self.assertEqual([instances[2]['uuid']],
+                         [inst['uuid'] for inst in result])
+        self.assertRaises(exception.MarkerNotFound,
+                          sqlalchemy_api.instance_get_active_by_window_joined,
+                          ctxt, begin=now, marker=str(stdlib_uuid.uuid4()))
+
+    def test_instance_count_active_by_window(self):
+        now = datetime.datetime(2013, 10, 10, 17, 16, 37, 156701)
+        now1 = now + datetime.timedelta(minutes=1)
+        ctxt = context.get_admin_context()
+        self.create_instance_with_args(launched_at=now, host='host1')
+        self.create_instance_with_args(launched_at=now, terminated_at=now1,
+                                       host='host1')
+        self.create_instance_with_args(launched_at=now, host='host2')
+
+        self.assertEqual(3, sqlalchemy_api.instance_count_active_by_window(
+            ctxt, begin=now))
+        self.assertEqual(1, sqlalchemy_api.instance_count_active_by_window(
+            ctxt, begin=now1, host='host1'))
+
+    def test_instance_get_host_inventory(self):
+        ctxt = context.get_admin_context()
+        running = self.create_instance_with_args()
+        evacuated = self.create_instance_with_args(host='host2')
+        deleted = self.create_instance_with_args()
+        cleaned = self.create_instance_with_args()
+        self.create_instance_with_args()
+        self.create_instance_with_args(host='host2')
+        db.instance_update(ctxt, cleaned['uuid'], {'cleaned': 1})
+        db.instance_destroy(ctxt, deleted['uuid'])
+        db.instance_destroy(ctxt, cleaned['uuid'])
+
+        result = sqlalchemy_api.instance_get_host_inventory(
+            ctxt, 'host1', [running['uuid'], evacuated['uuid']])
+        result = {inst['uuid']: inst for inst in result}
+        self.assertEqual(set([running['uuid'], evacuated['uuid'],
+                              deleted['uuid']]), set(result))
+        self.assertEqual('host2', result[evacuated['uuid']]['host'])
+        self.assertEqual(0, result[running['uuid']]['deleted'])
+        self.assertEqual(result[deleted['uuid']]['id'],
+                         result[deleted['uuid']]['deleted'])
+        self.assertIsNotNone(result[deleted['uuid']]['deleted_at'])
+
+        result = sqlalchemy_api.instance_get_host_inventory(ctxt, 'host1', [])
+        self.assertEqual([deleted['uuid']], [inst['uuid'] for inst in result])
+
     @mock.patch('nova.db.sqlalchemy.api.instance_get_all_by_filters_sort')
     def test_instance_get_all_by_filters_calls_sort(self,
                                                     mock_get_all_filters_sort):
@@ -2058,6 +2118,18 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
         mock_joinedload.assert_called_once_with('info_cache')
         mock_undefer.assert_called_once_with('extra.pci_requests')
 
+    def test_instance_get_all_by_filters_deleted_marker(self):
+        test1 = self.create_instance_with_args(display_name='test1')
+        test2 = self.create_instance_with_args(display_name='test2')
+        db.instance_destroy(self.ctxt, test1['uuid'])
+
+        result = db.instance_get_all_by_filters(self.ctxt,
+                                                {'deleted': False},
+                                                sort_key='id',
+                                                sort_dir='asc',
+                                                marker=test1['uuid'])
+        self.assertEqual([test2['uuid']], [inst['uuid'] for inst in result])
+
     def test_instance_get_all_by_filters_with_meta(self):
         self.create_instance_with_args()
         for inst in db.instance_get_all_by_filters(self.ctxt, {}):
@@ -2461,6 +2533,68 @@ class InstanceTestCase(test.TestCase, ModelsObjectComparatorMixin):
                     db.instance_update, self.ctxt, instance['uuid'],
                     {'host': 'h1', 'expected_vm_state': ('spam', 'bar')})
 
+    def test_instance_update_bulk(self):
+        inst1 = self.create_instance_with_args(vm_state='building',
+                                               display_name='one')
+        inst2 = self.create_instance_with_args(vm_state='building',
+                                               display_name='two')
+        inst3 = self.create_instance_with_args(vm_state='active',
+                                               display_name='three')
+        updates = {inst1['uuid']: {'vm_state': 'error', 'power_state': 1},
+                   inst2['uuid']: {'vm_state': 'error', 'power_state': 1},
+                   inst3['uuid']: {'power_state': 4}}
+        originals, failed = db.instance_update_bulk(self.ctxt, updates)
+        self.assertEqual([], failed)
+        self.assertEqual({'vm_state': 'building', 'task_state': None,
+                          'display_name': 'one'}, originals[inst1['uuid']])
+        self.assertEqual(set([inst1['uuid'], inst2['uuid'], inst3['uuid']]),
+                         set(originals))
+        for inst in (inst1, inst2):
+            db_inst = db.instance_get_by_uuid(self.ctxt, inst['uuid'])
+            self.assertEqual('error', db_inst['vm_state'])
+            self.assertEqual(1, db_inst['power_state'])
+        db_inst = db.instance_get_by_uuid(self.ctxt, inst3['uuid'])
+        self.assertEqual('active', db_inst['vm_state'])
+        self.assertEqual(4, db_inst['power_state'])
+        # Make sure the caller's values were left alone
+        self.assertEqual({'power_state': 4}, updates[inst3['uuid']])
+
+    def test_instance_update_bulk_expected_states(self):
+        inst1 = self.create_instance_with_args(vm_state='building')
+        inst2 = self.create_instance_with_args(vm_state='active')
+        inst3 = self.create_instance_with_args(task_state='deleting')
+        guard = {'expected_vm_state': ['building'],
+                 'expected_task_state': [None]}
+        updates = {inst1['uuid']: dict(guard, vm_state='error'),
+                   inst2['uuid']: dict(guard, vm_state='error'),
+                   inst3['uuid']: dict(guard, vm_state='error')}
+        originals, failed = db.instance_update_bulk(self.ctxt, updates)
+        self.assertEqual([inst1['uuid']], list(originals))
+        self.assertEqual(sorted([inst2['uuid'], inst3['uuid']]), failed)
+        self.assertEqual('error', db.instance_get_by_uuid(
+            self.ctxt, inst1['uuid'])['vm_state'])
+        self.assertEqual('active', db.instance_get_by_uuid(
+            self.ctxt, inst2['uuid'])['vm_state'])
+
+    def test_instance_update_bulk_missing_instance(self):
+        inst = self.create_instance_with_args()
+        db.instance_destroy(self.ctxt, inst['uuid'])
+        missing = str(stdlib_uuid.uuid4())
+        originals, failed = db.instance_update_bulk(
+            self.ctxt, {inst['uuid']: {'vm_state': 'error'},
+                        missing: {'vm_state': 'error'}})
+        self.assertEqual({}, originals)
+        self.assertEqual(sorted([inst['uuid'], missing]), failed)
+
+    def test_instance_update_bulk_metadata_not_allowed(self):
+        inst = self.create_instance_with_args()
+        self.assertRaises(ValueError, db.instance_update_bulk, self.ctxt,
+                          {inst['uuid']: {'metadata': {'foo': 'bar'}}})
+
+    def test_instance_update_bulk_invalid_uuid(self):
+        self.assertRaises(exception.InvalidUUID, db.instance_update_bulk,
+                          self.ctxt, {'foo': {'vm_state': 'error'}})
+
     def test_instance_update_with_instance_uuid(self):
         # test instance_update() works when an instance UUID is passed.
         ctxt = context.get_admin_context()
@@ -3265,6 +3399,39 @@ class InstanceActionTestCase(test.TestCase, ModelsObjectComparatorMixin):
                                              self.ctxt.request_id)
         self.assertEqual('Error', action['message'])
 
+    def test_instance_action_events_record(self):
+        """Record several finished instance action events at once."""
+        uuid1 = str(stdlib_uuid.uuid4())
+        uuid2 = str(stdlib_uuid.uuid4())
+        action1 = db.action_start(self.ctxt,
+                                  self._create_action_values(uuid1))
+        action2 = db.action_start(self.ctxt,
+                                  self._create_action_values(uuid2))
+        finish_time = timeutils.utcnow() + datetime.timedelta(seconds=5)
+        events = [
+            self._create_event_values(uuid1, event='spawn', extra={
+                'start_time': timeutils.strtime(),
+                'finish_time': timeutils.strtime(at=finish_time),
+                'result': 'Success'}),
+            self._create_event_values(uuid2, event='spawn', extra={
+                'finish_time': finish_time, 'result': 'Error'}),
+            self._create_event_values('fake-uuid', extra={
+                'finish_time': finish_time, 'result': 'Success'})]
+
+        not_found = db.action_events_record(self.ctxt, events)
+
+        self.assertEqual(events[2:], not_found)
+        for action, result in ((action1, 'Success'), (action2, 'Error')):
+            saved = db.action_events_get(self.ctxt, action['id'])
+            self.assertEqual(1, len(saved))
+            self.assertEqual('spawn', saved[0]['event'])
+            self.assertEqual(result, saved[0]['result'])
+            self.assertEqual(finish_time.replace(microsecond=0),
+                             saved[0]['finish_time'].replace(microsecond=0))
+        action2 = db.action_get_by_request_id(self.ctxt, uuid2,
+                                              self.ctxt.request_id)
+        self.assertEqual('Error', action2['message'])
+
     def test_instance_action_and_event_start_string_time(self):
         """Create an instance action and event with a string start_time."""
         uuid = str(stdlib_uuid.uuid4())
@@ -5350,6 +5517,63 @@ class VolumeUsageDBApiTestCase(test.TestCase):
         for key, value in expected_vol_usage.items():
             self.assertEqual(vol_usage[key], value, key)
 
+    def test_vol_usage_update_bulk(self):
+        ctxt = context.get_admin_context()
+        now = timeutils.utcnow()
+        start_time = now - datetime.timedelta(seconds=10)
+
+        db.vol_usage_update(ctxt, u'1',
+                            rd_req=10000, rd_bytes=20000,
+                            wr_req=30000, wr_bytes=40000,
+                            instance_id='fake-instance-uuid1',
+                            project_id='fake-project-uuid1',
+                            availability_zone='fake-az',
+                            user_id='fake-user-uuid1')
+
+        def _usage(volume_id, rd_req, instance_uuid):
+            return {'volume_id': volume_id,
+                    'rd_req': rd_req, 'rd_bytes': rd_req * 2,
+                    'wr_req': rd_req * 3, 'wr_bytes': rd_req * 4,
+                    'instance_uuid': instance_uuid,
+                    'project_id': 'fake-project-uuid1',
+                    'user_id': 'fake-user-uuid1',
+                    'availability_zone': 'fake-az'}
+
+        # Volume 1 was reset, volume 2 is new
+        result = db.vol_usage_update_bulk(ctxt, [
+            _usage(u'1', 100, 'fake-instance-uuid1'),
+            _usage(u'2', 200, 'fake-instance-uuid2')])
+        self.assertEqual([u'1', u'2'], [usage.volume_id for usage in result])
+
+        vol_usages = {usage.volume_id: usage for usage in
+                      db.vol_get_usage_by_time(ctxt, start_time)}
+        self.assertEqual(2, len(vol_usages))
+        expected_vol_usages = {
+            u'1': {'instance_uuid': 'fake-instance-uuid1',
+                   'curr_reads': 100,
+                   'curr_read_bytes': 200,
+                   'curr_writes': 300,
+                   'curr_write_bytes': 400,
+                   'tot_reads': 10000,
+                   'tot_read_bytes': 20000,
+                   'tot_writes': 30000,
+                   'tot_write_bytes': 40000},
+            u'2': {'instance_uuid': 'fake-instance-uuid2',
+                   'curr_reads': 200,
+                   'curr_read_bytes': 400,
+                   'curr_writes': 600,
+                   'curr_write_bytes': 800,
+                   'tot_reads': 0,
+                   'tot_read_bytes': 0,
+                   'tot_writes': 0,
+                   'tot_write_bytes': 0}}
+        for volume_id, expected in expected_vol_usages.items():
+            for key, value in expected.items():
+                self.assertEqual(value, vol_usages[volume_id][key], key)
+
+    def test_vol_usage_update_bulk_empty(self):
+        self.assertEqual([], db.vol_usage_update_bulk(self.context, []))
+
 
 class TaskLogTestCase(test.TestCase):
 
@@ -7530,6 +7754,58 @@ class BwUsageTestCase(test.TestCase, ModelsObjectComparatorMixin):
         self._assertEqualObjects(expected_bw_usage, bw_usage,
                                  ignored_keys=self._ignored_keys)
 
+    def test_bw_usage_update_bulk(self):
+        now = timeutils.utcnow()
+        start_period = now - datetime.timedelta(seconds=10)
+        start_period_str = timeutils.strtime(start_period)
+
+        db.bw_usage_update(self.ctxt, 'fake_uuid1',
+                'fake_mac1', start_period_str,
+                100, 200, 42, 42)
+
+        bw_usages = [{'uuid': 'fake_uuid1', 'mac': 'fake_mac1',
+                      'bw_in': 200, 'bw_out': 300,
+                      'last_ctr_in': 12345, 'last_ctr_out': 67890},
+                     {'uuid': 'fake_uuid1', 'mac': 'fake_mac2',
+                      'bw_in': 300, 'bw_out': 400,
+                      'last_ctr_in': 22345, 'last_ctr_out': 77890},
+                     {'uuid': 'fake_uuid2', 'mac': 'fake_mac3',
+                      'bw_in': 400, 'bw_out': 500,
+                      'last_ctr_in': 32345, 'last_ctr_out': 87890}]
+        db.bw_usage_update_bulk(self.ctxt, bw_usages, start_period_str,
+                                update_cells=False)
+
+        result = db.bw_usage_get_by_uuids(self.ctxt,
+                ['fake_uuid1', 'fake_uuid2'], start_period_str)
+        self.assertEqual(3, len(result))
+        expected_bw_usages = {}
+        for usage in bw_usages:
+            expected = dict(usage, start_period=start_period,
+                            last_refreshed=now)
+            expected_bw_usages[(usage['uuid'], usage['mac'])] = expected
+        for usage in result:
+            self._assertEqualObjects(
+                expected_bw_usages[(usage['uuid'], usage['mac'])], usage,
+                ignored_keys=self._ignored_keys)
+
+    def test_bw_usage_update_bulk_duplicate_entry(self):
+        now = timeutils.utcnow()
+        start_period = now - datetime.timedelta(seconds=10)
+        start_period_str = timeutils.strtime(start_period)
+        bw_usages = [{'uuid': 'fake_uuid1', 'mac': 'fake_mac1',
+                      'bw_in': 100, 'bw_out': 200,
+                      'last_ctr_in': 12345, 'last_ctr_out': 67890}]
+
+        with mock.patch.object(sqlalchemy_api, 'bw_usage_update') as update:
+            with mock.patch.object(sqlalchemy_api, 'model_query',
+                                   side_effect=db_exc.DBDuplicateEntry):
+                db.bw_usage_update_bulk(self.ctxt, bw_usages,
+                                        start_period_str, update_cells=False)
+            update.assert_called_once_with(self.ctxt, 'fake_uuid1',
+                                           'fake_mac1', start_period_str,
+                                           100, 200, 12345, 67890,
+                                           last_refreshed=mock.ANY)
+
 
 class Ec2TestCase(test.TestCase):
 
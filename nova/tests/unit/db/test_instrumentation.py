@@ -0,0 +1,144 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import sqlalchemy
+
+from nova import context
+from nova.db import instrumentation
+from nova import test
+
+
+class FakeBackend(object):
+    def __init__(self):
+        self.engine = sqlalchemy.create_engine('sqlite://')
+
+        def instance_get_all(context):
+            return [1, 2, 3]
+
+        def instance_destroy(context):
+            raise test.TestingException()
+
+        def instance_query(context):
+            return self.engine.execute('SELECT 1').fetchall()
+
+        def _private(context):
+            return []
+
+        self.instance_get_all = instance_get_all
+        self.instance_destroy = instance_destroy
+        self.instance_query = instance_query
+        self._private = _private
+
+
+class InstrumentationTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(InstrumentationTestCase, self).setUp()
+        self.flags(db_api_instrumentation=True)
+        self.addCleanup(instrumentation.reset_stats)
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.fake_backend = FakeBackend()
+        self.backend = instrumentation.instrument_backend(self.fake_backend)
+
+    def test_instrument_backend_disabled(self):
+        self.flags(db_api_instrumentation=False)
+        backend = instrumentation.instrument_backend(self.fake_backend)
+        self.assertIs(self.fake_backend, backend)
+
+    def test_call_stats(self):
+        self.assertEqual([1, 2, 3],
+                         self.backend.instance_get_all(self.context))
+        self.backend.instance_get_all(self.context)
+
+        stats = instrumentation.get_stats()['functions']['instance_get_all']
+        self.assertEqual(2, stats['calls'])
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(6, stats['rows'])
+        self.assertEqual(2, sum(stats['histogram'].values()))
+
+    def test_call_stats_error(self):
+        self.assertRaises(test.TestingException,
+                          self.backend.instance_destroy, self.context)
+
+        stats = instrumentation.get_stats()['functions']['instance_destroy']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(1, stats['errors'])
+
+    def test_private_functions_not_instrumented(self):
+        self.backend._private(self.context)
+        self.assertEqual({}, instrumentation.get_stats()['functions'])
+
+    def test_histogram(self):
+        stats = instrumentation.CallStats()
+        stats.add(0.0005)
+        stats.add(0.2)
+        stats.add(10)
+
+        result = stats.to_dict()
+        self.assertEqual(1, result['histogram']['<=0.001'])
+        self.assertEqual(1, result['histogram']['<=0.5'])
+        self.assertEqual(1, result['histogram']['>5.0'])
+        self.assertEqual(10, result['max_time'])
+
+    def test_reset_stats(self):
+        self.backend.instance_get_all(self.context)
+        instrumentation.reset_stats()
+        self.assertEqual({}, instrumentation.get_stats()['functions'])
+
+    def test_statements_counted(self):
+        instrumentation.instrument_engine(self.fake_backend.engine)
+        # Listening twice must not count statements twice
+        instrumentation.instrument_engine(self.fake_backend.engine)
+        self.backend.instance_query(self.context)
+
+        stats = instrumentation.get_stats()['functions']['instance_query']
+        self.assertEqual(1, stats['statements'])
+        self.assertEqual(1, stats['rows'])
+
+    @mock.patch.object(instrumentation.LOG, 'warning')
+    def test_slow_query_log(self, mock_warning):
+        self.flags(db_slow_query_threshold=0.000001)
+        instrumentation.instrument_engine(self.fake_backend.engine)
+        with instrumentation.operation('InstanceList.get_by_host'):
+            self.backend.instance_query(self.context)
+
+        slow_queries = instrumentation.get_stats()['slow_queries']
+        self.assertEqual(1, len(slow_queries))
+        self.assertEqual('instance_query', slow_queries[0]['function'])
+        self.assertEqual('InstanceList.get_by_host',
+                         slow_queries[0]['operation'])
+        self.assertEqual(self.context.request_id,
+                         slow_queries[0]['request_id'])
+        self.assertEqual('SELECT 1', slow_queries[0]['statement'])
+        self.assertTrue(mock_warning.called)
+
+    def test_slow_query_log_disabled(self):
+        self.flags(db_slow_query_threshold=0)
+        instrumentation.instrument_engine(self.fake_backend.engine)
+        self.backend.instance_query(self.context)
+        self.assertEqual([], instrumentation.get_stats()['slow_queries'])
+
+    def test_param_shape(self):
+        self.assertEqual({'uuid': 'str', 'deleted': 'int'},
+                         instrumentation._param_shape({'uuid': 'secret',
+                                                       'deleted': 0}))
+        self.assertEqual(['str', 'int'],
+                         instrumentation._param_shape(('secret', 0)))
+        self.assertEqual("2 x ['str']",
+                         instrumentation._param_shape([('a',), ('b',)]))
+
+    def test_operation(self):
+        with instrumentation.operation('outer'):
+            with instrumentation.operation('inner'):
+                self.assertEqual('inner', instrumentation._LOCAL.operation)
+            self.assertEqual('outer', instrumentation._LOCAL.operation)
+        self.assertIsNone(instrumentation._LOCAL.operation)
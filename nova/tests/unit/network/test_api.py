@@ -535,6 +535,29 @@ class ApiTestCase(test.TestCase):
             self.context, instance,
             {'source_compute': None, 'dest_compute': 'fake_compute_source'})
 
+    @mock.patch('nova.network.base_api.update_instance_cache_with_nw_info')
+    @mock.patch('nova.network.api.API._get_instance_nw_info')
+    def test_heal_instance_info_caches(self, mock_get_nw_info, mock_update):
+        vif = network_model.VIF(id='fake-vif')
+        unchanged = objects.Instance(uuid='fake-uuid-1')
+        unchanged.info_cache = objects.InstanceInfoCache(
+            network_info=network_model.NetworkInfo([vif]))
+        changed = objects.Instance(uuid='fake-uuid-2')
+        changed.info_cache = objects.InstanceInfoCache(
+            network_info=network_model.NetworkInfo())
+        gone = objects.Instance(uuid='fake-uuid-3')
+        mock_get_nw_info.side_effect = [
+            network_model.NetworkInfo([vif]),
+            network_model.NetworkInfo([vif]),
+            exception.InstanceNotFound(instance_id=gone.uuid)]
+
+        self.assertEqual(['fake-uuid-2'],
+                         self.network_api.heal_instance_info_caches(
+                             self.context, [unchanged, changed, gone]))
+        mock_update.assert_called_once_with(
+            self.network_api, self.context, changed,
+            nw_info=network_model.NetworkInfo([vif]), update_cells=False)
+
 
 @mock.patch('nova.network.api.API')
 @mock.patch('nova.db.instance_info_cache_update', return_value=fake_info_cache)
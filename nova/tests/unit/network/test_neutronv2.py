@@ -2820,6 +2820,164 @@ class TestNeutronv2WithMock(test.TestCase):
                           api.get_instance_nw_info, 'context', instance)
         mock_lock.assert_called_once_with('refresh_cache-%s' % instance.uuid)
 
+    def _make_heal_instance(self, inst_uuid, nw_info):
+        instance = objects.Instance(uuid=inst_uuid, project_id='fake-project')
+        instance.info_cache = objects.InstanceInfoCache(
+            instance_uuid=inst_uuid, network_info=nw_info)
+        return instance
+
+    def _make_neutron_data(self):
+        port = {'id': 'port-1', 'network_id': 'net-1',
+                'device_id': 'inst-1', 'tenant_id': 'fake-project',
+                'admin_state_up': True, 'status': 'ACTIVE',
+                'mac_address': 'de:ad:be:ef:00:01',
+                'fixed_ips': [{'ip_address': '10.0.0.2',
+                               'subnet_id': 'subnet-1'}],
+                'binding:vif_type': model.VIF_TYPE_OVS,
+                'binding:vnic_type': model.VNIC_TYPE_NORMAL,
+                'binding:vif_details': {}}
+        other_port = dict(port, id='port-2', device_id='inst-2',
+                          mac_address='de:ad:be:ef:00:02',
+                          fixed_ips=[{'ip_address': '10.0.0.3',
+                                      'subnet_id': 'subnet-1'}])
+        return {'ports': [port, other_port],
+                'networks': [{'id': 'net-1', 'name': 'private',
+                              'tenant_id': 'fake-project'}],
+                'subnets': [{'id': 'subnet-1', 'network_id': 'net-1',
+                             'cidr': '10.0.0.0/24',
+                             'gateway_ip': '10.0.0.1',
+                             'dns_nameservers': ['8.8.8.8']}],
+                'dhcp_ports': [{'id': 'dhcp-port', 'network_id': 'net-1',
+                                'fixed_ips': [{'ip_address': '10.0.0.4',
+                                               'subnet_id': 'subnet-1'}]}],
+                'floatingips': [{'id': 'fip-1', 'port_id': 'port-1',
+                                 'fixed_ip_address': '10.0.0.2',
+                                 'floating_ip_address': '172.24.4.3'},
+                                {'id': 'fip-2', 'port_id': 'port-2',
+                                 'fixed_ip_address': '10.0.0.3',
+                                 'floating_ip_address': '172.24.4.4'}]}
+
+    def test_get_neutron_data_for_instances(self):
+        instance = self._make_heal_instance(
+            'inst-1', model.NetworkInfo([model.VIF(
+                id='port-1', network=model.Network(id='net-1'))]))
+        neutron_data = self._make_neutron_data()
+        mock_client = mock.Mock()
+        mock_client.list_ports.side_effect = [
+            {'ports': neutron_data['ports']},
+            {'ports': neutron_data['dhcp_ports']}]
+        mock_client.list_networks.return_value = {
+            'networks': neutron_data['networks']}
+        mock_client.list_subnets.return_value = {
+            'subnets': neutron_data['subnets']}
+        mock_client.list_floatingips.return_value = {
+            'floatingips': neutron_data['floatingips']}
+
+        self.assertEqual(neutron_data,
+                         self.api._get_neutron_data_for_instances(
+                             mock_client, [instance]))
+        self.assertEqual([mock.call(device_id=['inst-1']),
+                          mock.call(network_id=['net-1'],
+                                    device_owner='network:dhcp')],
+                         mock_client.list_ports.call_args_list)
+        mock_client.list_networks.assert_called_once_with(id=['net-1'])
+        mock_client.list_subnets.assert_called_once_with(id=['subnet-1'])
+        mock_client.list_floatingips.assert_called_once_with(
+            port_id=['port-1', 'port-2'])
+
+    def test_get_neutron_data_for_instances_no_l3(self):
+        instance = self._make_heal_instance('inst-1', model.NetworkInfo())
+        port = dict(self._make_neutron_data()['ports'][0], fixed_ips=[])
+        mock_client = mock.Mock()
+        mock_client.list_ports.return_value = {'ports': [port]}
+
+        neutron_data = self.api._get_neutron_data_for_instances(
+            mock_client, [instance])
+        self.assertEqual([port], neutron_data['ports'])
+        self.assertEqual([], neutron_data['networks'])
+        self.assertEqual([], neutron_data['floatingips'])
+        self.assertFalse(mock_client.list_subnets.called)
+        self.assertFalse(mock_client.list_floatingips.called)
+
+    def test_build_network_info_model_with_neutron_data(self):
+        instance = self._make_heal_instance(
+            'inst-1', model.NetworkInfo([model.VIF(
+                id='port-1', network=model.Network(id='net-1'))]))
+        mock_client = mock.Mock()
+
+        nw_info = self.api._build_network_info_model(
+            self.context, instance, admin_client=mock_client,
+            neutron_data=self._make_neutron_data())
+
+        # Everything comes from the prefetched resources
+        self.assertEqual([], mock_client.method_calls)
+        self.assertEqual(1, len(nw_info))
+        vif = nw_info[0]
+        self.assertEqual('port-1', vif['id'])
+        self.assertEqual('net-1', vif['network']['id'])
+        subnet = vif['network']['subnets'][0]
+        self.assertEqual('10.0.0.0/24', subnet['cidr'])
+        self.assertEqual('10.0.0.4', subnet.get_meta('dhcp_server'))
+        self.assertEqual(['8.8.8.8'],
+                         [dns['address'] for dns in subnet['dns']])
+        self.assertEqual(['10.0.0.2'],
+                         [ip['address'] for ip in subnet['ips']])
+        self.assertEqual(['172.24.4.3'],
+                         [ip['address']
+                          for ip in subnet['ips'][0]['floating_ips']])
+
+    @mock.patch('nova.network.base_api.update_instance_cache_with_nw_info')
+    @mock.patch.object(objects.InstanceInfoCache, 'get_by_instance_uuid')
+    @mock.patch.object(neutronapi.API, '_build_network_info_model')
+    @mock.patch.object(neutronapi.API, '_get_neutron_data_for_instances')
+    @mock.patch.object(neutronapi, 'get_client')
+    def test_heal_instance_info_caches(self, mock_get_client,
+                                       mock_get_data, mock_build,
+                                       mock_get_cache, mock_update):
+        unchanged_vif = model.VIF(id='port-1',
+                                  network=model.Network(id='net-1'))
+        changed_vif = model.VIF(id='port-2',
+                                network=model.Network(id='net-1'))
+        unchanged = self._make_heal_instance(
+            'inst-1', model.NetworkInfo([unchanged_vif]))
+        changed = self._make_heal_instance('inst-2', model.NetworkInfo())
+        concurrent = self._make_heal_instance('inst-3', model.NetworkInfo())
+        gone = self._make_heal_instance('inst-4', model.NetworkInfo())
+
+        def fake_get_cache(context, inst_uuid):
+            if inst_uuid == 'inst-3':
+                # Refreshed by someone else since the batch started
+                return objects.InstanceInfoCache(
+                    network_info=model.NetworkInfo([changed_vif]))
+            if inst_uuid == 'inst-4':
+                raise exception.InstanceInfoCacheNotFound(
+                    instance_uuid=inst_uuid)
+            return objects.InstanceInfoCache(network_info=None)
+
+        def fake_build(context, instance, **kwargs):
+            if instance.uuid == 'inst-1':
+                return [unchanged_vif]
+            return [changed_vif]
+
+        mock_get_cache.side_effect = fake_get_cache
+        mock_build.side_effect = fake_build
+        instances = [unchanged, changed, concurrent, gone]
+
+        updated = self.api.heal_instance_info_caches(self.context, instances)
+
+        self.assertEqual(['inst-2'], updated)
+        mock_get_client.assert_called_once_with(self.context, admin=True)
+        mock_get_data.assert_called_once_with(mock_get_client.return_value,
+                                              instances)
+        self.assertEqual(2, mock_build.call_count)
+        mock_build.assert_called_with(
+            self.context, changed,
+            admin_client=mock_get_client.return_value,
+            neutron_data=mock_get_data.return_value)
+        mock_update.assert_called_once_with(
+            self.api, self.context, changed,
+            nw_info=model.NetworkInfo([changed_vif]), update_cells=False)
+
     def _test_validate_networks_fixed_ip_no_dup(self, nets, requested_networks,
                                                 ids, list_port_values):
 
@@ -116,6 +116,22 @@ class _TestBandwidthUsage(test.TestCase):
                         start_period=self.expected_bw_usage['start_period'])
         self._compare(self, self.expected_bw_usage, bw_usage)
 
+    @mock.patch.object(db, 'bw_usage_update_bulk')
+    def test_update_bulk(self, mock_update_bulk):
+        bw_usages = [{'uuid': 'fake_uuid%d' % i, 'mac': 'fake_mac%d' % i,
+                      'bw_in': 100, 'bw_out': 200,
+                      'last_ctr_in': 12345, 'last_ctr_out': 67890}
+                     for i in range(2)]
+
+        bandwidth_usage.BandwidthUsageList.update_bulk(
+            self.context, bw_usages,
+            start_period=self.expected_bw_usage['start_period'],
+            update_cells=False)
+
+        mock_update_bulk.assert_called_once_with(
+            mock.ANY, bw_usages, mock.ANY, last_refreshed=None,
+            update_cells=False)
+
 
 class TestBandwidthUsageObject(test_objects._LocalTest,
                                _TestBandwidthUsage):
@@ -66,6 +66,79 @@ class _TestFlavor(object):
                                                         'm1.foo')
             self._compare(self, fake_flavor, flavor)
 
+    def _enable_cache(self):
+        self.flags(flavor_cache_ttl=60)
+        flavor_obj.reset_cache()
+        self.addCleanup(flavor_obj.reset_cache)
+
+    def test_get_by_id_cached(self):
+        self._enable_cache()
+        with mock.patch.object(db, 'flavor_get') as get:
+            get.return_value = fake_flavor
+            flavor_obj.Flavor.get_by_id(self.context, 1)
+            flavor = flavor_obj.Flavor.get_by_id(self.context, 1)
+            flavor.extra_specs['foo'] = 'baz'
+            flavor = flavor_obj.Flavor.get_by_id(self.context, 1)
+            get.assert_called_once_with(self.context, 1)
+            self._compare(self, fake_flavor, flavor)
+
+    def test_get_by_flavor_id_cached(self):
+        self._enable_cache()
+        with mock.patch.object(db, 'flavor_get_by_flavor_id') as get_by_id:
+            get_by_id.return_value = fake_flavor
+            flavor_obj.Flavor.get_by_flavor_id(self.context, 'm1.foo')
+            flavor = flavor_obj.Flavor.get_by_flavor_id(self.context,
+                                                        'm1.foo')
+            get_by_id.assert_called_once_with(self.context, 'm1.foo', None)
+            self._compare(self, fake_flavor, flavor)
+
+            flavor_obj.Flavor.get_by_flavor_id(self.context, 'm1.foo',
+                                               read_deleted='yes')
+            self.assertEqual(2, get_by_id.call_count)
+
+    def test_get_by_flavor_id_cached_private(self):
+        self._enable_cache()
+        private_flavor = dict(fake_flavor, is_public=False)
+        with mock.patch.object(db, 'flavor_get_by_flavor_id') as get_by_id:
+            get_by_id.return_value = private_flavor
+            flavor_obj.Flavor.get_by_flavor_id(self.context.elevated(),
+                                               'm1.foo')
+            flavor_obj.Flavor.get_by_flavor_id(self.context.elevated(),
+                                               'm1.foo')
+            self.assertEqual(1, get_by_id.call_count)
+            # Non-admins always have their access checked by the DB API
+            flavor_obj.Flavor.get_by_flavor_id(self.context, 'm1.foo')
+            self.assertEqual(2, get_by_id.call_count)
+
+    def test_get_by_id_cache_disabled(self):
+        with mock.patch.object(db, 'flavor_get') as get:
+            get.return_value = fake_flavor
+            flavor_obj.Flavor.get_by_id(self.context, 1)
+            flavor_obj.Flavor.get_by_id(self.context, 1)
+            self.assertEqual(2, get.call_count)
+
+    @mock.patch('nova.db.flavor_extra_specs_update_or_create')
+    def test_save_extra_specs_resets_cache(self, mock_update):
+        self._enable_cache()
+        ctxt = self.context.elevated()
+        with mock.patch.object(db, 'flavor_get') as get:
+            get.return_value = dict(fake_flavor, extra_specs={'foo': 'bar'})
+            flavor = flavor_obj.Flavor.get_by_id(ctxt, 1)
+            flavor.extra_specs['foo'] = 'baz'
+            flavor.save()
+            flavor_obj.Flavor.get_by_id(ctxt, 1)
+            self.assertEqual(2, get.call_count)
+
+    def test_destroy_resets_cache(self):
+        self._enable_cache()
+        with mock.patch.object(db, 'flavor_get') as get:
+            get.return_value = fake_flavor
+            flavor = flavor_obj.Flavor.get_by_id(self.context, 1)
+            with mock.patch.object(db, 'flavor_destroy'):
+                flavor.destroy()
+            flavor_obj.Flavor.get_by_id(self.context, 1)
+            self.assertEqual(2, get.call_count)
+
     def test_add_access(self):
         elevated = self.context.elevated()
         flavor = flavor_obj.Flavor(context=elevated, flavorid='123')
@@ -491,6 +491,56 @@ class _TestInstanceObject(object):
             inst.save()
             self.assertFalse(mock_upd.called)
 
+    def _get_numa_instance(self):
+        numa_topology = objects.InstanceNUMATopology(
+            instance_uuid='fake-uuid', cells=[
+                objects.InstanceNUMACell(id=0, cpuset=set([0]), memory=128)])
+        inst = instance.Instance(context=self.context, id=123,
+                                 uuid='fake-uuid',
+                                 numa_topology=numa_topology)
+        numa_topology.cells[0].obj_reset_changes()
+        numa_topology.obj_reset_changes()
+        inst.obj_reset_changes()
+        return inst
+
+    @mock.patch('nova.db.instance_extra_update_by_uuid')
+    def test_save_skips_unchanged_numa_topology(self, mock_extra_update):
+        inst = self._get_numa_instance()
+        inst.save()
+        self.assertFalse(mock_extra_update.called)
+
+    @mock.patch('nova.db.instance_extra_update_by_uuid')
+    def test_save_numa_topology_cell_changed(self, mock_extra_update):
+        inst = self._get_numa_instance()
+        inst.numa_topology.cells[0].memory = 256
+        inst.save()
+        mock_extra_update.assert_called_once_with(
+            self.context, inst.uuid, {'numa_topology': mock.ANY})
+        self.assertIn('"memory": 256',
+                      mock_extra_update.call_args[0][2]['numa_topology'])
+
+    @mock.patch('nova.db.instance_extra_update_by_uuid')
+    def test_save_merges_extra_updates(self, mock_extra_update):
+        inst = self._get_numa_instance()
+        inst.numa_topology = None
+        inst.vcpu_model = None
+        inst.save()
+        mock_extra_update.assert_called_once_with(
+            self.context, inst.uuid,
+            {'numa_topology': None, 'vcpu_model': None})
+
+    @mock.patch('nova.db.instance_extra_update_by_uuid')
+    def test_save_extra_updates_missing_instance_row(self, mock_extra_update):
+        mock_extra_update.side_effect = db_exc.DBReferenceError(
+            'table', 'constraint', 'key', 'key_table')
+        inst = self._get_numa_instance()
+        inst.numa_topology.cells[0].memory = 256
+        inst.vcpu_model = None
+        self.assertRaises(exception.InstanceNotFound, inst.save)
+        mock_extra_update.assert_called_once_with(
+            self.context, inst.uuid,
+            {'numa_topology': mock.ANY, 'vcpu_model': None})
+
     @mock.patch.object(cells_rpcapi.CellsAPI, 'instance_update_from_api')
     @mock.patch.object(cells_rpcapi.CellsAPI, 'instance_update_at_top')
     @mock.patch.object(db, 'instance_update_and_get_original')
@@ -1582,11 +1632,14 @@ class _TestInstanceListObject(object):
 
         def fake_instance_get_active_by_window_joined(context, begin, end,
                                                       project_id, host,
-                                                      columns_to_join):
+                                                      columns_to_join,
+                                                      limit, marker):
             # make sure begin is tz-aware
             self.assertIsNotNone(begin.utcoffset())
             self.assertIsNone(end)
             self.assertEqual(['metadata'], columns_to_join)
+            self.assertIsNone(limit)
+            self.assertIsNone(marker)
             return fakes
 
         with mock.patch.object(db, 'instance_get_active_by_window_joined',
@@ -1598,6 +1651,91 @@ class _TestInstanceListObject(object):
             self.assertIsInstance(obj, instance.Instance)
             self.assertEqual(obj.uuid, fake['uuid'])
 
+    @mock.patch.object(db, 'instance_count_active_by_window')
+    def test_get_count_active_by_window(self, mock_count):
+        mock_count.return_value = 3
+        dt = timeutils.utcnow()
+        self.assertEqual(3, instance.InstanceList.get_count_active_by_window(
+            self.context, dt, host='host'))
+        mock_count.assert_called_once_with(self.context, mock.ANY, None,
+                                           None, 'host', use_slave=False)
+        self.assertIsNotNone(mock_count.call_args[0][1].utcoffset())
+
+    @mock.patch.object(db, 'instance_get_host_inventory')
+    def test_get_host_inventory(self, mock_get):
+        dt = timeutils.utcnow().replace(microsecond=0)
+        mock_get.return_value = [
+            {'id': 1, 'uuid': 'fake-uuid-1', 'host': 'host', 'deleted': 0,
+             'deleted_at': None, 'vm_state': 'active',
+             'task_state': None, 'cleaned': 0},
+            {'id': 2, 'uuid': 'fake-uuid-2', 'host': 'host', 'deleted': 2,
+             'deleted_at': dt, 'vm_state': 'deleted',
+             'task_state': None, 'cleaned': 1},
+        ]
+        inst_list = instance.InstanceList.get_host_inventory(
+            self.context, 'host', ['fake-uuid-1'])
+
+        mock_get.assert_called_once_with(self.context, 'host',
+                                         ['fake-uuid-1'], use_slave=False)
+        self.assertEqual(['fake-uuid-1', 'fake-uuid-2'],
+                         [inst.uuid for inst in inst_list])
+        self.assertFalse(inst_list[0].deleted)
+        self.assertFalse(inst_list[0].cleaned)
+        self.assertTrue(inst_list[1].deleted)
+        self.assertTrue(inst_list[1].cleaned)
+        self.assertEqual(dt, inst_list[1].deleted_at.replace(tzinfo=None))
+        self.assertEqual('deleted', inst_list[1].vm_state)
+        self.assertFalse(inst_list[1].obj_attr_is_set('system_metadata'))
+
+    @mock.patch.object(db, 'instance_get_active_by_window_joined')
+    def test_iter_active_by_window_joined(self, mock_get):
+        fakes = [self.fake_instance(i, {'uuid': 'fake-uuid-%d' % i})
+                 for i in range(5)]
+        mock_get.side_effect = [fakes[:2], fakes[2:4], fakes[4:]]
+        dt = timeutils.utcnow()
+        instances = instance.InstanceList.iter_active_by_window_joined(
+            self.context, dt, host='host', expected_attrs=['metadata'],
+            page_size=2)
+        self.assertEqual([fake['uuid'] for fake in fakes],
+                         [inst.uuid for inst in instances])
+        self.assertEqual([None, fakes[1]['uuid'], fakes[3]['uuid']],
+                         [call[1]['marker']
+                          for call in mock_get.call_args_list])
+        for call in mock_get.call_args_list:
+            self.assertEqual(2, call[1]['limit'])
+            self.assertEqual(['metadata'], call[1]['columns_to_join'])
+
+    @mock.patch.object(db, 'instance_get_all_by_filters_sort')
+    def test_iter_by_filters(self, mock_get):
+        fakes = [self.fake_instance(i, {'uuid': 'fake-uuid-%d' % i})
+                 for i in range(4)]
+        mock_get.side_effect = [fakes[:2], fakes[2:], []]
+        instances = instance.InstanceList.iter_by_filters(
+            self.context, {'host': 'host'}, page_size=2)
+        # NOTE: Nothing is read until the first instance is needed
+        self.assertFalse(mock_get.called)
+        self.assertEqual([fake['uuid'] for fake in fakes],
+                         [inst.uuid for inst in instances])
+        self.assertEqual(3, mock_get.call_count)
+        mock_get.assert_called_with(
+            self.context, {'host': 'host'}, limit=2, marker=fakes[3]['uuid'],
+            columns_to_join=mock.ANY, use_slave=False, sort_keys=['id'],
+            sort_dirs=['asc'])
+
+    @mock.patch.object(db, 'instance_fault_get_by_instance_uuids')
+    @mock.patch.object(db, 'instance_get_all_by_filters_sort')
+    def test_iter_by_filters_fault(self, mock_get, mock_faults):
+        fakes = [self.fake_instance(i, {'uuid': 'fake-uuid-%d' % i})
+                 for i in range(2)]
+        mock_get.side_effect = [fakes[:1], fakes[1:], []]
+        mock_faults.return_value = {}
+        expected_attrs = ['fault']
+        instances = instance.InstanceList.iter_by_filters(
+            self.context, {}, expected_attrs=expected_attrs, page_size=1)
+        self.assertEqual(2, len(list(instances)))
+        self.assertEqual(3, mock_faults.call_count)
+        self.assertEqual(['fault'], expected_attrs)
+
     def test_with_fault(self):
         fake_insts = [
             fake_instance.fake_db_instance(uuid='fake-uuid', host='host'),
@@ -1659,6 +1797,149 @@ class _TestInstanceListObject(object):
         for inst in inst_list:
             self.assertEqual(inst.obj_what_changed(), set())
 
+    def _make_lazy_load_list(self, count=3):
+        insts = []
+        for i in range(count):
+            inst = instance.Instance(context=self.context,
+                                     uuid='uuid%d' % (i + 1))
+            inst.obj_reset_changes()
+            insts.append(inst)
+        inst_list = instance.InstanceList(self.context, objects=insts)
+        inst_list._track_instances()
+        return inst_list
+
+    @mock.patch.object(db, 'instance_get_all_by_filters')
+    def test_members_track_list(self, mock_get):
+        mock_get.return_value = [fake_instance.fake_db_instance(),
+                                 fake_instance.fake_db_instance()]
+        inst_list = instance.InstanceList.get_by_filters(self.context, {})
+        for inst in inst_list:
+            self.assertIs(inst_list, inst._instance_list())
+
+    def test_lazy_load_batched(self):
+        inst_list = self._make_lazy_load_list()
+        loaded = instance.InstanceList(objects=[
+            instance.Instance(uuid='uuid1', metadata={'foo': 'bar'}),
+            instance.Instance(uuid='uuid2', metadata={})])
+        with mock.patch.object(instance.InstanceList, 'get_by_filters',
+                               return_value=loaded) as mock_get:
+            self.assertEqual({'foo': 'bar'}, inst_list[0].metadata)
+            self.assertEqual({}, inst_list[1].metadata)
+            mock_get.assert_called_once_with(
+                self.context, {'uuid': ['uuid1', 'uuid2', 'uuid3']},
+                expected_attrs=['metadata'])
+        for inst in inst_list[:2]:
+            self.assertEqual(set(), inst.obj_what_changed())
+
+        # uuid3 was not found (deleted meanwhile), so it loads on its own
+        self.assertFalse(inst_list[2].obj_attr_is_set('metadata'))
+        with mock.patch.object(instance.Instance, '_load_generic') as load:
+            inst_list[2].obj_load_attr('metadata')
+            load.assert_called_once_with('metadata')
+
+    def test_lazy_load_batched_fault(self):
+        inst_list = self._make_lazy_load_list(count=2)
+        fault = objects.InstanceFault(instance_uuid='uuid2', message='foo')
+        with mock.patch.object(objects.InstanceFaultList,
+                               'get_by_instance_uuids',
+                               return_value=[fault]) as mock_get:
+            self.assertIsNone(inst_list[0].fault)
+            self.assertEqual('foo', inst_list[1].fault.message)
+            mock_get.assert_called_once_with(self.context,
+                                             ['uuid1', 'uuid2'])
+
+    @mock.patch.object(instance.Instance, '_load_generic')
+    @mock.patch.object(instance.InstanceList, 'get_by_filters')
+    def test_lazy_load_single_missing_not_batched(self, mock_get, mock_load):
+        inst_list = self._make_lazy_load_list(count=2)
+        inst_list[1].metadata = {}
+        inst_list[0].obj_load_attr('metadata')
+        self.assertFalse(mock_get.called)
+        mock_load.assert_called_once_with('metadata')
+
+    @mock.patch.object(instance.Instance, '_load_generic')
+    @mock.patch.object(instance.InstanceList, 'get_by_filters')
+    def test_lazy_load_copy_not_batched(self, mock_get, mock_load):
+        inst_list = self._make_lazy_load_list(count=2)
+        inst = inst_list[0].obj_clone()
+        inst._instance_list = inst_list[0]._instance_list
+        inst.obj_load_attr('metadata')
+        self.assertFalse(mock_get.called)
+        mock_load.assert_called_once_with('metadata')
+
+    def _make_save_many_list(self):
+        insts = []
+        for uuid in ('uuid1', 'uuid2', 'uuid3'):
+            inst = instance.Instance(context=self.context, uuid=uuid,
+                                     vm_state='building', task_state=None)
+            inst.obj_reset_changes()
+            insts.append(inst)
+        inst_list = instance.InstanceList()
+        inst_list._context = self.context
+        inst_list.objects = insts
+        return inst_list
+
+    @mock.patch.object(notifications, 'send_update')
+    @mock.patch.object(db, 'instance_update_bulk')
+    def test_save_many(self, mock_bulk, mock_notify):
+        self.useFixture(test.TimeOverride())
+        now = timeutils.utcnow()
+        original = {'vm_state': 'building', 'task_state': None,
+                    'display_name': None}
+        mock_bulk.return_value = ({'uuid1': original}, ['uuid2'])
+        inst_list = self._make_save_many_list()
+        inst_list[0].vm_state = 'error'
+        inst_list[1].vm_state = 'error'
+        inst_list[1].cleaned = True
+
+        failed = inst_list.save_many(expected_vm_state=['building'])
+
+        self.assertEqual(['uuid2'], failed)
+        mock_bulk.assert_called_once_with(self.context, {
+            'uuid1': {'vm_state': 'error', 'updated_at': now,
+                      'expected_vm_state': ['building']},
+            'uuid2': {'vm_state': 'error', 'cleaned': 1, 'updated_at': now,
+                      'expected_vm_state': ['building']}})
+        self.assertEqual(set(), inst_list[0].obj_what_changed())
+        self.assertEqual(set(['vm_state', 'cleaned']),
+                         inst_list[1].obj_what_changed())
+        self.assertEqual(1, mock_notify.call_count)
+        self.assertEqual(original, mock_notify.call_args[0][1])
+        self.assertEqual('uuid1', mock_notify.call_args[0][2].uuid)
+
+    @mock.patch.object(instance.Instance, 'save')
+    @mock.patch.object(db, 'instance_update_bulk')
+    def test_save_many_saves_complex_changes_individually(self, mock_bulk,
+                                                           mock_save):
+        mock_bulk.return_value = ({}, [])
+        mock_save.side_effect = [None, exception.UnexpectedTaskStateError(
+            expected=[None], actual='deleting')]
+        inst_list = self._make_save_many_list()
+        inst_list[0].metadata = {'foo': 'bar'}
+        inst_list[1].hostname = 'foo'
+
+        failed = inst_list.save_many(expected_task_state=[None])
+
+        self.assertEqual(['uuid2'], failed)
+        mock_bulk.assert_called_once_with(self.context, {})
+        mock_save.assert_has_calls([
+            mock.call(expected_vm_state=None, expected_task_state=[None]),
+            mock.call(expected_vm_state=None, expected_task_state=[None])])
+
+    @mock.patch('nova.cells.opts.get_cell_type', return_value='compute')
+    @mock.patch.object(instance.Instance, 'save')
+    @mock.patch.object(db, 'instance_update_bulk')
+    def test_save_many_with_cells(self, mock_bulk, mock_save, mock_cells):
+        mock_bulk.return_value = ({}, [])
+        inst_list = self._make_save_many_list()
+        inst_list[0].vm_state = 'error'
+
+        self.assertEqual([], inst_list.save_many())
+
+        mock_bulk.assert_called_once_with(self.context, {})
+        mock_save.assert_called_once_with(expected_vm_state=None,
+                                          expected_task_state=None)
+
     def test_get_by_security_group(self):
         fake_secgroup = dict(test_security_group.fake_secgroup)
         fake_secgroup['instances'] = [
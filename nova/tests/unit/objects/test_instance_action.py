@@ -12,6 +12,7 @@
 #    License for the specific language governing permissions and limitations
 #    under the License.
 
+import datetime
 import traceback
 
 import mock
@@ -356,6 +357,38 @@ class _TestInstanceActionEventObject(object):
                                           exc_tb='traceback')
         mock_format.assert_called_once_with(mock.sentinel.exc_tb)
 
+    @mock.patch('traceback.format_tb')
+    def test_pack_action_event_record(self, mock_format):
+        mock_format.return_value = 'traceback'
+        timeutils.set_time_override(override_time=NOW)
+        start_time = NOW - datetime.timedelta(seconds=10)
+        values = instance_action.InstanceActionEvent.pack_action_event_record(
+            self.context, 'fake-uuid', 'fake-event', start_time,
+            exc_val=test.TestingException('failed'),
+            exc_tb=mock.sentinel.exc_tb)
+        self.assertEqual({'event': 'fake-event',
+                          'instance_uuid': 'fake-uuid',
+                          'request_id': self.context.request_id,
+                          'start_time': timeutils.strtime(at=start_time),
+                          'finish_time': timeutils.strtime(at=NOW),
+                          'result': 'Error',
+                          'message': 'failed',
+                          'traceback': 'traceback'}, values)
+        mock_format.assert_called_once_with(mock.sentinel.exc_tb)
+
+    @mock.patch.object(db, 'action_events_record')
+    def test_record_events(self, mock_record):
+        timeutils.set_time_override(override_time=NOW)
+        test_class = instance_action.InstanceActionEvent
+        events = [test_class.pack_action_event_record(
+                      self.context, 'fake-uuid', 'fake-event-%d' % i, NOW)
+                  for i in range(2)]
+        mock_record.return_value = events[1:]
+
+        not_found = test_class.record_events(self.context, events)
+        mock_record.assert_called_once_with(self.context, events)
+        self.assertEqual(events[1:], not_found)
+
 
 class TestInstanceActionEventObject(test_objects._LocalTest,
                                     _TestInstanceActionEventObject):
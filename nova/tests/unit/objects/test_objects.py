@@ -24,6 +24,7 @@ import pprint
 import fixtures
 import mock
 from oslo_log import log
+from oslo_serialization import jsonutils
 from oslo_utils import timeutils
 from oslo_versionedobjects import exception as ovo_exc
 from oslo_versionedobjects import fixture
@@ -215,6 +216,73 @@ class TestObjMakeList(test.NoDBTestCase):
             self.assertEqual(db_objs[index]['missing'], item.missing)
 
 
+class TestObjCompact(test.NoDBTestCase):
+    def setUp(self):
+        super(TestObjCompact, self).setUp()
+        self.obj = MyObj(context='ctxt', foo=1, bar='baz')
+        self.compact = base.obj_compact(self.obj, ['foo', 'missing'])
+
+    def test_obj_compact(self):
+        self.assertEqual(1, self.compact.foo)
+        self.assertTrue(self.compact.obj_attr_is_set('foo'))
+        self.assertFalse(self.compact.obj_attr_is_set('missing'))
+        self.assertFalse(hasattr(self.compact, '__dict__'))
+        self.assertIsNone(self.compact._materialized)
+        self.assertIs(type(self.compact),
+                      type(base.obj_compact(MyObj(), ['foo', 'missing'])))
+
+    def test_obj_compact_materialize(self):
+        self.assertEqual('loaded!', self.compact.bar)
+        obj = self.compact.obj_materialize()
+        self.assertIsInstance(obj, MyObj)
+        self.assertIs(obj, self.compact.obj_materialize())
+        self.assertEqual('ctxt', obj._context)
+        self.assertEqual(1, obj.foo)
+        self.assertEqual(set(['bar']), obj.obj_what_changed())
+
+    @mock.patch.object(objects.Instance, 'get_by_uuid')
+    def test_obj_compact_materialize_fetches(self, mock_get):
+        mock_get.return_value = objects.Instance(uuid='fake-uuid',
+                                                 host='host',
+                                                 memory_mb=512)
+        compact = base.obj_compact(
+            objects.Instance(context='ctxt', uuid='fake-uuid', host='host'),
+            ['uuid', 'host'])
+
+        self.assertEqual('host', compact.host)
+        self.assertFalse(mock_get.called)
+        self.assertEqual(512, compact.memory_mb)
+        self.assertEqual(512, compact.memory_mb)
+        mock_get.assert_called_once_with('ctxt', 'fake-uuid')
+
+    @mock.patch.object(objects.Instance, 'get_by_uuid',
+                       side_effect=exception.InstanceNotFound(
+                           instance_id='fake-uuid'))
+    def test_obj_compact_materialize_deleted(self, mock_get):
+        compact = base.obj_compact(
+            objects.Instance(context='ctxt', uuid='fake-uuid', host='host'),
+            ['uuid', 'host'])
+
+        self.assertRaises(exception.ObjectActionError,
+                          getattr, compact, 'memory_mb')
+        self.assertEqual('host', compact.obj_materialize().host)
+        mock_get.assert_called_once_with('ctxt', 'fake-uuid')
+
+    def test_obj_compact_read_only(self):
+        self.assertRaises(exception.ObjectActionError,
+                          setattr, self.compact, 'foo', 2)
+
+    def test_obj_compact_list(self):
+        class MyList(base.ObjectListBase, base.NovaObject):
+            fields = {
+                'objects': fields.ListOfObjectsField('MyObj'),
+            }
+
+        mylist = MyList(objects=[MyObj(foo=1), MyObj(foo=2)])
+        self.assertEqual([1, 2],
+                         [obj.foo for obj in mylist.obj_compact(['foo'])])
+
+
 def compare_obj(test, obj, db_obj, subs=None, allow_missing=None,
                 comparators=None):
     """Compare a NovaObject and a dict-like database object.
@@ -791,6 +859,17 @@ class _TestObject(object):
             self.assertFalse(mock_compat.called)
             self.assertNotIn('rel_object', primitive)
 
+    def test_obj_to_primitive_own_version_backports_sub_objects(self):
+        subobj = MyOwnedObject(baz=1)
+        subobj.VERSION = '1.2'
+        obj = MyObj(rel_object=subobj)
+        obj.obj_relationships = {'rel_object': [('1.6', '1.1')]}
+        with mock.patch.object(subobj, 'obj_make_compatible') as mock_compat:
+            primitive = obj.obj_to_primitive(target_version=obj.VERSION)
+            mock_compat.assert_called_once_with(mock.ANY, '1.1')
+        self.assertEqual('1.1', primitive['nova_object.data']['rel_object'][
+            'nova_object.version'])
+
     def test_obj_make_compatible_hits_sub_objects(self):
         subobj = MyOwnedObject(baz=1)
         obj = MyObj(foo=123, rel_object=subobj)
@@ -814,6 +893,17 @@ class _TestObject(object):
         self.assertRaises(exception.ObjectActionError,
                           obj.obj_make_compatible, {}, '1.0')
 
+    def test_obj_compatibility_plan(self):
+        obj = MyObj(foo=123)
+        obj.obj_relationships = {'rel_object': [('1.0', '1.0')]}
+        plan = obj._obj_compatibility_plan()
+        self.assertEqual((('rel_object', True), ('rel_objects', False)),
+                         plan)
+        self.assertIs(plan, obj._obj_compatibility_plan())
+        obj.obj_relationships = {}
+        self.assertEqual((('rel_object', False), ('rel_objects', False)),
+                         obj._obj_compatibility_plan())
+
     def test_obj_make_compatible_doesnt_skip_falsey_sub_objects(self):
         @base.NovaObjectRegistry.register_if(False)
         class MyList(base.ObjectListBase, base.NovaObject):
@@ -848,6 +938,41 @@ class _TestObject(object):
             obj.obj_to_primitive('1.0')
             self.assertTrue(mock_mc.called)
 
+    def test_obj_calculate_child_version_follows_relationships(self):
+        obj = MyObj()
+        obj.obj_relationships = {'rel_object': [('1.5', '1.1')]}
+        self.assertEqual('1.1',
+                         obj.obj_calculate_child_version('1.6', 'rel_object'))
+        obj.obj_relationships = {'rel_object': [('1.5', '1.1'),
+                                                ('1.6', '1.2')]}
+        self.assertEqual('1.2',
+                         obj.obj_calculate_child_version('1.6', 'rel_object'))
+
+    def test_obj_primitive_handlers(self):
+        handlers = dict((name, (attrname, simple)) for
+                        name, attrname, field, simple in
+                        MyObj._obj_primitive_handlers())
+        self.assertEqual(('_obj_foo', True), handlers['foo'])
+        self.assertEqual(('_obj_bar', True), handlers['bar'])
+        self.assertEqual(('_obj_created_at', False), handlers['created_at'])
+        self.assertEqual(('_obj_rel_object', False), handlers['rel_object'])
+        self.assertEqual(('_obj_mutable_default', False),
+                         handlers['mutable_default'])
+        self.assertIs(MyObj._obj_primitive_handlers(),
+                      MyObj._obj_primitive_handlers())
+
+    def test_obj_to_primitive_matches_fields(self):
+        dt = datetime.datetime(1955, 11, 5)
+        obj = MyObj(foo=1, bar=None, created_at=dt, deleted=False,
+                    rel_object=MyOwnedObject(baz=2),
+                    rel_objects=[MyOwnedObject(baz=3)],
+                    mutable_default=['a'])
+        expected = dict((name, field.to_primitive(obj, name,
+                                                  getattr(obj, name)))
+                        for name, field in obj.fields.items()
+                        if obj.obj_attr_is_set(name))
+        self.assertEqual(expected, obj.obj_to_primitive()['nova_object.data'])
+
     def test_delattr(self):
         obj = MyObj(bar='foo')
         del obj.bar
@@ -864,6 +989,14 @@ class _TestObject(object):
 
 
 class TestObject(_LocalTest, _TestObject):
+    def test_remotable_batch_local(self):
+        obj = MyObj.query(self.context)
+        with base.RemotableBatch(self.context) as batch:
+            self.assertEqual('polo', obj.marco())
+            obj._update_test()
+            self.assertEqual('updated', obj.bar)
+        self.assertEqual([], batch.calls)
+
     def test_set_defaults(self):
         obj = MyObj()
         obj.obj_set_defaults('foo')
@@ -917,6 +1050,61 @@ class TestRemoteObject(_RemoteTest, _TestObject):
         obj = MyObj2.query(self.context)
         self.assertEqual('bar', obj.bar)
 
+    def test_remotable_batch(self):
+        obj = MyObj.query(self.context)
+        with base.RemotableBatch(self.context) as batch:
+            update = obj._update_test()
+            marco = obj.marco()
+            query = MyObj.query(self.context)
+            self.assertIsInstance(update, base.BatchedCall)
+            self.assertFalse(update.done)
+            self.assertRaises(exception.ObjectActionError, update.result)
+        self.assertEqual([update, marco, query], batch.calls)
+        self.assertEqual('updated', obj.bar)
+        self.assertEqual('polo', marco.result())
+        self.assertEqual(1, query.result().foo)
+        self.assertEqual(self.context, query.result()._context)
+
+    def test_remotable_batch_object_actions(self):
+        api = base.NovaObject.indirection_api
+        obj = MyObj.query(self.context)
+        with mock.patch.object(api, 'object_actions', create=True,
+                               return_value=[{'result': ({'bar': 'meow'},
+                                                         'polo')}]
+                               ) as object_actions:
+            with base.RemotableBatch(self.context):
+                marco = obj.marco()
+            object_actions.assert_called_once_with(
+                self.context, [{'objinst': mock.ANY, 'objmethod': 'marco',
+                                'args': (), 'kwargs': {}}])
+        self.assertEqual('polo', marco.result())
+        self.assertEqual('meow', obj.bar)
+
+    def test_remotable_batch_exception(self):
+        api = base.NovaObject.indirection_api
+        obj = MyObj.query(self.context)
+        with mock.patch.object(api, 'object_action',
+                               side_effect=exception.InstanceNotFound(
+                                   instance_id='fake-uuid')):
+            with base.RemotableBatch(self.context,
+                                     raise_on_error=False) as batch:
+                save = obj.save()
+            self.assertIsInstance(save.exception, exception.InstanceNotFound)
+            self.assertRaises(exception.InstanceNotFound, save.result)
+            self.assertEqual(1, len(batch.calls))
+
+            def _batch():
+                with base.RemotableBatch(self.context):
+                    obj.save()
+
+            self.assertRaises(exception.InstanceNotFound, _batch)
+
+    def test_obj_exception_primitive_unknown(self):
+        primitive = base.obj_exception_to_primitive(ValueError('oops'))
+        exc = base.obj_exception_from_primitive(primitive, 'save')
+        self.assertIsInstance(exc, exception.ObjectActionError)
+        self.assertIn('oops', six.text_type(exc))
+
 
 class TestObjectSerializer(_BaseTestCase):
     def test_serialize_entity_primitive(self):
@@ -968,6 +1156,44 @@ class TestObjectSerializer(_BaseTestCase):
     def test_deserialize_entity_newer_version_passes_revision(self):
         self._test_deserialize_entity_newer('1.7', '1.6.1', '1.6.1')
 
+    def test_deserialize_entity_newer_version_remembered(self):
+        ser = base.NovaObjectSerializer()
+        ser._conductor = mock.Mock()
+        ser._conductor.object_backport.return_value = 'backported'
+
+        class MyTestObj(MyObj):
+            VERSION = '1.6'
+
+        base.NovaObjectRegistry.register(MyTestObj)
+
+        obj = MyTestObj()
+        obj.VERSION = '1.25'
+        primitive = obj.obj_to_primitive()
+        with mock.patch.object(base.NovaObject, 'obj_class_from_name',
+                               wraps=base.NovaObject.obj_class_from_name
+                               ) as mock_class:
+            for i in range(2):
+                self.assertEqual('backported',
+                                 ser.deserialize_entity(self.context,
+                                                        primitive))
+        self.assertEqual(1, mock_class.call_count)
+        self.assertEqual(2, ser._conductor.object_backport.call_count)
+        ser._conductor.object_backport.assert_called_with(self.context,
+                                                          primitive, '1.6')
+
+        # A newer registered version must be able to load the object
+        class MyTestObjNewer(MyObj):
+            VERSION = '1.25'
+
+            @classmethod
+            def obj_name(cls):
+                return 'MyTestObj'
+
+        base.NovaObjectRegistry.register(MyTestObjNewer)
+        self.assertEqual('1.25',
+                         ser.deserialize_entity(self.context,
+                                                primitive).VERSION)
+
     def test_deserialize_dot_z_with_extra_stuff(self):
         primitive = {'nova_object.name': 'MyObj',
                      'nova_object.namespace': 'nova',
@@ -986,6 +1212,52 @@ class TestObjectSerializer(_BaseTestCase):
         # .0 of the object.
         self.assertEqual('1.6', obj.VERSION)
 
+    def test_compact_primitive(self):
+        obj = MyObj(foo=1, rel_object=MyOwnedObject(baz=2),
+                    rel_objects=[MyOwnedObject(baz=3)])
+        obj.obj_reset_changes(['rel_objects'])
+        primitive = obj.obj_to_primitive()
+        compact = base.compact_primitive(primitive)
+        self.assertEqual(['MyObj', '1.6'], compact['nova_obj'][:2])
+        self.assertEqual(set(['foo', 'rel_object']),
+                         set(compact['nova_obj'][3]))
+        data = compact['nova_obj'][2]
+        self.assertEqual(1, data['foo'])
+        self.assertEqual(['MyOwnedObject', '1.0', {'baz': 2}, ['baz']],
+                         data['rel_object']['nova_obj'])
+        self.assertEqual({'baz': 3}, data['rel_objects'][0]['nova_obj'][2])
+        self.assertNotIn('nova_object', jsonutils.dumps(compact))
+        self.assertEqual(primitive, base.expand_primitive(compact))
+
+    def test_compact_primitive_leaves_metadata_alone(self):
+        metadata = {'nova_object.name': 'name', 'nova_obj': 'value',
+                    'key': 'value'}
+        inst = objects.Instance(uuid='fake-uuid', metadata=metadata,
+                                system_metadata=dict(metadata))
+        ser = base.NovaObjectSerializer(compact=True)
+        primitive = ser.serialize_entity(self.context, inst)
+        data = primitive['nova_obj'][2]
+        self.assertEqual(metadata, data['metadata'])
+        self.assertEqual(metadata, data['system_metadata'])
+
+        inst2 = base.NovaObjectSerializer().deserialize_entity(
+            self.context, jsonutils.loads(jsonutils.dumps(primitive)))
+        self.assertEqual(metadata, inst2.metadata)
+        self.assertEqual(metadata, inst2.system_metadata)
+
+    def test_object_serialization_compact(self):
+        ser = base.NovaObjectSerializer(compact=True)
+        obj = MyObj(foo=1, rel_object=MyOwnedObject(baz=2))
+        primitive = ser.serialize_entity(self.context, [obj])
+        self.assertIn('nova_obj', primitive[0])
+        obj2 = base.NovaObjectSerializer().deserialize_entity(self.context,
+                                                              primitive)[0]
+        self.assertIsInstance(obj2, MyObj)
+        self.assertEqual(1, obj2.foo)
+        self.assertEqual(2, obj2.rel_object.baz)
+        self.assertEqual(set(['foo', 'rel_object']), obj2.obj_what_changed())
+        self.assertEqual(self.context, obj2._context)
+
     def test_object_serialization(self):
         ser = base.NovaObjectSerializer()
         obj = MyObj()
@@ -1058,7 +1330,7 @@ object_data = {
     'Aggregate': '1.1-1ab35c4516f71de0bef7087026ab10d1',
     'AggregateList': '1.2-79689d69db4de545a82fe09f30468c53',
     'BandwidthUsage': '1.2-c6e4c779c7f40f2407e3d70022e3cd1c',
-    'BandwidthUsageList': '1.2-77b4d43e641459f464a6aa4d53debd8f',
+    'BandwidthUsageList': '1.3-d70e8f19d6320ef9760710fedfe37986',
     'BlockDeviceMapping': '1.9-72d92c263f03a5cbc1761b0ea4c66c22',
     'BlockDeviceMappingList': '1.10-972d431e07463ae1f68e752521937b01',
     'CellMapping': '1.0-7f1a7e85a22bbb7559fc730ab658b9bd',
@@ -1081,8 +1353,8 @@ object_data = {
     'ImageMetaProps': '1.1-8fe09b7872538f291649e77375f8ac4c',
     'Instance': '1.20-260d385315d4868b6397c61a13109841',
     'InstanceAction': '1.1-f9f293e526b66fca0d05c3b3a2d13914',
-    'InstanceActionEvent': '1.1-e56a64fa4710e43ef7af2ad9d6028b33',
-    'InstanceActionEventList': '1.0-c37db4e58b637a857c90fb02284d8f7c',
+    'InstanceActionEvent': '1.2-51f2145b31dbf4927ea9f75e60ae5550',
+    'InstanceActionEventList': '1.2-1668b2d528ae24f6447869423bfae689',
     'InstanceActionList': '1.0-89266105d853ff9b8f83351776fab788',
     'InstanceExternalEvent': '1.0-33cc4a1bbd0655f68c0ee791b95da7e6',
     'InstanceFault': '1.2-7ef01f16f1084ad1304a513d6d410a38',
@@ -1090,7 +1362,7 @@ object_data = {
     'InstanceGroup': '1.9-a413a4ec0ff391e3ef0faa4e3e2a96d0',
     'InstanceGroupList': '1.6-1e383df73d9bd224714df83d9a9983bb',
     'InstanceInfoCache': '1.5-cd8b96fefe0fc8d4d337243ba0bf0e1e',
-    'InstanceList': '1.17-64f6949d58e4ecd3219142f1567a61d9',
+    'InstanceList': '1.20-da0bded479906f93f2d921cd701446ea',
     'InstanceMapping': '1.0-47ef26034dfcbea78427565d9177fe50',
     'InstanceMappingList': '1.0-b7b108f6a56bd100c20a3ebd5f3801a1',
     'InstanceNUMACell': '1.2-535ef30e0de2d6a0d26a71bd58ecafc4',
@@ -1162,7 +1434,7 @@ object_relationships = {
                  'VirtCPUModel': '1.0',
                  'EC2Ids': '1.0',
                  },
-    'InstanceActionEventList': {'InstanceActionEvent': '1.1'},
+    'InstanceActionEventList': {'InstanceActionEvent': '1.2'},
     'InstanceActionList': {'InstanceAction': '1.1'},
     'InstanceFaultList': {'InstanceFault': '1.2'},
     'InstanceGroupList': {'InstanceGroup': '1.9'},
@@ -570,6 +570,26 @@ class HostManagerTestCase(test.NoDBTestCase):
         self.assertEqual(len(new_info['instances']), 4)
         self.assertTrue(new_info['updated'])
 
+    def test_update_instance_info_compact(self):
+        self.flags(scheduler_compact_instance_info=True)
+        host_name = 'fake_host'
+        self.host_manager._instance_info = {
+                host_name: {
+                    'instances': {},
+                    'updated': False,
+                }}
+        inst1 = fake_instance.fake_instance_obj('fake_context', uuid='aaa',
+                                                host=host_name,
+                                                instance_type_id=2)
+        update = objects.InstanceList(objects=[inst1])
+        self.host_manager.update_instance_info('fake_context', host_name,
+                                               update)
+        tracked = self.host_manager._instance_info[host_name]['instances']
+        self.assertIsInstance(tracked['aaa'], obj_base.CompactObject)
+        self.assertEqual('aaa', tracked['aaa'].uuid)
+        self.assertEqual(2, tracked['aaa'].instance_type_id)
+        self.assertIsNone(tracked['aaa']._materialized)
+
     def test_update_instance_info_unknown_host(self):
         self.host_manager._recreate_instance_info = mock.MagicMock()
         host_name = 'fake_host'
@@ -48,3 +48,7 @@ class BaseAPITestCase(test.TestCase):
         res = self.base_rpcapi.get_backdoor_port(self.context,
                 self.compute.host)
         self.assertEqual(res, self.compute.backdoor_port)
+
+    def test_get_rpc_stats(self):
+        res = self.base_rpcapi.get_rpc_stats(self.context, self.compute.host)
+        self.assertEqual({'enabled': False, 'client': {}, 'server': {}}, res)
@@ -0,0 +1,112 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+
+from nova import context
+from nova import manager
+from nova.openstack.common import periodic_task
+from nova import test
+
+
+class FakeManager(manager.Manager):
+    def __init__(self, clock):
+        self.clock = clock
+        self.ran = []
+        super(FakeManager, self).__init__(host='fake-host')
+
+    @periodic_task.periodic_task(spacing=10)
+    def _fast_task(self, context):
+        self.ran.append('_fast_task')
+        self.clock.append(self.clock[-1] + 1)
+
+    @periodic_task.periodic_task(spacing=60, run_immediately=True)
+    def _slow_task(self, context):
+        self.ran.append('_slow_task')
+        self.clock.append(self.clock[-1] + 90)
+
+    @periodic_task.periodic_task(spacing=30)
+    def _failing_task(self, context):
+        self.ran.append('_failing_task')
+        raise test.TestingException()
+
+
+@mock.patch('time.sleep')
+class ManagerPeriodicTasksTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(ManagerPeriodicTasksTestCase, self).setUp()
+        self.context = context.get_admin_context()
+        self.clock = [1000.0]
+        patcher = mock.patch('time.time', side_effect=lambda: self.clock[-1])
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.manager = FakeManager(self.clock)
+        for name in self.manager._periodic_last_run:
+            if self.manager._periodic_last_run[name] is not None:
+                self.manager._periodic_last_run[name] = 0
+
+    def test_run_periodic_tasks(self, mock_sleep):
+        with mock.patch.object(manager.LOG, 'warning') as mock_warning:
+            idle_for = self.manager.periodic_tasks(self.context)
+
+        self.assertEqual(['_failing_task', '_fast_task', '_slow_task'],
+                         sorted(self.manager.ran))
+        self.assertEqual(10, idle_for)
+        stats = self.manager.get_periodic_task_stats()
+        self.assertEqual(1, stats['_failing_task']['errors'])
+        self.assertEqual(1, stats['_fast_task']['runs'])
+        self.assertEqual(1, stats['_fast_task']['max_time'])
+        self.assertEqual(0, stats['_fast_task']['overruns'])
+        self.assertEqual(90, stats['_slow_task']['last_time'])
+        self.assertEqual(1, stats['_slow_task']['overruns'])
+        self.assertEqual(1, mock_warning.call_count)
+
+    def test_run_periodic_tasks_raise_on_error(self, mock_sleep):
+        self.assertRaises(test.TestingException,
+                          self.manager.periodic_tasks, self.context,
+                          raise_on_error=True)
+        stats = self.manager.get_periodic_task_stats()
+        self.assertEqual(1, stats['_failing_task']['errors'])
+
+    def test_run_periodic_tasks_budget(self, mock_sleep):
+        self.flags(periodic_task_budget=5)
+        self.manager._periodic_last_run['_fast_task'] = 900.0
+
+        self.assertEqual(0, self.manager.periodic_tasks(self.context))
+        # The task asking to run immediately goes first and uses the budget
+        self.assertEqual(['_slow_task'], self.manager.ran)
+        stats = self.manager.get_periodic_task_stats()
+        self.assertEqual(1, stats['_failing_task']['deferrals'])
+        self.assertEqual(1, stats['_fast_task']['deferrals'])
+
+        # The deferred tasks run on the next pass, most overdue first
+        self.manager.periodic_tasks(self.context)
+        self.assertEqual(['_slow_task', '_failing_task', '_fast_task'],
+                         self.manager.ran[:3])
+
+    @mock.patch('random.random', return_value=0.5)
+    def test_jitter(self, mock_random, mock_sleep):
+        self.flags(periodic_task_jitter=True)
+        mgr = FakeManager(self.clock)
+
+        self.assertEqual(1000 - 5, mgr._periodic_last_run['_fast_task'])
+        self.assertEqual(1000 - 15, mgr._periodic_last_run['_failing_task'])
+        self.assertIsNone(mgr._periodic_last_run['_slow_task'])
+
+    @mock.patch.object(manager.LOG, 'info')
+    def test_log_periodic_task_stats(self, mock_info, mock_sleep):
+        self.manager.periodic_tasks(self.context)
+        self.manager.log_periodic_task_stats()
+
+        self.assertEqual(3, mock_info.call_count)
+        self.assertEqual('FakeManager._slow_task',
+                         mock_info.call_args_list[0][0][1]['name'])
@@ -20,6 +20,7 @@ import fixtures
 import mock
 
 from nova.cmd import manage
+from nova.conductor import api as conductor_api
 from nova import context
 from nova import db
 from nova.db import migration
@@ -341,12 +342,12 @@ class VmCommandsTestCase(test.TestCase):
     def test_list_without_host(self):
         output = StringIO.StringIO()
         sys.stdout = output
-        with mock.patch.object(objects.InstanceList, 'get_by_filters') as get:
-            get.return_value = objects.InstanceList(
-                objects=[fake_instance.fake_instance_obj(
-                    context.get_admin_context(), host='foo-host',
-                    flavor=self.fake_flavor,
-                    system_metadata={})])
+        with mock.patch.object(objects.InstanceList,
+                               'iter_by_filters') as get:
+            get.return_value = iter([fake_instance.fake_instance_obj(
+                context.get_admin_context(), host='foo-host',
+                flavor=self.fake_flavor,
+                system_metadata={})])
             self.commands.list()
 
         sys.stdout = sys.__stdout__
@@ -383,6 +384,44 @@ class DBCommandsTestCase(test.TestCase):
     def test_archive_deleted_rows_negative(self):
         self.assertEqual(1, self.commands.archive_deleted_rows(-1))
 
+    @mock.patch.object(conductor_api.LocalAPI, 'get_db_api_stats')
+    def test_stats(self, mock_stats):
+        self.flags(use_local=True, group='conductor')
+        mock_stats.return_value = {
+            'enabled': True,
+            'functions': {
+                'instance_get': {'calls': 10, 'errors': 0, 'rows': 10,
+                                 'avg_time': 0.001, 'max_time': 0.002,
+                                 'total_time': 0.01},
+                'instance_get_all_by_host': {'calls': 2, 'errors': 1,
+                                             'rows': 200, 'avg_time': 0.5,
+                                             'max_time': 0.6,
+                                             'total_time': 1.0}},
+            'slow_queries': [{'duration': 0.6,
+                              'function': 'instance_get_all_by_host',
+                              'operation': 'InstanceList.get_by_host',
+                              'request_id': 'req-fake',
+                              'statement': 'SELECT fake',
+                              'parameters': {'host': 'str'}}]}
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout',
+                                             StringIO.StringIO()))
+        self.commands.stats(top=1, reset=True)
+        mock_stats.assert_called_once_with(mock.ANY, reset=True)
+        output = sys.stdout.getvalue()
+        self.assertIn('instance_get_all_by_host', output)
+        self.assertNotIn('instance_get ', output)
+        self.assertIn('InstanceList.get_by_host', output)
+        self.assertIn('SELECT fake', output)
+
+    @mock.patch.object(conductor_api.LocalAPI, 'get_db_api_stats',
+                       return_value={'enabled': False, 'functions': {},
+                                     'slow_queries': []})
+    def test_stats_disabled(self, mock_stats):
+        self.flags(use_local=True, group='conductor')
+        self.useFixture(fixtures.MonkeyPatch('sys.stdout',
+                                             StringIO.StringIO()))
+        self.assertEqual(1, self.commands.stats())
+
     @mock.patch.object(migration, 'db_null_instance_uuid_scan',
                        return_value={'foo': 0})
     def test_null_instance_uuid_scan_no_records_found(self, mock_scan):
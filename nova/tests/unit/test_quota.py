@@ -579,6 +579,21 @@ class QuotaEngineTestCase(test.TestCase):
                 ])
         self.assertEqual(result, quota_obj._resources)
 
+    def test_invalidate_limits_cache(self):
+        driver = FakeDriver()
+        driver.invalidate_limits_cache = lambda: driver.called.append(
+            ('invalidate_limits_cache',))
+        quota_obj = self._make_quota_obj(driver)
+        quota_obj.invalidate_limits_cache()
+
+        self.assertEqual(driver.called, [('invalidate_limits_cache',)])
+
+    def test_invalidate_limits_cache_not_implemented(self):
+        # Drivers without a limits cache, like FakeDriver, are skipped.
+        driver = FakeDriver()
+        quota_obj = self._make_quota_obj(driver)
+        quota_obj.invalidate_limits_cache()
+
     def test_get_class_quotas(self):
         context = FakeContext(None, None)
         driver = FakeDriver()
@@ -2310,6 +2325,80 @@ class DbQuotaDriverTestCase(test.TestCase):
                 ])
         self.assertEqual(result, ['resv-1', 'resv-2', 'resv-3'])
 
+    def _stub_quota_get_all_by_project(self):
+        def fake_qgabp(context, project_id):
+            self.calls.append('quota_get_all_by_project')
+            return dict(instances=5)
+        self.stubs.Set(db, 'quota_get_all_by_project', fake_qgabp)
+
+    def _reserve_twice(self, advance=None):
+        self._stub_quota_get_all_by_project()
+        self._stub_get_project_quotas()
+        self._stub_quota_reserve()
+        ctxt = FakeContext('test_project', 'test_class')
+        expire = timeutils.utcnow() + datetime.timedelta(seconds=120)
+        self.driver.reserve(ctxt, quota.QUOTAS._resources,
+                            dict(instances=2), expire=expire)
+        if advance:
+            advance()
+        self.driver.reserve(ctxt, quota.QUOTAS._resources,
+                            dict(instances=2), expire=expire)
+        return expire
+
+    def test_reserve_limits_not_cached_by_default(self):
+        expire = self._reserve_twice()
+        self.assertEqual(['quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0),
+                          'quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0)], self.calls)
+
+    def test_reserve_limits_cached(self):
+        self.flags(quota_limits_cache_ttl=60)
+        self.addCleanup(self.driver.invalidate_limits_cache)
+        expire = self._reserve_twice()
+        self.assertEqual(['quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0),
+                          ('quota_reserve', expire, 0, 0)], self.calls)
+
+    def test_reserve_limits_cache_expired(self):
+        self.flags(quota_limits_cache_ttl=60)
+        self.addCleanup(self.driver.invalidate_limits_cache)
+        expire = self._reserve_twice(
+            advance=lambda: timeutils.advance_time_seconds(61))
+        self.assertEqual(['quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0),
+                          'quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0)], self.calls)
+
+    def test_reserve_limits_cache_invalidated(self):
+        self.flags(quota_limits_cache_ttl=60)
+        self.addCleanup(self.driver.invalidate_limits_cache)
+        expire = self._reserve_twice(
+            advance=quota.QUOTAS.invalidate_limits_cache)
+        self.assertEqual(['quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0),
+                          'quota_get_all_by_project', 'get_project_quotas',
+                          ('quota_reserve', expire, 0, 0)], self.calls)
+
+    def test_limit_check_limits_cached(self):
+        self.flags(quota_limits_cache_ttl=60)
+        self.addCleanup(self.driver.invalidate_limits_cache)
+        self._stub_quota_get_all_by_project()
+        self._stub_get_project_quotas()
+        ctxt = FakeContext('test_project', 'test_class')
+        for i in range(2):
+            self.driver.limit_check(ctxt, quota.QUOTAS._resources,
+                                    dict(metadata_items=128))
+        self.assertEqual(['quota_get_all_by_project', 'get_project_quotas'],
+                         self.calls)
+
+    def test_destroy_all_by_project_invalidates_limits_cache(self):
+        self.stubs.Set(db, 'quota_destroy_all_by_project',
+                       lambda context, project_id: None)
+        generation = quota._LIMITS_CACHE.generation
+        self.driver.destroy_all_by_project(None, 'test_project')
+        self.assertEqual(generation + 1, quota._LIMITS_CACHE.generation)
+
     def test_usage_reset(self):
         calls = []
 
@@ -2341,6 +2430,48 @@ class DbQuotaDriverTestCase(test.TestCase):
         self.assertEqual(calls, exemplar)
 
 
+class QuotaLimitsCacheTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(QuotaLimitsCacheTestCase, self).setUp()
+        self.flags(quota_limits_cache_ttl=60)
+        self.useFixture(test.TimeOverride())
+        self.cache = quota.QuotaLimitsCache()
+
+    def test_get_set(self):
+        self.assertIsNone(self.cache.get('key'))
+        self.cache.set('key', 'value', self.cache.generation)
+        self.assertEqual('value', self.cache.get('key'))
+
+    def test_disabled(self):
+        self.flags(quota_limits_cache_ttl=0)
+        self.cache.set('key', 'value', self.cache.generation)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_expired(self):
+        self.cache.set('key', 'value', self.cache.generation)
+        timeutils.advance_time_seconds(61)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_invalidate(self):
+        self.cache.set('key', 'value', self.cache.generation)
+        self.cache.invalidate()
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_set_after_concurrent_invalidate(self):
+        generation = self.cache.generation
+        self.cache.invalidate()
+        self.cache.set('key', 'stale', generation)
+        self.assertIsNone(self.cache.get('key'))
+
+    def test_max_entries(self):
+        self.stubs.Set(self.cache, 'MAX_ENTRIES', 2)
+        self.cache.set('key1', 'value1', self.cache.generation)
+        self.cache.set('key2', 'value2', self.cache.generation)
+        self.cache.set('key3', 'value3', self.cache.generation)
+        self.assertIsNone(self.cache.get('key1'))
+        self.assertEqual('value3', self.cache.get('key3'))
+
+
 class FakeSession(object):
     def begin(self):
         return self
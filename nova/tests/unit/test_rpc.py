@@ -0,0 +1,174 @@
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+import mock
+import oslo_messaging as messaging
+
+from nova import context
+from nova import rpc
+from nova import test
+
+
+class RPCInstrumentationTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(RPCInstrumentationTestCase, self).setUp()
+        self.flags(rpc_instrumentation=True)
+        self.addCleanup(rpc.reset_stats)
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.serializer = rpc._InstrumentedSerializer(
+            rpc.RequestContextSerializer(None))
+        self.fake_client = mock.Mock(
+            target=messaging.Target(topic='compute'))
+        self.client = rpc.InstrumentedRPCClient(self.fake_client)
+
+    def _fake_call(self, ctxt, method, **kwargs):
+        for value in kwargs.values():
+            self.serializer.serialize_entity(ctxt, value)
+        return self.serializer.deserialize_entity(ctxt, 'pong')
+
+    @mock.patch.object(messaging, 'RPCClient')
+    def test_get_client(self, mock_client):
+        client = rpc.get_client(messaging.Target(topic='compute'),
+                                transport=mock.sentinel.transport)
+        self.assertIsInstance(client, rpc.InstrumentedRPCClient)
+        self.assertIsInstance(mock_client.call_args[1]['serializer'],
+                              rpc._InstrumentedSerializer)
+
+    @mock.patch.object(messaging, 'RPCClient')
+    def test_get_client_disabled(self, mock_client):
+        self.flags(rpc_instrumentation=False)
+        client = rpc.get_client(messaging.Target(topic='compute'),
+                                transport=mock.sentinel.transport)
+        self.assertIs(mock_client.return_value, client)
+
+    def test_call_stats(self):
+        self.fake_client.prepare.return_value.call.side_effect = (
+            self._fake_call)
+        self.assertEqual('pong', self.client.call(self.context, 'ping',
+                                                  arg='foo'))
+
+        stats = rpc.get_stats()['client']['compute.ping']
+        self.assertEqual(1, stats['calls'])
+        self.assertEqual(0, stats['errors'])
+        self.assertEqual(len('"foo"'), stats['request_bytes'])
+        self.assertEqual(len('"pong"'), stats['reply_bytes'])
+        self.assertEqual(1, sum(stats['histogram'].values()))
+
+    def test_call_timeout(self):
+        self.fake_client.prepare.return_value.call.side_effect = (
+            messaging.MessagingTimeout)
+        self.assertRaises(messaging.MessagingTimeout,
+                          self.client.call, self.context, 'ping', arg='foo')
+
+        stats = rpc.get_stats()['client']['compute.ping']
+        self.assertEqual(1, stats['errors'])
+        self.assertEqual(1, stats['timeouts'])
+
+    def test_cast_prepared_topic(self):
+        cctxt = self.client.prepare(topic='scheduler', version='4.0')
+        cctxt.cast(self.context, 'update_instance_info', instance_info={})
+
+        self.fake_client.prepare.assert_called_once_with(topic='scheduler',
+                                                         version='4.0')
+        stats = rpc.get_stats()['client']
+        self.assertEqual(['scheduler.update_instance_info'], list(stats))
+
+    def test_endpoint_stats(self):
+        endpoint = mock.Mock(target=mock.sentinel.target)
+        endpoint.ping.return_value = 'pong'
+        endpoint.fail.side_effect = test.TestingException
+        wrapped = rpc.InstrumentedEndpoint(endpoint, 'compute')
+
+        self.assertIs(mock.sentinel.target, wrapped.target)
+        self.assertEqual('pong', wrapped.ping(self.context, arg='foo'))
+        self.assertRaises(test.TestingException, wrapped.fail, self.context)
+
+        stats = rpc.get_stats()['server']
+        self.assertEqual(1, stats['compute.ping']['calls'])
+        self.assertEqual(0, stats['compute.ping']['errors'])
+        self.assertEqual(1, stats['compute.fail']['errors'])
+        endpoint.ping.assert_called_once_with(self.context, arg='foo')
+
+    @mock.patch.object(rpc.LOG, 'info')
+    def test_log_stats(self, mock_info):
+        self.fake_client.prepare.return_value.call.side_effect = (
+            self._fake_call)
+        self.client.call(self.context, 'ping', arg='foo')
+        rpc.log_stats()
+        self.assertEqual(1, mock_info.call_count)
+        self.assertEqual('compute.ping', mock_info.call_args[0][1]['name'])
+
+    def test_reset_stats(self):
+        self.client.cast(self.context, 'ping', arg='foo')
+        rpc.reset_stats()
+        self.assertEqual({}, rpc.get_stats()['client'])
+
+
+class CastCoalescerTestCase(test.NoDBTestCase):
+    def setUp(self):
+        super(CastCoalescerTestCase, self).setUp()
+        self.window = 0
+        self.coalescer = rpc.CastCoalescer(lambda: self.window)
+        self.context = context.RequestContext('fake-user', 'fake-project')
+        self.cctxt = mock.Mock(target=messaging.Target(topic='compute',
+                                                       server='host1'))
+
+    def test_cast_disabled(self):
+        self.coalescer.cast(self.cctxt, self.context, 'refresh', 1,
+                            security_group_id=1)
+        self.cctxt.cast.assert_called_once_with(self.context, 'refresh',
+                                                security_group_id=1)
+
+    @mock.patch('eventlet.greenthread.spawn_after')
+    def test_cast_coalesced(self, mock_spawn):
+        self.window = 0.5
+        self.coalescer.cast(self.cctxt, self.context, 'refresh', 1,
+                            security_group_id=1)
+        self.coalescer.cast(self.cctxt, self.context, 'other', 1)
+        self.coalescer.cast(self.cctxt, self.context, 'refresh', 1,
+                            security_group_id=1)
+        self.coalescer.cast(self.cctxt, self.context, 'refresh', 2,
+                            security_group_id=2)
+        self.assertFalse(self.cctxt.cast.called)
+        mock_spawn.assert_called_once_with(0.5, self.coalescer.flush)
+
+        self.coalescer.flush()
+        self.assertEqual([mock.call(self.context, 'refresh',
+                                    security_group_id=1),
+                          mock.call(self.context, 'other'),
+                          mock.call(self.context, 'refresh',
+                                    security_group_id=2)],
+                         self.cctxt.cast.call_args_list)
+        self.assertTrue(mock_spawn.return_value.cancel.called)
+
+    @mock.patch('eventlet.greenthread.spawn_after')
+    def test_cast_merged(self, mock_spawn):
+        self.window = 0.5
+
+        def merge(earlier, later):
+            later['ids'] = earlier['ids'] + later['ids']
+
+        for i in range(3):
+            self.coalescer.cast(self.cctxt, self.context, 'refresh', 'key',
+                                merge=merge, ids=[i])
+        self.coalescer.flush()
+        self.cctxt.cast.assert_called_once_with(self.context, 'refresh',
+                                                ids=[0, 1, 2])
+
+    @mock.patch('eventlet.greenthread.spawn_after')
+    def test_flush_error(self, mock_spawn):
+        self.window = 0.5
+        self.cctxt.cast.side_effect = [test.TestingException, None]
+        self.coalescer.cast(self.cctxt, self.context, 'refresh', 1)
+        self.coalescer.cast(self.cctxt, self.context, 'refresh', 2)
+        self.coalescer.flush()
+        self.assertEqual(2, self.cctxt.cast.call_count)
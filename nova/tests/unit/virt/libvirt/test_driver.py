@@ -4373,6 +4373,23 @@ class LibvirtConnTestCase(test.NoDBTestCase):
         self.assertEqual(uuids[3], vm4.UUIDString())
         mock_list.assert_called_with(only_running=False)
 
+    @mock.patch.object(host.Host, "list_instance_domains")
+    def test_get_power_states(self, mock_list):
+        vm1 = FakeVirtDomain(id=3, name="instance00000001")
+        vm2 = FakeVirtDomain(name="instance00000002")
+        vm2._info[0] = libvirt_driver.VIR_DOMAIN_SHUTOFF
+        vm3 = FakeVirtDomain(name="instance00000003")
+        vm3.info = mock.Mock(side_effect=fakelibvirt.make_libvirtError(
+            fakelibvirt.libvirtError, 'Domain not found',
+            error_code=fakelibvirt.VIR_ERR_NO_DOMAIN))
+
+        mock_list.return_value = [vm1, vm2, vm3]
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        self.assertEqual({vm1.UUIDString(): power_state.RUNNING,
+                          vm2.UUIDString(): power_state.SHUTDOWN},
+                         drvr.get_power_states())
+        mock_list.assert_called_with(only_running=False)
+
     @mock.patch.object(host.Host, "list_instance_domains")
     def test_get_all_block_devices(self, mock_list):
         xml = [
@@ -6213,6 +6230,22 @@ class LibvirtConnTestCase(test.NoDBTestCase):
 
         self._test_live_migration_monitoring(domain_info_records, True)
 
+    @mock.patch.object(fake.FakeVirtAPI, 'update_live_migration_progress')
+    def test_live_migration_monitor_progress(self, mock_progress):
+        # NOTE: The records are consumed from the end of the list
+        domain_info_records = [
+            host.DomainJobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_COMPLETED),
+            "domain-stop",
+            "thread-finish",
+            host.DomainJobInfo(
+                type=fakelibvirt.VIR_DOMAIN_JOB_UNBOUNDED,
+                memory_total=100, memory_remaining=40),
+        ]
+
+        self._test_live_migration_monitoring(domain_info_records, True)
+        mock_progress.assert_called_once_with(self.context, mock.ANY, 60)
+
     def test_live_migration_monitor_success_race(self):
         # A normalish sequence but we're too slow to see the
         # completed job state
@@ -7400,6 +7433,35 @@ class LibvirtConnTestCase(test.NoDBTestCase):
             ]
         self.assertEqual(gotFiles, wantFiles)
 
+    def test_prefetch_image(self):
+        instance = objects.Instance(**self.test_instance)
+        instance.image_ref = 1
+        instance.root_gb = 10
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        drvr.image_backend = mock.MagicMock()
+        drvr.image_backend.backend.return_value.SUPPORTS_CLONE = False
+
+        drvr.prefetch_image(self.context, instance, {})
+
+        drvr.image_backend.image.assert_called_once_with(instance, 'disk')
+        mock_image = drvr.image_backend.image.return_value
+        mock_image.cache_template.assert_called_once_with(
+            fetch_func=fake_libvirt_utils.fetch_image,
+            filename='356a192b7913b04c54574d18c28d46e6395428ab',
+            context=self.context, image_id=1, user_id=instance.user_id,
+            project_id=instance.project_id, max_size=10 * units.Gi)
+
+    def test_prefetch_image_supports_clone(self):
+        instance = objects.Instance(**self.test_instance)
+        instance.image_ref = 1
+        drvr = libvirt_driver.LibvirtDriver(fake.FakeVirtAPI(), False)
+        drvr.image_backend = mock.MagicMock()
+        drvr.image_backend.backend.return_value.SUPPORTS_CLONE = True
+
+        drvr.prefetch_image(self.context, instance, {})
+
+        self.assertFalse(drvr.image_backend.image.called)
+
     def test_create_image_plain_os_type_blank(self):
         self._test_create_image_plain(os_type='',
                                       filename=self._EPHEMERAL_20_DEFAULT,
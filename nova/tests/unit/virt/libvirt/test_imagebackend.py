@@ -139,6 +139,24 @@ class _ImageTestCase(object):
 
         self.assertEqual(fake_processutils.fake_execute_get_log(), [])
 
+    def test_cache_template(self):
+        image = self.image_class(self.INSTANCE, self.NAME)
+        fn = mock.Mock()
+        image.cache_template(fn, self.TEMPLATE, max_size=self.SIZE)
+
+        fn.assert_called_once_with(target=self.TEMPLATE_PATH,
+                                   max_size=self.SIZE)
+        self.assertTrue(os.path.isdir(self.TEMPLATE_DIR))
+
+    def test_cache_template_exists(self):
+        os.makedirs(self.TEMPLATE_DIR)
+        open(self.TEMPLATE_PATH, 'w').close()
+        image = self.image_class(self.INSTANCE, self.NAME)
+        fn = mock.Mock()
+        image.cache_template(fn, self.TEMPLATE)
+
+        self.assertFalse(fn.called)
+
     def test_libvirt_fs_info(self):
         image = self.image_class(self.INSTANCE, self.NAME)
         fs = image.libvirt_fs_info("/mnt")
@@ -26,6 +26,7 @@ from oslo_utils import timeutils
 import six
 
 from nova.compute import manager
+from nova.compute import power_state
 from nova.console import type as ctype
 from nova import exception
 from nova import objects
@@ -530,6 +531,13 @@ class _VirtDriverTestCase(_FakeDriverBackendTestCase):
                           self.connection.get_info,
                           fake_instance)
 
+    @catch_notimplementederror
+    def test_get_power_states(self):
+        instance_ref, network_info = self._get_running_instance()
+        power_states = self.connection.get_power_states()
+        self.assertEqual(power_state.RUNNING,
+                         power_states[instance_ref['uuid']])
+
     @catch_notimplementederror
     def test_get_diagnostics(self):
         instance_ref, network_info = self._get_running_instance(obj=True)
@@ -487,6 +487,11 @@ class VMwareAPIVMTestCase(test.NoDBTestCase):
         uuids = self.conn.list_instance_uuids()
         self.assertEqual(len(uuids), 0)
 
+    def test_get_power_states(self):
+        self._create_vm()
+        self.assertEqual({self.uuid: power_state.RUNNING},
+                         self.conn.get_power_states())
+
     def _cached_files_exist(self, exists=True):
         cache = ds_obj.DatastorePath(self.ds, 'vmware_base',
                                       self.fake_image_uuid,
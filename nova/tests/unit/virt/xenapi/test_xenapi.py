@@ -377,6 +377,11 @@ class XenAPIVMTestCase(stubs.XenAPITestBase):
         self.assertEqual(len(uuids), len(instance_uuids))
         self.assertEqual(set(uuids), set(instance_uuids))
 
+    def test_get_power_states(self):
+        instance = self._create_instance()
+        self.assertEqual({instance['uuid']: power_state.RUNNING},
+                         self.conn.get_power_states())
+
     def test_get_rrd_server(self):
         self.flags(connection_url='myscheme://myaddress/',
                    group='xenserver')
@@ -166,7 +166,8 @@ class ComputeDriver(object):
     capabilities = {
         "has_imagecache": False,
         "supports_recreate": False,
-        "supports_migrate_to_same_host": False
+        "supports_migrate_to_same_host": False,
+        "supports_parallel_init_instance": False
     }
 
     def __init__(self, virtapi):
@@ -196,6 +197,17 @@ class ComputeDriver(object):
         # TODO(Vek): Need to pass context in for access to auth_token
         raise NotImplementedError()
 
+    def get_power_states(self):
+        """Return the power states of all the instances on this host.
+
+        Used by the compute manager to query the power state of every
+        instance in one call instead of one get_info() call each.
+        Instances missing from the result are looked up with get_info().
+
+        :returns: dict of power states, keyed by instance uuid
+        """
+        raise NotImplementedError()
+
     def get_num_instances(self):
         """Return the total number of virtual machines.
 
@@ -324,6 +336,22 @@ class ComputeDriver(object):
         """
         raise NotImplementedError()
 
+    def prefetch_image(self, context, instance, image_meta):
+        """Fetch the image of an instance about to be spawned into the image
+        cache of the driver.
+
+        Called when the build request for the instance is received, before
+        its resources are claimed, so that spawn() finds the image already
+        cached. This may run concurrently with spawn() for the same instance.
+        Drivers which do not cache images do not need to implement it.
+
+        :param context: security context
+        :param instance: nova.objects.instance.Instance being built
+        :param image_meta: image object returned by nova.image.glance that
+                           defines the image from which to boot this instance
+        """
+        pass
+
     def destroy(self, context, instance, network_info, block_device_info=None,
                 destroy_disks=True, migrate_data=None):
         """Destroy the specified instance from the Hypervisor.
@@ -125,7 +125,8 @@ class FakeDriver(driver.ComputeDriver):
     capabilities = {
         "has_imagecache": True,
         "supports_recreate": True,
-        "supports_migrate_to_same_host": True
+        "supports_migrate_to_same_host": True,
+        "supports_parallel_init_instance": True
         }
 
     # Since we don't have a real hypervisor, pretend we have lots of
@@ -327,6 +328,9 @@ class FakeDriver(driver.ComputeDriver):
                                      num_cpu=2,
                                      cpu_time_ns=0)
 
+    def get_power_states(self):
+        return {uuid: i.state for uuid, i in self.instances.items()}
+
     def get_diagnostics(self, instance):
         return {'cpu0_time': 17300000000,
                 'memory': 524288,
@@ -465,6 +469,7 @@ class FakeDriver(driver.ComputeDriver):
     def live_migration(self, context, instance, dest,
                        post_method, recover_method, block_migration=False,
                        migrate_data=None):
+        self.virtapi.update_live_migration_progress(context, instance, 100)
         post_method(context, instance, dest, block_migration,
                             migrate_data)
         return
@@ -542,6 +547,9 @@ class FakeVirtAPI(virtapi.VirtAPI):
     def provider_fw_rule_get_all(self, context):
         return db.provider_fw_rule_get_all(context)
 
+    def update_live_migration_progress(self, context, instance, progress):
+        pass
+
     @contextlib.contextmanager
     def wait_for_instance_event(self, instance, event_names, deadline=300,
                                 error_callback=None):
@@ -393,7 +393,8 @@ class LibvirtDriver(driver.ComputeDriver):
     capabilities = {
         "has_imagecache": True,
         "supports_recreate": True,
-        "supports_migrate_to_same_host": False
+        "supports_migrate_to_same_host": False,
+        "supports_parallel_init_instance": True
     }
 
     def __init__(self, virtapi, read_only=False):
@@ -613,6 +614,20 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return uuids
 
+    def get_power_states(self):
+        power_states = {}
+        for dom in self._host.list_instance_domains(only_running=False):
+            try:
+                dom_info = self._host.get_domain_info(dom)
+            except libvirt.libvirtError as ex:
+                # NOTE: The domain may have gone away since it was listed
+                if ex.get_error_code() == libvirt.VIR_ERR_NO_DOMAIN:
+                    continue
+                raise
+            power_states[dom.UUIDString()] = LIBVIRT_POWER_STATE[dom_info[0]]
+
+        return power_states
+
     def plug_vifs(self, instance, network_info):
         """Plug VIFs into networks."""
         for vif in network_info:
@@ -5650,6 +5665,8 @@ class LibvirtDriver(driver.ComputeDriver):
                                           100 / info.memory_total)
                     instance.progress = 100 - remaining
                     instance.save()
+                    self.virtapi.update_live_migration_progress(
+                        context, instance, instance.progress)
 
                     lg = LOG.debug
                     if (n % 60) == 0:
@@ -5955,6 +5972,22 @@ class LibvirtDriver(driver.ComputeDriver):
 
         return res_data
 
+    def prefetch_image(self, context, instance, image_meta):
+        # NOTE: Backends which can clone the image may not need the template
+        if (not instance.image_ref or
+                self.image_backend.backend().SUPPORTS_CLONE):
+            return
+        filename = imagecache.get_cache_fname(
+            {'image_id': instance.image_ref}, 'image_id')
+        backend = self.image_backend.image(instance, 'disk')
+        backend.cache_template(fetch_func=libvirt_utils.fetch_image,
+                               filename=filename,
+                               context=context,
+                               image_id=instance.image_ref,
+                               user_id=instance.user_id,
+                               project_id=instance.project_id,
+                               max_size=instance.root_gb * units.Gi)
+
     def _try_fetch_image_cache(self, image, fetch_func, context, filename,
                                image_id, instance, size,
                                fallback_from_host=None):
@@ -238,6 +238,28 @@ class Image(object):
                 os.access(self.path, os.W_OK)):
             utils.execute('fallocate', '-n', '-l', size, self.path)
 
+    def cache_template(self, fetch_func, filename, *args, **kwargs):
+        """Fetches the template into the image cache, without creating
+        the image itself.
+
+        Synchronizes on template fetching like cache(), which then finds
+        the template already fetched.
+
+        :fetch_func: Function that creates the base image
+                     Should accept `target` argument.
+        :filename: Name of the file in the image directory
+        """
+        @utils.synchronized(filename, external=True, lock_path=self.lock_path)
+        def fetch_func_sync(target, *args, **kwargs):
+            if not os.path.exists(target):
+                fetch_func(target=target, *args, **kwargs)
+
+        base_dir = os.path.join(CONF.instances_path,
+                                CONF.image_cache_subdirectory_name)
+        if not os.path.exists(base_dir):
+            fileutils.ensure_tree(base_dir)
+        fetch_func_sync(os.path.join(base_dir, filename), *args, **kwargs)
+
     def _can_fallocate(self):
         """Check once per class, whether fallocate(1) is available,
            and that the instances directory supports fallocate(2).
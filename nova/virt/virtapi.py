@@ -22,6 +22,14 @@ class VirtAPI(object):
         """
         raise NotImplementedError()
 
+    def update_live_migration_progress(self, context, instance, progress):
+        """Report the progress of a live migration from this host
+        :param context: security context
+        :param instance: nova.objects.instance.Instance being migrated
+        :param progress: percentage of the migration which is done
+        """
+        raise NotImplementedError()
+
     @contextlib.contextmanager
     def wait_for_instance_event(self, instance, event_names, deadline=300,
                                 error_callback=None):
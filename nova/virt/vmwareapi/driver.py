@@ -656,6 +656,10 @@ class VMwareVCDriver(driver.ComputeDriver):
         """Return info about the VM instance."""
         return self._vmops.get_info(instance)
 
+    def get_power_states(self):
+        """Return the power states of the VM instances of the cluster."""
+        return self._vmops.get_power_states()
+
     def get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         return self._vmops.get_diagnostics(instance)
@@ -1828,6 +1828,31 @@ class VMwareVMOps(object):
         LOG.debug("Got total of %s instances", str(len(lst_vm_names)))
         return lst_vm_names
 
+    def get_power_states(self):
+        """Get the power states of the VM instances of the cluster, keyed
+        by instance uuid, with a single property collector query.
+        """
+        properties = ['name', 'runtime.connectionState', 'runtime.powerState']
+        power_states = {}
+        if not self._root_resource_pool:
+            return power_states
+        vms = self._session._call_method(
+            vim_util, 'get_inner_objects', self._root_resource_pool, 'vm',
+            'VirtualMachine', properties)
+        while vms:
+            for vm in vms.objects:
+                props = dict((prop.name, prop.val) for prop in vm.propSet)
+                vm_name = props.get('name')
+                # Ignoring the orphaned or inaccessible VMs
+                if (props.get('runtime.connectionState') not in
+                        ["orphaned", "inaccessible"] and
+                        uuidutils.is_uuid_like(vm_name)):
+                    power_states[vm_name] = VMWARE_POWER_STATES[
+                        props['runtime.powerState']]
+            vms = self._session._call_method(vutil, 'continue_retrieval',
+                                             vms)
+        return power_states
+
     def get_vnc_console(self, instance):
         """Return connection info for a vnc console using vCenter logic."""
 
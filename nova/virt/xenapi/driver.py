@@ -336,6 +336,10 @@ class XenAPIDriver(driver.ComputeDriver):
         """Return data about VM instance."""
         return self._vmops.get_info(instance)
 
+    def get_power_states(self):
+        """Return the power states of the VMs on this host."""
+        return self._vmops.get_power_states()
+
     def get_diagnostics(self, instance):
         """Return data about VM diagnostics."""
         return self._vmops.get_diagnostics(instance)
@@ -204,6 +204,19 @@ class VMOps(object):
                 nova_uuids.append(nova_uuid)
         return nova_uuids
 
+    def get_power_states(self):
+        """Get the power states of the VMs found on the hypervisor, keyed
+        by nova instance uuid.
+        """
+        power_states = {}
+        for vm_ref, vm_rec in vm_utils.list_vms(self._session):
+            nova_uuid = vm_rec['other_config'].get('nova_uuid')
+            # NOTE: A rescue VM carries the uuid of the instance it rescues
+            if nova_uuid and not vm_rec['name_label'].endswith('-rescue'):
+                power_states[nova_uuid] = vm_utils.XENAPI_POWER_STATE[
+                    vm_rec['power_state']]
+        return power_states
+
     def confirm_migration(self, migration, instance, network_info):
         self._destroy_orig_vm(instance, network_info)
 
@@ -0,0 +1,194 @@
+#!/usr/bin/env python
+# Copyright (c) 2015 OpenStack Foundation
+# All Rights Reserved.
+#
+#    Licensed under the Apache License, Version 2.0 (the "License"); you may
+#    not use this file except in compliance with the License. You may obtain
+#    a copy of the License at
+#
+#         http://www.apache.org/licenses/LICENSE-2.0
+#
+#    Unless required by applicable law or agreed to in writing, software
+#    distributed under the License is distributed on an "AS IS" BASIS, WITHOUT
+#    WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied. See the
+#    License for the specific language governing permissions and limitations
+#    under the License.
+
+
+"""Micro-benchmarks for NovaObjects.
+
+By default, times obj_to_primitive() for an Instance, an InstanceList and a
+ComputeNode, both with the per-class field handler tables and with the plain
+field by field implementation they replaced, e.g.:
+
+    tools/with_venv.sh python tools/object_benchmark.py --instances 500
+
+With --memory, compares the memory used by a list of full Instance objects
+with the compact copies kept by the scheduler, e.g.:
+
+    tools/with_venv.sh python tools/object_benchmark.py --memory \
+        --instances 100000
+"""
+
+from __future__ import print_function
+
+import datetime
+import optparse
+import sys
+import timeit
+import uuid
+
+from oslo_serialization import jsonutils
+
+from nova import objects
+from nova.objects import base
+from nova.scheduler import host_manager
+
+
+def legacy_obj_to_primitive(self, target_version=None):
+    primitive = dict()
+    for name, field in self.fields.items():
+        if self.obj_attr_is_set(name):
+            primitive[name] = field.to_primitive(self, name,
+                                                 getattr(self, name))
+    if target_version:
+        self.obj_make_compatible(primitive, target_version)
+    obj = {'nova_object.name': self.obj_name(),
+           'nova_object.namespace': 'nova',
+           'nova_object.version': target_version or self.VERSION,
+           'nova_object.data': primitive}
+    if self.obj_what_changed():
+        obj['nova_object.changes'] = list(self.obj_what_changed())
+    return obj
+
+
+def make_flavor():
+    return objects.Flavor(id=1, flavorid='42', name='m1.small',
+                          memory_mb=2048, vcpus=1, root_gb=20,
+                          ephemeral_gb=0, swap=0, rxtx_factor=1.0,
+                          vcpu_weight=0, disabled=False, is_public=True,
+                          extra_specs={'hw:cpu_policy': 'shared'})
+
+
+def make_instance(index, optional_attrs=True):
+    now = datetime.datetime(2015, 6, 1, 12, 0, 0)
+    inst = objects.Instance(
+        id=index, uuid=str(uuid.uuid4()), user_id='fake-user',
+        project_id='fake-project', host='compute%d' % (index % 10),
+        node='node%d' % (index % 10), hostname='server-%d' % index,
+        display_name='server-%d' % index, vm_state='active',
+        power_state=1, task_state=None, memory_mb=2048, vcpus=1,
+        root_gb=20, ephemeral_gb=0, instance_type_id=1,
+        image_ref='fake-image', launched_at=now, created_at=now,
+        updated_at=now, deleted_at=None, deleted=False)
+    if optional_attrs:
+        inst.metadata = {'key%d' % i: 'value%d' % i for i in range(5)}
+        inst.system_metadata = {'image_key%d' % i: 'value%d' % i
+                                for i in range(20)}
+        inst.flavor = make_flavor()
+        inst.old_flavor = None
+        inst.new_flavor = None
+        inst.flavor.obj_reset_changes()
+    inst.obj_reset_changes()
+    return inst
+
+
+def make_compute_node():
+    now = datetime.datetime(2015, 6, 1, 12, 0, 0)
+    node = objects.ComputeNode(
+        id=1, host='compute1', hypervisor_hostname='node1',
+        hypervisor_type='QEMU', hypervisor_version=2001000, vcpus=32,
+        memory_mb=131072, local_gb=2048, vcpus_used=8,
+        memory_mb_used=16384, local_gb_used=160, free_ram_mb=114688,
+        free_disk_gb=1888, current_workload=0, running_vms=8,
+        disk_available_least=1800, host_ip='192.168.1.10',
+        cpu_info=jsonutils.dumps({'vendor': 'Intel', 'model': 'Haswell'}),
+        stats={'num_instances': '8', 'io_workload': '0'},
+        supported_hv_specs=[], created_at=now, updated_at=now,
+        deleted_at=None, deleted=False)
+    node.obj_reset_changes()
+    return node
+
+
+def deep_sizeof(obj, seen=None):
+    """Return the size of obj and everything it references, in bytes."""
+    if seen is None:
+        seen = set()
+    if id(obj) in seen:
+        return 0
+    seen.add(id(obj))
+    size = sys.getsizeof(obj)
+    if isinstance(obj, dict):
+        size += sum(deep_sizeof(key, seen) + deep_sizeof(value, seen)
+                    for key, value in obj.items())
+    elif isinstance(obj, (list, tuple, set, frozenset)):
+        size += sum(deep_sizeof(item, seen) for item in obj)
+    if hasattr(obj, '__dict__'):
+        size += deep_sizeof(obj.__dict__, seen)
+    for cls in type(obj).__mro__:
+        for name in getattr(cls, '__slots__', ()):
+            if hasattr(cls, name) and name not in ('__dict__', '__weakref__'):
+                try:
+                    size += deep_sizeof(getattr(obj, name), seen)
+                except AttributeError:
+                    pass
+    return size
+
+
+def memory(count):
+    # NOTE: The scheduler loads instances without any optional attributes
+    inst_list = objects.InstanceList(
+        objects=[make_instance(i, optional_attrs=False)
+                 for i in range(count)])
+    compact = inst_list.obj_compact(host_manager.COMPACT_INSTANCE_FIELDS)
+    compact_size = deep_sizeof(compact)
+    full_size = deep_sizeof(inst_list.objects)
+    for label, size in (('Instance', full_size),
+                        ('CompactInstance', compact_size)):
+        print('%-20s %10.1f MiB %8d bytes/instance' %
+              (label, size / 1048576.0, size // count))
+
+
+def bench(label, func, number):
+    best = min(timeit.repeat(func, number=number, repeat=3))
+    print('%-40s %10.3f ms' % (label, best * 1000.0 / number))
+
+
+def main():
+    parser = optparse.OptionParser()
+    parser.add_option('-i', '--instances', type='int', default=200,
+                      help='Number of instances in the InstanceList')
+    parser.add_option('-n', '--number', type='int', default=20,
+                      help='Number of serializations per measurement')
+    parser.add_option('-m', '--memory', action='store_true', default=False,
+                      help='Measure memory use instead of serialization')
+    options, args = parser.parse_args()
+
+    objects.register_all()
+    if options.memory:
+        memory(options.instances)
+        return
+
+    instance = make_instance(0)
+    inst_list = objects.InstanceList(
+        objects=[make_instance(i) for i in range(options.instances)])
+    inst_list.obj_reset_changes()
+    compute_node = make_compute_node()
+    cases = [('Instance', instance),
+             ('InstanceList(%d)' % options.instances, inst_list),
+             ('ComputeNode', compute_node)]
+
+    fast_obj_to_primitive = base.NovaObject.__dict__['obj_to_primitive']
+    for impl, func in (('legacy', legacy_obj_to_primitive),
+                       ('fast', fast_obj_to_primitive)):
+        base.NovaObject.obj_to_primitive = func
+        try:
+            for name, obj in cases:
+                bench('%s %s' % (impl, name), obj.obj_to_primitive,
+                      options.number)
+        finally:
+            base.NovaObject.obj_to_primitive = fast_obj_to_primitive
+
+
+if __name__ == '__main__':
+    main()